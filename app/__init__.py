@@ -5,7 +5,6 @@ Modularna struktura z zachowaniem pełnej kompatybilności
 
 import os
 import logging
-import gzip
 import secrets
 from flask import Flask, request, Response
 from flask_wtf.csrf import CSRFProtect
@@ -29,12 +28,62 @@ def create_app():
     
     # Podstawowa konfiguracja
     app.config['SECRET_KEY'] = os.environ.get("SECRET_KEY", "5G5_hLlJRHaOAwQH-YvDcrQhp7T7TQ6rxtQdI07x9k")
-    app.config['DATABASE_PATH'] = os.path.join(os.path.dirname(__file__), "..", "app.db")
+    app.config['DATABASE_PATH'] = os.environ.get("DATABASE_PATH",
+                                                 os.path.join(os.path.dirname(__file__), "..", "app.db"))
+    
+    # Limity żądań (Flask-Limiter) - wyłączane np. dla serwera testów obciążeniowych.
+    # Magazyn liczników wspólny dla workerów gunicorna (sqlite:///... - ustawia gunicorn.conf.py),
+    # jeden proces (serwer deweloperski, testy) - memory://
+    app.config['RATELIMIT_ENABLED'] = os.environ.get("RATELIMIT_ENABLED", "true").lower() == "true"
+    app.config['RATELIMIT_STORAGE_URI'] = os.environ.get("RATELIMIT_STORAGE_URI", "memory://")
+    app.config['RATELIMIT_DEFAULT'] = os.environ.get("RATELIMIT_DEFAULT", "2000 per day;500 per hour")
+    app.config['RATELIMIT_SWALLOW_ERRORS'] = True  # błąd magazynu liczników nie blokuje żądań
+    # Liczba zaufanych proxy przed aplikacją (nginx = 1) - adres klienta z X-Forwarded-For.
+    # Bez tego za proxy każdy anonimowy klient ma adres 127.0.0.1 i wspólny limit
+    app.config['PROXY_FIX_HOPS'] = int(os.environ.get("PROXY_FIX_HOPS", "0"))
+    
+    # Instrumentacja zapytań SQL - próg wolnego zapytania i nagłówki X-DB-Query-*
+    app.config['SLOW_QUERY_MS'] = float(os.environ.get("SLOW_QUERY_MS", "100"))
+    if os.environ.get("DB_QUERY_HEADERS"):
+        app.config['DB_QUERY_HEADERS'] = os.environ["DB_QUERY_HEADERS"].lower() == "true"
+    
+    # Blokady SQLite i checkpointy WAL - maksymalne oczekiwanie na blokadę (s),
+    # co ile sekund checkpoint PASSIVE (0 = wyłączone), po ilu sekundach bez zapisów TRUNCATE
+    app.config['DB_LOCK_TIMEOUT'] = float(os.environ.get("DB_LOCK_TIMEOUT", "30"))
+    app.config['DB_CHECKPOINT_INTERVAL'] = float(os.environ.get("DB_CHECKPOINT_INTERVAL", "60"))
+    app.config['DB_CHECKPOINT_QUIET_SECONDS'] = float(os.environ.get("DB_CHECKPOINT_QUIET_SECONDS", "120"))
+    
+    # Jeden wątek zapisujący na proces (szeregowanie transakcji zapisu, group commit)
+    app.config['DB_WRITE_QUEUE'] = os.environ.get("DB_WRITE_QUEUE", "true").lower() == "true"
+    app.config['DB_WRITE_BATCH'] = int(os.environ.get("DB_WRITE_BATCH", "32"))
+    # Group commit: okno zbierania równoległych zapisów i limit opóźnienia commitu (ms)
+    app.config['DB_GROUP_COMMIT_WINDOW_MS'] = float(os.environ.get("DB_GROUP_COMMIT_WINDOW_MS", "2"))
+    app.config['DB_GROUP_COMMIT_MAX_DELAY_MS'] = float(os.environ.get("DB_GROUP_COMMIT_MAX_DELAY_MS", "20"))
+    
+    # Hashowanie haseł w ograniczonej puli wątków - liczba obliczeń naraz,
+    # maksymalna kolejka (dalsze próby odrzucane), limit czekania (s)
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get("PASSWORD_HASH_QUEUE", "16"))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))
+    # Algorytm i parametry nowych hashy (scrypt: "n=16384,r=8,p=1", pbkdf2_sha256: "100000"),
+    # dobór pod docelowy czas: python -m benchmarks.password_params
+    app.config['PASSWORD_HASH_ALGORITHM'] = os.environ.get("PASSWORD_HASH_ALGORITHM", "scrypt")
+    app.config['PASSWORD_HASH_PARAMS'] = os.environ.get("PASSWORD_HASH_PARAMS", "")
     
     # Konfiguracja VAPID dla Web Push Notifications
     app.config['VAPID_PUBLIC_KEY'] = os.environ.get("VAPID_PUBLIC_KEY", "")
     app.config['VAPID_PRIVATE_KEY'] = os.environ.get("VAPID_PRIVATE_KEY", "")
     app.config['VAPID_CLAIM_EMAIL'] = os.environ.get("VAPID_CLAIM_EMAIL", "admin@grafik4600.com")
+    # Wysyłka push - równoległe wysyłki, timeout (s), ponowienia, wielkość partii, TTL (s)
+    app.config['PUSH_WORKERS'] = int(os.environ.get("PUSH_WORKERS", "4"))
+    app.config['PUSH_TIMEOUT'] = float(os.environ.get("PUSH_TIMEOUT", "10"))
+    app.config['PUSH_MAX_RETRIES'] = int(os.environ.get("PUSH_MAX_RETRIES", "3"))
+    app.config['PUSH_BATCH_SIZE'] = int(os.environ.get("PUSH_BATCH_SIZE", "100"))
+    app.config['PUSH_TTL'] = int(os.environ.get("PUSH_TTL", "86400"))
+    # Dodatkowe hosty usług push (po przecinku) poza znanymi usługami przeglądarek (app/push.py)
+    app.config['PUSH_ALLOWED_HOSTS'] = os.environ.get("PUSH_ALLOWED_HOSTS", "")
+    # Powiadomienia o zmianach zbierane per użytkownik przez tyle sekund i wysyłane jako jedno
+    app.config['PUSH_COALESCE_SECONDS'] = float(os.environ.get("PUSH_COALESCE_SECONDS", "5"))
     
     # CSRF Protection
     csrf = CSRFProtect()
@@ -54,6 +103,26 @@ def create_app():
     # Inicjalizacja bazy danych
     database.init_app(app)
     
+    # Adres i schemat klienta z nagłówków zaufanego proxy (klucze limitów, logi)
+    if app.config['PROXY_FIX_HOPS'] > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    
+    # Jeden limiter dla całej aplikacji (trasy auth i API)
+    from .rate_limit import limiter
+    limiter.init_app(app)
+    
+    # Pula hashowania haseł
+    from .password_utils import PasswordHasher
+    PasswordHasher(app)
+    
+    # Wysyłka powiadomień Web Push
+    from .push import PushSender
+    from .notifications import NotificationDispatcher
+    PushSender(app)
+    NotificationDispatcher(app)
+    
     # Inicjalizuj trasy autoryzacji
     auth_routes.init_auth_routes(app)
     
@@ -63,24 +132,55 @@ def create_app():
     app.register_blueprint(auth_routes.bp)
     app.register_blueprint(admin.bp)
     
-    # Middleware dla cache control i compression
+    # Tworzenie tabel i migracje schematu - "flask init-db" z install.sh / manage.sh update
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Zainicjalizuj bazę danych i wykonaj migracje schematu"""
+        database.init_db()
+        print("Baza danych zainicjalizowana")
+    
+    # Metryki żądań w formacie Prometheus (/metrics) - rejestrowane przed kompresją,
+    # żeby czas żądania obejmował też kompresję odpowiedzi
+    app.config['METRICS_ENABLED'] = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    app.config['METRICS_TOKEN'] = os.environ.get("METRICS_TOKEN", "")
+    from .metrics import RequestMetrics
+    RequestMetrics(app)
+    
+    # Profilowanie na żądanie (cProfile per żądanie + próbkowanie stosów) - tylko admin
+    if os.environ.get("PROFILE_DIR"):
+        app.config['PROFILE_DIR'] = os.environ["PROFILE_DIR"]
+    from .profiling import Profiler
+    Profiler(app)
+    
+    # Kompresja odpowiedzi dynamicznych (HTML/JSON)
+    app.config['COMPRESS_RESPONSES'] = os.environ.get("COMPRESS_RESPONSES", "false").lower() == "true"
+    app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+    
+    # Serwowanie prekompresowanych plików statycznych (.br/.gz)
+    from .compression import PrecompressedStatic, ResponseCompressor
+    PrecompressedStatic(app)
+    ResponseCompressor(app)
+    
+    # Wersjonowanie plików statycznych hashem zawartości (asset_url w szablonach)
+    from .assets import AssetFingerprints, IMMUTABLE_CACHE_CONTROL
+    assets = AssetFingerprints(app)
+    
+    # Middleware dla cache control i nagłówków bezpieczeństwa
     @app.after_request
     def after_request(response):
-        # Wyłącz cache dla plików statycznych (CSS, JS) - zawsze pobieraj najnowsze wersje
+        # Pliki z aktualnym hashem zawartości (?v=...) mogą być cachowane na stałe,
+        # pozostałe pliki statyczne (CSS, JS) - zawsze pobieraj najnowsze wersje
         if request.path.startswith("/static/"):
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-            
-            # Add compression for static files
-            if (request.path.endswith(('.css', '.js', '.html')) and 
-                'gzip' in request.headers.get('Accept-Encoding', '')):
-                
-                # Check if compressed version exists
-                compressed_path = f"{request.path}.gz"
-                if os.path.exists(os.path.join(app.static_folder, compressed_path.lstrip('/'))):
-                    response.headers['Content-Encoding'] = 'gzip'
-                    response.headers['Content-Type'] = response.headers.get('Content-Type', '')
+            if assets.is_fingerprinted_request() and response.status_code == 200:
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            else:
+                response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+                response.headers["Pragma"] = "no-cache"
+                response.headers["Expires"] = "0"
+        
+        # Service Worker z /static/ kontroluje całą aplikację (scope '/')
+        if request.path == "/static/sw.js":
+            response.headers["Service-Worker-Allowed"] = "/"
         
         # Dodaj nagłówki bezpieczeństwa
         response.headers["X-Frame-Options"] = "DENY"
@@ -0,0 +1,75 @@
+"""
+Static asset fingerprinting
+Content-hash versions for static files, used in templates (asset_url) and
+in the service worker precache list generated by optimize_assets.py
+"""
+
+import os
+import hashlib
+import logging
+from typing import Dict, Optional
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+# Long-lived caching for URLs carrying the current content hash
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def file_fingerprint(path: str, length: int = 10) -> str:
+    """Short content hash of a file (same algorithm as optimize_assets.py)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:length]
+
+class AssetFingerprints:
+    """Content-hash versions of static files
+
+    Hashes are computed once at startup. Templates use ``asset_url(filename)``
+    which yields ``/static/<filename>?v=<hash>``; requests whose ``v`` matches
+    the current hash are served with an immutable Cache-Control header.
+    """
+
+    def __init__(self, app=None):
+        self.static_folder: Optional[str] = None
+        self._hashes: Dict[str, str] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.build_index()
+        app.jinja_env.globals['asset_url'] = self.asset_url
+        app.extensions['asset_fingerprints'] = self
+
+    def build_index(self) -> None:
+        """Hash every file in the static folder"""
+        hashes: Dict[str, str] = {}
+        if self.static_folder and os.path.isdir(self.static_folder):
+            for root, _, files in os.walk(self.static_folder):
+                for name in files:
+                    if name.endswith(('.gz', '.br')):
+                        continue
+                    path = os.path.join(root, name)
+                    rel_path = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                    hashes[rel_path] = file_fingerprint(path)
+        self._hashes = hashes
+        logger.info(f"Asset fingerprints: {len(hashes)} files")
+
+    def fingerprint(self, filename: str) -> Optional[str]:
+        return self._hashes.get(filename)
+
+    def asset_url(self, filename: str) -> str:
+        """URL of a static file with its content hash"""
+        version = self.fingerprint(filename)
+        if version is None:
+            return f"/static/{filename}"
+        return f"/static/{filename}?v={version}"
+
+    def is_fingerprinted_request(self) -> bool:
+        """Whether current static request carries the current content hash"""
+        if not request.path.startswith("/static/"):
+            return False
+        version = request.args.get('v')
+        return version is not None and version == self.fingerprint(request.path[len("/static/"):])
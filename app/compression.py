@@ -0,0 +1,300 @@
+"""
+Compression utilities for performance optimization
+Serving of precompressed static assets (.br/.gz siblings) and on-the-fly
+compression of dynamic HTML/JSON responses
+"""
+
+import os
+import gzip
+import json
+import zlib
+import logging
+import mimetypes
+from functools import wraps
+from typing import Dict, Iterable, Iterator, List, Optional
+from flask import request, send_from_directory, abort, current_app
+from werkzeug.security import safe_join
+from .assets import file_fingerprint
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Encodings in order of preference, mapped to the sibling file extension
+ENCODING_EXTENSIONS = [
+    ('br', '.br'),
+    ('gzip', '.gz'),
+]
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Parse Accept-Encoding header into {encoding: q-value}"""
+    encodings: Dict[str, float] = {}
+    if not header:
+        return encodings
+
+    for part in header.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, params = part.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+def negotiate_encoding(header: Optional[str], available: List[str]) -> Optional[str]:
+    """Pick the best encoding from available ones accepted by the client"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*')
+    for encoding in available:
+        q = accepted.get(encoding, wildcard)
+        if q is not None and q > 0:
+            return encoding
+    return None
+
+# Written by optimize_assets.py: {"app.js.gz": "<sha256 of app.js>", ...}
+PRECOMPRESSED_MANIFEST = 'precompressed.json'
+
+def load_precompressed_manifest(static_folder: str) -> Dict[str, str]:
+    """Source hashes recorded for precompressed variants (empty when missing)"""
+    path = os.path.join(static_folder, PRECOMPRESSED_MANIFEST)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable {path}, precompressed files ignored: {e}")
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+class PrecompressedStatic:
+    """Static file handler serving precompressed variants
+
+    The static folder is scanned once at startup; for every asset with a
+    fresh .br/.gz sibling the available encodings are remembered, so no
+    filesystem lookups happen on the request path. A sibling is fresh when
+    the source hash optimize_assets.py recorded for it in precompressed.json
+    matches the asset's current content (mtimes do not survive checkouts,
+    and an edit can keep the file size).
+    """
+
+    def __init__(self, app=None):
+        self.static_folder: Optional[str] = None
+        self._index: Dict[str, List[str]] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Index static folder and replace the default static view"""
+        self.static_folder = app.static_folder
+        self.build_index()
+        app.view_functions['static'] = self.send_static_file
+        app.extensions['precompressed_static'] = self
+
+    def build_index(self) -> None:
+        """Scan static folder for assets with precompressed siblings"""
+        index: Dict[str, List[str]] = {}
+        compressed_exts = tuple(ext for _, ext in ENCODING_EXTENSIONS)
+
+        if self.static_folder and os.path.isdir(self.static_folder):
+            manifest = load_precompressed_manifest(self.static_folder)
+            for root, _, files in os.walk(self.static_folder):
+                for name in files:
+                    if name.endswith(compressed_exts):
+                        continue
+                    path = os.path.join(root, name)
+                    rel_path = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                    encodings = self._fresh_encodings(path, rel_path, manifest)
+                    if encodings:
+                        index[rel_path] = encodings
+
+        self._index = index
+        logger.info(f"Precompressed static index: {len(index)} assets")
+
+    @staticmethod
+    def _fresh_encodings(path: str, rel_path: str, manifest: Dict[str, str]) -> List[str]:
+        """Return encodings whose sibling file was compressed from the current original"""
+        encodings = []
+        source_hash = None
+        for encoding, ext in ENCODING_EXTENSIONS:
+            sibling = path + ext
+            if not os.path.isfile(sibling):
+                continue
+            if source_hash is None:
+                source_hash = file_fingerprint(path, length=64)
+            if manifest.get(rel_path + ext) != source_hash:
+                logger.warning(f"Stale precompressed file ignored: {sibling}")
+                continue
+            encodings.append(encoding)
+        return encodings
+
+    def encodings_for(self, filename: str) -> List[str]:
+        """Get available encodings for a static asset"""
+        return self._index.get(filename, [])
+
+    def send_static_file(self, filename: str):
+        """View function replacing Flask's default static endpoint"""
+        if safe_join(self.static_folder, filename) is None:
+            abort(404)
+
+        available = self.encodings_for(filename)
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), available)
+
+        if encoding is None:
+            response = send_from_directory(self.static_folder, filename)
+        else:
+            ext = dict(ENCODING_EXTENSIONS)[encoding]
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(self.static_folder, filename + ext, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+
+        if available:
+            response.vary.add('Accept-Encoding')
+        return response
+
+# Mimetypes worth compressing on the fly
+COMPRESSIBLE_MIMETYPES = {
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/manifest+json',
+}
+
+def no_compress(func):
+    """Decorator excluding a view from dynamic response compression
+
+    Use for responses that are already compressed (xlsx, images, archives).
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+    wrapper.no_compress = True
+    return wrapper
+
+class _StreamCompressor:
+    """Incremental compressor flushing after every chunk"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        else:
+            # wbits=31 -> gzip container
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, level: int) -> Iterator[bytes]:
+    """Compress an iterable of chunks, yielding output as soon as it is available"""
+    compressor = _StreamCompressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    """Compress a complete response body"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+class ResponseCompressor:
+    """after_request middleware compressing large dynamic responses
+
+    Configuration (app.config):
+        COMPRESS_RESPONSES   - enable middleware (default False - nginx compresses
+                               proxied responses; opt in when serving directly)
+        COMPRESS_MIN_SIZE    - minimum body size in bytes (default 1024)
+        COMPRESS_LEVEL       - gzip level / Brotli quality (default 6)
+        COMPRESS_BROTLI      - allow Brotli when the module is installed (default True)
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_RESPONSES', False)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BROTLI', True)
+        app.after_request(self.after_request)
+        app.extensions['response_compressor'] = self
+
+    def _available_encodings(self) -> List[str]:
+        if BROTLI_AVAILABLE and current_app.config['COMPRESS_BROTLI']:
+            return ['br', 'gzip']
+        return ['gzip']
+
+    @staticmethod
+    def _view_opted_out() -> bool:
+        view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+        return bool(getattr(view, 'no_compress', False))
+
+    def after_request(self, response):
+        """Compress response if client, content type and size allow it"""
+        config = current_app.config
+        if not config['COMPRESS_RESPONSES']:
+            return response
+
+        if (response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or response.status_code < 200
+                or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.direct_passthrough
+                or request.method == 'HEAD'
+                or self._view_opted_out()):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'),
+                                      self._available_encodings())
+        if encoding is None:
+            return response
+
+        level = config['COMPRESS_LEVEL']
+
+        if response.is_streamed:
+            # Streamed body is compressed chunk by chunk - length is unknown
+            response.response = compress_stream(response.response, encoding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(compress_bytes(data, encoding, level))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
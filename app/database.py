@@ -3,34 +3,73 @@ Zarządzanie bazą danych SQLite
 Zachowuje pełną kompatybilność z istniejącą strukturą
 """
 
+import os
+import time
+import hashlib
+import queue
 import sqlite3
 import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
 from flask import g, current_app
+from .metrics import observe_checkpoint, set_wal_size, observe_write_batch, observe_write_queue_wait
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows - bez blokady, checkpointy w każdym procesie
+    FCNTL_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Tryby PRAGMA wal_checkpoint
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+def connect(db_path, lock_timeout=30.0, instrumented=True, slow_query_ms=100, isolation_level=''):
+    """Otwórz połączenie z optymalizacjami (używane przez get_db i wątek zapisujący)"""
+    conn = sqlite3.connect(
+        db_path,
+        timeout=lock_timeout,  # Maksymalny czas oczekiwania na blokadę zapisu
+        check_same_thread=False,  # Allow multi-threading
+        isolation_level=isolation_level
+    )
+    conn.row_factory = sqlite3.Row
+    
+    # Enable WAL mode for better concurrency
+    conn.execute("PRAGMA journal_mode=WAL")
+    
+    # Optimize SQLite settings for performance
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=10000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")  # 256MB memory mapping
+    
+    # Enable foreign key constraints
+    conn.execute("PRAGMA foreign_keys=ON")
+    
+    # Pomiar czasu zapytań, liczba zapytań na żądanie, log wolnych zapytań
+    # Oczekiwanie na blokady przejmuje wrapper (busy_timeout=0) - liczy ponowienia
+    # po SQLITE_BUSY i czas czekania na blokadę w żądaniu
+    if instrumented:
+        from .db_instrumentation import InstrumentedConnection
+        conn.execute("PRAGMA busy_timeout=0")
+        conn = InstrumentedConnection(
+            conn,
+            slow_query_threshold=slow_query_ms / 1000,
+            lock_timeout=lock_timeout
+        )
+    return conn
+
 def get_db():
     """Pobierz połączenie z bazą danych z optymalizacjami"""
     if 'db' not in g:
-        g.db = sqlite3.connect(
+        g.db = connect(
             current_app.config['DATABASE_PATH'],
-            timeout=30.0,  # Increase timeout for better reliability
-            check_same_thread=False  # Allow multi-threading
+            lock_timeout=current_app.config.get('DB_LOCK_TIMEOUT', 30.0),
+            instrumented=current_app.config.get('DB_INSTRUMENTATION', True),
+            slow_query_ms=current_app.config.get('SLOW_QUERY_MS', 100)
         )
-        g.db.row_factory = sqlite3.Row
-        
-        # Enable WAL mode for better concurrency
-        g.db.execute("PRAGMA journal_mode=WAL")
-        
-        # Optimize SQLite settings for performance
-        g.db.execute("PRAGMA synchronous=NORMAL")
-        g.db.execute("PRAGMA cache_size=10000")
-        g.db.execute("PRAGMA temp_store=MEMORY")
-        g.db.execute("PRAGMA mmap_size=268435456")  # 256MB memory mapping
-        
-        # Enable foreign key constraints
-        g.db.execute("PRAGMA foreign_keys=ON")
-        
     return g.db
 
 def close_db(e=None):
@@ -83,6 +122,7 @@ def init_db():
         ensure_schedule_changes_table()
         ensure_push_subscriptions_table()
         ensure_draft_shifts_table()
+        ensure_whitelist_table()
         
         # Migruj tabelę users do nowej struktury
         migrate_users_table()
@@ -117,12 +157,17 @@ def ensure_swaps_table():
                   recipient_status TEXT DEFAULT 'PENDING',
                   boss_status TEXT DEFAULT 'PENDING',
                   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  version INTEGER NOT NULL DEFAULT 0,    -- Wersja prośby (optymistyczna kontrola zmian)
                   FOREIGN KEY (requester_user_id) REFERENCES users (id)
                 );
             ''')
             logger.info("Tabela swap_requests utworzona")
         else:
-            logger.info("Tabela swap_requests już istnieje")
+            cols = db.execute("PRAGMA table_info(swap_requests)").fetchall()
+            if not any(c[1] == 'version' for c in cols):
+                db.execute("ALTER TABLE swap_requests ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                db.commit()
+                logger.info("Dodano kolumnę 'version' do tabeli swap_requests")
             
     except Exception as e:
         logger.error(f"Błąd podczas tworzenia tabeli swap_requests: {e}")
@@ -189,8 +234,16 @@ def ensure_schedule_changes_table():
         logger.error(f"Błąd podczas tworzenia tabeli schedule_changes: {e}")
         raise
 
+def push_endpoint_hash(endpoint):
+    """Klucz subskrypcji push - SHA-256 adresu endpointu (jeden wiersz na urządzenie)"""
+    return hashlib.sha256(endpoint.encode('utf-8')).hexdigest()
+
 def ensure_push_subscriptions_table():
-    """Tworzy tabelę push_subscriptions jeśli nie istnieje"""
+    """Tworzy tabelę push_subscriptions jeśli nie istnieje
+    
+    Wiele urządzeń na użytkownika - wiersz na endpoint (unikalny endpoint_hash),
+    last_seen odświeżane przy każdej rejestracji subskrypcji z urządzenia.
+    """
     try:
         db = get_db()
         
@@ -201,19 +254,58 @@ def ensure_push_subscriptions_table():
                 CREATE TABLE push_subscriptions (
                   id INTEGER PRIMARY KEY AUTOINCREMENT,
                   user_id INTEGER NOT NULL,
+                  endpoint_hash TEXT,               -- SHA-256 endpointu (push_endpoint_hash)
                   subscription_data TEXT NOT NULL,
                   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                   FOREIGN KEY (user_id) REFERENCES users (id)
                 );
             ''')
             logger.info("Tabela push_subscriptions utworzona")
         else:
             logger.info("Tabela push_subscriptions już istnieje")
+            migrate_push_subscriptions_table()
+        
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_push_subscriptions_endpoint ON push_subscriptions(endpoint_hash)")
+        db.execute("CREATE INDEX IF NOT EXISTS idx_push_subscriptions_user ON push_subscriptions(user_id)")
             
     except Exception as e:
         logger.error(f"Błąd podczas tworzenia tabeli push_subscriptions: {e}")
         raise
 
+def migrate_push_subscriptions_table():
+    """Dodaje endpoint_hash/last_seen do starej tabeli (jedna subskrypcja na użytkownika)"""
+    import json
+    db = get_db()
+    cols = [c[1] for c in db.execute("PRAGMA table_info(push_subscriptions)").fetchall()]
+    if 'endpoint_hash' in cols:
+        return
+    
+    db.execute("ALTER TABLE push_subscriptions ADD COLUMN endpoint_hash TEXT")
+    if 'last_seen' not in cols:
+        db.execute("ALTER TABLE push_subscriptions ADD COLUMN last_seen TIMESTAMP")
+        db.execute("UPDATE push_subscriptions SET last_seen = created_at")
+    
+    # Wylicz klucze - przy powtórzonym endpoincie zostaje najnowszy wiersz
+    seen = set()
+    duplicates = []
+    rows = db.execute("SELECT id, subscription_data FROM push_subscriptions ORDER BY id DESC").fetchall()
+    for row in rows:
+        try:
+            endpoint = json.loads(row[1]).get('endpoint')
+        except (TypeError, ValueError, AttributeError):
+            endpoint = None
+        if not endpoint:
+            continue
+        key = push_endpoint_hash(endpoint)
+        if key in seen:
+            duplicates.append((row[0],))
+            continue
+        seen.add(key)
+        db.execute("UPDATE push_subscriptions SET endpoint_hash = ? WHERE id = ?", (key, row[0]))
+    db.executemany("DELETE FROM push_subscriptions WHERE id = ?", duplicates)
+    logger.info(f"Tabela push_subscriptions zmigrowana (usunięto {len(duplicates)} duplikatów endpointów)")
+
 def ensure_draft_shifts_table():
     """Tworzy tabelę draft_shifts jeśli nie istnieje"""
     try:
@@ -248,11 +340,11 @@ def ensure_request_history_table():
     try:
         db = get_db()
         
-        # Sprawdź czy tabela istnieje
+        # Sprawdź czy tabela istnieje (IF NOT EXISTS - równoległe żądania mogą tworzyć ją naraz)
         cursor = db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='request_history'")
         if not cursor.fetchone():
             db.execute('''
-                CREATE TABLE request_history (
+                CREATE TABLE IF NOT EXISTS request_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     original_id INTEGER NOT NULL,
                     type VARCHAR(20) NOT NULL, -- 'swap' lub 'unavailability'
@@ -274,9 +366,9 @@ def ensure_request_history_table():
             ''')
             
             # Dodaj indeksy dla lepszej wydajności
-            db.execute('CREATE INDEX idx_request_history_type ON request_history(type)')
-            db.execute('CREATE INDEX idx_request_history_status ON request_history(final_status)')
-            db.execute('CREATE INDEX idx_request_history_archived_at ON request_history(archived_at)')
+            db.execute('CREATE INDEX IF NOT EXISTS idx_request_history_type ON request_history(type)')
+            db.execute('CREATE INDEX IF NOT EXISTS idx_request_history_status ON request_history(final_status)')
+            db.execute('CREATE INDEX IF NOT EXISTS idx_request_history_archived_at ON request_history(archived_at)')
             
             logger.info("Tabela request_history utworzona")
         else:
@@ -287,7 +379,16 @@ def ensure_request_history_table():
         raise
 
 def ensure_whitelist_table():
-    """Tworzy tabelę whitelist_emails jeśli nie istnieje"""
+    """Tworzy tabelę whitelist_emails jeśli nie istnieje
+    
+    Razem z tabelą whitelist_version (jeden wiersz z licznikiem) i wyzwalaczami,
+    które zwiększają licznik przy każdej zmianie listy - procesy robocze
+    odświeżają swoją kopię listy tylko po zmianie wersji (app/whitelist.py).
+    Emaile z WHITELIST_EMAILS (dotychczasowe źródło listy) są dopisywane raz -
+    także do istniejącej tabeli - znacznik env_imported w whitelist_version
+    pilnuje, żeby usunięte później przez API nie wracały. Pusta zmienna i pusta
+    tabela to nadal brak ograniczeń.
+    """
     try:
         db = get_db()
         
@@ -307,23 +408,39 @@ def ensure_whitelist_table():
             # Dodaj indeks dla lepszej wydajności
             db.execute('CREATE INDEX idx_whitelist_emails_email ON whitelist_emails(email)')
             
-            # Dodaj domyślne emaile do whitelist
-            default_emails = [
-                'nikodemboniecki1@gmail.com',
-                'official221team@gmail.com', 
-                'bonieckinikodem0@gmail.com'
-            ]
-            
-            for email in default_emails:
-                try:
-                    db.execute("INSERT INTO whitelist_emails (email) VALUES (?)", (email,))
-                except Exception as e:
-                    logger.warning(f"Email {email} już istnieje w whitelist: {e}")
-            
-            db.commit()
-            logger.info("Tabela whitelist_emails utworzona z domyślnymi emailami")
-        else:
-            logger.info("Tabela whitelist_emails już istnieje")
+            logger.info("Tabela whitelist_emails utworzona")
+        
+        # Licznik wersji listy zwiększany wyzwalaczami (także przy zmianach spoza aplikacji)
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS whitelist_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL,
+                env_imported INTEGER NOT NULL DEFAULT 0  -- WHITELIST_EMAILS już dopisane
+            )
+        """)
+        db.execute("INSERT OR IGNORE INTO whitelist_version (id, version) VALUES (1, 0)")
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS whitelist_emails_version_{event.lower()}
+                AFTER {event} ON whitelist_emails
+                BEGIN
+                    UPDATE whitelist_version SET version = version + 1 WHERE id = 1;
+                END
+            """)
+        
+        # Jednorazowe dopisanie WHITELIST_EMAILS (również do tabeli sprzed tej wersji)
+        cols = db.execute("PRAGMA table_info(whitelist_version)").fetchall()
+        if not any(c[1] == 'env_imported' for c in cols):
+            db.execute("ALTER TABLE whitelist_version ADD COLUMN env_imported INTEGER NOT NULL DEFAULT 0")
+        imported = db.execute("SELECT env_imported FROM whitelist_version WHERE id = 1").fetchone()[0]
+        if not imported:
+            env_emails = [e.strip().lower() for e in os.environ.get('WHITELIST_EMAILS', '').split(',') if e.strip()]
+            db.executemany("INSERT OR IGNORE INTO whitelist_emails (email) VALUES (?)",
+                           [(email,) for email in env_emails])
+            db.execute("UPDATE whitelist_version SET env_imported = 1 WHERE id = 1")
+            if env_emails:
+                logger.info(f"Dopisano {len(env_emails)} emaili z WHITELIST_EMAILS do whitelisty")
+        db.commit()
             
     except Exception as e:
         logger.error(f"Błąd podczas tworzenia tabeli whitelist_emails: {e}")
@@ -454,37 +571,27 @@ def get_request_history(limit=50, offset=0, request_type=None):
 def save_push_subscription(user_id, subscription):
     """
     Zapisuje subskrypcję push w bazie danych
+    Jeden wiersz na endpoint (urządzenie) - ponowna rejestracja odświeża klucze
+    i last_seen, endpoint zalogowany na inne konto przechodzi do tego konta.
     """
     try:
         import json
-        logger.info(f"Zapisywanie subskrypcji push - user_id: {user_id}, subscription: {subscription}")
-        
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Sprawdź czy użytkownik już ma subskrypcję
-        cursor.execute("SELECT id FROM push_subscriptions WHERE user_id = ?", (user_id,))
-        existing = cursor.fetchone()
-        logger.info(f"Istniejąca subskrypcja: {existing}")
-        
-        if existing:
-            # Aktualizuj istniejącą subskrypcję
-            logger.info("Aktualizuję istniejącą subskrypcję")
-            cursor.execute("""
-                UPDATE push_subscriptions 
-                SET subscription_data = ?, updated_at = CURRENT_TIMESTAMP 
-                WHERE user_id = ?
-            """, (json.dumps(subscription), user_id))
-        else:
-            # Utwórz nową subskrypcję
-            logger.info("Tworzę nową subskrypcję")
-            cursor.execute("""
-                INSERT INTO push_subscriptions (user_id, subscription_data, created_at, updated_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """, (user_id, json.dumps(subscription)))
-        
-        conn.commit()
-        logger.info(f"Subskrypcja push zapisana dla użytkownika {user_id}")
+        logger.info(f"Zapisywanie subskrypcji push - user_id: {user_id}")
+        
+        def write(db):
+            return db.execute("""
+                INSERT INTO push_subscriptions (user_id, endpoint_hash, subscription_data, last_seen)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(endpoint_hash) DO UPDATE SET
+                  user_id = excluded.user_id,
+                  subscription_data = excluded.subscription_data,
+                  last_seen = excluded.last_seen
+                RETURNING id
+            """, (user_id, push_endpoint_hash(subscription['endpoint']), json.dumps(subscription))).fetchone()[0]
+        
+        # Mały zapis - grupowany z innymi w jednej transakcji (group commit)
+        subscription_id = run_write(write)
+        logger.info(f"Subskrypcja push {subscription_id} zapisana dla użytkownika {user_id}")
         return True
         
     except Exception as e:
@@ -492,6 +599,20 @@ def save_push_subscription(user_id, subscription):
         logger.error(f"Szczegóły błędu: {type(e).__name__}: {str(e)}")
         return False
 
+def get_push_subscriptions(user_ids):
+    """Subskrypcje push wszystkich podanych użytkowników - jedno zapytanie
+    
+    Zwraca listę (id, subscription_data) - lista id przekazana jako jeden parametr JSON,
+    więc liczba użytkowników nie jest ograniczona limitem parametrów SQLite.
+    """
+    import json
+    db = get_db()
+    return db.execute("""
+        SELECT id, subscription_data FROM push_subscriptions
+        WHERE user_id IN (SELECT value FROM json_each(?))
+        ORDER BY id
+    """, (json.dumps(list(user_ids)),)).fetchall()
+
 def ensure_employees_code_column():
     """Dodaje kolumnę code do tabeli employees jeśli nie istnieje"""
     try:
@@ -611,6 +732,7 @@ def create_database_indexes():
         # Indeksy dla tabeli schedule_changes
         db.execute("CREATE INDEX IF NOT EXISTS idx_schedule_changes_date ON schedule_changes(date)")
         db.execute("CREATE INDEX IF NOT EXISTS idx_schedule_changes_employee ON schedule_changes(employee_name)")
+        db.execute("CREATE INDEX IF NOT EXISTS idx_schedule_changes_created_at ON schedule_changes(created_at)")
         
         logger.info("Indeksy bazy danych utworzone pomyślnie")
         
@@ -618,6 +740,399 @@ def create_database_indexes():
         logger.error(f"Błąd podczas tworzenia indeksów: {e}")
         # Nie rzucamy wyjątku - indeksy to optymalizacja, nie krytyczna funkcjonalność
 
+def add_query_headers(response):
+    """Dodaj liczbę i czas zapytań SQL do nagłówków (tryb debug)"""
+    stats = g.get('db_query_stats')
+    response.headers['X-DB-Query-Count'] = str(stats.count if stats else 0)
+    response.headers['X-DB-Query-Time'] = f"{(stats.total_time if stats else 0) * 1000:.1f}ms"
+    response.headers['X-DB-Lock-Wait'] = f"{(stats.lock_wait if stats else 0) * 1000:.1f}ms"
+    return response
+
+def wal_size(db_path):
+    """Rozmiar pliku WAL w bajtach (0 gdy plik nie istnieje)"""
+    try:
+        return os.path.getsize(f"{db_path}-wal")
+    except OSError:
+        return 0
+
+def wal_checkpoint(conn, mode='PASSIVE'):
+    """Wykonaj PRAGMA wal_checkpoint i zapisz wynik w metrykach
+
+    Zwraca słownik busy (1 = checkpoint nie mógł dokończyć przez blokady),
+    log (stron w WAL) i checkpointed (stron przeniesionych do bazy).
+    """
+    mode = mode.upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"Nieznany tryb checkpointu: {mode}")
+
+    start = time.perf_counter()
+    try:
+        busy, log, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    except sqlite3.Error as e:
+        observe_checkpoint(mode, 'error', 0, time.perf_counter() - start)
+        logger.error(f"Błąd checkpointu WAL ({mode}): {e}")
+        raise
+    observe_checkpoint(mode, 'busy' if busy else 'ok', checkpointed, time.perf_counter() - start)
+    return {'mode': mode, 'busy': busy, 'log': log, 'checkpointed': checkpointed}
+
+class CheckpointScheduler:
+    """Zarządzane checkpointy WAL w wątku w tle
+
+    Co `interval` sekund wykonuje checkpoint PASSIVE (nie blokuje nikogo),
+    a gdy przez `quiet_seconds` nikt nic nie zapisał (PRAGMA data_version
+    się nie zmienia) - jednorazowo TRUNCATE, który zeruje plik WAL.
+    Automatyczny checkpoint SQLite (wal_autocheckpoint) działa dalej.
+
+    Pod gunicornem scheduler startuje w każdym workerze, ale checkpointy
+    wykonuje tylko ten, który trzyma blokadę pliku <baza>-checkpoint.lock.
+    """
+
+    def __init__(self, db_path, interval=60.0, quiet_seconds=120.0, busy_timeout_ms=200):
+        self.db_path = db_path
+        self.interval = interval
+        self.quiet_seconds = quiet_seconds
+        self.busy_timeout_ms = busy_timeout_ms
+        self.last_result = None
+        self._conn = None
+        self._lock_file = None
+        self._data_version = None
+        self._last_change = 0.0
+        self._truncated = False
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    def _acquire_leadership(self):
+        """Tylko jeden proces wykonuje checkpointy (blokada zwalniana przy śmierci procesu)"""
+        if not FCNTL_AVAILABLE:
+            return True
+        if self._lock_file is None:
+            self._lock_file = open(f"{self.db_path}-checkpoint.lock", 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                                         check_same_thread=False)
+        return self._conn
+
+    def tick(self):
+        """Jeden krok harmonogramu - zwraca wynik checkpointu albo None"""
+        if not self._acquire_leadership():
+            return None
+
+        conn = self._connection()
+        now = time.monotonic()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._last_change = now
+            self._truncated = False
+
+        try:
+            if now - self._last_change >= self.quiet_seconds:
+                if self._truncated:
+                    return None  # WAL już wyzerowany, od tego czasu brak zapisów
+                result = wal_checkpoint(conn, 'TRUNCATE')
+                self._truncated = not result['busy']
+            else:
+                result = wal_checkpoint(conn, 'PASSIVE')
+        finally:
+            set_wal_size(wal_size(self.db_path))
+
+        if result['busy']:
+            logger.info(f"Checkpoint WAL {result['mode']} niedokończony (blokady): "
+                        f"{result['checkpointed']}/{result['log']} stron")
+        self.last_result = result
+        return result
+
+    def ensure_started(self):
+        """Uruchom wątek w bieżącym procesie (po forku workera wątek trzeba utworzyć ponownie)"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        # Połączenie i blokada z procesu macierzystego nie mogą być używane po forku
+        self._conn = None
+        self._lock_file = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="wal-checkpoint", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Zatrzymaj wątek, zamknij połączenie i zwolnij blokadę"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._lock_file is not None:
+            self._lock_file.close()  # zamknięcie pliku zwalnia flock
+            self._lock_file = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Błąd harmonogramu checkpointów WAL: {e}")
+
+class WriteJob:
+    """Zadanie kolejki zapisu: funkcja, argumenty i Future wołającego"""
+
+    __slots__ = ('fn', 'args', 'future', 'stats', 'enqueued')
+
+    def __init__(self, fn, args, future, stats, enqueued):
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.stats = stats
+        self.enqueued = enqueued
+
+class WriteQueue:
+    """Jeden wątek zapisujący na proces - szereguje transakcje zapisu
+
+    Wątki żądań (gthread/gevent) nie konkurują o blokadę zapisu SQLite:
+    zlecają funkcję `fn(conn, *args)`, a wątek zapisujący wykonuje ją na
+    własnym połączeniu. Zadania zebrane razem trafiają do jednej transakcji
+    (group commit - jedna blokada zapisu i jeden commit WAL), każde w osobnym
+    SAVEPOINT, więc błąd jednego nie wycofuje pozostałych. Wynik (lub
+    wyjątek) zadania wołający dostaje przez Future dopiero po COMMIT.
+
+    Grupowanie:
+        window    - gdy poprzednia transakcja objęła kilka zadań (są
+                    równoległe zapisy), wątek czeka do `window` sekund
+                    na kolejne zadania przed BEGIN
+        max_delay - limit opóźnienia: okno nie trwa dłużej niż max_delay od
+                    zlecenia najstarszego zadania, a transakcja grupy nie
+                    przyjmuje kolejnych zadań po max_delay od BEGIN - pozostałe
+                    przechodzą do następnej (długi zapis nie wstrzymuje krótkich)
+        max_batch - maksymalna liczba zadań w jednej transakcji
+
+    Funkcja zadania nie może wywoływać commit()/rollback() ani używać
+    flask.g/session - działa poza kontekstem żądania.
+    """
+
+    def __init__(self, db_path, lock_timeout=30.0, max_batch=32, window=0.002, max_delay=0.02,
+                 slow_query_ms=100):
+        self.db_path = db_path
+        self.lock_timeout = lock_timeout
+        self.max_batch = max_batch
+        self.window = window
+        self.max_delay = max_delay
+        self.slow_query_ms = slow_query_ms
+        self._queue = queue.Queue()
+        self._pending = deque()  # zadania odcięte przez max_delay - idą pierwsze
+        self._coalescing = False
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """Zleć zadanie zapisu - zwraca concurrent.futures.Future"""
+        from .db_instrumentation import request_query_stats
+        self._ensure_started()
+        future = Future()
+        # Statystyki żądania: zapytania zadania i czas w kolejce liczą się do żądania
+        self._queue.put(WriteJob(fn, args, future, request_query_stats(), time.perf_counter()))
+        return future
+
+    def run(self, fn, *args, timeout=None):
+        """Zleć zadanie i poczekaj na wynik (wyjątek zadania jest rzucany dalej)"""
+        return self.submit(fn, *args).result(timeout)
+
+    def stop(self, timeout=5):
+        """Dokończ zleconą pracę i zakończ wątek (zamyka połączenie)"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def copy_for(self, db_path):
+        """Nowa kolejka z tymi samymi ustawieniami dla innej bazy"""
+        return WriteQueue(db_path, lock_timeout=self.lock_timeout, max_batch=self.max_batch,
+                          window=self.window, max_delay=self.max_delay, slow_query_ms=self.slow_query_ms)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Kolejka procesu macierzystego nie obsłuży zadań po forku
+                self._queue = queue.Queue()
+                self._pending = deque()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        """Zbierz zadania do jednej transakcji (odcięte wcześniej, czekające, z okna)"""
+        first = self._pending.popleft() if self._pending else self._queue.get()
+        if first is None:
+            self._stopping = True
+            return []
+        batch = [first]
+        # Okno grupowania tylko przy równoległych zapisach - pojedynczy zapis nie czeka
+        window_end = batch[0].enqueued + self.max_delay
+        if self._coalescing and self.window > 0:
+            window_end = min(window_end, time.perf_counter() + self.window)
+        else:
+            window_end = 0
+
+        while len(batch) < self.max_batch:
+            if self._pending:
+                batch.append(self._pending.popleft())
+                continue
+            try:
+                remaining = window_end - time.perf_counter()
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:  # stop() - zakończ po tej transakcji
+                self._stopping = True
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        conn = None
+        while not (self._stopping and not self._pending):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                if conn is None:
+                    conn = connect(self.db_path, lock_timeout=self.lock_timeout,
+                                   slow_query_ms=self.slow_query_ms, isolation_level=None)
+                self._execute(conn, batch)
+            except Exception as e:
+                logger.error(f"Błąd transakcji wątku zapisującego ({len(batch)} zadań): {e}")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                if conn is not None:
+                    try:
+                        conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+        if conn is not None:
+            conn.close()
+
+    def _execute(self, conn, batch):
+        """Wykonaj zadania w jednej transakcji, wyniki ustaw po COMMIT"""
+        from .db_instrumentation import bound_query_stats
+        outcomes = []
+        conn.execute("BEGIN IMMEDIATE")
+        began = time.perf_counter()
+        for index, job in enumerate(batch):
+            # Limit opóźnienia - reszta zadań do następnej transakcji
+            if outcomes and time.perf_counter() - began > self.max_delay:
+                self._pending.extendleft(reversed(batch[index:]))
+                del batch[index:]
+                break
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            wait = time.perf_counter() - job.enqueued
+            observe_write_queue_wait(wait)
+            if job.stats is not None:
+                job.stats.lock_wait += wait
+            with bound_query_stats(job.stats):
+                conn.execute("SAVEPOINT write_job")
+                try:
+                    outcomes.append((job.future, True, job.fn(conn, *job.args)))
+                    conn.execute("RELEASE write_job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_job")
+                    conn.execute("RELEASE write_job")
+                    outcomes.append((job.future, False, e))
+        conn.execute("COMMIT")
+
+        observe_write_batch(len(outcomes))
+        self._coalescing = len(outcomes) > 1
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+def run_write(fn, *args):
+    """Wykonaj transakcję zapisu `fn(db, *args)` i zwróć jej wynik
+
+    Z kolejką zapisu (DB_WRITE_QUEUE) przez wątek zapisujący procesu,
+    bez niej - na połączeniu żądania z commit/rollback. W obu przypadkach
+    transakcja zaczyna się od BEGIN IMMEDIATE, więc odczyty w `fn` widzą
+    stan, którego nikt nie zmieni przed COMMIT. Czas oczekiwania
+    w kolejce wlicza się do czasu czekania na blokady żądania.
+    """
+    write_queue = get_write_queue()
+    if write_queue is None:
+        db = get_db()
+        try:
+            if not db.in_transaction:
+                db.execute("BEGIN IMMEDIATE")
+            result = fn(db, *args)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+
+    return write_queue.run(fn, *args)
+
+def get_write_queue():
+    """Kolejka zapisu aplikacji dla bieżącej DATABASE_PATH (None gdy wyłączona)"""
+    write_queue = current_app.extensions.get('write_queue')
+    if write_queue is None:
+        return None
+    db_path = current_app.config['DATABASE_PATH']
+    if write_queue.db_path is None:
+        write_queue.db_path = db_path
+    elif write_queue.db_path != db_path:
+        # Zmieniona ścieżka bazy (testy) - połączenie wątku zapisującego wskazuje starą
+        write_queue.stop()
+        write_queue = current_app.extensions['write_queue'] = write_queue.copy_for(db_path)
+    return write_queue
+
+def start_checkpoint_scheduler():
+    """Uruchom harmonogram checkpointów przy pierwszym żądaniu w procesie"""
+    scheduler = current_app.extensions.get('checkpoint_scheduler')
+    if scheduler is None or current_app.testing:
+        return
+    if scheduler.db_path is None:
+        scheduler.db_path = current_app.config['DATABASE_PATH']
+    scheduler.ensure_started()
+
 def init_app(app):
     """Inicjalizuj moduł bazy danych z aplikacją Flask"""
     app.teardown_appcontext(close_db)
+    
+    # Nagłówki z liczbą zapytań - domyślnie tylko w trybie debug
+    if app.config.get('DB_QUERY_HEADERS', app.debug):
+        app.after_request(add_query_headers)
+    
+    # Checkpointy WAL w tle (DB_CHECKPOINT_INTERVAL=0 wyłącza)
+    interval = app.config.get('DB_CHECKPOINT_INTERVAL', 60)
+    if interval > 0:
+        app.extensions['checkpoint_scheduler'] = CheckpointScheduler(
+            None,  # ścieżka z konfiguracji przy starcie - testy podmieniają DATABASE_PATH
+            interval=interval,
+            quiet_seconds=app.config.get('DB_CHECKPOINT_QUIET_SECONDS', 120)
+        )
+        app.before_request(start_checkpoint_scheduler)
+    
+    # Jeden wątek zapisujący na proces (DB_WRITE_QUEUE=false - zapis na połączeniu żądania)
+    if app.config.get('DB_WRITE_QUEUE', True):
+        app.extensions['write_queue'] = WriteQueue(
+            None,  # ścieżka z konfiguracji przy pierwszym zapisie
+            lock_timeout=app.config.get('DB_LOCK_TIMEOUT', 30.0),
+            max_batch=app.config.get('DB_WRITE_BATCH', 32),
+            window=app.config.get('DB_GROUP_COMMIT_WINDOW_MS', 2) / 1000,
+            max_delay=app.config.get('DB_GROUP_COMMIT_MAX_DELAY_MS', 20) / 1000,
+            slow_query_ms=app.config.get('SLOW_QUERY_MS', 100)
+        )
@@ -0,0 +1,218 @@
+"""
+SQL query instrumentation
+Connection wrapper timing every statement, keyed by normalized SQL, counting
+queries per request and logging slow statements with EXPLAIN QUERY PLAN.
+
+With a lock timeout the wrapper also owns lock waiting: SQLite's busy handler
+is disabled (busy_timeout=0) and statements failing with SQLITE_BUSY are
+retried here with backoff, so retries and time spent waiting are measured
+instead of disappearing inside sqlite3_busy_timeout.
+"""
+
+import re
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional, Tuple
+from flask import g, has_request_context
+from .performance import perf_counter
+from .metrics import observe_query, observe_busy_retry, observe_lock_timeout
+
+logger = logging.getLogger(__name__)
+
+# Statements that are not worth explaining (no query plan or not a query)
+NO_EXPLAIN_PREFIXES = ('PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK', 'CREATE', 'DROP',
+                       'ALTER', 'EXPLAIN', 'VACUUM', 'ANALYZE', 'SAVEPOINT', 'RELEASE')
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+_IN_LIST_RE = re.compile(r"IN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+
+# Sleeps between SQLITE_BUSY retries (seconds), the last one repeats -
+# close to the schedule of SQLite's own busy handler
+BUSY_BACKOFF = (0.001, 0.002, 0.005, 0.01, 0.015, 0.02, 0.025, 0.05, 0.1)
+
+# Extended result code: a read transaction's snapshot is stale and cannot be
+# upgraded to a write transaction - waiting does not help, only a rollback
+SQLITE_BUSY_SNAPSHOT = getattr(sqlite3, 'SQLITE_BUSY_SNAPSHOT', 517)
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace literals, so equal statements share a key"""
+    normalized = _STRING_LITERAL_RE.sub('?', sql)
+    normalized = _NUMBER_LITERAL_RE.sub('?', normalized)
+    normalized = _WHITESPACE_RE.sub(' ', normalized).strip().rstrip(';')
+    return _IN_LIST_RE.sub('IN (?...)', normalized)
+
+@lru_cache(maxsize=1024)
+def statement_label(normalized_sql: str) -> Tuple[str, str]:
+    """Low-cardinality (operation, table) label for metrics"""
+    operation = normalized_sql.split(' ', 1)[0].upper() if normalized_sql else 'UNKNOWN'
+    match = _TABLE_RE.search(normalized_sql)
+    return operation, match.group(1).lower() if match else '-'
+
+def is_busy_error(exc: Exception) -> bool:
+    """True for SQLITE_BUSY errors that may succeed when retried"""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    code = getattr(exc, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff == sqlite3.SQLITE_BUSY and code != SQLITE_BUSY_SNAPSHOT
+    return 'database is locked' in str(exc)
+
+class QueryStats:
+    """Queries executed within one request (stored in flask.g)"""
+
+    __slots__ = ('count', 'total_time', 'lock_wait', 'busy_retries')
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.lock_wait = 0.0
+        self.busy_retries = 0
+
+# Stats bound to a thread that runs statements on behalf of a request
+# (the SQLite writer thread, see database.WriteQueue)
+_bound = threading.local()
+
+@contextmanager
+def bound_query_stats(stats: Optional[QueryStats]):
+    """Attribute statements run in this thread to another request's stats"""
+    previous = getattr(_bound, 'stats', None)
+    _bound.stats = stats
+    try:
+        yield
+    finally:
+        _bound.stats = previous
+
+def request_query_stats() -> Optional[QueryStats]:
+    """Query stats of the current request, None outside of a request"""
+    stats = getattr(_bound, 'stats', None)
+    if stats is not None:
+        return stats
+    if not has_request_context():
+        return None
+    stats = g.get('db_query_stats')
+    if stats is None:
+        stats = g.db_query_stats = QueryStats()
+    return stats
+
+class InstrumentedConnection:
+    """sqlite3.Connection proxy timing execute/executemany
+
+    Everything else (commit, rollback, close, row_factory, ...) is delegated
+    to the wrapped connection, so callers do not notice the wrapper.
+
+    lock_timeout > 0 retries statements failing with SQLITE_BUSY for up to
+    that many seconds; the connection should have busy_timeout=0.
+    """
+
+    def __init__(self, connection, slow_query_threshold: float = 0.1, explain_slow: bool = True,
+                 lock_timeout: float = 0.0):
+        object.__setattr__(self, '_connection', connection)
+        object.__setattr__(self, 'slow_query_threshold', slow_query_threshold)
+        object.__setattr__(self, 'explain_slow', explain_slow)
+        object.__setattr__(self, 'lock_timeout', lock_timeout)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+    def __enter__(self):
+        self._connection.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._connection.__exit__(exc_type, exc, tb)
+
+    def execute(self, sql, parameters=()):
+        return self._run(self._connection.execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if self.lock_timeout > 0 and not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)  # a retry needs the rows again
+        return self._run(self._connection.executemany, sql, seq_of_parameters, None)
+
+    def _run(self, method, sql, arguments, parameters):
+        start = time.perf_counter()
+        try:
+            return method(sql, arguments)
+        except sqlite3.OperationalError as e:
+            if self.lock_timeout <= 0 or not is_busy_error(e):
+                raise
+            cursor, start = self._wait_for_lock(method, sql, arguments, start, e)
+            return cursor
+        finally:
+            self._record(sql, parameters, time.perf_counter() - start)
+
+    def _wait_for_lock(self, method, sql: str, arguments, first_attempt: float, error: Exception):
+        """Retry a statement after SQLITE_BUSY with backoff
+
+        Returns (cursor, start of the successful attempt), so the statement
+        latency excludes the wait. Re-raises the last error after lock_timeout.
+        """
+        operation, table = statement_label(normalize_sql(sql))
+        deadline = first_attempt + self.lock_timeout
+        retries = 0
+        stats = request_query_stats()
+        try:
+            while True:
+                delay = BUSY_BACKOFF[min(retries, len(BUSY_BACKOFF) - 1)]
+                if time.perf_counter() + delay > deadline:
+                    observe_lock_timeout(operation, table)
+                    logger.warning(f"Gave up waiting for database lock after {self.lock_timeout:.1f} s "
+                                   f"({retries} retries): {normalize_sql(sql)}")
+                    raise error
+                time.sleep(delay)
+                retries += 1
+                observe_busy_retry(operation, table)
+                start = time.perf_counter()
+                try:
+                    cursor = method(sql, arguments)
+                except sqlite3.OperationalError as e:
+                    if not is_busy_error(e):
+                        raise
+                    error = e
+                    continue
+
+                waited = start - first_attempt
+                if waited >= self.slow_query_threshold:
+                    logger.warning(f"Waited {waited * 1000:.1f} ms for database lock ({retries} retries): "
+                                   f"{normalize_sql(sql)}")
+                return cursor, start
+        finally:
+            if stats is not None:
+                stats.busy_retries += retries
+                stats.lock_wait += time.perf_counter() - first_attempt
+
+    def _record(self, sql: str, parameters, duration: float) -> None:
+        normalized = normalize_sql(sql)
+        perf_counter.add_time(f"sql:{normalized}", duration)
+
+        stats = request_query_stats()
+        if stats is not None:
+            stats.count += 1
+            stats.total_time += duration
+
+        observe_query(*statement_label(normalized), duration)
+
+        if duration >= self.slow_query_threshold:
+            self._log_slow_query(sql, normalized, parameters, duration)
+
+    def _log_slow_query(self, sql: str, normalized: str, parameters, duration: float) -> None:
+        plan = ''
+        if self.explain_slow and parameters is not None and not normalized.upper().startswith(NO_EXPLAIN_PREFIXES):
+            try:
+                rows = self._connection.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+                plan = '; '.join(str(row[-1]) for row in rows)
+            except Exception as e:
+                plan = f"unavailable ({e})"
+        logger.warning(f"Slow query ({duration * 1000:.1f} ms): {normalized}"
+                       + (f" | plan: {plan}" if plan else ""))
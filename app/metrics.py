@@ -0,0 +1,283 @@
+"""
+Prometheus request metrics
+App-wide before/after_request instrumentation (latency histogram, status
+counts, in-flight gauge, SQL statements and lock waits per endpoint) plus
+SQLite WAL/checkpoint metrics, exposed on /metrics.
+
+Under gunicorn every worker is a separate process, so metrics are written to
+PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py) and aggregated on scrape by
+MultiProcessCollector.
+"""
+
+import os
+import time
+import hmac
+import logging
+from flask import request, g, abort, Response, current_app
+from .performance import perf_counter
+
+try:
+    from prometheus_client import (Counter, Gauge, Histogram, CollectorRegistry,
+                                   generate_latest, CONTENT_TYPE_LATEST, multiprocess)
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds) - from static files to Excel export
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Requests that did not match any route (404) share one label value
+UNMATCHED_ENDPOINT = "none"
+
+if PROMETHEUS_AVAILABLE and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    # Metrics without labels open their files in this directory as soon as they
+    # are defined below - it may not exist yet (e.g. /dev/shm after a reboot)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+if PROMETHEUS_AVAILABLE:
+    # Module-level: the default registry accepts each metric name only once,
+    # even if create_app() is called several times (tests)
+    REQUEST_COUNT = Counter(
+        "grafik_http_requests_total",
+        "Total HTTP requests",
+        ["method", "endpoint", "status"],
+    )
+    REQUEST_LATENCY = Histogram(
+        "grafik_http_request_duration_seconds",
+        "HTTP request latency in seconds",
+        ["method", "endpoint"],
+        buckets=LATENCY_BUCKETS,
+    )
+    REQUESTS_IN_PROGRESS = Gauge(
+        "grafik_http_requests_in_progress",
+        "HTTP requests currently being processed",
+        ["method", "endpoint"],
+        multiprocess_mode="livesum",
+    )
+    DB_QUERY_LATENCY = Histogram(
+        "grafik_db_query_duration_seconds",
+        "SQLite statement latency in seconds",
+        ["operation", "table"],
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+    )
+    DB_QUERIES_PER_REQUEST = Histogram(
+        "grafik_db_queries_per_request",
+        "Number of SQL statements executed by one request",
+        ["endpoint"],
+        buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+    )
+    DB_LOCK_WAIT = Histogram(
+        "grafik_db_lock_wait_seconds",
+        "Time one request spent waiting on SQLite locks (SQLITE_BUSY)",
+        ["endpoint"],
+        buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+    )
+    DB_BUSY_RETRIES = Counter(
+        "grafik_db_busy_retries_total",
+        "SQL statements retried after SQLITE_BUSY",
+        ["operation", "table"],
+    )
+    DB_LOCK_TIMEOUTS = Counter(
+        "grafik_db_lock_timeouts_total",
+        "SQL statements that gave up waiting for a lock",
+        ["operation", "table"],
+    )
+    DB_WRITE_BATCH_SIZE = Histogram(
+        "grafik_db_write_batch_size",
+        "Write transactions committed together by the writer thread (group commit)",
+        buckets=(1, 2, 4, 8, 16, 32, 64),
+    )
+    DB_WRITE_QUEUE_WAIT = Histogram(
+        "grafik_db_write_queue_wait_seconds",
+        "Time a write transaction waited for the writer thread",
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+    )
+    PASSWORD_HASH_QUEUE_WAIT = Histogram(
+        "grafik_password_hash_queue_seconds",
+        "Time a password hash/verify job waited for the hashing pool",
+        ["operation"],
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    )
+    PASSWORD_HASH_DURATION = Histogram(
+        "grafik_password_hash_duration_seconds",
+        "Password hash/verify computation time",
+        ["operation"],
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+    )
+    PASSWORD_HASH_REJECTED = Counter(
+        "grafik_password_hash_rejected_total",
+        "Password hash/verify jobs rejected because the hashing pool was full",
+        ["operation"],
+    )
+    PUSH_DELIVERIES = Counter(
+        "grafik_push_deliveries_total",
+        "Web Push deliveries by result (sent, gone, failed, invalid)",
+        ["result"],
+    )
+    DB_WAL_SIZE = Gauge(
+        "grafik_db_wal_size_bytes",
+        "Size of the SQLite WAL file",
+        multiprocess_mode="livemax",
+    )
+    DB_CHECKPOINTS = Counter(
+        "grafik_db_checkpoints_total",
+        "WAL checkpoints by mode and result (ok, busy, error)",
+        ["mode", "result"],
+    )
+    DB_CHECKPOINT_PAGES = Counter(
+        "grafik_db_checkpoint_pages_total",
+        "WAL pages copied back into the database by checkpoints",
+        ["mode"],
+    )
+    DB_CHECKPOINT_DURATION = Histogram(
+        "grafik_db_checkpoint_duration_seconds",
+        "WAL checkpoint duration in seconds",
+        ["mode"],
+        buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+    )
+
+def observe_query(operation, table, duration):
+    """Record SQL statement latency (called by the instrumented connection)"""
+    if PROMETHEUS_AVAILABLE:
+        DB_QUERY_LATENCY.labels(operation, table).observe(duration)
+
+def observe_busy_retry(operation, table):
+    """Count a statement retried after SQLITE_BUSY"""
+    if PROMETHEUS_AVAILABLE:
+        DB_BUSY_RETRIES.labels(operation, table).inc()
+
+def observe_lock_timeout(operation, table):
+    """Count a statement that exhausted its lock timeout"""
+    if PROMETHEUS_AVAILABLE:
+        DB_LOCK_TIMEOUTS.labels(operation, table).inc()
+
+def observe_checkpoint(mode, result, pages, duration):
+    """Record a WAL checkpoint (called by the checkpoint scheduler)"""
+    if PROMETHEUS_AVAILABLE:
+        DB_CHECKPOINTS.labels(mode, result).inc()
+        DB_CHECKPOINT_PAGES.labels(mode).inc(max(pages, 0))
+        DB_CHECKPOINT_DURATION.labels(mode).observe(duration)
+
+def observe_write_batch(size):
+    """Number of write transactions committed in one group commit"""
+    if PROMETHEUS_AVAILABLE:
+        DB_WRITE_BATCH_SIZE.observe(size)
+
+def observe_write_queue_wait(wait):
+    """Time a write transaction spent queued for the writer thread"""
+    if PROMETHEUS_AVAILABLE:
+        DB_WRITE_QUEUE_WAIT.observe(wait)
+
+def observe_password_hash(operation, wait, duration):
+    """Queue wait and computation time of one password hash/verify job"""
+    if PROMETHEUS_AVAILABLE:
+        PASSWORD_HASH_QUEUE_WAIT.labels(operation).observe(wait)
+        PASSWORD_HASH_DURATION.labels(operation).observe(duration)
+
+def observe_password_hash_rejected(operation):
+    """A password hash/verify job turned away by the full hashing pool"""
+    if PROMETHEUS_AVAILABLE:
+        PASSWORD_HASH_REJECTED.labels(operation).inc()
+
+def observe_push_delivery(result):
+    """Outcome of one Web Push delivery"""
+    if PROMETHEUS_AVAILABLE:
+        PUSH_DELIVERIES.labels(result).inc()
+
+def set_wal_size(size):
+    """Current WAL file size in bytes"""
+    if PROMETHEUS_AVAILABLE:
+        DB_WAL_SIZE.set(size)
+
+def multiprocess_dir():
+    """Directory for multiprocess metric files, None in single-process mode"""
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+class RequestMetrics:
+    """Flask extension recording per-endpoint request metrics
+
+    Configuration (app.config):
+        METRICS_ENABLED - enable instrumentation and /metrics (default True)
+        METRICS_TOKEN   - bearer token required for /metrics; without it
+                          only direct loopback requests are allowed
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_TOKEN', '')
+
+        if not app.config['METRICS_ENABLED']:
+            return
+        if not PROMETHEUS_AVAILABLE:
+            logger.warning("prometheus_client not installed - request metrics disabled")
+            return
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        # Scraped every few seconds - must never hit the app-wide default rate limits
+        from .rate_limit import limiter
+        app.add_url_rule("/metrics", "metrics", limiter.exempt(self.metrics_view))
+        app.extensions['request_metrics'] = self
+
+    @staticmethod
+    def _labels():
+        return request.method, request.endpoint or UNMATCHED_ENDPOINT
+
+    def before_request(self):
+        if request.endpoint == "metrics":
+            return
+        g.metrics_start = time.perf_counter()
+        g.metrics_labels = self._labels()
+        REQUESTS_IN_PROGRESS.labels(*g.metrics_labels).inc()
+
+    def after_request(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+
+        duration = time.perf_counter() - start
+        method, endpoint = g.metrics_labels
+        REQUEST_LATENCY.labels(method, endpoint).observe(duration)
+        REQUEST_COUNT.labels(method, endpoint, str(response.status_code)).inc()
+        query_stats = g.get('db_query_stats')
+        DB_QUERIES_PER_REQUEST.labels(endpoint).observe(query_stats.count if query_stats else 0)
+        DB_LOCK_WAIT.labels(endpoint).observe(query_stats.lock_wait if query_stats else 0)
+        perf_counter.add_time(f"request_{endpoint}", duration)
+        return response
+
+    def teardown_request(self, exc):
+        # Runs even if the view raised - in-flight gauge must always go down
+        labels = g.pop('metrics_labels', None)
+        if labels is not None:
+            REQUESTS_IN_PROGRESS.labels(*labels).dec()
+
+    @staticmethod
+    def _authorized():
+        token = current_app.config['METRICS_TOKEN']
+        if token:
+            header = request.headers.get('Authorization', '')
+            return hmac.compare_digest(header, f"Bearer {token}")
+        # Without a token: only direct local scrapes (not proxied by nginx)
+        return (request.remote_addr in ('127.0.0.1', '::1')
+                and 'X-Forwarded-For' not in request.headers)
+
+    def metrics_view(self):
+        """Prometheus text exposition of request metrics"""
+        if not self._authorized():
+            abort(403)
+
+        path = multiprocess_dir()
+        if path:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry, path=path)
+            data = generate_latest(registry)
+        else:
+            data = generate_latest()
+        return Response(data, content_type=CONTENT_TYPE_LATEST)
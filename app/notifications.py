@@ -0,0 +1,168 @@
+"""
+Event-driven notifications
+Routes call notify_employees()/notify_users()/notify_admins() after their
+write has committed. Events are collected per user and delivered as one
+Web Push message per user once PUSH_COALESCE_SECONDS have passed since that
+user's first pending event - a draft publish touching hundreds of shifts
+sends each affected employee a single notification.
+
+Delivery runs on a background thread per process (started lazily, so it
+survives gunicorn's fork) and goes through app/push.py, which prunes
+subscriptions the push service reports as gone. With no VAPID key
+configured the calls are no-ops.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+TITLE = "Grafik SP4600"
+
+# Body used when a user has several different events of one kind pending
+SUMMARIES = {
+    "schedule": "Zmiany w Twoim grafiku ({count})",
+    "swap": "Zmiany w prośbach o zamianę ({count})",
+    "unavailability": "Zmiany w zgłoszeniach niedyspozycji ({count})",
+}
+
+class NotificationDispatcher:
+    """Per-user coalescing queue in front of the push sender (app.extensions['notifications'])"""
+
+    def __init__(self, app=None, window=5.0):
+        self.app = None
+        self.window = window
+        self._pending: Dict[int, List[Tuple[str, str, str]]] = {}  # user_id -> [(kind, message, url)]
+        self._due: Dict[int, float] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.window = float(app.config.get("PUSH_COALESCE_SECONDS", self.window))
+        app.extensions["notifications"] = self
+
+    def enqueue(self, user_ids: Iterable[int], kind: str, message: str, url: str = "/") -> None:
+        """Queue one event for each user; the first pending event starts that user's window"""
+        now = time.monotonic()
+        with self._cond:
+            for user_id in set(user_ids):
+                events = self._pending.setdefault(user_id, [])
+                if not events:
+                    self._due[user_id] = now + self.window
+                events.append((kind, message, url))
+            self._ensure_worker()
+            self._cond.notify()
+
+    def _ensure_worker(self) -> None:
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="push-notifications", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _take_due(self, force: bool = False) -> Dict[int, List[Tuple[str, str, str]]]:
+        now = time.monotonic()
+        due = [user_id for user_id, at in self._due.items() if force or at <= now]
+        for user_id in due:
+            del self._due[user_id]
+        return {user_id: self._pending.pop(user_id) for user_id in due}
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                batch = self._take_due()
+                while not batch:
+                    timeout = min(self._due.values()) - time.monotonic() if self._due else None
+                    self._cond.wait(timeout)
+                    batch = self._take_due()
+            try:
+                self.deliver(batch)
+            except Exception as e:
+                logger.error(f"Push notification delivery failed: {e}")
+
+    def flush(self) -> Dict[str, int]:
+        """Deliver everything pending now, regardless of windows (tests, shutdown)"""
+        with self._cond:
+            batch = self._take_due(force=True)
+        return self.deliver(batch)
+
+    def deliver(self, batch: Dict[int, List[Tuple[str, str, str]]]) -> Dict[str, int]:
+        """Send one coalesced notification per user"""
+        from . import push
+        totals = {"sent": 0, "failed": 0, "removed": 0}
+        if not batch:
+            return totals
+        with self.app.app_context():
+            # Users with identical content share one fan-out call
+            groups: Dict[Tuple[str, str, Tuple[str, ...]], List[int]] = {}
+            for user_id, events in batch.items():
+                groups.setdefault(coalesce(events), []).append(user_id)
+            for (body, url, kinds), user_ids in groups.items():
+                payload = push.build_notification(TITLE, body, url)
+                payload["data"]["kinds"] = list(kinds)
+                for key, value in push.notify_users(user_ids, payload).items():
+                    totals[key] += value
+        logger.info(f"Push notifications for {len(batch)} users: {totals}")
+        return totals
+
+def coalesce(events: List[Tuple[str, str, str]]) -> Tuple[str, str, Tuple[str, ...]]:
+    """(body, url, kinds) of the single notification standing in for `events`"""
+    messages = list(dict.fromkeys(message for _, message, _ in events))
+    kinds = tuple(dict.fromkeys(kind for kind, _, _ in events))
+    url = events[0][2] if len({u for _, _, u in events}) == 1 else "/"
+    if len(messages) == 1:
+        return messages[0], url, kinds
+    if len(kinds) == 1 and kinds[0] in SUMMARIES:
+        return SUMMARIES[kinds[0]].format(count=len(messages)), url, kinds
+    return f"{messages[0]} (+{len(messages) - 1})", url, kinds
+
+def get_dispatcher() -> Optional[NotificationDispatcher]:
+    """Dispatcher of the current app, None when push is not configured"""
+    dispatcher = current_app.extensions.get("notifications")
+    sender = current_app.extensions.get("push_sender")
+    if dispatcher is None or sender is None or not sender.configured:
+        return None
+    return dispatcher
+
+def notify_users(user_ids: Iterable[int], kind: str, message: str, url: str = "/") -> None:
+    """Queue a notification for users by id (call after the change has committed)"""
+    dispatcher = get_dispatcher()
+    user_ids = [user_id for user_id in user_ids if user_id]
+    if dispatcher is None or not user_ids:
+        return
+    dispatcher.enqueue(user_ids, kind, message, url)
+
+def notify_employees(names: Iterable[str], kind: str, message: str, url: str = "/") -> None:
+    """Queue a notification for the accounts of employees (matched by email or full name)"""
+    names = list(set(name for name in names if name))
+    if get_dispatcher() is None or not names:
+        return
+    from .services.employees import user_ids_for_employees
+    try:
+        user_ids = user_ids_for_employees(names)
+    except sqlite3.Error as e:
+        # The change is already committed - a missed notification must not fail the request
+        logger.error(f"Cannot resolve notification recipients: {e}")
+        return
+    notify_users(user_ids, kind, message, url)
+
+def notify_admins(kind: str, message: str, url: str = "/") -> None:
+    """Queue a notification for every administrator"""
+    if get_dispatcher() is None:
+        return
+    from .database import get_db
+    try:
+        rows = get_db().execute("SELECT id FROM users WHERE role = 'ADMIN'").fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Cannot resolve notification recipients: {e}")
+        return
+    notify_users([row["id"] for row in rows], kind, message, url)
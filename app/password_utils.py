@@ -1,42 +1,162 @@
 """
 Narzędzia do zarządzania hasłami
 Bezpieczne hashowanie i weryfikacja haseł
+
+Format hashu: "algorytm$parametry$sól$hash" - parametry kosztu zapisane
+przy hashu, więc można je zmienić bez unieważniania starych haseł:
+    scrypt$n=16384,r=8,p=1$sól$hash    (domyślny, wymaga pamięci)
+    pbkdf2_sha256$100000$sól$hash
+Stary format "hash:sól" (PBKDF2, 100 000 iteracji) jest nadal weryfikowany.
+Hash innym algorytmem lub z innymi parametrami niż aktualne
+(PASSWORD_HASH_ALGORITHM, PASSWORD_HASH_PARAMS) jest przepisywany
+przy najbliższym udanym logowaniu.
+
+Obliczenia zajmują CPU przez dziesiątki milisekund, dlatego hashowanie
+i weryfikacja w trasach idą przez PasswordHasher - ograniczoną pulę
+wątków (hashlib zwalnia GIL) z limitem oczekujących zadań.
+Parametry dla docelowego czasu: python -m benchmarks.password_params
 """
 
+import os
+import time
 import hashlib
 import secrets
 import logging
-from typing import Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Tuple
+from flask import current_app
+from .metrics import observe_password_hash, observe_password_hash_rejected
 
 logger = logging.getLogger(__name__)
 
+LEGACY_ALGORITHM = 'pbkdf2_sha256_legacy'  # stary format "hash:sól"
+
+class Pbkdf2Sha256:
+    """PBKDF2-HMAC-SHA256, parametry: liczba iteracji ("100000")"""
+    
+    name = 'pbkdf2_sha256'
+    defaults = {'iterations': 100000}
+    
+    def encode_params(self, params: Dict[str, int]) -> str:
+        return str(params['iterations'])
+    
+    def decode_params(self, text: str) -> Dict[str, int]:
+        return {'iterations': int(text)}
+    
+    def derive(self, password: str, salt: str, params: Dict[str, int]) -> str:
+        return hashlib.pbkdf2_hmac(
+            'sha256',
+            password.encode('utf-8'),
+            salt.encode('utf-8'),
+            params['iterations']
+        ).hex()
+
+class Scrypt:
+    """scrypt (hashlib.scrypt), parametry: n (koszt, potęga 2), r, p ("n=16384,r=8,p=1")
+    
+    Pamięć jednego obliczenia to ok. 128 * n * r bajtów (16 MB dla domyślnych).
+    """
+    
+    name = 'scrypt'
+    defaults = {'n': 16384, 'r': 8, 'p': 1}
+    
+    def encode_params(self, params: Dict[str, int]) -> str:
+        return ','.join(f"{key}={params[key]}" for key in ('n', 'r', 'p'))
+    
+    def decode_params(self, text: str) -> Dict[str, int]:
+        params = dict(item.split('=', 1) for item in text.split(','))
+        return {key: int(params[key]) for key in ('n', 'r', 'p')}
+    
+    def derive(self, password: str, salt: str, params: Dict[str, int]) -> str:
+        n, r, p = params['n'], params['r'], params['p']
+        return hashlib.scrypt(
+            password.encode('utf-8'),
+            salt=salt.encode('utf-8'),
+            n=n, r=r, p=p,
+            maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+            dklen=32
+        ).hex()
+
+# Rejestr algorytmów - nazwa z przechowywanego hashu -> implementacja
+HASHERS = {}
+
+def register_hasher(hasher) -> None:
+    """Dodaj algorytm do rejestru (obiekt z name, defaults, encode/decode_params, derive)"""
+    HASHERS[hasher.name] = hasher
+
+register_hasher(Pbkdf2Sha256())
+register_hasher(Scrypt())
+
+DEFAULT_ALGORITHM = 'scrypt'
+
 def generate_salt() -> str:
     """Generuje losową sól dla hasła"""
     return secrets.token_hex(32)
 
-def hash_password(password: str, salt: str = None) -> str:
+def get_hasher(algorithm: str):
+    """Implementacja algorytmu z rejestru (ValueError dla nieznanego)"""
+    try:
+        return HASHERS[algorithm]
+    except KeyError:
+        raise ValueError(f"Nieznany algorytm hashu hasła: {algorithm}")
+
+def parse_params(algorithm: str, text: str) -> Dict[str, int]:
+    """Parametry z konfiguracji ("n=32768,r=8,p=1", "200000") uzupełnione domyślnymi"""
+    hasher = get_hasher(algorithm)
+    params = dict(hasher.defaults)
+    if text:
+        if '=' in text:
+            params.update({key.strip(): int(value) for key, value in
+                           (item.split('=', 1) for item in text.split(','))})
+        else:
+            params.update(hasher.decode_params(text))
+    return params
+
+def hash_password(password: str, salt: str = None, algorithm: str = None,
+                  params: Dict[str, int] = None) -> str:
     """
     Hashuje hasło z solą
     
     Args:
         password: Hasło do zahashowania
         salt: Opcjonalna sól (jeśli None, zostanie wygenerowana)
+        algorithm: Nazwa algorytmu z rejestru (domyślnie DEFAULT_ALGORITHM)
+        params: Parametry kosztu (domyślnie parametry domyślne algorytmu)
     
     Returns:
-        String w formacie "hash:salt"
+        String w formacie "algorytm$parametry$sól$hash"
     """
     if salt is None:
         salt = generate_salt()
+    hasher = get_hasher(algorithm or DEFAULT_ALGORITHM)
+    params = dict(hasher.defaults, **(params or {}))
     
-    # Użyj PBKDF2 z SHA-256 dla bezpiecznego hashowania
-    password_hash = hashlib.pbkdf2_hmac(
-        'sha256',
-        password.encode('utf-8'),
-        salt.encode('utf-8'),
-        100000  # 100,000 iteracji
-    )
+    return f"{hasher.name}${hasher.encode_params(params)}${salt}${hasher.derive(password, salt, params)}"
+
+def parse_hash(stored: str) -> Optional[Tuple[str, Dict[str, int], str, str]]:
+    """
+    Rozkłada przechowywany hash na (algorytm, parametry, sól, hash)
     
-    return f"{password_hash.hex()}:{salt}"
+    Returns:
+        Krotka lub None dla nieznanego formatu/algorytmu; stary format
+        "hash:sól" zwracany jest z algorytmem LEGACY_ALGORITHM
+    """
+    if not stored:
+        return None
+    try:
+        if '$' in stored:
+            parts = stored.split('$')
+            if len(parts) != 4 or parts[0] not in HASHERS:
+                return None
+            algorithm, params, salt, password_hash = parts
+            return algorithm, HASHERS[algorithm].decode_params(params), salt, password_hash
+        if ':' in stored:
+            password_hash, salt = stored.split(':', 1)
+            return LEGACY_ALGORITHM, {'iterations': 100000}, salt, password_hash
+    except (ValueError, KeyError):
+        pass
+    return None
 
 def verify_password(password: str, stored_hash_salt: str) -> bool:
     """
@@ -44,25 +164,143 @@ def verify_password(password: str, stored_hash_salt: str) -> bool:
     
     Args:
         password: Hasło do weryfikacji
-        stored_hash_salt: Przechowywany hash w formacie "hash:salt"
+        stored_hash_salt: Przechowywany hash (dowolny algorytm z rejestru lub stary format)
     
     Returns:
         True jeśli hasło jest poprawne, False w przeciwnym razie
     """
     try:
-        if ':' not in stored_hash_salt:
+        parsed = parse_hash(stored_hash_salt)
+        if parsed is None:
             logger.error("Nieprawidłowy format przechowywanego hashu")
             return False
         
-        stored_hash, salt = stored_hash_salt.split(':', 1)
-        computed_hash_salt = hash_password(password, salt)
-        computed_hash = computed_hash_salt.split(':', 1)[0]
-        
-        return secrets.compare_digest(computed_hash, stored_hash)
+        algorithm, params, salt, stored_hash = parsed
+        hasher = HASHERS['pbkdf2_sha256'] if algorithm == LEGACY_ALGORITHM else HASHERS[algorithm]
+        return secrets.compare_digest(hasher.derive(password, salt, params), stored_hash)
     except Exception as e:
         logger.error(f"Błąd podczas weryfikacji hasła: {e}")
         return False
 
+def needs_rehash(stored_hash_salt: str, algorithm: str = None, params: Dict[str, int] = None) -> bool:
+    """Czy hash jest w starym formacie, innym algorytmem lub z innymi parametrami niż aktualne"""
+    parsed = parse_hash(stored_hash_salt)
+    if parsed is None:
+        return False
+    algorithm = algorithm or DEFAULT_ALGORITHM
+    stored_algorithm, stored_params, _, _ = parsed
+    return (stored_algorithm != algorithm or
+            stored_params != dict(get_hasher(algorithm).defaults, **(params or {})))
+
+def check_password(password: str, stored_hash_salt: str, algorithm: str = None,
+                   params: Dict[str, int] = None) -> Tuple[bool, Optional[str]]:
+    """
+    Weryfikuje hasło i przy poprawnym haśle przygotowuje nowy hash,
+    jeśli zapisany jest przestarzały (format, algorytm lub parametry)
+    
+    Returns:
+        Tuple (is_valid, new_hash) - new_hash None gdy przepisanie zbędne
+    """
+    if not verify_password(password, stored_hash_salt):
+        return False, None
+    if needs_rehash(stored_hash_salt, algorithm, params):
+        return True, hash_password(password, algorithm=algorithm, params=params)
+    return True, None
+
+class PasswordHasherBusy(Exception):
+    """Pula hashowania haseł pełna - żądanie odrzucone zamiast czekać"""
+
+class PasswordHasher:
+    """Ograniczona pula wątków do hashowania i weryfikacji haseł
+    
+    Najwyżej `workers` obliczeń PBKDF2 naraz w procesie (pozostałe wątki
+    żądań obsługują grafik), najwyżej `max_waiting` zadań czeka w kolejce -
+    kolejne są odrzucane od razu (PasswordHasherBusy), np. przy fali prób
+    logowania. Czas w kolejce i czas obliczeń trafiają do metryk.
+    """
+    
+    def __init__(self, app=None, workers=2, max_waiting=16, timeout=10.0, algorithm=None, params=None):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.algorithm = algorithm or DEFAULT_ALGORITHM
+        self.params = parse_params(self.algorithm, '') if params is None else dict(params)
+        self._slots = threading.BoundedSemaphore(workers + max_waiting)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        self.workers = max(1, int(app.config.get('PASSWORD_HASH_WORKERS', self.workers)))
+        self.max_waiting = max(0, int(app.config.get('PASSWORD_HASH_QUEUE', self.max_waiting)))
+        self.timeout = float(app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout))
+        self.algorithm = app.config.get('PASSWORD_HASH_ALGORITHM') or DEFAULT_ALGORITHM
+        self.params = parse_params(self.algorithm, app.config.get('PASSWORD_HASH_PARAMS', ''))
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_waiting)
+        app.extensions['password_hasher'] = self
+    
+    def hash(self, password: str) -> str:
+        """Nowy hash hasła aktualnym algorytmem i parametrami"""
+        return self._run('hash', hash_password, password, None, self.algorithm, self.params)
+    
+    def check(self, password: str, stored_hash_salt: str) -> Tuple[bool, Optional[str]]:
+        """Weryfikacja hasła + ewentualny nowy hash (patrz check_password)"""
+        return self._run('verify', check_password, password, stored_hash_salt, self.algorithm, self.params)
+    
+    def _get_executor(self):
+        # Pula procesu macierzystego (preload_app) nie ma wątków po forku
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix="password-hasher")
+                    self._pid = os.getpid()
+        return self._executor
+    
+    def _run(self, operation, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            observe_password_hash_rejected(operation)
+            raise PasswordHasherBusy(f"Pula hashowania haseł pełna ({self.workers} + {self.max_waiting})")
+        
+        enqueued = time.perf_counter()
+        
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                observe_password_hash(operation, started - enqueued, time.perf_counter() - started)
+        
+        try:
+            future = self._get_executor().submit(job)
+        except Exception:
+            self._slots.release()
+            raise
+        # Miejsce zwalniane po zakończeniu obliczeń, nie po timeoucie wołającego
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy(f"Hashowanie hasła przekroczyło {self.timeout} s")
+
+_default_hasher = None
+
+def get_password_hasher() -> PasswordHasher:
+    """Pula aplikacji (app.extensions) lub domyślna poza kontekstem aplikacji"""
+    global _default_hasher
+    try:
+        hasher = current_app.extensions.get('password_hasher')
+    except RuntimeError:
+        hasher = None
+    if hasher is None:
+        if _default_hasher is None:
+            _default_hasher = PasswordHasher()
+        hasher = _default_hasher
+    return hasher
+
 def validate_password_strength(password: str) -> Tuple[bool, str]:
     """
     Sprawdza siłę hasła
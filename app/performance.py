@@ -2,8 +2,10 @@
 Performance monitoring utilities
 """
 
+import math
 import time
 import logging
+import threading
 from functools import wraps
 from flask import request, g
 
@@ -17,6 +19,7 @@ def monitor_performance(func):
         try:
             result = func(*args, **kwargs)
             execution_time = time.time() - start_time
+            perf_counter.add_time(func.__name__, execution_time)
             
             # Log slow operations
             if execution_time > 1.0:  # More than 1 second
@@ -27,6 +30,7 @@ def monitor_performance(func):
             return result
         except Exception as e:
             execution_time = time.time() - start_time
+            perf_counter.increment(f"{func.__name__}_errors")
             logger.error(f"Error in {func.__name__} after {execution_time:.2f}s: {e}")
             raise
     return wrapper
@@ -58,38 +62,162 @@ def monitor_request_performance():
         return wrapper
     return decorator
 
+class LogHistogram:
+    """Fixed-memory histogram with logarithmic buckets
+
+    Bucket boundaries grow by a constant factor (2 ** (1 / BUCKETS_PER_OCTAVE)),
+    so percentiles have a bounded relative error (< 9%) regardless of the
+    number of samples. Values from MIN_VALUE up to MIN_VALUE * 2 ** OCTAVES
+    (1 µs .. ~1100 s) get their own buckets; values outside are clamped.
+    """
+
+    MIN_VALUE = 1e-6
+    OCTAVES = 30
+    BUCKETS_PER_OCTAVE = 8
+    BUCKET_COUNT = OCTAVES * BUCKETS_PER_OCTAVE + 1
+
+    __slots__ = ('buckets', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def bucket_index(cls, value):
+        if value <= cls.MIN_VALUE:
+            return 0
+        index = int(math.log2(value / cls.MIN_VALUE) * cls.BUCKETS_PER_OCTAVE) + 1
+        return min(index, cls.BUCKET_COUNT - 1)
+
+    @classmethod
+    def bucket_upper_bound(cls, index):
+        return cls.MIN_VALUE * 2 ** (index / cls.BUCKETS_PER_OCTAVE)
+
+    def record(self, value):
+        self.buckets[self.bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add samples of another histogram to this one"""
+        if not other.count:
+            return
+        for i, bucket_count in enumerate(other.buckets):
+            if bucket_count:
+                self.buckets[i] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100), clamped to observed min/max"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for i, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min(max(self.bucket_upper_bound(i), self.min), self.max)
+        return self.max
+
+class WindowedHistogram:
+    """Sliding time window made of fixed-duration histogram slots
+
+    The window is split into ``slots`` ring-buffer slots; a slot older than
+    the window is cleared when its position is reused, so memory stays
+    constant and stats reflect only the last ``window_seconds``.
+    """
+
+    def __init__(self, window_seconds=300, slots=5, clock=time.monotonic):
+        self.slot_seconds = window_seconds / slots
+        self.clock = clock
+        self._slots = [LogHistogram() for _ in range(slots)]
+        self._epochs = [None] * slots
+
+    def _current_epoch(self):
+        return int(self.clock() // self.slot_seconds)
+
+    def record(self, value):
+        epoch = self._current_epoch()
+        index = epoch % len(self._slots)
+        if self._epochs[index] != epoch:
+            self._slots[index] = LogHistogram()
+            self._epochs[index] = epoch
+        self._slots[index].record(value)
+
+    def snapshot(self):
+        """Merged histogram of all slots within the window"""
+        epoch = self._current_epoch()
+        merged = LogHistogram()
+        for slot_epoch, histogram in zip(self._epochs, self._slots):
+            if slot_epoch is not None and epoch - slot_epoch < len(self._slots):
+                merged.merge(histogram)
+        return merged
+
 class PerformanceCounter:
-    """Simple performance counter for tracking metrics"""
+    """Thread-safe performance counter for tracking metrics
+
+    Counters are cumulative; timings are kept in fixed-size log-bucketed
+    histograms over a sliding window (default last 5 minutes), so memory
+    does not grow with traffic and ``get_stats`` cost does not depend on
+    the number of samples.
+    """
     
-    def __init__(self):
+    PERCENTILES = (50, 95, 99)
+    
+    def __init__(self, window_seconds=300, slots=5, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.slots = slots
+        self.clock = clock
         self.counts = {}
         self.times = {}
+        self._lock = threading.Lock()
     
     def increment(self, key):
         """Increment counter"""
-        self.counts[key] = self.counts.get(key, 0) + 1
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
     
     def add_time(self, key, time_taken):
         """Add time measurement"""
-        if key not in self.times:
-            self.times[key] = []
-        self.times[key].append(time_taken)
+        with self._lock:
+            histogram = self.times.get(key)
+            if histogram is None:
+                histogram = self.times[key] = WindowedHistogram(
+                    self.window_seconds, self.slots, self.clock)
+            histogram.record(time_taken)
     
     def get_stats(self):
         """Get performance statistics"""
         stats = {}
         
+        with self._lock:
+            counts = dict(self.counts)
+            snapshots = {key: histogram.snapshot() for key, histogram in self.times.items()}
+        
         # Counter stats
-        for key, count in self.counts.items():
+        for key, count in counts.items():
             stats[f"{key}_count"] = count
         
-        # Time stats
-        for key, times in self.times.items():
-            if times:
-                stats[f"{key}_avg_time"] = sum(times) / len(times)
-                stats[f"{key}_max_time"] = max(times)
-                stats[f"{key}_min_time"] = min(times)
-                stats[f"{key}_total_time"] = sum(times)
+        # Time stats (sliding window)
+        for key, histogram in snapshots.items():
+            if histogram.count:
+                stats[f"{key}_samples"] = histogram.count
+                stats[f"{key}_avg_time"] = histogram.total / histogram.count
+                stats[f"{key}_max_time"] = histogram.max
+                stats[f"{key}_min_time"] = histogram.min
+                stats[f"{key}_total_time"] = histogram.total
+                for q in self.PERCENTILES:
+                    stats[f"{key}_p{q}_time"] = histogram.percentile(q)
         
         return stats
 
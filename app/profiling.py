@@ -0,0 +1,268 @@
+"""
+On-demand profiling for live workers
+- per-request cProfile capture (admin only, X-Profile header or _profile=1),
+  stored as .pstats files
+- stack-sampling profiler thread producing collapsed stacks (flamegraph.pl /
+  speedscope compatible); a run is requested through a trigger file, so every
+  gunicorn worker picks it up on its next request
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import tempfile
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+from flask import request, g, current_app
+from .performance import perf_counter
+
+logger = logging.getLogger(__name__)
+
+TRIGGER_FILE = "sampling.trigger"
+TRIGGER_CHECK_INTERVAL = 1.0
+
+# Limits protecting production workers
+MAX_SAMPLING_SECONDS = 120
+MIN_SAMPLING_INTERVAL = 0.001
+
+def frame_label(frame) -> str:
+    """Stack frame name used in collapsed output"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+def collapse_stack(frame) -> str:
+    """Root-to-leaf collapsed stack of a frame"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+class StackSampler(threading.Thread):
+    """Background thread sampling stacks of other threads at a fixed interval"""
+
+    def __init__(self, run_id: str, deadline: float, interval: float, output_path: str,
+                 thread_filter=None):
+        super().__init__(name=f"stack-sampler-{run_id}", daemon=True)
+        self.run_id = run_id
+        self.deadline = deadline
+        self.interval = interval
+        self.output_path = output_path
+        self.thread_filter = thread_filter
+        self.counts: Counter = Counter()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while time.time() < self.deadline:
+            tick_start = time.perf_counter()
+            wanted = self.thread_filter() if self.thread_filter else None
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (wanted is not None and thread_id not in wanted):
+                    continue
+                self.counts[collapse_stack(frame)] += 1
+            perf_counter.add_time("profiler_sample_tick", time.perf_counter() - tick_start)
+            time.sleep(self.interval)
+        self.write_output()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+    def write_output(self) -> None:
+        tmp_path = f"{self.output_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.collapsed())
+        os.replace(tmp_path, self.output_path)
+        logger.info(f"Stack sampling {self.run_id} finished: {sum(self.counts.values())} samples")
+
+class Profiler:
+    """Flask extension with per-request cProfile and the sampling profiler
+
+    Configuration (app.config):
+        PROFILE_DIR       - directory for .pstats/.folded files and the trigger
+        PROFILE_MAX_FILES - number of .pstats files kept (default 50)
+    """
+
+    def __init__(self, app=None):
+        self.profile_dir: Optional[str] = None
+        self.max_files = 50
+        self._active_threads = set()
+        self._active_lock = threading.Lock()
+        self._sampler: Optional[StackSampler] = None
+        self._last_trigger_check = 0.0
+        self._last_run_id: Optional[str] = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILE_DIR', os.path.join(tempfile.gettempdir(), "grafiksp4600-profiles"))
+        app.config.setdefault('PROFILE_MAX_FILES', 50)
+        self.profile_dir = app.config['PROFILE_DIR']
+        self.max_files = app.config['PROFILE_MAX_FILES']
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.extensions['profiler'] = self
+
+    # ------------------------------------------------------------------
+    # Request hooks
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _profiling_requested() -> bool:
+        return request.headers.get('X-Profile') == '1' or request.args.get('_profile') == '1'
+
+    def before_request(self):
+        with self._active_lock:
+            self._active_threads.add(threading.get_ident())
+        self.check_trigger()
+
+        if self._profiling_requested():
+            from .auth import is_admin_user
+            if is_admin_user():
+                g.request_profile = cProfile.Profile()
+                g.request_profile.enable()
+
+    def after_request(self, response):
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return response
+
+        profile.disable()
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{request.endpoint or 'none'}.pstats"
+        profile.dump_stats(os.path.join(self.profile_dir, name))
+        self._prune_profiles()
+        perf_counter.increment("profiler_request_captures")
+        response.headers['X-Profile-File'] = name
+        return response
+
+    def teardown_request(self, exc):
+        with self._active_lock:
+            self._active_threads.discard(threading.get_ident())
+
+    def active_request_threads(self) -> set:
+        with self._active_lock:
+            return set(self._active_threads)
+
+    # ------------------------------------------------------------------
+    # cProfile files
+    # ------------------------------------------------------------------
+
+    def list_profiles(self) -> List[str]:
+        names = [name for name in os.listdir(self.profile_dir) if name.endswith('.pstats')]
+        return sorted(names, reverse=True)
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Path of a stored profile, None for unknown or unsafe names"""
+        if os.path.basename(name) != name or not name.endswith('.pstats'):
+            return None
+        path = os.path.join(self.profile_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def profile_summary(self, name: str, limit: int = 30) -> Optional[str]:
+        """Text report of a stored profile sorted by cumulative time"""
+        path = self.profile_path(name)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    def _prune_profiles(self) -> None:
+        for name in self.list_profiles()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.profile_dir, name))
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Sampling profiler
+    # ------------------------------------------------------------------
+
+    def request_sampling(self, seconds: float, interval: float = 0.005, requests_only: bool = True) -> Dict:
+        """Ask all workers to sample their stacks for the next N seconds"""
+        seconds = min(max(seconds, 1), MAX_SAMPLING_SECONDS)
+        interval = max(interval, MIN_SAMPLING_INTERVAL)
+        trigger = {
+            'run_id': uuid.uuid4().hex[:12],
+            'deadline': time.time() + seconds,
+            'interval': interval,
+            'requests_only': requests_only,
+        }
+        tmp_path = os.path.join(self.profile_dir, f"{TRIGGER_FILE}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(trigger, f)
+        os.replace(tmp_path, os.path.join(self.profile_dir, TRIGGER_FILE))
+
+        # This worker starts right away, the others on their next request
+        self.check_trigger(force=True)
+        return trigger
+
+    def check_trigger(self, force: bool = False) -> None:
+        """Start a sampler if a new sampling run was requested (throttled)"""
+        now = time.time()
+        if not force and now - self._last_trigger_check < TRIGGER_CHECK_INTERVAL:
+            return
+        self._last_trigger_check = now
+
+        try:
+            with open(os.path.join(self.profile_dir, TRIGGER_FILE), encoding='utf-8') as f:
+                trigger = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if trigger.get('run_id') == self._last_run_id or now >= trigger.get('deadline', 0):
+            return
+        if self._sampler is not None and self._sampler.is_alive():
+            return
+
+        self._last_run_id = trigger['run_id']
+        output_path = os.path.join(self.profile_dir, f"sampling-{trigger['run_id']}-{os.getpid()}.folded")
+        self._sampler = StackSampler(
+            trigger['run_id'], trigger['deadline'], trigger['interval'], output_path,
+            thread_filter=self.active_request_threads if trigger.get('requests_only', True) else None,
+        )
+        self._sampler.start()
+        logger.info(f"Stack sampling {trigger['run_id']} started in worker {os.getpid()}")
+
+    def sampling_result(self, run_id: str) -> Optional[str]:
+        """Collapsed stacks of a run merged over all workers that took part"""
+        if not run_id.isalnum():
+            return None
+        prefix = f"sampling-{run_id}-"
+        counts: Counter = Counter()
+        found = False
+        for name in os.listdir(self.profile_dir):
+            if not (name.startswith(prefix) and name.endswith('.folded')):
+                continue
+            found = True
+            with open(os.path.join(self.profile_dir, name), encoding='utf-8') as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if stack:
+                        counts[stack] += int(count)
+        if not found:
+            return None
+        return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+    def status(self) -> Dict:
+        sampler = self._sampler
+        return {
+            'pid': os.getpid(),
+            'sampling': bool(sampler and sampler.is_alive()),
+            'sampling_run_id': sampler.run_id if sampler else None,
+            'profiles': self.list_profiles()[:20],
+            'stats': {key: value for key, value in perf_counter.get_stats().items()
+                      if key.startswith('profiler_')},
+        }
+
+def get_profiler() -> Profiler:
+    return current_app.extensions['profiler']
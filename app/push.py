@@ -0,0 +1,372 @@
+"""
+Web Push delivery
+Encrypts notifications for browser push services (RFC 8291, aes128gcm),
+signs requests with the VAPID key (RFC 8292) and sends them from a bounded
+thread pool over one pooled HTTP session (keep-alive connections to the
+push services are reused between notifications).
+
+Fan-out to many subscriptions goes in batches of PUSH_BATCH_SIZE, so the
+pool queue and memory stay bounded. Temporary failures (429, 5xx, network
+errors) are retried with exponential backoff; subscriptions the push
+service reports as gone (404/410) are deleted.
+
+Only needs `cryptography` and `requests`. The VAPID private key is either a
+PEM or the base64url raw 32-byte key produced by web-push tooling.
+"""
+
+import os
+import json
+import time
+import base64
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from flask import current_app
+
+from .metrics import observe_push_delivery
+
+logger = logging.getLogger(__name__)
+
+RECORD_SIZE = 4096
+# Push service answers that will not get better on retry vs. ones that mean "gone"
+GONE_STATUSES = (404, 410)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_BACKOFF = 30.0
+VAPID_TOKEN_LIFETIME = 12 * 3600
+# Browser push services (a host matches itself and its subdomains). Endpoints come
+# from clients, so anything else - internal hosts, loopback, plain http - is
+# refused to keep the server from being used for requests into the local network.
+# PUSH_ALLOWED_HOSTS adds hosts (e.g. a self-hosted push service).
+PUSH_SERVICE_HOSTS = (
+    "fcm.googleapis.com",
+    "android.googleapis.com",
+    "push.services.mozilla.com",
+    "notify.windows.com",
+    "push.apple.com",
+)
+
+def b64url_decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+def b64url_encode(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode("ascii")
+
+def _public_bytes(key) -> bytes:
+    return key.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+
+def load_vapid_private_key(value: str) -> ec.EllipticCurvePrivateKey:
+    """VAPID private key from PEM or base64url raw 32 bytes"""
+    value = value.strip()
+    if value.startswith("-----BEGIN"):
+        return serialization.load_pem_private_key(value.encode(), password=None)
+    return ec.derive_private_key(int.from_bytes(b64url_decode(value), "big"), ec.SECP256R1())
+
+def endpoint_error(endpoint, allowed_hosts: Iterable[str] = PUSH_SERVICE_HOSTS) -> Optional[str]:
+    """Why a subscription endpoint must not be used, None when it is a known push service"""
+    if not isinstance(endpoint, str):
+        return "endpoint is not a string"
+    try:
+        url = urlparse(endpoint)
+        host = (url.hostname or "").lower()
+    except ValueError:
+        return "invalid endpoint URL"
+    if url.scheme != "https":
+        return "endpoint must use https"
+    if url.username or url.password:
+        return "endpoint must not contain credentials"
+    if not any(host == allowed or host.endswith("." + allowed) for allowed in allowed_hosts):
+        return f"{host or 'missing host'} is not a known push service"
+    return None
+
+def encrypt_payload(payload: bytes, p256dh: str, auth: str, salt: Optional[bytes] = None,
+                    server_key: Optional[ec.EllipticCurvePrivateKey] = None) -> bytes:
+    """Encrypt one push message for a subscription (RFC 8291, single aes128gcm record)"""
+    if len(payload) > RECORD_SIZE - 17 - 86:
+        raise ValueError(f"push payload too large ({len(payload)} bytes)")
+    ua_public = b64url_decode(p256dh)
+    auth_secret = b64url_decode(auth)
+    salt = salt or os.urandom(16)
+    server_key = server_key or ec.generate_private_key(ec.SECP256R1())
+    as_public = _public_bytes(server_key.public_key())
+
+    shared = server_key.exchange(ec.ECDH(), ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), ua_public))
+    ikm = HKDF(hashes.SHA256(), 32, auth_secret, b"WebPush: info\x00" + ua_public + as_public).derive(shared)
+    cek = HKDF(hashes.SHA256(), 16, salt, b"Content-Encoding: aes128gcm\x00").derive(ikm)
+    nonce = HKDF(hashes.SHA256(), 12, salt, b"Content-Encoding: nonce\x00").derive(ikm)
+
+    ciphertext = AESGCM(cek).encrypt(nonce, payload + b"\x02", None)
+    header = salt + RECORD_SIZE.to_bytes(4, "big") + bytes([len(as_public)]) + as_public
+    return header + ciphertext
+
+class DeliveryResult:
+    """Outcome of sending one notification to one subscription"""
+
+    __slots__ = ("subscription_id", "status", "ok", "gone", "attempts", "error")
+
+    def __init__(self, subscription_id, status=None, ok=False, gone=False, attempts=0, error=None):
+        self.subscription_id = subscription_id
+        self.status = status
+        self.ok = ok
+        self.gone = gone
+        self.attempts = attempts
+        self.error = error
+
+class PushSender:
+    """Bounded-concurrency Web Push sender (app.extensions['push_sender'])"""
+
+    def __init__(self, app=None, workers=4, timeout=10.0, max_retries=3, backoff=0.5,
+                 batch_size=100, ttl=86400, allowed_hosts=()):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.allowed_hosts = PUSH_SERVICE_HOSTS + tuple(allowed_hosts)
+        self.vapid_key = None
+        self.vapid_public_key = ""
+        self.vapid_subject = ""
+        self._executor = None
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, tuple] = {}  # audience -> (token, expires)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = int(app.config.get("PUSH_WORKERS", self.workers))
+        self.timeout = float(app.config.get("PUSH_TIMEOUT", self.timeout))
+        self.max_retries = int(app.config.get("PUSH_MAX_RETRIES", self.max_retries))
+        self.batch_size = int(app.config.get("PUSH_BATCH_SIZE", self.batch_size))
+        self.ttl = int(app.config.get("PUSH_TTL", self.ttl))
+        extra = app.config.get("PUSH_ALLOWED_HOSTS", "")
+        self.allowed_hosts = PUSH_SERVICE_HOSTS + tuple(
+            host.strip().lower() for host in extra.split(",") if host.strip())
+        self.configure_vapid(app.config.get("VAPID_PRIVATE_KEY", ""), app.config.get("VAPID_CLAIM_EMAIL", ""))
+        app.extensions["push_sender"] = self
+
+    def configure_vapid(self, private_key: str, claim_email: str) -> None:
+        """Load the VAPID key; an invalid key disables sending instead of failing startup"""
+        self.vapid_key = None
+        self._tokens = {}
+        if not private_key:
+            return
+        try:
+            self.vapid_key = load_vapid_private_key(private_key)
+        except (ValueError, TypeError) as e:
+            logger.error(f"Invalid VAPID_PRIVATE_KEY, push notifications disabled: {e}")
+            return
+        self.vapid_public_key = b64url_encode(_public_bytes(self.vapid_key.public_key()))
+        self.vapid_subject = claim_email if claim_email.startswith(("mailto:", "https:")) else f"mailto:{claim_email}"
+
+    @property
+    def configured(self) -> bool:
+        return self.vapid_key is not None
+
+    def endpoint_error(self, endpoint) -> Optional[str]:
+        """endpoint_error() against this sender's allowed push service hosts"""
+        return endpoint_error(endpoint, self.allowed_hosts)
+
+    def _resources(self):
+        # Threads and sockets do not survive a fork (gunicorn preload_app)
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="push-sender")
+                    session = requests.Session()
+                    # https only - without an adapter requests refuses http:// URLs
+                    session.adapters.pop("http://", None)
+                    session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=self.workers))
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._executor, self._session
+
+    def vapid_headers(self, endpoint: str) -> Dict[str, str]:
+        """Authorization header for the push service of `endpoint` (token cached per origin)"""
+        url = urlparse(endpoint)
+        audience = f"{url.scheme}://{url.netloc}"
+        now = time.time()
+        cached = self._tokens.get(audience)
+        if cached is None or cached[1] - now < 600:
+            expires = int(now) + VAPID_TOKEN_LIFETIME
+            segments = [b64url_encode(json.dumps(part, separators=(",", ":")).encode()) for part in (
+                {"typ": "JWT", "alg": "ES256"},
+                {"aud": audience, "exp": expires, "sub": self.vapid_subject},
+            )]
+            signing_input = ".".join(segments).encode()
+            r, s = decode_dss_signature(self.vapid_key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+            signature = r.to_bytes(32, "big") + s.to_bytes(32, "big")
+            cached = (f"{signing_input.decode()}.{b64url_encode(signature)}", expires)
+            self._tokens[audience] = cached
+        return {"Authorization": f"vapid t={cached[0]}, k={self.vapid_public_key}"}
+
+    def send(self, subscription_id, subscription: Dict, payload: bytes) -> DeliveryResult:
+        """Encrypt and POST one notification, retrying temporary failures"""
+        result = DeliveryResult(subscription_id)
+        try:
+            endpoint = subscription["endpoint"]
+            keys = subscription["keys"]
+            body = encrypt_payload(payload, keys["p256dh"], keys["auth"])
+        except (KeyError, TypeError, ValueError) as e:
+            result.error = f"invalid subscription: {e}"
+            observe_push_delivery("invalid")
+            return result
+        # Checked again here - rows may predate validation or be edited in the database
+        error = self.endpoint_error(endpoint)
+        if error:
+            result.error = f"invalid subscription: {error}"
+            observe_push_delivery("invalid")
+            return result
+
+        _, session = self._resources()
+        headers = dict(self.vapid_headers(endpoint), **{
+            "Content-Encoding": "aes128gcm",
+            "Content-Type": "application/octet-stream",
+            "TTL": str(self.ttl),
+            "Urgency": "normal",
+        })
+        delay = self.backoff
+        while True:
+            result.attempts += 1
+            retry_after = None
+            try:
+                # No redirects - a push service answer must not send the request elsewhere
+                response = session.post(endpoint, data=body, headers=headers, timeout=self.timeout,
+                                        allow_redirects=False)
+                result.status = response.status_code
+                if 200 <= response.status_code < 300:
+                    result.ok = True
+                    observe_push_delivery("sent")
+                    return result
+                if response.status_code in GONE_STATUSES:
+                    result.gone = True
+                    observe_push_delivery("gone")
+                    return result
+                result.error = f"HTTP {response.status_code}"
+                if response.status_code not in RETRY_STATUSES:
+                    observe_push_delivery("failed")
+                    return result
+                retry_after = response.headers.get("Retry-After")
+            except requests.RequestException as e:
+                result.error = str(e)
+            if result.attempts > self.max_retries:
+                observe_push_delivery("failed")
+                return result
+            wait = delay
+            if retry_after and retry_after.isdigit():
+                wait = max(wait, float(retry_after))
+            time.sleep(min(wait, MAX_BACKOFF))
+            delay *= 2
+
+    def send_many(self, subscriptions: Iterable[tuple], payload: Dict) -> List[DeliveryResult]:
+        """Send `payload` to (id, subscription) pairs concurrently, batch by batch"""
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        executor, _ = self._resources()
+        results = []
+        batch = []
+        for item in subscriptions:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                results.extend(executor.map(lambda pair: self.send(pair[0], pair[1], data), batch))
+                batch = []
+        if batch:
+            results.extend(executor.map(lambda pair: self.send(pair[0], pair[1], data), batch))
+        return results
+
+def build_notification(title: str, body: str, url: str = "/") -> Dict:
+    """Payload in the shape static/sw.js merges into its notification defaults"""
+    return {"title": title, "body": body, "data": {"url": url, "timestamp": int(time.time() * 1000)}}
+
+def get_push_sender() -> PushSender:
+    return current_app.extensions["push_sender"]
+
+def _decode(rows):
+    for row in rows:
+        try:
+            yield row["id"], json.loads(row["subscription_data"])
+        except (TypeError, ValueError):
+            yield row["id"], None
+
+def _load_subscriptions(user_ids=None, batch_size=500):
+    """(id, subscription dict) pairs - one query for a set of users, paged by id for everyone"""
+    from .database import get_db, get_push_subscriptions
+    if user_ids is not None:
+        yield from _decode(get_push_subscriptions(user_ids))
+        return
+    db = get_db()
+    last_id = 0
+    while True:
+        rows = db.execute("SELECT id, subscription_data FROM push_subscriptions WHERE id > ? ORDER BY id LIMIT ?",
+                          (last_id, batch_size)).fetchall()
+        if not rows:
+            return
+        yield from _decode(rows)
+        last_id = rows[-1]["id"]
+
+def _prune(results: List[DeliveryResult]) -> int:
+    """Delete subscriptions the push service reported as gone"""
+    from .database import run_write
+    gone = [r.subscription_id for r in results if r.gone]
+    if not gone:
+        return 0
+    placeholders = ",".join("?" * len(gone))
+    return run_write(lambda db: db.execute(f"DELETE FROM push_subscriptions WHERE id IN ({placeholders})", gone).rowcount)
+
+def _summary(results: List[DeliveryResult], removed: int) -> Dict[str, int]:
+    return {
+        "sent": sum(1 for r in results if r.ok),
+        "failed": sum(1 for r in results if not r.ok and not r.gone),
+        "removed": removed,
+    }
+
+def notify_user(user_id, payload: Dict) -> Dict[str, int]:
+    """Send to every subscription of one user; returns {sent, failed, removed}"""
+    return notify_users([user_id], payload)
+
+def notify_users(user_ids, payload: Dict) -> Dict[str, int]:
+    """Send the same payload to every subscription of the given users"""
+    sender = get_push_sender()
+    results = sender.send_many(_load_subscriptions(user_ids), payload)
+    return _summary(results, _prune(results))
+
+def notify_all(payload: Dict) -> Dict[str, int]:
+    """Send to every stored subscription; returns {sent, failed, removed}"""
+    sender = get_push_sender()
+    results = sender.send_many(_load_subscriptions(batch_size=sender.batch_size), payload)
+    return _summary(results, _prune(results))
+
+def cleanup_subscriptions(max_age_days: Optional[int] = None) -> int:
+    """Delete unusable subscriptions (bad JSON, no keys, endpoint outside the allowed push
+    services) and, optionally, devices not seen for `max_age_days`. Duplicate endpoints
+    are prevented by the unique index."""
+    from .database import run_write
+    sender = get_push_sender()
+    remove = []
+    for sub_id, subscription in _load_subscriptions():
+        keys = subscription.get("keys") if isinstance(subscription, dict) else None
+        if not isinstance(keys, dict) or sender.endpoint_error(subscription.get("endpoint")) \
+                or not keys.get("p256dh") or not keys.get("auth"):
+            remove.append(sub_id)
+
+    def delete(db):
+        removed = 0
+        if remove:
+            placeholders = ",".join("?" * len(remove))
+            removed += db.execute(f"DELETE FROM push_subscriptions WHERE id IN ({placeholders})", remove).rowcount
+        if max_age_days is not None:
+            removed += db.execute("DELETE FROM push_subscriptions WHERE last_seen < datetime('now', ?)",
+                                  (f"-{int(max_age_days)} days",)).rowcount
+        return removed
+
+    return run_write(delete)
@@ -0,0 +1,161 @@
+"""
+Rate limiting shared by all gunicorn workers
+One Flask-Limiter instance for the whole app (auth and API routes) with a
+SQLite storage backend (``sqlite:///path``), so every worker process counts
+against the same fixed-window counters without an external service.
+gunicorn.conf.py points RATELIMIT_STORAGE_URI at /dev/shm; the dev server
+and tests run in one process and keep the default ``memory://``.
+
+Keys are per user for logged-in requests and per client address otherwise.
+A key that is already over its limit in the current window is rejected from
+a per-process cache without touching the shared storage.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from flask import session
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# Delete expired counters at most this often (seconds)
+CLEANUP_INTERVAL = 60.0
+
+def rate_limit_key() -> str:
+    """Per-user key for authenticated requests, client address otherwise"""
+    user_id = session.get("user_id")
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{get_remote_address()}"
+
+def _limit_amount(key: str) -> Optional[int]:
+    """Limit amount encoded in a limits key (.../<amount>/<multiples>/<granularity>)"""
+    parts = key.rsplit("/", 3)
+    if len(parts) == 4 and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+class SQLiteStorage(Storage):
+    """Fixed-window counters in a SQLite file shared by worker processes
+
+    Each process/thread uses its own connection (WAL, synchronous=OFF - the
+    counters do not need to survive a power loss). Keys seen over their limit
+    are remembered per process until the window ends, so a client hammering
+    a limited endpoint costs a dict lookup instead of a write transaction.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, timeout: float = 1.0, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri.split("://", 1)[1][1:] or ":memory:"
+        self.timeout = float(timeout)
+        self._local = threading.local()
+        self._blocked: Dict[str, Tuple[int, float]] = {}  # key -> (count, window end)
+        self._blocked_lock = threading.Lock()
+        self._next_cleanup = 0.0
+        self._create_schema()
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _create_schema(self) -> None:
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def _precheck(self, key: str, amount: int, now: float) -> Optional[int]:
+        """Count to report for a key known to be over its limit in this window"""
+        blocked = self._blocked.get(key)
+        if blocked is None:
+            return None
+        count, expires = blocked
+        if expires <= now:
+            with self._blocked_lock:
+                self._blocked.pop(key, None)
+            return None
+        with self._blocked_lock:
+            self._blocked[key] = (count + amount, expires)
+        return count + amount
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        count = self._precheck(key, amount, now)
+        if count is not None:
+            return count
+
+        conn = self._connection()
+        count, expires = conn.execute(
+            "INSERT INTO rate_limits (key, count, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            " count = CASE WHEN expires <= ? THEN excluded.count ELSE count + excluded.count END, "
+            " expires = CASE WHEN expires <= ? THEN excluded.expires ELSE expires END "
+            "RETURNING count, expires",
+            (key, amount, now + expiry, now, now),
+        ).fetchone()
+
+        limit = _limit_amount(key)
+        if limit is not None and count > limit:
+            with self._blocked_lock:
+                self._blocked[key] = (count, expires)
+
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + CLEANUP_INTERVAL
+            conn.execute("DELETE FROM rate_limits WHERE expires <= ?", (now,))
+            with self._blocked_lock:
+                self._blocked = {k: v for k, v in self._blocked.items() if v[1] > now}
+        return count
+
+    def get(self, key: str) -> int:
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT count FROM rate_limits WHERE key = ? AND expires > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expires FROM rate_limits WHERE key = ? AND expires > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        with self._blocked_lock:
+            self._blocked.clear()
+        return self._connection().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        with self._blocked_lock:
+            self._blocked.pop(key, None)
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+# The only limiter in the app - routes decorate with it, create_app() calls init_app().
+# Storage, default limits and on/off switch come from app.config (RATELIMIT_*).
+limiter = Limiter(key_func=rate_limit_key)
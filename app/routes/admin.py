@@ -3,11 +3,12 @@ Funkcje administracyjne - eksport Excel, powiadomienia, niedyspozycje
 Zachowuje pełną kompatybilność z istniejącymi funkcjami
 """
 
-import os
 import logging
-from flask import Blueprint, request, jsonify, session, send_file
+from flask import Blueprint, request, jsonify, session, send_file, redirect, url_for
 from ..auth import login_required, admin_required
 from ..database import get_db
+from ..push import build_notification, cleanup_subscriptions, get_push_sender, notify_all, notify_user
+from .api import safe_get_json
 
 logger = logging.getLogger(__name__)
 
@@ -26,16 +27,23 @@ bp = Blueprint('admin', __name__)
 def api_push_send():
     """Wysyła powiadomienie push do użytkownika"""
     try:
-        data = request.get_json()
+        data = safe_get_json()
         title = data.get('title', '')
         body = data.get('body', '')
         
         if not title or not body:
             return jsonify(error="Tytuł i treść są wymagane"), 400
+        if not get_push_sender().configured:
+            return jsonify(error="Powiadomienia push nie są skonfigurowane"), 503
+        
+        # Administrator może wysłać do wybranego użytkownika, pozostali tylko do siebie
+        user_id = session.get("user_id")
+        if data.get('user_id') and session.get("user_role") == "ADMIN":
+            user_id = data['user_id']
         
-        # TODO: Implementacja wysyłania powiadomień push
-        logger.info(f"Powiadomienie push: {title} - {body}")
-        return jsonify(status="ok", message="Powiadomienie zostało wysłane")
+        result = notify_user(user_id, build_notification(title, body, data.get('url', '/')))
+        logger.info(f"Powiadomienie push do użytkownika {user_id}: {title} - {result}")
+        return jsonify(status="ok", message="Powiadomienie zostało wysłane", **result)
         
     except Exception as e:
         logger.error(f"Błąd podczas wysyłania powiadomienia: {e}")
@@ -56,16 +64,19 @@ def api_push_send_to_all():
         if not user_row or user_row["role"] != "ADMIN":
             return jsonify(error="Brak uprawnień"), 403
         
-        data = request.get_json()
+        data = safe_get_json()
         title = data.get('title', '')
         body = data.get('body', '')
         
         if not title or not body:
             return jsonify(error="Tytuł i treść są wymagane"), 400
+        if not get_push_sender().configured:
+            return jsonify(error="Powiadomienia push nie są skonfigurowane"), 503
         
-        # TODO: Implementacja wysyłania do wszystkich
-        logger.info(f"Powiadomienie push do wszystkich: {title} - {body}")
-        return jsonify(status="ok", message="Powiadomienie zostało wysłane do wszystkich")
+        # Wysyłka partiami przez pulę wątków, wygasłe subskrypcje (404/410) są usuwane
+        result = notify_all(build_notification(title, body, data.get('url', '/')))
+        logger.info(f"Powiadomienie push do wszystkich: {title} - {result}")
+        return jsonify(status="ok", message="Powiadomienie zostało wysłane do wszystkich", **result)
         
     except Exception as e:
         logger.error(f"Błąd podczas wysyłania powiadomienia do wszystkich: {e}")
@@ -86,217 +97,44 @@ def api_push_cleanup():
         if not user_row or user_row["role"] != "ADMIN":
             return jsonify(error="Brak uprawnień"), 403
         
-        # TODO: Implementacja czyszczenia subskrypcji
-        logger.info(f"Admin {session.get('user_email')} wyczyścił subskrypcje push")
-        return jsonify(status="ok", message="Subskrypcje zostały wyczyszczone")
+        # Uszkodzone subskrypcje i opcjonalnie urządzenia niewidziane od max_age_days dni -
+        # wygasłe usuwa sama wysyłka (404/410)
+        max_age_days = safe_get_json().get('max_age_days')
+        if max_age_days is not None and (not isinstance(max_age_days, int) or max_age_days < 1):
+            return jsonify(error="Nieprawidłowa wartość max_age_days"), 400
+        removed = cleanup_subscriptions(max_age_days)
+        logger.info(f"Admin {session.get('user_email')} wyczyścił subskrypcje push ({removed})")
+        return jsonify(status="ok", message="Subskrypcje zostały wyczyszczone", removed=removed)
         
     except Exception as e:
         logger.error(f"Błąd podczas czyszczenia subskrypcji: {e}")
         return jsonify(error="Wystąpił błąd podczas czyszczenia"), 500
 
 # ============================================================================
-# ENDPOINTY NIEDYSPOZYCJI
+# PRZESTARZAŁE ADRESY (implementacje w api.py + app/services)
 # ============================================================================
 
-@bp.post("/unavailability")
-@login_required
-def api_unavailability_create():
-    """Tworzy zgłoszenie niedyspozycji"""
-    try:
-        from ..database import ensure_unavailability_table
-        ensure_unavailability_table()
-        data = safe_get_json()
-        
-        month_year = data.get("month_year", "").strip()
-        reason = data.get("reason", "").strip()
-        
-        if not month_year or not reason:
-            return jsonify(error="Miesiąc i powód są wymagane"), 400
-        
-        # Pobierz nazwę użytkownika
-        user_name = session.get('user_name', '')
-        if not user_name:
-            return jsonify(error="Nie można określić użytkownika"), 400
-        
-        db = get_db()
-        
-        # Znajdź ID pracownika
-        emp_row = db.execute("SELECT id FROM employees WHERE name = ?", (user_name,)).fetchone()
-        if not emp_row:
-            return jsonify(error="Nie znaleziono pracownika"), 400
-        
-        emp_id = emp_row['id']
-        
-        # Sprawdź czy już istnieje zgłoszenie dla tego miesiąca
-        existing = db.execute("""
-            SELECT id FROM unavailability_requests 
-            WHERE employee_id = ? AND month_year = ?
-        """, (emp_id, month_year)).fetchone()
-        
-        if existing:
-            return jsonify(error="Już istnieje zgłoszenie niedyspozycji dla tego miesiąca"), 400
-        
-        # Utwórz zgłoszenie
-        db.execute("""
-            INSERT INTO unavailability_requests (employee_id, month_year, reason)
-            VALUES (?, ?, ?)
-        """, (emp_id, month_year, reason))
-        
-        db.commit()
-        
-        logger.info(f"Użytkownik {user_name} zgłosił niedyspozycję dla {month_year}")
-        return jsonify(status="ok", message="Zgłoszenie niedyspozycji zostało utworzone")
-        
-    except Exception as e:
-        logger.error(f"Błąd podczas tworzenia zgłoszenia niedyspozycji: {e}")
-        return jsonify(error="Wystąpił błąd podczas tworzenia zgłoszenia"), 500
-
-@bp.get("/unavailability/inbox")
-@login_required
-def api_unavailability_inbox():
-    """Pobiera zgłoszenia niedyspozycji"""
-    try:
-        from ..database import ensure_unavailability_table
-        ensure_unavailability_table()
-        db = get_db()
-        
-        # Pobierz wszystkie zgłoszenia
-        requests = db.execute("""
-            SELECT ur.*, e.name as employee_name
-            FROM unavailability_requests ur
-            JOIN employees e ON ur.employee_id = e.id
-            ORDER BY ur.created_at DESC
-        """).fetchall()
-        
-        requests_list = []
-        for req in requests:
-            requests_list.append({
-                'id': req['id'],
-                'employee_name': req['employee_name'],
-                'month_year': req['month_year'],
-                'reason': req['reason'],
-                'status': req['status'],
-                'created_at': req['created_at']
-            })
-        
-        return jsonify(requests_list)
-        
-    except Exception as e:
-        logger.error(f"Błąd podczas pobierania zgłoszeń niedyspozycji: {e}")
-        return jsonify(error="Wystąpił błąd podczas pobierania danych"), 500
-
-@bp.post("/unavailability/respond")
-@admin_required
-def api_unavailability_respond():
-    """Odpowiada na zgłoszenie niedyspozycji (admin)"""
-    try:
-        data = safe_get_json()
-        request_id = data.get('id')
-        status = data.get('status')  # 'APPROVED' lub 'REJECTED'
-        
-        if not request_id or not status:
-            return jsonify(error="Brak wymaganych parametrów"), 400
-        
-        if status not in ['APPROVED', 'REJECTED']:
-            return jsonify(error="Nieprawidłowy status"), 400
-        
-        db = get_db()
-        
-        # Pobierz zgłoszenie
-        req = db.execute("""
-            SELECT ur.*, e.name as employee_name
-            FROM unavailability_requests ur
-            JOIN employees e ON ur.employee_id = e.id
-            WHERE ur.id = ?
-        """, (request_id,)).fetchone()
-        
-        if not req:
-            return jsonify(error="Nie znaleziono zgłoszenia"), 404
-        
-        # Zaktualizuj status
-        db.execute("""
-            UPDATE unavailability_requests 
-            SET status = ? 
-            WHERE id = ?
-        """, (status, request_id))
-        
-        # Jeśli zatwierdzono, dodaj zmiany "-" dla wszystkich dni w miesiącu
-        if status == 'APPROVED':
-            month_year = req['month_year']
-            year, month = map(int, month_year.split('-'))
-            
-            # Pobierz wszystkie dni w miesiącu
-            import datetime as dt
-            import calendar
-            
-            first_day = dt.date(year, month, 1)
-            last_day = dt.date(year, month, calendar.monthrange(year, month)[1])
-            
-            current_date = first_day
-            while current_date <= last_day:
-                date_str = current_date.strftime('%Y-%m-%d')
-                
-                # Usuń istniejące zmiany dla tego pracownika w tym dniu
-                db.execute("DELETE FROM shifts WHERE date = ? AND employee_id = ?", 
-                          (date_str, req['employee_id']))
-                
-                # Dodaj wpis z "-"
-                db.execute("INSERT INTO shifts(date, shift_type, employee_id) VALUES (?, ?, ?)", 
-                          (date_str, "-", req['employee_id']))
-                
-                current_date += dt.timedelta(days=1)
-        
-        db.commit()
-        
-        # Automatycznie archiwizuj zakończone prośby
-        try:
-            from ..database import archive_completed_requests
-            archive_completed_requests()
-        except Exception as e:
-            logger.warning(f"Błąd podczas automatycznej archiwizacji: {e}")
-        
-        logger.info(f"Admin {session.get('user_email')} {status} zgłoszenie niedyspozycji {request_id}")
-        return jsonify(status="ok", message=f"Zgłoszenie zostało {status}")
-        
-    except Exception as e:
-        logger.error(f"Błąd podczas odpowiadania na zgłoszenie niedyspozycji: {e}")
-        return jsonify(error="Wystąpił błąd podczas przetwarzania zgłoszenia"), 500
+# Stare adresy bez prefiksu /api -> endpoint w blueprincie api. 308 zachowuje
+# metodę i treść żądania (POST zostaje POST-em).
+DEPRECATED_ALIASES = [
+    ("/unavailability", "api.api_unavailability_create", ["POST"]),
+    ("/unavailability/inbox", "api.api_unavailability_inbox", ["GET"]),
+    ("/unavailability/respond", "api.api_unavailability_respond", ["POST"]),
+    ("/schedule/changes", "api.api_schedule_changes", ["GET"]),
+]
 
-# ============================================================================
-# ENDPOINTY DODATKOWE
-# ============================================================================
+def _deprecated_alias(endpoint):
+    def view():
+        target = url_for(endpoint)
+        logger.warning(f"Przestarzały adres {request.method} {request.path} - użyj {target}")
+        response = redirect(target, code=308)
+        response.headers['Deprecation'] = 'true'
+        response.headers['Link'] = f'<{target}>; rel="successor-version"'
+        return response
+    return view
 
-@bp.get("/schedule/changes")
-@login_required
-def api_schedule_changes():
-    """Pobiera zmiany w grafiku"""
-    try:
-        db = get_db()
-        
-        # Pobierz ostatnie zmiany
-        changes = db.execute("""
-            SELECT * FROM schedule_changes 
-            ORDER BY created_at DESC 
-            LIMIT 50
-        """).fetchall()
-        
-        changes_list = []
-        for change in changes:
-            changes_list.append({
-                'id': change['id'],
-                'date': change['date'],
-                'employee_name': change['employee_name'],
-                'old_shift': change['old_shift'],
-                'new_shift': change['new_shift'],
-                'changed_by': change['changed_by'],
-                'created_at': change['created_at']
-            })
-        
-        return jsonify(changes_list)
-        
-    except Exception as e:
-        logger.error(f"Błąd podczas pobierania zmian w grafiku: {e}")
-        return jsonify(error="Wystąpił błąd podczas pobierania danych"), 500
+for rule, endpoint, methods in DEPRECATED_ALIASES:
+    bp.add_url_rule(rule, f"deprecated_{endpoint.split('.')[-1]}", _deprecated_alias(endpoint), methods=methods)
 
 @bp.post("/notifications/test")
 @login_required
@@ -309,3 +147,63 @@ def api_notifications_test():
     except Exception as e:
         logger.error(f"Błąd podczas testu powiadomień: {e}")
         return jsonify(error="Wystąpił błąd podczas testu"), 500
+
+# ============================================================================
+# ENDPOINTY PROFILOWANIA (tylko admin)
+# ============================================================================
+
+@bp.get("/admin/profiler")
+@admin_required
+def api_profiler_status():
+    """Stan profilera w tym workerze i lista zapisanych profili cProfile"""
+    from ..profiling import get_profiler
+    return jsonify(get_profiler().status())
+
+@bp.post("/admin/profiler/sampling")
+@admin_required
+def api_profiler_sampling_start():
+    """Uruchamia próbkowanie stosów na N sekund we wszystkich workerach"""
+    try:
+        from ..profiling import get_profiler
+        data = request.get_json(silent=True) or {}
+        seconds = float(data.get('seconds', 10))
+        interval = float(data.get('interval', 0.005))
+        requests_only = bool(data.get('requests_only', True))
+        
+        trigger = get_profiler().request_sampling(seconds, interval, requests_only)
+        logger.info(f"Admin {session.get('user_email')} uruchomił próbkowanie {trigger['run_id']}")
+        return jsonify(status="ok", **trigger)
+        
+    except (TypeError, ValueError):
+        return jsonify(error="Nieprawidłowe parametry próbkowania"), 400
+    except Exception as e:
+        logger.error(f"Błąd podczas uruchamiania próbkowania: {e}")
+        return jsonify(error="Wystąpił błąd podczas uruchamiania profilera"), 500
+
+@bp.get("/admin/profiler/sampling/<run_id>")
+@admin_required
+def api_profiler_sampling_result(run_id):
+    """Wynik próbkowania w formacie collapsed stacks (flamegraph.pl, speedscope)"""
+    from ..profiling import get_profiler
+    result = get_profiler().sampling_result(run_id)
+    if result is None:
+        return jsonify(error="Brak wyników - próbkowanie trwa lub nie istnieje"), 404
+    return result, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@bp.get("/admin/profiler/profiles/<name>")
+@admin_required
+def api_profiler_profile(name):
+    """Pobiera profil cProfile (.pstats) lub jego raport tekstowy (?format=text)"""
+    from ..profiling import get_profiler
+    profiler = get_profiler()
+    
+    if request.args.get('format') == 'text':
+        summary = profiler.profile_summary(name)
+        if summary is None:
+            return jsonify(error="Nie znaleziono profilu"), 404
+        return summary, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    
+    path = profiler.profile_path(name)
+    if path is None:
+        return jsonify(error="Nie znaleziono profilu"), 404
+    return send_file(path, as_attachment=True, download_name=name)
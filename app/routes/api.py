@@ -8,21 +8,27 @@ import logging
 import os
 from flask import Blueprint, request, jsonify, session
 from ..auth import login_required, admin_required, rate_limit_required
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from ..database import get_db
+from ..database import get_db, run_write
 from ..cache import cache, cached, invalidate_cache_pattern
 from ..performance import monitor_performance, perf_counter
+from ..compression import no_compress
+from ..rate_limit import limiter
+from ..whitelist import whitelist
+from ..notifications import notify_admins, notify_employees, notify_users
+from ..services import employees as employees_service
+from ..services import requests as requests_service
+from ..services import schedule as schedule_service
+from ..services import swaps as swaps_service
 
 logger = logging.getLogger(__name__)
 
+# Status decyzji w treści powiadomień
+DECISION_TEXT = {'APPROVED': 'zatwierdzona', 'REJECTED': 'odrzucona'}
+
 bp = Blueprint('api', __name__, url_prefix='/api')
 
-# Rate limiter dla API - optimized limits
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["200 per minute"]  # Increased from 100 to 200 for better UX
-)
+# Limit dla całego API (oprócz domyślnych) - wspólny limiter aplikacji, klucz per użytkownik
+limiter.limit("200 per minute", override_defaults=False)(bp)
 
 def safe_get_json():
     """Bezpieczne pobieranie JSON z requestu"""
@@ -62,8 +68,6 @@ def api_save():
         if is_draft and user_role != 'ADMIN':
             return jsonify(error="Tylko administratorzy mogą używać trybu roboczego"), 403
         
-        db = get_db()
-        
         # Jeśli to tryb draft, użyj specjalnej logiki
         if is_draft:
             from ..database import ensure_draft_shifts_table
@@ -71,16 +75,66 @@ def api_save():
             
             user_id = session.get('user_id')
             
-            # Wyczyść wszystkie istniejące drafty dla tego użytkownika
-            db.execute("DELETE FROM draft_shifts WHERE created_by = ?", (user_id,))
+            def write_draft(db):
+                # Wyczyść wszystkie istniejące drafty dla tego użytkownika
+                db.execute("DELETE FROM draft_shifts WHERE created_by = ?", (user_id,))
             
-            # Zapisz nowe zmiany w trybie draft
+                # Zapisz nowe zmiany w trybie draft
+                for change in changes:
+                    date = change.get('date')
+                    employee = change.get('employee') or change.get('name')
+                    shift_type_raw = change.get('shift_type') or change.get('value', '')
+                
+                    # Mapowanie typów zmian (jak w normalnym save)
+                    shift_type_mapping = {
+                        'D': 'DNIOWKA',
+                        'DNIOWKA': 'DNIOWKA',
+                        'N': 'NOCKA', 
+                        'NOCKA': 'NOCKA',
+                        'P': 'POPOLUDNIOWKA'
+                    }
+                
+                    if shift_type_raw in shift_type_mapping:
+                        shift_type = shift_type_mapping[shift_type_raw]
+                    elif shift_type_raw and shift_type_raw.startswith('P '):
+                        shift_type = shift_type_raw
+                    else:
+                        shift_type = shift_type_raw
+                
+                    if not date or not employee:
+                        continue
+                
+                    # Znajdź ID pracownika
+                    emp_row = db.execute("SELECT id FROM employees WHERE name = ?", (employee,)).fetchone()
+                    if not emp_row:
+                        logger.warning(f"Nie znaleziono pracownika: {employee}")
+                        continue
+                
+                    emp_id = emp_row['id']
+                
+                    # Zapisz tylko jeśli shift_type nie jest puste
+                    if shift_type and shift_type.strip() and shift_type != '-':
+                        db.execute("""
+                            INSERT INTO draft_shifts (date, shift_type, employee_id, created_by)
+                            VALUES (?, ?, ?, ?)
+                        """, (date, shift_type, emp_id, user_id))
+                        logger.info(f"DRAFT ZAPISANO: {date} - {employee} - {shift_type}")
+            
+            run_write(write_draft)
+            logger.info(f"Zapisano {len(changes)} zmian w trybie draft przez {user_email}")
+            return jsonify(status="ok", message="Zmiany robocze zapisane pomyślnie")
+        
+        # Normalny tryb zapisywania (z powiadomieniami)
+        changed = {}  # data -> pracownicy, których grafik się zmienił
+        
+        def write(db):
+            # Zapisz zmiany do bazy danych
             for change in changes:
                 date = change.get('date')
-                employee = change.get('employee') or change.get('name')
-                shift_type_raw = change.get('shift_type') or change.get('value', '')
-                
-                # Mapowanie typów zmian (jak w normalnym save)
+                employee = change.get('employee') or change.get('name')  # Support both formats
+                shift_type_raw = change.get('shift_type') or change.get('value', '')  # Support both formats
+            
+                # Map abbreviated shift types to full names, but preserve custom text
                 shift_type_mapping = {
                     'D': 'DNIOWKA',
                     'DNIOWKA': 'DNIOWKA',
@@ -88,103 +142,60 @@ def api_save():
                     'NOCKA': 'NOCKA',
                     'P': 'POPOLUDNIOWKA'
                 }
-                
+                # If it's not a standard single-letter mapping, keep the original value (for custom text like "D 9-21", "D 10-22")
                 if shift_type_raw in shift_type_mapping:
                     shift_type = shift_type_mapping[shift_type_raw]
                 elif shift_type_raw and shift_type_raw.startswith('P '):
+                    # Międzyzmiana w formacie "P 10-22" - zachowaj pełny tekst
                     shift_type = shift_type_raw
                 else:
-                    shift_type = shift_type_raw
-                
+                    shift_type = shift_type_raw  # Keep custom text as-is
+            
                 if not date or not employee:
                     continue
-                
+            
                 # Znajdź ID pracownika
                 emp_row = db.execute("SELECT id FROM employees WHERE name = ?", (employee,)).fetchone()
                 if not emp_row:
                     logger.warning(f"Nie znaleziono pracownika: {employee}")
                     continue
-                
-                emp_id = emp_row['id']
-                
-                # Zapisz tylko jeśli shift_type nie jest puste
-                if shift_type and shift_type.strip() and shift_type != '-':
-                    db.execute("""
-                        INSERT INTO draft_shifts (date, shift_type, employee_id, created_by)
-                        VALUES (?, ?, ?, ?)
-                    """, (date, shift_type, emp_id, user_id))
-                    logger.info(f"DRAFT ZAPISANO: {date} - {employee} - {shift_type}")
-            
-            db.commit()
-            logger.info(f"Zapisano {len(changes)} zmian w trybie draft przez {user_email}")
-            return jsonify(status="ok", message="Zmiany robocze zapisane pomyślnie")
-        
-        # Normalny tryb zapisywania (z powiadomieniami)
-        # Zapisz zmiany do bazy danych
-        for change in changes:
-            date = change.get('date')
-            employee = change.get('employee') or change.get('name')  # Support both formats
-            shift_type_raw = change.get('shift_type') or change.get('value', '')  # Support both formats
-            
-            # Map abbreviated shift types to full names, but preserve custom text
-            shift_type_mapping = {
-                'D': 'DNIOWKA',
-                'DNIOWKA': 'DNIOWKA',
-                'N': 'NOCKA', 
-                'NOCKA': 'NOCKA',
-                'P': 'POPOLUDNIOWKA'
-            }
-            # If it's not a standard single-letter mapping, keep the original value (for custom text like "D 9-21", "D 10-22")
-            if shift_type_raw in shift_type_mapping:
-                shift_type = shift_type_mapping[shift_type_raw]
-            elif shift_type_raw and shift_type_raw.startswith('P '):
-                # Międzyzmiana w formacie "P 10-22" - zachowaj pełny tekst
-                shift_type = shift_type_raw
-            else:
-                shift_type = shift_type_raw  # Keep custom text as-is
-            
-            if not date or not employee:
-                continue
             
-            # Znajdź ID pracownika
-            emp_row = db.execute("SELECT id FROM employees WHERE name = ?", (employee,)).fetchone()
-            if not emp_row:
-                logger.warning(f"Nie znaleziono pracownika: {employee}")
-                continue
-            
-            emp_id = emp_row['id']
+                emp_id = emp_row['id']
             
-            # Pobierz starą zmianę przed usunięciem
-            old_shift = db.execute("SELECT shift_type FROM shifts WHERE date = ? AND employee_id = ?", 
-                                 (date, emp_id)).fetchone()
-            old_shift_type = old_shift['shift_type'] if old_shift else None
+                # Pobierz starą zmianę przed usunięciem
+                old_shift = db.execute("SELECT shift_type FROM shifts WHERE date = ? AND employee_id = ?", 
+                                     (date, emp_id)).fetchone()
+                old_shift_type = old_shift['shift_type'] if old_shift else None
             
-            # Usuń istniejącą zmianę dla tego pracownika w tym dniu
-            db.execute("DELETE FROM shifts WHERE date = ? AND employee_id = ?", (date, emp_id))
+                # Usuń istniejącą zmianę dla tego pracownika w tym dniu
+                db.execute("DELETE FROM shifts WHERE date = ? AND employee_id = ?", (date, emp_id))
             
-            # Dodaj nową zmianę (jeśli nie jest pusta)
-            if shift_type and shift_type.strip() and shift_type != '-':
-                db.execute("INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, ?)", 
-                          (date, shift_type, emp_id))
-                logger.info(f"ZAPISANO: {date} - {employee} - {shift_type}")
+                # Dodaj nową zmianę (jeśli nie jest pusta)
+                if shift_type and shift_type.strip() and shift_type != '-':
+                    db.execute("INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, ?)", 
+                              (date, shift_type, emp_id))
+                    logger.info(f"ZAPISANO: {date} - {employee} - {shift_type}")
                 
-                # Zapisz historię zmian
-                action = "DODANO" if not old_shift_type else "ZMIENIONO"
-                db.execute("""
-                    INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (date, employee, old_shift_type or '', shift_type, user_email))
-            else:
-                # Zapisz usunięcie do schedule_changes
-                if old_shift_type:
+                    # Zapisz historię zmian
+                    action = "DODANO" if not old_shift_type else "ZMIENIONO"
                     db.execute("""
                         INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
                         VALUES (?, ?, ?, ?, ?)
-                    """, (date, employee, old_shift_type, '', user_email))
-        
-        # Użyj transakcji dla atomowości
+                    """, (date, employee, old_shift_type or '', shift_type, user_email))
+                    if shift_type != old_shift_type:
+                        changed.setdefault(date, set()).add(employee)
+                else:
+                    # Zapisz usunięcie do schedule_changes
+                    if old_shift_type:
+                        db.execute("""
+                            INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
+                            VALUES (?, ?, ?, ?, ?)
+                        """, (date, employee, old_shift_type, '', user_email))
+                        changed.setdefault(date, set()).add(employee)
+        
+        # Jedna transakcja (wątek zapisujący) dla atomowości
         try:
-            db.commit()
+            run_write(write)
             
             # Invalidate cache for affected dates
             for change in changes:
@@ -192,10 +203,13 @@ def api_save():
                 if date:
                     cache.delete(f"shifts:{date}")
             
+            # Powiadomienia push po commicie (łączone per użytkownik)
+            for date, employees in changed.items():
+                notify_employees(employees, 'schedule', f"Zmieniono Twój grafik: {date}")
+            
             logger.info(f"Zapisano {len(changes)} zmian przez {user_email}")
             return jsonify(status="ok", message="Zmiany zapisane pomyślnie")
         except Exception as commit_error:
-            db.rollback()
             logger.error(f"Błąd podczas commit: {commit_error}")
             return jsonify(error="Błąd podczas zapisywania zmian"), 500
         
@@ -373,8 +387,6 @@ def api_swaps_inbox():
         return jsonify(error="Nie jesteś zalogowany"), 401
     """Pobiera prośby o zamianę dla użytkownika"""
     try:
-        from ..database import ensure_swaps_table
-        ensure_swaps_table()
         db = get_db()
         
         user_id = session.get('user_id')
@@ -384,9 +396,9 @@ def api_swaps_inbox():
         user_row = db.execute("SELECT name FROM users WHERE id = ?", (user_id,)).fetchone()
         user_name = user_row['name'] if user_row else user_email
         
-        # Znajdź nazwę pracownika odpowiadającego użytkownikowi
-        emp_row = db.execute("SELECT name FROM employees WHERE user_id = ?", (user_id,)).fetchone()
-        employee_name = emp_row['name'] if emp_row else user_name
+        # Pracownik odpowiada użytkownikowi o tym samym imieniu i nazwisku
+        # (tabela employees nie ma kolumny user_id)
+        employee_name = user_name
         
         # Sprawdź czy użytkownik jest bossem
         user_role = session.get('user_role', 'USER')
@@ -418,7 +430,8 @@ def api_swaps_inbox():
                 'comment_requester': req['comment_requester'],
                 'recipient_status': req['recipient_status'],
                 'boss_status': req['boss_status'],
-                'created_at': req['created_at']
+                'created_at': req['created_at'],
+                'version': req['version']
             }
             
             # Dodaj informacje o zmianach
@@ -465,53 +478,31 @@ def api_swaps_inbox():
 def api_unavailability_create():
     """Tworzy zgłoszenie niedyspozycji"""
     try:
-        from ..database import ensure_unavailability_table
-        ensure_unavailability_table()
         data = safe_get_json()
         
-        month_year = data.get("month_year", "").strip()
+        month_year = str(data.get("month_year", "")).strip()
         selected_days = data.get("selected_days", [])
-        comment = data.get("comment", "").strip()
+        comment = str(data.get("comment") or data.get("reason") or "").strip()
         
-        if not month_year or not selected_days:
-            return jsonify(error="Miesiąc i wybrane dni są wymagane"), 400
+        error = requests_service.validate_unavailability(month_year, selected_days)
+        if error:
+            return jsonify(error=error), 400
         
         # Pobierz dane użytkownika z sesji
         user_email = session.get('user_email', '')
         user_name = session.get('user_name', '')
-        user_id = session.get('user_id', '')
-        
-        logger.info(f"Session data - user_email: {user_email}, user_name: {user_name}, user_id: {user_id}")
-        
         if not user_email:
             return jsonify(error="Nie można określić użytkownika (brak email w sesji)"), 400
         
-        db = get_db()
-        
-        # Znajdź ID pracownika po email (najlepsze rozwiązanie - email jest unikalny)
-        emp_row = db.execute("SELECT id FROM employees WHERE email = ?", (user_email,)).fetchone()
-        logger.info(f"Szukam pracownika po email '{user_email}': {emp_row}")
-        
-        if not emp_row:
+        # Pracownik po emailu, a gdy pracownik nie ma emaila - po imieniu i nazwisku
+        employee = employees_service.find_employee(user_email, user_name)
+        if not employee:
             return jsonify(error=f"Nie znaleziono pracownika dla email='{user_email}'. Upewnij się, że Twoje konto jest powiązane z pracownikiem w systemie."), 400
         
-        emp_id = emp_row['id']
-        
-        # Usunięto sprawdzenie duplikatów - można wysyłać nieograniczoną ilość zgłoszeń
-        
-        # Konwertuj wybrane dni na string
-        selected_days_str = ','.join(selected_days)
-        
-        # Utwórz zgłoszenie
-        db.execute("""
-            INSERT INTO unavailability_requests (employee_id, month_year, comment, selected_days)
-            VALUES (?, ?, ?, ?)
-        """, (emp_id, month_year, comment or "Niedyspozycja", selected_days_str))
-        
-        db.commit()
+        request_id = requests_service.create_unavailability(employee['id'], month_year, selected_days, comment)
         
-        logger.info(f"Użytkownik {user_name} zgłosił niedyspozycję dla {month_year}: {selected_days_str}")
-        return jsonify(message="Subskrypcja zapisana pomyślnie")
+        logger.info(f"Użytkownik {user_name} zgłosił niedyspozycję dla {month_year}: {selected_days}")
+        return jsonify(status="ok", message="Zgłoszenie niedyspozycji zostało utworzone", id=request_id)
         
     except Exception as e:
         logger.error(f"Błąd podczas tworzenia zgłoszenia niedyspozycji: {e}")
@@ -522,59 +513,14 @@ def api_unavailability_inbox():
     # Sprawdź czy użytkownik jest zalogowany
     if not session.get('user_id'):
         return jsonify(error="Nie jesteś zalogowany"), 401
-    """Pobiera prośby o niedyspozycję dla użytkownika"""
+    """Pobiera zgłoszenia niedyspozycji - admin wszystkie, pracownik swoje"""
     try:
-        db = get_db()
-        
-        # Pobierz wszystkie zgłoszenia niedyspozycji z informacjami o pracownikach
-        unavailability_requests = db.execute("""
-            SELECT 
-                ur.id,
-                ur.employee_id,
-                ur.month_year,
-                ur.selected_days,
-                ur.comment,
-                ur.status,
-                ur.boss_comment,
-                ur.created_at,
-                ur.updated_at,
-                e.name as employee_name,
-                e.email as employee_email
-            FROM unavailability_requests ur
-            JOIN employees e ON ur.employee_id = e.id
-            ORDER BY ur.created_at DESC
-        """).fetchall()
-        
-        # Konwertuj na listę słowników
-        items = []
-        for req in unavailability_requests:
-            # Parsuj selected_days jeśli to JSON string
-            selected_days = req['selected_days']
-            if selected_days.startswith('[') and selected_days.endswith(']'):
-                try:
-                    import json
-                    selected_days = json.loads(selected_days)
-                except:
-                    selected_days = selected_days.split(',') if selected_days else []
-            else:
-                selected_days = selected_days.split(',') if selected_days else []
-            
-            items.append({
-                'id': req['id'],
-                'employee_id': req['employee_id'],
-                'employee_name': req['employee_name'],
-                'employee_email': req['employee_email'],
-                'month_year': req['month_year'],
-                'selected_days': selected_days,
-                'comment': req['comment'],
-                'status': req['status'],
-                'boss_comment': req['boss_comment'],
-                'created_at': req['created_at'],
-                'updated_at': req['updated_at']
-            })
-        
-        # Sprawdź czy użytkownik jest szefem (można dodać logikę sprawdzania roli)
-        is_boss = True  # Na razie wszyscy mogą widzieć wszystkie zgłoszenia
+        is_boss = session.get('user_role') == 'ADMIN'
+        if is_boss:
+            items = requests_service.unavailability_inbox()
+        else:
+            employee = employees_service.find_employee(session.get('user_email', ''), session.get('user_name', ''))
+            items = requests_service.unavailability_inbox(employee['id']) if employee else []
         
         return jsonify({
             'items': items,
@@ -585,6 +531,48 @@ def api_unavailability_inbox():
         logger.error(f"Błąd podczas pobierania próśb o niedyspozycję: {e}")
         return jsonify(error="Wystąpił błąd podczas pobierania danych"), 500
 
+@bp.post("/unavailability/respond")
+@admin_required
+def api_unavailability_respond():
+    """Odpowiada na zgłoszenie niedyspozycji (admin)
+    
+    Zatwierdzenie wpisuje "-" dokładnie w wybrane dni - zapytania zbiorcze
+    w jednej transakcji (services/requests.py).
+    """
+    try:
+        data = safe_get_json()
+        request_id = data.get('id')
+        status = data.get('status')  # 'APPROVED' lub 'REJECTED'
+        
+        if not request_id or not status:
+            return jsonify(error="Brak wymaganych parametrów"), 400
+        
+        if status not in ['APPROVED', 'REJECTED']:
+            return jsonify(error="Nieprawidłowy status"), 400
+        
+        req = requests_service.get_unavailability(request_id)
+        if not req:
+            return jsonify(error="Nie znaleziono zgłoszenia"), 404
+        
+        if requests_service.parse_month(req['month_year']) is None:
+            return jsonify(error="Nieprawidłowy miesiąc zgłoszenia"), 400
+        
+        changed = requests_service.decide_unavailability(
+            req, status, session.get('user_email', 'admin'), session.get('user_id'))
+        if changed is None:
+            return jsonify(error="Zgłoszenie zostało już rozpatrzone"), 409
+        
+        notify_employees([req['employee_name']], 'unavailability',
+                         f"Niedyspozycja {req['month_year']} {DECISION_TEXT[status]}")
+        
+        logger.info(f"Admin {session.get('user_email')} {status} zgłoszenie niedyspozycji {request_id} "
+                    f"(zmienione dni: {changed})")
+        return jsonify(status="ok", message=f"Zgłoszenie zostało {status}", changed_days=changed)
+        
+    except Exception as e:
+        logger.error(f"Błąd podczas odpowiadania na zgłoszenie niedyspozycji: {e}")
+        return jsonify(error="Wystąpił błąd podczas przetwarzania zgłoszenia"), 500
+
 @bp.post("/swaps/respond")
 def api_swaps_respond():
     # Sprawdź czy użytkownik jest zalogowany
@@ -602,6 +590,10 @@ def api_swaps_respond():
         if status not in ['APPROVED', 'REJECTED']:
             return jsonify(error="Nieprawidłowy status"), 400
         
+        version = data.get('version')
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+            return jsonify(error="Nieprawidłowa wersja prośby"), 400
+        
         db = get_db()
         
         # Pobierz prośbę
@@ -610,21 +602,31 @@ def api_swaps_respond():
             return jsonify(error="Nie znaleziono prośby"), 404
         
         # Sprawdź czy użytkownik ma prawo do odpowiedzi
-        user_id = session.get('user_id')
-        emp_row = db.execute("SELECT name FROM employees WHERE user_id = ?", (user_id,)).fetchone()
-        employee_name = emp_row['name'] if emp_row else session.get('user_name', '')
+        # (tabela employees nie ma user_id - pracownik to użytkownik o tym samym imieniu i nazwisku)
+        user_name = session.get('user_name', '')
+        employee_name = user_name
         
         if req['to_employee'] != employee_name:
             return jsonify(error="Nie masz uprawnień do odpowiedzi na tę prośbę"), 403
         
-        # Zaktualizuj status
-        db.execute("""
-            UPDATE swap_requests 
-            SET recipient_status = ? 
-            WHERE id = ?
-        """, (status, request_id))
+        # Zaktualizuj status - mały zapis, group commit. Tylko przed decyzją kierownika
+        # i na wersji, którą widział adresat (jak decide_swap)
+        expected = req['version'] if version is None else version
         
-        db.commit()
+        def write(db):
+            return db.execute("""
+                UPDATE swap_requests 
+                SET recipient_status = ?, version = version + 1
+                WHERE id = ? AND version = ? AND boss_status = 'PENDING'
+            """, (status, request_id, expected)).rowcount
+        
+        if not run_write(write):
+            return jsonify(error="Prośba została w międzyczasie zmieniona - odśwież skrzynkę"), 409
+        
+        notify_users([req['requester_user_id']], 'swap',
+                     f"Prośba o zamianę {req['from_date']} ↔ {req['to_date']} {DECISION_TEXT[status]} przez {user_name}")
+        if status == 'APPROVED':
+            notify_admins('swap', f"Zamiana {req['from_date']} ↔ {req['to_date']} czeka na zatwierdzenie")
         
         logger.info(f"Użytkownik {user_name} {status} prośbę o zamianę {request_id}")
         return jsonify(status="ok", message=f"Prośba została {status}")
@@ -648,85 +650,27 @@ def api_swaps_boss():
         if status not in ['APPROVED', 'REJECTED']:
             return jsonify(error="Nieprawidłowy status"), 400
         
-        db = get_db()
+        version = data.get('version')
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+            return jsonify(error="Nieprawidłowa wersja prośby"), 400
         
         # Pobierz prośbę
-        req = db.execute("SELECT * FROM swap_requests WHERE id = ?", (request_id)).fetchone()
+        req = get_db().execute("SELECT * FROM swap_requests WHERE id = ?", (request_id,)).fetchone()
         if not req:
             return jsonify(error="Nie znaleziono prośby"), 404
         
-        # Zaktualizuj status bossa
-        db.execute("""
-            UPDATE swap_requests 
-            SET boss_status = ? 
-            WHERE id = ?
-        """, (status, request_id))
+        # Decyzja, zamiana wpisów grafiku i archiwizacja - jedna transakcja BEGIN IMMEDIATE
+        moved = swaps_service.decide_swap(dict(req), status, session.get('user_email', 'admin'),
+                                          session.get('user_id'), version)
+        if moved is None:
+            return jsonify(error="Prośba została w międzyczasie zmieniona - odśwież skrzynkę"), 409
         
-        # Jeśli boss zatwierdził, wykonaj zamianę
-        if status == 'APPROVED':
-            # Pobierz dane o zmianach
-            from_date = req['from_date']
-            to_date = req['to_date']
-            from_employee = req['from_employee']
-            to_employee = req['to_employee']
-            
-            # Znajdź ID pracowników
-            from_emp = db.execute("SELECT id FROM employees WHERE name = ?", (from_employee,)).fetchone()
-            to_emp = db.execute("SELECT id FROM employees WHERE name = ?", (to_employee,)).fetchone()
-            
-            if from_emp and to_emp:
-                from_emp_id = from_emp['id']
-                to_emp_id = to_emp['id']
-                
-                # Pobierz istniejące zmiany
-                from_shift = db.execute("""
-                    SELECT shift_type FROM shifts 
-                    WHERE date = ? AND employee_id = ?
-                """, (from_date, from_emp_id)).fetchone()
-                
-                to_shift = db.execute("""
-                    SELECT shift_type FROM shifts 
-                    WHERE date = ? AND employee_id = ?
-                """, (to_date, to_emp_id)).fetchone()
-                
-                from_shift_type = from_shift['shift_type'] if from_shift else ''
-                to_shift_type = to_shift['shift_type'] if to_shift else ''
-                
-                # Usuń stare zmiany
-                db.execute("DELETE FROM shifts WHERE date = ? AND employee_id = ?", (from_date, from_emp_id))
-                db.execute("DELETE FROM shifts WHERE date = ? AND employee_id = ?", (to_date, to_emp_id))
-                
-                # Dodaj nowe zmiany (zamienione)
-                if to_shift_type:
-                    db.execute("INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, ?)", 
-                              (from_date, to_shift_type, from_emp_id))
-                
-                if from_shift_type:
-                    db.execute("INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, ?)", 
-                              (to_date, from_shift_type, to_emp_id))
-                
-                # Zapisz historię zmian
-                admin_email = session.get('user_email', 'admin')
-                db.execute("""
-                    INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (from_date, from_employee, from_shift_type, to_shift_type, admin_email))
-                
-                db.execute("""
-                    INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (to_date, to_employee, to_shift_type, from_shift_type, admin_email))
+        message = f"Zamiana {req['from_date']} ↔ {req['to_date']} {DECISION_TEXT[status]} przez kierownika"
+        notify_users([req['requester_user_id']], 'swap', message)
+        notify_employees([req['from_employee'], req['to_employee']], 'swap', message)
         
-        db.commit()
-        
-        # Automatycznie archiwizuj zakończone prośby
-        try:
-            from ..database import archive_completed_requests
-            archive_completed_requests()
-        except Exception as e:
-            logger.warning(f"Błąd podczas automatycznej archiwizacji: {e}")
-        
-        logger.info(f"Admin {session.get('user_email')} {status} prośbę o zamianę {request_id}")
+        logger.info(f"Admin {session.get('user_email')} {status} prośbę o zamianę {request_id} "
+                    f"(przeniesione wpisy: {moved})")
         return jsonify(status="ok", message=f"Prośba została {status}")
         
     except Exception as e:
@@ -791,43 +735,8 @@ def api_request_history():
 def api_whitelist_get():
     """Pobiera listę whitelist z przypisanymi kontami (admin)"""
     try:
-        import os
-        
-        # Pobierz whitelist z zmiennej środowiskowej
-        whitelist_emails = os.environ.get('WHITELIST_EMAILS', '').split(',')
-        whitelist_emails = [email.strip().lower() for email in whitelist_emails if email.strip()]
-        
-        db = get_db()
-        
-        # Pobierz informacje o użytkownikach z whitelist
-        whitelist_data = []
-        for email in whitelist_emails:
-            # Sprawdź czy użytkownik istnieje w bazie
-            user = db.execute("""
-                SELECT u.email, u.name as user_name, e.name as employee_name, e.id as employee_id
-                FROM users u
-                LEFT JOIN employees e ON u.id = e.user_id
-                WHERE u.email = ?
-            """, (email,)).fetchone()
-            
-            if user:
-                whitelist_data.append({
-                    'email': user['email'],
-                    'user_name': user['user_name'],
-                    'employee_name': user['employee_name'],
-                    'employee_id': user['employee_id'],
-                    'has_account': True
-                })
-            else:
-                whitelist_data.append({
-                    'email': email,
-                    'user_name': None,
-                    'employee_name': None,
-                    'employee_id': None,
-                    'has_account': False
-                })
-        
-        return jsonify(emails=whitelist_data)
+        # Konta i pracownicy dla wszystkich emaili jednym zapytaniem (JOIN)
+        return jsonify(emails=whitelist.entries())
         
     except Exception as e:
         logger.error(f"Błąd podczas pobierania whitelist: {e}")
@@ -839,8 +748,6 @@ def api_whitelist_get():
 def api_whitelist_add():
     """Dodaje email do whitelist (admin)"""
     try:
-        import os
-        
         data = safe_get_json()
         email = data.get('email', '').strip().lower()
         
@@ -850,19 +757,10 @@ def api_whitelist_add():
         if not email.count('@') == 1:
             return jsonify(error="Nieprawidłowy format email"), 400
         
-        # Pobierz aktualną whitelist
-        current_whitelist = os.environ.get('WHITELIST_EMAILS', '').split(',')
-        current_whitelist = [e.strip().lower() for e in current_whitelist if e.strip()]
-        
-        # Sprawdź czy email już jest na whitelist
-        if email in current_whitelist:
+        # Zapis w bazie - trwały i widoczny dla wszystkich procesów
+        if not whitelist.add(email, added_by=session.get('user_id')):
             return jsonify(error="Email już jest na whitelist"), 400
         
-        # Dodaj email do whitelist
-        current_whitelist.append(email)
-        new_whitelist = ','.join(current_whitelist)
-        os.environ['WHITELIST_EMAILS'] = new_whitelist
-        
         logger.info(f"Admin {session.get('user_email')} dodał email {email} do whitelist")
         return jsonify(status="ok", message="Email został dodany do whitelist")
         
@@ -876,27 +774,15 @@ def api_whitelist_add():
 def api_whitelist_remove():
     """Usuwa email z whitelist (admin)"""
     try:
-        import os
-        
         data = safe_get_json()
         email = data.get('email', '').strip().lower()
         
         if not email:
             return jsonify(error="Email jest wymagany"), 400
         
-        # Pobierz aktualną whitelist
-        current_whitelist = os.environ.get('WHITELIST_EMAILS', '').split(',')
-        current_whitelist = [e.strip().lower() for e in current_whitelist if e.strip()]
-        
-        # Sprawdź czy email jest na whitelist
-        if email not in current_whitelist:
+        if not whitelist.remove(email):
             return jsonify(error="Email nie jest na whitelist"), 404
         
-        # Usuń email z whitelist
-        current_whitelist.remove(email)
-        new_whitelist = ','.join(current_whitelist)
-        os.environ['WHITELIST_EMAILS'] = new_whitelist
-        
         logger.info(f"Admin {session.get('user_email')} usunął email {email} z whitelist")
         return jsonify(status="ok", message="Email został usunięty z whitelist")
         
@@ -985,34 +871,7 @@ def api_shifts_for_date(date):
 def api_employees_list():
     """Pobiera listę pracowników (admin) z cache"""
     try:
-        # Check cache first
-        cache_key = "employees:list"
-        cached_result = cache.get(cache_key)
-        if cached_result is not None:
-            return jsonify(cached_result)
-        
-        from ..database import ensure_employees_code_column, ensure_employees_email_column
-        ensure_employees_code_column()  # Upewnij się, że kolumna code istnieje
-        ensure_employees_email_column()  # Upewnij się, że kolumna email istnieje
-        
-        db = get_db()
-        employees = db.execute("SELECT id, name, code, email FROM employees ORDER BY name").fetchall()
-        
-        employees_list = []
-        for emp in employees:
-            employees_list.append({
-                'id': emp['id'],
-                'name': emp['name'],
-                'code': emp['code'] or '',  # Zwróć pusty string jeśli code jest None
-                'email': emp['email'] or ''  # Zwróć pusty string jeśli email jest None
-            })
-        
-        result = {"employees": employees_list}
-        
-        # Cache result for 10 minutes
-        cache.set(cache_key, result, 600)
-        
-        return jsonify(result)
+        return jsonify(employees_service.list_employees())
         
     except Exception as e:
         logger.error(f"Błąd podczas pobierania pracowników: {e}")
@@ -1059,19 +918,12 @@ def api_employees_create():
         db.commit()
         
         # Invalidate employees cache
-        cache.delete("employees:list")
+        employees_service.invalidate_employees()
         
         # Jeśli podano email, dodaj go automatycznie do whitelisty
         if email:
             try:
-                import os
-                current_whitelist = os.environ.get('GOOGLE_WHITELIST', '').split(',')
-                current_whitelist = [e.strip() for e in current_whitelist if e.strip()]
-                
-                if email not in current_whitelist:
-                    current_whitelist.append(email)
-                    new_whitelist = ','.join(current_whitelist)
-                    os.environ['WHITELIST_EMAILS'] = new_whitelist
+                if whitelist.add(email, added_by=session.get('user_id')):
                     logger.info(f"Email {email} został automatycznie dodany do whitelisty")
             except Exception as e:
                 logger.warning(f"Nie udało się dodać emaila do whitelisty: {e}")
@@ -1133,28 +985,18 @@ def api_employees_update(emp_id):
         db.commit()
         
         # Invalidate employees cache
-        cache.delete("employees:list")
+        employees_service.invalidate_employees()
         
         # Synchronizuj whitelistę
         try:
-            import os
-            current_whitelist = os.environ.get('WHITELIST_EMAILS', '').split(',')
-            current_whitelist = [e.strip() for e in current_whitelist if e.strip()]
-            
-            # Usuń stary email z whitelisty (jeśli istniał)
-            if old_email and old_email in current_whitelist:
-                current_whitelist.remove(old_email)
+            # Usuń stary email z whitelisty (jeśli się zmienił)
+            if old_email and old_email.lower() != email.lower() and whitelist.remove(old_email):
                 logger.info(f"Stary email {old_email} został usunięty z whitelisty")
             
             # Dodaj nowy email do whitelisty (jeśli podano)
-            if email and email not in current_whitelist:
-                current_whitelist.append(email)
+            if email and whitelist.add(email, added_by=session.get('user_id')):
                 logger.info(f"Nowy email {email} został dodany do whitelisty")
             
-            # Zaktualizuj zmienną środowiskową
-            new_whitelist = ','.join(current_whitelist)
-            os.environ['GOOGLE_WHITELIST'] = new_whitelist
-            
         except Exception as e:
             logger.warning(f"Nie udało się zsynchronizować whitelisty: {e}")
         
@@ -1187,19 +1029,12 @@ def api_employees_delete(emp_id):
         db.commit()
         
         # Invalidate employees cache
-        cache.delete("employees:list")
+        employees_service.invalidate_employees()
         
         # Usuń email z whitelisty (jeśli istniał)
         if emp_email:
             try:
-                import os
-                current_whitelist = os.environ.get('GOOGLE_WHITELIST', '').split(',')
-                current_whitelist = [e.strip() for e in current_whitelist if e.strip()]
-                
-                if emp_email in current_whitelist:
-                    current_whitelist.remove(emp_email)
-                    new_whitelist = ','.join(current_whitelist)
-                    os.environ['WHITELIST_EMAILS'] = new_whitelist
+                if whitelist.remove(emp_email):
                     logger.info(f"Email {emp_email} został usunięty z whitelisty")
             except Exception as e:
                 logger.warning(f"Nie udało się usunąć emaila z whitelisty: {e}")
@@ -1258,37 +1093,10 @@ def get_vapid_key():
 def api_schedule_changes():
     """Pobiera ostatnie zmiany w grafiku dla powiadomień"""
     try:
-        db = get_db()
-        user_id = session.get("user_id")
-        
-        # Pobierz nazwę aktualnego użytkownika
-        user_row = db.execute("SELECT name FROM users WHERE id=?", (user_id,)).fetchone()
-        current_user_name = user_row["name"] if user_row else "Nieznany użytkownik"
-        
-        # Pobierz ostatnie zmiany z ostatnich 24 godzin
-        changes = db.execute("""
-            SELECT id, date, employee_name, old_shift, new_shift, changed_by, changed_at
-            FROM schedule_changes 
-            WHERE changed_at > datetime('now', '-1 day')
-            ORDER BY changed_at DESC
-            LIMIT 50
-        """).fetchall()
-        
-        # Konwertuj na listę słowników
-        changes_list = []
-        for change in changes:
-            changes_list.append({
-                'id': change['id'],
-                'date': change['date'],
-                'employee_name': change['employee_name'],
-                'old_shift': change['old_shift'],
-                'new_shift': change['new_shift'],
-                'changed_by': change['changed_by'],
-                'changed_at': change['changed_at']
-            })
+        current_user_name = schedule_service.user_name(session.get("user_id")) or "Nieznany użytkownik"
         
         return jsonify({
-            'changes': changes_list,
+            'changes': schedule_service.recent_changes(hours=24, limit=50),
             'current_user_name': current_user_name
         })
         
@@ -1296,6 +1104,103 @@ def api_schedule_changes():
         logger.error(f"Błąd podczas pobierania zmian w grafiku: {e}")
         return jsonify(error="Wystąpił błąd podczas pobierania zmian"), 500
 
+# ============================================================================
+# DANE GRAFIKU DLA TRYBU OFFLINE (PWA)
+# ============================================================================
+
+# Powyżej tylu zmienionych komórek klient pobiera całe miesiące od nowa
+SCHEDULE_DELTA_LIMIT = 2000
+
+@bp.get("/schedule/month")
+@login_required
+@monitor_performance
+def api_schedule_month():
+    """Pełne dane miesiąca z kursorem - zapisywane przez klienta w IndexedDB"""
+    try:
+        import datetime as dt
+        from .main import get_shifts_for_month, get_schedule_cursor
+        
+        today = dt.date.today()
+        try:
+            year = int(request.args.get('year', today.year))
+            month = int(request.args.get('month', today.month))
+        except ValueError:
+            return jsonify(error="Nieprawidłowy rok lub miesiąc"), 400
+        
+        if not 1 <= month <= 12 or not 2000 <= year <= 2100:
+            return jsonify(error="Nieprawidłowy rok lub miesiąc"), 400
+        
+        db = get_db()
+        # Kursor przed danymi - późniejsza zmiana wróci w delcie i zostanie nadpisana
+        cursor = get_schedule_cursor(db)
+        shifts_by_date = get_shifts_for_month(db, year, month)
+        
+        return jsonify({
+            'year': year,
+            'month': month,
+            'cursor': cursor,
+            'shifts': shifts_by_date
+        })
+        
+    except Exception as e:
+        logger.error(f"Błąd podczas pobierania danych miesiąca: {e}")
+        return jsonify(error="Wystąpił błąd podczas pobierania danych"), 500
+
+@bp.get("/schedule/delta")
+@login_required
+@monitor_performance
+def api_schedule_delta():
+    """Aktualne wartości komórek zmienionych po danym kursorze (id w schedule_changes)
+
+    Parametry: since - kursor klienta, from/to - opcjonalny zakres dat (YYYY-MM-DD)
+    przechowywanych przez klienta. Zwraca aktualny stan komórek, a nie historię,
+    więc ponowne zastosowanie tej samej delty jest bezpieczne.
+    """
+    try:
+        from .main import get_schedule_cursor
+        
+        try:
+            since = int(request.args.get('since', 0))
+        except ValueError:
+            return jsonify(error="Nieprawidłowy kursor"), 400
+        
+        date_from = request.args.get('from', '0000-00-00')
+        date_to = request.args.get('to', '9999-99-99')
+        
+        db = get_db()
+        cursor = get_schedule_cursor(db)
+        
+        # Kursor z przyszłości oznacza odtworzoną bazę - klient musi pobrać wszystko
+        if since > cursor:
+            return jsonify(cursor=cursor, reset=True, changes=[])
+        
+        cells = db.execute("""
+            SELECT c.date, c.employee_name, s.shift_type
+            FROM (
+                SELECT DISTINCT date, employee_name
+                FROM schedule_changes
+                WHERE id > ? AND id <= ? AND date >= ? AND date <= ?
+                LIMIT ?
+            ) c
+            LEFT JOIN employees e ON e.name = c.employee_name
+            LEFT JOIN shifts s ON s.employee_id = e.id AND s.date = c.date
+        """, (since, cursor, date_from, date_to, SCHEDULE_DELTA_LIMIT + 1)).fetchall()
+        
+        if len(cells) > SCHEDULE_DELTA_LIMIT:
+            return jsonify(cursor=cursor, reset=True, changes=[])
+        
+        changes = [{
+            'date': cell['date'],
+            'employee': cell['employee_name'],
+            'shift_type': cell['shift_type'] or ''
+        } for cell in cells]
+        
+        return jsonify(cursor=cursor, reset=False, changes=changes)
+        
+    except Exception as e:
+        logger.error(f"Błąd podczas pobierania delty grafiku: {e}")
+        return jsonify(error="Wystąpił błąd podczas pobierania zmian"), 500
+
 @bp.post("/push/subscribe")
 @login_required
 def subscribe_push():
@@ -1322,6 +1227,13 @@ def subscribe_push():
         if 'keys' not in subscription or not subscription['keys']:
             return jsonify(error="Brak kluczy w subskrypcji"), 400
         
+        # Tylko https do znanych usług push - adres podaje klient, serwer wysyła na niego żądania
+        from ..push import get_push_sender
+        endpoint_error = get_push_sender().endpoint_error(subscription['endpoint'])
+        if endpoint_error:
+            logger.warning(f"Odrzucona subskrypcja push użytkownika {user_id}: {endpoint_error}")
+            return jsonify(error="Nieobsługiwany adres usługi push"), 400
+        
         # Import funkcji zapisywania subskrypcji
         from ..database import save_push_subscription
         if save_push_subscription(user_id, subscription):
@@ -1352,55 +1264,55 @@ def api_draft_save():
         if not changes:
             return jsonify(error="Brak zmian do zapisania"), 400
         
-        db = get_db()
         user_id = session.get('user_id')
         user_email = session.get('user_email', 'nieznany')
         
-        # Wyczyść wszystkie istniejące drafty dla tego użytkownika
-        db.execute("DELETE FROM draft_shifts WHERE created_by = ?", (user_id,))
+        def write(db):
+            # Wyczyść wszystkie istniejące drafty dla tego użytkownika
+            db.execute("DELETE FROM draft_shifts WHERE created_by = ?", (user_id,))
         
-        # Zapisz nowe zmiany w trybie draft
-        for change in changes:
-            date = change.get('date')
-            employee = change.get('employee') or change.get('name')
-            shift_type_raw = change.get('shift_type') or change.get('value', '')
+            # Zapisz nowe zmiany w trybie draft
+            for change in changes:
+                date = change.get('date')
+                employee = change.get('employee') or change.get('name')
+                shift_type_raw = change.get('shift_type') or change.get('value', '')
             
-            # Mapowanie typów zmian (jak w normalnym save)
-            shift_type_mapping = {
-                'D': 'DNIOWKA',
-                'DNIOWKA': 'DNIOWKA',
-                'N': 'NOCKA', 
-                'NOCKA': 'NOCKA',
-                'P': 'POPOLUDNIOWKA'
-            }
+                # Mapowanie typów zmian (jak w normalnym save)
+                shift_type_mapping = {
+                    'D': 'DNIOWKA',
+                    'DNIOWKA': 'DNIOWKA',
+                    'N': 'NOCKA', 
+                    'NOCKA': 'NOCKA',
+                    'P': 'POPOLUDNIOWKA'
+                }
             
-            if shift_type_raw in shift_type_mapping:
-                shift_type = shift_type_mapping[shift_type_raw]
-            elif shift_type_raw and shift_type_raw.startswith('P '):
-                shift_type = shift_type_raw
-            else:
-                shift_type = shift_type_raw
+                if shift_type_raw in shift_type_mapping:
+                    shift_type = shift_type_mapping[shift_type_raw]
+                elif shift_type_raw and shift_type_raw.startswith('P '):
+                    shift_type = shift_type_raw
+                else:
+                    shift_type = shift_type_raw
             
-            if not date or not employee:
-                continue
+                if not date or not employee:
+                    continue
             
-            # Znajdź ID pracownika
-            emp_row = db.execute("SELECT id FROM employees WHERE name = ?", (employee,)).fetchone()
-            if not emp_row:
-                logger.warning(f"Nie znaleziono pracownika: {employee}")
-                continue
+                # Znajdź ID pracownika
+                emp_row = db.execute("SELECT id FROM employees WHERE name = ?", (employee,)).fetchone()
+                if not emp_row:
+                    logger.warning(f"Nie znaleziono pracownika: {employee}")
+                    continue
             
-            emp_id = emp_row['id']
+                emp_id = emp_row['id']
             
-            # Zapisz zmianę (może być pusta jeśli usuwamy zmianę)
-            # Pusta wartość oznacza że użytkownik usunął zmianę z oficjalnego grafiku
-            db.execute("""
-                INSERT INTO draft_shifts (date, shift_type, employee_id, created_by)
-                VALUES (?, ?, ?, ?)
-            """, (date, shift_type or '', emp_id, user_id))
-            logger.info(f"DRAFT ZAPISANO: {date} - {employee} - {shift_type or 'PUSTE'}")
+                # Zapisz zmianę (może być pusta jeśli usuwamy zmianę)
+                # Pusta wartość oznacza że użytkownik usunął zmianę z oficjalnego grafiku
+                db.execute("""
+                    INSERT INTO draft_shifts (date, shift_type, employee_id, created_by)
+                    VALUES (?, ?, ?, ?)
+                """, (date, shift_type or '', emp_id, user_id))
+                logger.info(f"DRAFT ZAPISANO: {date} - {employee} - {shift_type or 'PUSTE'}")
         
-        db.commit()
+        run_write(write)
         
         logger.info(f"Zapisano {len(changes)} zmian w trybie draft przez {user_email}")
         return jsonify(status="ok", message="Zmiany robocze zapisane pomyślnie")
@@ -1461,69 +1373,80 @@ def api_draft_publish():
         ensure_draft_shifts_table()
         ensure_schedule_changes_table()
         
-        db = get_db()
         user_id = session.get('user_id')
         user_email = session.get('user_email', 'nieznany')
-        
-        # Pobierz wszystkie drafty dla tego użytkownika
-        draft_shifts = db.execute("""
-            SELECT ds.date, ds.shift_type, e.name as employee_name, e.id as employee_id
-            FROM draft_shifts ds
-            JOIN employees e ON ds.employee_id = e.id
-            WHERE ds.created_by = ?
-        """, (user_id,)).fetchall()
-        
-        if not draft_shifts:
-            return jsonify(error="Brak zmian do publikacji"), 400
-        
-        # Znajdź wszystkie unikalne daty w draft
-        draft_dates = list(set([shift['date'] for shift in draft_shifts]))
-        logger.info(f"📅 Daty do zastąpienia w oficjalnym grafiku: {draft_dates}")
-        
-        # KROK 1: Wyczyść wszystkie zmiany w oficjalnym grafiku dla dat z draft
-        for date in draft_dates:
-            # Pobierz wszystkie istniejące zmiany dla tej daty (dla historii)
-            existing_shifts = db.execute("""
-                SELECT s.shift_type, e.name as employee_name
-                FROM shifts s
-                JOIN employees e ON s.employee_id = e.id
-                WHERE s.date = ?
-            """, (date,)).fetchall()
+        affected = set()  # pracownicy z usuniętymi lub dodanymi zmianami
+        
+        def write(db):
+            # Pobierz wszystkie drafty dla tego użytkownika
+            draft_shifts = db.execute("""
+                SELECT ds.date, ds.shift_type, e.name as employee_name, e.id as employee_id
+                FROM draft_shifts ds
+                JOIN employees e ON ds.employee_id = e.id
+                WHERE ds.created_by = ?
+            """, (user_id,)).fetchall()
+        
+            if not draft_shifts:
+                return None
+        
+            # Znajdź wszystkie unikalne daty w draft
+            draft_dates = list(set([shift['date'] for shift in draft_shifts]))
+            logger.info(f"📅 Daty do zastąpienia w oficjalnym grafiku: {draft_dates}")
+        
+            # KROK 1: Wyczyść wszystkie zmiany w oficjalnym grafiku dla dat z draft
+            for date in draft_dates:
+                # Pobierz wszystkie istniejące zmiany dla tej daty (dla historii)
+                existing_shifts = db.execute("""
+                    SELECT s.shift_type, e.name as employee_name
+                    FROM shifts s
+                    JOIN employees e ON s.employee_id = e.id
+                    WHERE s.date = ?
+                """, (date,)).fetchall()
             
-            # Usuń wszystkie zmiany dla tej daty
-            deleted_count = db.execute("DELETE FROM shifts WHERE date = ?", (date,)).rowcount
-            logger.info(f"🗑️ Usunięto {deleted_count} zmian z oficjalnego grafiku dla daty {date}")
+                # Usuń wszystkie zmiany dla tej daty
+                deleted_count = db.execute("DELETE FROM shifts WHERE date = ?", (date,)).rowcount
+                logger.info(f"🗑️ Usunięto {deleted_count} zmian z oficjalnego grafiku dla daty {date}")
             
-            # Zapisz usunięcia do historii zmian
-            for old_shift in existing_shifts:
-                db.execute("""
-                    INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (date, old_shift['employee_name'], old_shift['shift_type'], '', user_email))
-        
-        # KROK 2: Dodaj wszystkie zmiany z draft do oficjalnego grafiku
-        for shift in draft_shifts:
-            date = shift['date']
-            employee_name = shift['employee_name']
-            shift_type = shift['shift_type']
-            employee_id = shift['employee_id']
+                # Zapisz usunięcia do historii zmian
+                for old_shift in existing_shifts:
+                    db.execute("""
+                        INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (date, old_shift['employee_name'], old_shift['shift_type'], '', user_email))
+                    affected.add(old_shift['employee_name'])
+        
+            # KROK 2: Dodaj wszystkie zmiany z draft do oficjalnego grafiku
+            for shift in draft_shifts:
+                date = shift['date']
+                employee_name = shift['employee_name']
+                shift_type = shift['shift_type']
+                employee_id = shift['employee_id']
             
-            # Dodaj zmianę tylko jeśli nie jest pusta
-            if shift_type and shift_type.strip() and shift_type != '-':
-                db.execute("INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, ?)", 
-                          (date, shift_type, employee_id))
+                # Dodaj zmianę tylko jeśli nie jest pusta
+                if shift_type and shift_type.strip() and shift_type != '-':
+                    db.execute("INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, ?)", 
+                              (date, shift_type, employee_id))
                 
-                # Zapisz dodanie do historii zmian
-                db.execute("""
-                    INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (date, employee_name, '', shift_type, user_email))
-                logger.info(f"✅ Dodano zmianę: {date} - {employee_name} - {shift_type}")
+                    # Zapisz dodanie do historii zmian
+                    db.execute("""
+                        INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (date, employee_name, '', shift_type, user_email))
+                    affected.add(employee_name)
+                    logger.info(f"✅ Dodano zmianę: {date} - {employee_name} - {shift_type}")
         
-        # Usuń drafty po publikacji
-        db.execute("DELETE FROM draft_shifts WHERE created_by = ?", (user_id,))
+            # Usuń drafty po publikacji
+            db.execute("DELETE FROM draft_shifts WHERE created_by = ?", (user_id,))
         
-        db.commit()
+            return draft_shifts, draft_dates
+        
+        published = run_write(write)
+        if published is None:
+            return jsonify(error="Brak zmian do publikacji"), 400
+        draft_shifts, draft_dates = published
+        
+        # Jedno powiadomienie na pracownika, niezależnie od liczby zmian
+        notify_employees(affected, 'schedule', "Opublikowano nowy grafik")
         
         logger.info(f"🚀 Opublikowano {len(draft_shifts)} zmian z draft przez {user_email}")
         logger.info(f"📊 Zastąpiono oficjalny grafik dla {len(draft_dates)} dat: {draft_dates}")
@@ -1542,16 +1465,14 @@ def api_draft_discard():
         from ..database import ensure_draft_shifts_table
         ensure_draft_shifts_table()
         
-        db = get_db()
         user_id = session.get('user_id')
         user_email = session.get('user_email', 'nieznany')
         
-        # Pobierz liczbę draftów przed usunięciem
-        count = db.execute("SELECT COUNT(*) as count FROM draft_shifts WHERE created_by = ?", (user_id,)).fetchone()['count']
+        def write(db):
+            # Usuń wszystkie drafty dla tego użytkownika (rowcount = liczba usuniętych)
+            return db.execute("DELETE FROM draft_shifts WHERE created_by = ?", (user_id,)).rowcount
         
-        # Usuń wszystkie drafty dla tego użytkownika
-        db.execute("DELETE FROM draft_shifts WHERE created_by = ?", (user_id,))
-        db.commit()
+        count = run_write(write)
         
         logger.info(f"Usunięto {count} zmian draft przez {user_email}")
         return jsonify(status="ok", message=f"Usunięto {count} zmian roboczych")
@@ -1599,6 +1520,7 @@ def api_draft_status():
 @bp.get("/export/excel")
 @login_required
 @admin_required
+@no_compress  # xlsx to już archiwum ZIP
 def api_export_excel():
     """Eksportuje grafik do pliku Excel - dokładnie jak na stronie"""
     try:
@@ -3,16 +3,15 @@ Trasy uwierzytelniania - logowanie, wylogowanie, callback OAuth
 Zachowuje pełną kompatybilność z Google OAuth2
 """
 
-import os
 import logging
 import traceback
 import re
 from flask import Blueprint, render_template, redirect, url_for, session, request, flash
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from ..auth import init_oauth
-from ..database import get_db
-from ..password_utils import hash_password, verify_password, validate_password_strength
+from ..rate_limit import limiter
+from ..database import get_db, run_write
+from ..password_utils import get_password_hasher, PasswordHasherBusy, validate_password_strength
+from ..whitelist import whitelist
 
 logger = logging.getLogger(__name__)
 
@@ -21,26 +20,10 @@ bp = Blueprint('auth', __name__)
 # Inicjalizuj OAuth
 google = None
 
-# Rate limiter - będzie zainicjalizowany w init_auth_routes
-limiter = None
-
 def init_auth_routes(app):
     """Inicjalizuj trasy uwierzytelniania"""
-    global google, limiter
+    global google
     google = init_oauth(app)
-    
-    # Inicjalizuj rate limiter
-    from flask_limiter import Limiter
-    from flask_limiter.util import get_remote_address
-    limiter = Limiter(
-        key_func=get_remote_address,
-        default_limits=["2000 per day", "500 per hour"]
-    )
-    limiter.init_app(app)
-    
-    # Dodaj rate limiting do tras
-    limiter.limit("5 per minute")(register)
-    limiter.limit("10 per minute")(login_email)
 
 @bp.get("/signin")
 def signin():
@@ -138,13 +121,8 @@ def auth_callback():
             logger.error(f"Pełne dane użytkownika: {user_info}")
             return render_template("signin.html", error=f"Niepełne dane użytkownika: email='{email}', name='{name}', sub='{google_sub}'")
         
-        # Sprawdź whitelistę emaili
-        whitelist = os.environ.get('WHITELIST_EMAILS', '').split(',')
-        whitelist = [email.strip().lower() for email in whitelist if email.strip()]
-        
-        logger.info(f"Whitelist: {whitelist}, User email: {email}")
-        
-        if whitelist and email not in whitelist:
+        # Sprawdź whitelistę emaili (tabela whitelist_emails, kopia w procesie)
+        if not whitelist.is_allowed(email):
             logger.warning(f"Użytkownik {email} nie jest na liście dozwolonych")
             return render_template("signin.html", error="Twój email nie jest autoryzowany do korzystania z tej aplikacji")
         
@@ -201,6 +179,7 @@ def auth_callback():
         return render_template("signin.html", error=f"Wystąpił błąd podczas logowania: {str(e)}")
 
 @bp.post("/register")
+@limiter.limit("5 per minute")
 def register():
     """Rejestracja nowego użytkownika przez email i hasło"""
     try:
@@ -244,11 +223,8 @@ def register():
             flash(error_msg, "error")
             return render_template("signin.html", error=error_msg)
         
-        # Sprawdź whitelistę emaili
-        whitelist = os.environ.get('WHITELIST_EMAILS', '').split(',')
-        whitelist = [email.strip().lower() for email in whitelist if email.strip()]
-        
-        if whitelist and email not in whitelist:
+        # Sprawdź whitelistę emaili (tabela whitelist_emails, kopia w procesie)
+        if not whitelist.is_allowed(email):
             logger.warning(f"Próba rejestracji użytkownika {email} nie na liście dozwolonych")
             flash("Twój email nie jest autoryzowany do korzystania z tej aplikacji", "error")
             return render_template("signin.html", error="Twój email nie jest autoryzowany do korzystania z tej aplikacji")
@@ -264,7 +240,7 @@ def register():
                 return render_template("signin.html", error="Użytkownik z tym adresem email już istnieje")
             else:
                 # Użytkownik ma konto Google - połącz konta
-                password_hash = hash_password(password)
+                password_hash = get_password_hasher().hash(password)
                 db.execute("""
                     UPDATE users 
                     SET password_hash = ?, login_type = 'BOTH', name = ?
@@ -274,7 +250,7 @@ def register():
                 logger.info(f"Połączono konto Google z rejestracją email dla {email}")
         else:
             # Utwórz nowego użytkownika
-            password_hash = hash_password(password)
+            password_hash = get_password_hasher().hash(password)
             cursor = db.execute("""
                 INSERT INTO users (email, name, password_hash, login_type, role) 
                 VALUES (?, ?, ?, 'EMAIL', 'USER')
@@ -294,12 +270,17 @@ def register():
         logger.info(f"Użytkownik {email} zarejestrowany i zalogowany pomyślnie")
         return redirect(url_for('main.index'))
         
+    except PasswordHasherBusy as e:
+        logger.warning(f"Pula hashowania haseł zajęta podczas rejestracji: {e}")
+        error = "Zbyt wiele prób naraz, spróbuj ponownie za chwilę"
+        return render_template("signin.html", error=error), 429
     except Exception as e:
         logger.error(f"Błąd podczas rejestracji: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         return render_template("signin.html", error=f"Wystąpił błąd podczas rejestracji: {str(e)}")
 
 @bp.post("/login-email")
+@limiter.limit("10 per minute")
 def login_email():
     """Logowanie przez email i hasło"""
     try:
@@ -339,11 +320,20 @@ def login_email():
             flash("Nieprawidłowy email lub hasło", "error")
             return render_template("signin.html", error="Nieprawidłowy email lub hasło")
         
-        # Sprawdź hasło
-        if not verify_password(password, user['password_hash']):
+        # Sprawdź hasło (hash hasła w puli hashowania - nie blokuje pozostałych żądań)
+        is_valid, new_hash = get_password_hasher().check(password, user['password_hash'])
+        if not is_valid:
             flash("Nieprawidłowy email lub hasło", "error")
             return render_template("signin.html", error="Nieprawidłowy email lub hasło")
         
+        # Przestarzały format/koszt hashu - przepisz (tylko jeśli nikt go w międzyczasie nie zmienił)
+        if new_hash:
+            run_write(lambda db: db.execute(
+                "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                (new_hash, user['id'], user['password_hash'])
+            ))
+            logger.info(f"Zaktualizowano format hashu hasła dla {email}")
+        
         # Ustaw sesję użytkownika
         session['user_id'] = user['id']
         session['user_email'] = user['email']
@@ -354,6 +344,10 @@ def login_email():
         logger.info(f"Użytkownik {email} zalogowany przez email pomyślnie")
         return redirect(url_for('main.index'))
         
+    except PasswordHasherBusy as e:
+        logger.warning(f"Pula hashowania haseł zajęta podczas logowania: {e}")
+        error = "Zbyt wiele prób naraz, spróbuj ponownie za chwilę"
+        return render_template("signin.html", error=error), 429
     except Exception as e:
         logger.error(f"Błąd podczas logowania email: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
@@ -36,6 +36,8 @@ def index():
         # Pobierz dane z bazy danych
         db = get_db()
         employees = db.execute("SELECT id, name FROM employees ORDER BY name").fetchall()
+        # Kursor pobierany przed danymi - dane są zawsze co najmniej tak świeże jak kursor
+        schedule_cursor = get_schedule_cursor(db)
         shifts_today = get_today_shifts(db)
         shifts_tomorrow = get_tomorrow_shifts(db)
         
@@ -87,8 +89,9 @@ def index():
         # Znajdź pracownika odpowiadającego użytkownikowi
         current_emp_name = None
         if current_user_data:
-            user_id = current_user_data.get("id")
-            emp_row = db.execute("SELECT name FROM employees WHERE user_id = ?", (user_id,)).fetchone()
+            # Dopasowanie po imieniu i nazwisku - tabela employees nie ma kolumny user_id
+            emp_row = db.execute("SELECT name FROM employees WHERE name = ?",
+                                 (current_user_data.get("name"),)).fetchone()
             if emp_row:
                 current_emp_name = emp_row["name"]
         
@@ -109,7 +112,8 @@ def index():
             is_admin=is_admin,
             current_user=current_user,
             current_emp_name=current_emp_name,
-            today_date=today_date
+            today_date=today_date,
+            schedule_cursor=schedule_cursor
         ))
         
         logger.info(f"Główna strona załadowana dla użytkownika {current_user}")
@@ -255,6 +259,15 @@ def get_shifts_for_month(db, year, month):
     
     return shifts_by_date
 
+def get_schedule_cursor(db):
+    """Pobierz kursor grafiku - id ostatniego wpisu w schedule_changes
+
+    Klient PWA zapamiętuje kursor razem z danymi miesiąca i pobiera
+    później tylko zmiany o większym id (/api/schedule/delta).
+    """
+    row = db.execute("SELECT COALESCE(MAX(id), 0) AS cursor FROM schedule_changes").fetchone()
+    return row["cursor"]
+
 def get_calendar_days(year, month):
     """Pobierz dni kalendarza dla danego miesiąca - tylko dni danego miesiąca od 1 do ostatniego"""
     # Polskie nazwy dni
@@ -0,0 +1,6 @@
+"""
+Warstwa usług współdzielona przez blueprinty
+Zapytania i zapisy dla grafiku, zgłoszeń i pracowników są zaimplementowane
+(i instrumentowane przez monitor_performance) tylko tutaj - trasy w api.py
+i admin.py odpowiadają wyłącznie za HTTP: sesję, walidację i format odpowiedzi.
+"""
@@ -0,0 +1,67 @@
+"""
+Usługi pracowników
+Lista pracowników (z cache), pracownik zalogowanego użytkownika i konta
+użytkowników odpowiadające pracownikom. Pracownik to użytkownik o tym samym
+emailu, a gdy pracownik nie ma emaila - o tym samym imieniu i nazwisku
+(tabela employees nie ma kolumny user_id).
+"""
+
+import json
+import logging
+from typing import Dict, Iterable, List, Optional
+from ..cache import cache
+from ..database import get_db, ensure_employees_code_column, ensure_employees_email_column
+from ..performance import monitor_performance
+
+logger = logging.getLogger(__name__)
+
+EMPLOYEES_CACHE_KEY = "employees:list"
+
+@monitor_performance
+def list_employees() -> Dict[str, List[Dict]]:
+    """Wszyscy pracownicy posortowani po nazwisku - cache na 10 minut"""
+    cached_result = cache.get(EMPLOYEES_CACHE_KEY)
+    if cached_result is not None:
+        return cached_result
+    
+    ensure_employees_code_column()
+    ensure_employees_email_column()
+    rows = get_db().execute("SELECT id, name, code, email FROM employees ORDER BY name").fetchall()
+    result = {"employees": [{
+        'id': row['id'],
+        'name': row['name'],
+        'code': row['code'] or '',
+        'email': row['email'] or '',
+    } for row in rows]}
+    cache.set(EMPLOYEES_CACHE_KEY, result, 600)
+    return result
+
+def invalidate_employees() -> None:
+    cache.delete(EMPLOYEES_CACHE_KEY)
+
+@monitor_performance
+def find_employee(email: str, name: str = '') -> Optional[Dict]:
+    """Pracownik użytkownika - po emailu, a gdy go brak po imieniu i nazwisku (jedno zapytanie)"""
+    ensure_employees_email_column()
+    row = get_db().execute("""
+        SELECT id, name FROM employees
+        WHERE email = ? OR (email IS NULL AND name = ?)
+        ORDER BY email = ? DESC
+        LIMIT 1
+    """, (email or None, name or None, email or None)).fetchone()
+    return {'id': row['id'], 'name': row['name']} if row else None
+
+@monitor_performance
+def user_ids_for_employees(names: Iterable[str]) -> List[int]:
+    """Id kont użytkowników pracowników o podanych nazwach - jedno zapytanie na listę"""
+    names = list(set(name for name in names if name))
+    if not names:
+        return []
+    ensure_employees_email_column()
+    rows = get_db().execute("""
+        SELECT DISTINCT u.id
+        FROM employees e
+        JOIN users u ON u.email = e.email OR u.name = e.name
+        WHERE e.name IN (SELECT value FROM json_each(?))
+    """, (json.dumps(names),)).fetchall()
+    return [row['id'] for row in rows]
@@ -0,0 +1,180 @@
+"""
+Usługi zgłoszeń niedyspozycji
+Tworzenie, skrzynka i decyzja administratora. Decyzja to jedna transakcja
+w wątku zapisującym: zmiana statusu (tylko z PENDING), "-" w wybranych
+dniach zapisane zbiorczo, historia w schedule_changes i archiwizacja.
+"""
+
+import json
+import logging
+import datetime as dt
+from typing import Dict, List, Optional
+from ..cache import invalidate_cache_pattern
+from ..database import (get_db, run_write, ensure_unavailability_table, ensure_request_history_table,
+                        ensure_schedule_changes_table)
+from ..performance import monitor_performance
+
+logger = logging.getLogger(__name__)
+
+# Dni zatwierdzanej niedyspozycji: seria dat miesiąca (rekurencyjne CTE) zawężona do
+# wybranych dni; all_days=1 dla starych zgłoszeń bez selected_days (cały miesiąc)
+UNAVAILABILITY_DAYS_CTE = """
+    WITH RECURSIVE month_days(d) AS (
+        SELECT date(:first_day)
+        UNION ALL
+        SELECT date(d, '+1 day') FROM month_days WHERE d < date(:first_day, '+1 month', '-1 day')
+    ),
+    days(d) AS (
+        SELECT d FROM month_days
+        WHERE :all_days OR d IN (SELECT value FROM json_each(:selected_days))
+    )
+"""
+
+FINAL_STATUS = {'APPROVED': 'ZATWIERDZONE', 'REJECTED': 'ODRZUCONE'}
+
+def parse_selected_days(value) -> List[str]:
+    """selected_days z bazy - lista po przecinku (lub JSON ze starszych wersji)"""
+    if not value:
+        return []
+    if value.startswith('['):
+        try:
+            return [str(day) for day in json.loads(value)]
+        except ValueError:
+            pass
+    return [day.strip() for day in value.split(',') if day.strip()]
+
+def parse_month(month_year) -> Optional[dt.datetime]:
+    try:
+        return dt.datetime.strptime(month_year, '%Y-%m')
+    except (TypeError, ValueError):
+        return None
+
+def validate_unavailability(month_year: str, selected_days) -> Optional[str]:
+    """Komunikat błędu dla nieprawidłowego zgłoszenia, None gdy poprawne"""
+    month = parse_month(month_year)
+    if month is None:
+        return "Nieprawidłowy miesiąc"
+    if not isinstance(selected_days, list) or not selected_days:
+        return "Miesiąc i wybrane dni są wymagane"
+    for day in selected_days:
+        try:
+            parsed = dt.datetime.strptime(str(day), '%Y-%m-%d')
+        except ValueError:
+            return f"Nieprawidłowa data: {day}"
+        if (parsed.year, parsed.month) != (month.year, month.month):
+            return f"Dzień {day} spoza miesiąca {month_year}"
+    return None
+
+@monitor_performance
+def create_unavailability(employee_id: int, month_year: str, selected_days: List[str], reason: str) -> int:
+    """Nowe zgłoszenie (komentarz w kolumnie reason) - mały zapis, group commit"""
+    ensure_unavailability_table()
+    days = ','.join(sorted(set(selected_days)))
+
+    def write(db):
+        return db.execute("""
+            INSERT INTO unavailability_requests (employee_id, month_year, reason, selected_days)
+            VALUES (?, ?, ?, ?)
+        """, (employee_id, month_year, reason or "Niedyspozycja", days)).lastrowid
+
+    return run_write(write)
+
+@monitor_performance
+def unavailability_inbox(employee_id: Optional[int] = None) -> List[Dict]:
+    """Oczekujące zgłoszenia - wszystkie (admin) albo jednego pracownika, jedno zapytanie"""
+    ensure_unavailability_table()
+    rows = get_db().execute("""
+        SELECT ur.id, ur.employee_id, ur.month_year, ur.reason, ur.selected_days, ur.status,
+               ur.created_at, e.name AS employee_name
+        FROM unavailability_requests ur
+        JOIN employees e ON ur.employee_id = e.id
+        WHERE ? IS NULL OR ur.employee_id = ?
+        ORDER BY ur.created_at DESC, ur.id DESC
+    """, (employee_id, employee_id)).fetchall()
+    return [{
+        'id': row['id'],
+        'employee_id': row['employee_id'],
+        'employee_name': row['employee_name'],
+        'month_year': row['month_year'],
+        'selected_days': parse_selected_days(row['selected_days']),
+        'comment': row['reason'],
+        'reason': row['reason'],
+        'status': row['status'],
+        'created_at': row['created_at'],
+    } for row in rows]
+
+def get_unavailability(request_id) -> Optional[Dict]:
+    row = get_db().execute("""
+        SELECT ur.*, e.name AS employee_name
+        FROM unavailability_requests ur
+        JOIN employees e ON ur.employee_id = e.id
+        WHERE ur.id = ?
+    """, (request_id,)).fetchone()
+    return dict(row) if row else None
+
+@monitor_performance
+def decide_unavailability(req: Dict, status: str, admin_email: str, admin_id) -> Optional[int]:
+    """Zatwierdza/odrzuca zgłoszenie; liczba zmienionych dni grafiku albo None,
+    gdy zgłoszenie zostało już rozpatrzone (równoległa decyzja innego admina)"""
+    ensure_request_history_table()
+    ensure_schedule_changes_table()
+    month_year = req['month_year']
+    selected = parse_selected_days(req['selected_days'])
+    params = {
+        'first_day': f"{month_year}-01",
+        'all_days': 0 if selected else 1,
+        'selected_days': json.dumps(selected),
+        'employee_id': req['employee_id'],
+        'employee_name': req['employee_name'],
+        'changed_by': admin_email,
+    }
+
+    def write(db):
+        # Tylko oczekujące - równoległa decyzja innego admina wygrywa, ta dostaje None
+        updated = db.execute("""
+            UPDATE unavailability_requests SET status = ?
+            WHERE id = ? AND status = 'PENDING'
+        """, (status, req['id'])).rowcount
+        if not updated:
+            return None
+
+        changed = 0
+        if status == 'APPROVED':
+            # Historia przed zmianą - tylko dni, w których grafik faktycznie się zmienia
+            # (rowcount nie działa dla zapytań z WITH - liczymy wiersze RETURNING)
+            changed = len(db.execute(UNAVAILABILITY_DAYS_CTE + """
+                INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
+                SELECT days.d, :employee_name, COALESCE(s.shift_type, ''), '-', :changed_by
+                FROM days
+                LEFT JOIN shifts s ON s.employee_id = :employee_id AND s.date = days.d
+                WHERE s.shift_type IS NOT '-'
+                RETURNING id
+            """, params).fetchall())
+
+            # Upsert "-": aktualizacja istniejących wpisów, wstawienie brakujących
+            db.execute(UNAVAILABILITY_DAYS_CTE + """
+                UPDATE shifts SET shift_type = '-'
+                WHERE employee_id = :employee_id AND shift_type != '-'
+                  AND date IN (SELECT d FROM days)
+            """, params)
+            db.execute(UNAVAILABILITY_DAYS_CTE + """
+                INSERT INTO shifts (date, shift_type, employee_id)
+                SELECT d, '-', :employee_id FROM days
+                WHERE NOT EXISTS (SELECT 1 FROM shifts WHERE employee_id = :employee_id AND date = days.d)
+            """, params)
+
+        # Archiwizacja tylko tego zgłoszenia, w tej samej transakcji
+        db.execute("""
+            INSERT INTO request_history (
+                original_id, type, from_employee, month_year, reason,
+                final_status, admin_action, created_at, archived_at, archived_by
+            ) VALUES (?, 'unavailability', ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+        """, (req['id'], req['employee_name'], month_year, req['reason'], FINAL_STATUS[status], status,
+              req['created_at'], admin_id))
+        db.execute("DELETE FROM unavailability_requests WHERE id = ?", (req['id'],))
+        return changed
+
+    changed = run_write(write)
+    if changed:
+        invalidate_cache_pattern(f"shifts:{month_year}-")
+    return changed
@@ -0,0 +1,37 @@
+"""
+Usługi grafiku
+Ostatnie zmiany w grafiku (dla powiadomień w przeglądarkach bez push).
+"""
+
+import logging
+from typing import Dict, List, Optional
+from ..database import get_db, ensure_schedule_changes_table
+from ..performance import monitor_performance
+
+logger = logging.getLogger(__name__)
+
+@monitor_performance
+def recent_changes(hours: int = 24, limit: int = 50) -> List[Dict]:
+    """Zmiany z ostatnich `hours` godzin, najnowsze pierwsze (indeks na created_at)"""
+    ensure_schedule_changes_table()
+    rows = get_db().execute("""
+        SELECT id, date, employee_name, old_shift, new_shift, changed_by, created_at
+        FROM schedule_changes
+        WHERE created_at > datetime('now', ?)
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    """, (f"-{int(hours)} hours", limit)).fetchall()
+    return [{
+        'id': row['id'],
+        'date': row['date'],
+        'employee_name': row['employee_name'],
+        'old_shift': row['old_shift'],
+        'new_shift': row['new_shift'],
+        'changed_by': row['changed_by'],
+        'changed_at': row['created_at'],
+        'created_at': row['created_at'],
+    } for row in rows]
+
+def user_name(user_id) -> Optional[str]:
+    row = get_db().execute("SELECT name FROM users WHERE id = ?", (user_id,)).fetchone()
+    return row['name'] if row else None
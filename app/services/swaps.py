@@ -0,0 +1,90 @@
+"""
+Usługi próśb o zamianę
+Decyzja kierownika to jedna transakcja w wątku zapisującym (BEGIN IMMEDIATE):
+zmiana statusu z kontrolą wersji prośby, zamiana dwóch wpisów grafiku jednym
+UPDATE, historia w schedule_changes i archiwizacja prośby. Żaden inny zapis
+(zapis grafiku, druga decyzja) nie wejdzie między odczyt a zamianę.
+"""
+
+import logging
+from typing import Dict, Optional
+from ..cache import cache
+from ..database import run_write, ensure_request_history_table, ensure_schedule_changes_table
+from ..performance import monitor_performance
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUS = {'APPROVED': 'ZATWIERDZONE', 'REJECTED': 'ODRZUCONE_PRZEZ_SZEFA'}
+
+@monitor_performance
+def decide_swap(req: Dict, status: str, admin_email: str, admin_id,
+                version: Optional[int] = None) -> Optional[int]:
+    """Zatwierdza/odrzuca prośbę; liczba przeniesionych wpisów grafiku (0-2)
+
+    `version` to wersja prośby widziana przez kierownika (domyślnie wersja
+    odczytana przez trasę) - gdy w bazie jest inna albo prośba ma już
+    decyzję (odpowiedź adresata, równoległa decyzja), zwraca None
+    i niczego nie zmienia.
+    """
+    ensure_request_history_table()
+    ensure_schedule_changes_table()
+    expected = req['version'] if version is None else version
+    params = {
+        'from_date': req['from_date'], 'to_date': req['to_date'],
+        'from_name': req['from_employee'], 'to_name': req['to_employee'],
+    }
+
+    def write(db):
+        updated = db.execute("""
+            UPDATE swap_requests SET boss_status = ?, version = version + 1
+            WHERE id = ? AND version = ? AND boss_status = 'PENDING'
+        """, (status, req['id'], expected)).rowcount
+        if not updated:
+            return None
+
+        moved = 0
+        employees = dict(db.execute("SELECT name, id FROM employees WHERE name IN (?, ?)",
+                                    (req['from_employee'], req['to_employee'])).fetchall())
+        if status == 'APPROVED' and req['from_employee'] in employees and req['to_employee'] in employees:
+            params.update(from_id=employees[req['from_employee']], to_id=employees[req['to_employee']])
+            # Historia przed zamianą - obie strony, stan odczytany pod blokadą zapisu
+            db.execute("""
+                INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
+                SELECT side.date, side.name,
+                       COALESCE((SELECT shift_type FROM shifts WHERE date = side.date AND employee_id = side.id), ''),
+                       COALESCE((SELECT shift_type FROM shifts WHERE date = side.other_date AND employee_id = side.other_id), ''),
+                       :changed_by
+                FROM (SELECT :from_date AS date, :from_name AS name, :from_id AS id,
+                             :to_date AS other_date, :to_id AS other_id
+                      UNION ALL
+                      SELECT :to_date, :to_name, :to_id, :from_date, :from_id) AS side
+            """, dict(params, changed_by=admin_email))
+            # Zamiana jednym UPDATE: każdy z dwóch wpisów przechodzi na pozycję drugiego
+            # (brakujący wpis po jednej stronie zostaje brakującym po drugiej)
+            moved = db.execute("""
+                UPDATE shifts SET
+                  date = CASE WHEN date = :from_date AND employee_id = :from_id THEN :to_date ELSE :from_date END,
+                  employee_id = CASE WHEN date = :from_date AND employee_id = :from_id THEN :to_id ELSE :from_id END
+                WHERE (date = :from_date AND employee_id = :from_id)
+                   OR (date = :to_date AND employee_id = :to_id)
+            """, params).rowcount
+        elif status == 'APPROVED':
+            logger.warning(f"Zamiana {req['id']}: nie znaleziono pracowników "
+                           f"{req['from_employee']!r}/{req['to_employee']!r} - grafik bez zmian")
+
+        # Archiwizacja tylko tej prośby, w tej samej transakcji
+        db.execute("""
+            INSERT INTO request_history (
+                original_id, type, from_employee, to_employee, from_date, to_date,
+                comment_requester, final_status, admin_action, created_at, archived_at, archived_by
+            ) VALUES (?, 'swap', ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+        """, (req['id'], req['from_employee'], req['to_employee'], req['from_date'], req['to_date'],
+              req['comment_requester'], FINAL_STATUS[status], status, req['created_at'], admin_id))
+        db.execute("DELETE FROM swap_requests WHERE id = ?", (req['id'],))
+        return moved
+
+    moved = run_write(write)
+    if moved:
+        cache.delete(f"shifts:{req['from_date']}")
+        cache.delete(f"shifts:{req['to_date']}")
+    return moved
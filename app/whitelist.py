@@ -0,0 +1,97 @@
+"""
+Lista dozwolonych emaili (whitelist)
+Źródłem jest tabela whitelist_emails - zmiany przez API są trwałe i widoczne
+dla wszystkich procesów gunicorna. Każdy proces trzyma listę jako frozenset
+i wczytuje ją ponownie tylko po zmianie licznika w whitelist_version
+(zwiększanego wyzwalaczami), więc sprawdzenie przy logowaniu to jedno
+zapytanie o jeden wiersz zamiast parsowania listy.
+
+Pusta lista oznacza brak ograniczeń (jak pusta WHITELIST_EMAILS).
+"""
+
+import logging
+import threading
+from typing import Dict, FrozenSet, List, Optional
+from flask import current_app
+from .database import get_db, run_write, ensure_whitelist_table, ensure_employees_email_column
+
+logger = logging.getLogger(__name__)
+
+class EmailWhitelist:
+    """Kopia listy w procesie: frozenset + wersja, dla której została wczytana"""
+
+    def __init__(self):
+        self._emails: FrozenSet[str] = frozenset()
+        self._key = None  # (ścieżka bazy, wersja)
+        self._ready = set()  # bazy z utworzoną tabelą
+        self._lock = threading.Lock()
+
+    def _ensure_table(self, db_path):
+        if db_path not in self._ready:
+            ensure_whitelist_table()
+            self._ready.add(db_path)
+
+    def emails(self) -> FrozenSet[str]:
+        """Aktualna lista - wczytywana ponownie tylko po zmianie wersji"""
+        db_path = current_app.config['DATABASE_PATH']
+        self._ensure_table(db_path)
+        db = get_db()
+        version = db.execute("SELECT version FROM whitelist_version WHERE id = 1").fetchone()[0]
+        key = (db_path, version)
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    rows = db.execute("SELECT email FROM whitelist_emails").fetchall()
+                    self._emails = frozenset(row[0].strip().lower() for row in rows)
+                    self._key = key
+                    logger.info(f"Wczytano whitelist (wersja {version}, {len(self._emails)} emaili)")
+        return self._emails
+
+    def is_allowed(self, email: str) -> bool:
+        """Czy email może się zalogować/zarejestrować (pusta lista - każdy)"""
+        emails = self.emails()
+        return not emails or email.strip().lower() in emails
+
+    def add(self, email: str, added_by: Optional[int] = None) -> bool:
+        """Dodaj email (False gdy już jest na liście)"""
+        self._ensure_table(current_app.config['DATABASE_PATH'])
+        email = email.strip().lower()
+
+        def write(db):
+            return db.execute(
+                "INSERT OR IGNORE INTO whitelist_emails (email, added_by) VALUES (?, ?)",
+                (email, added_by)
+            ).rowcount == 1
+
+        return run_write(write)
+
+    def remove(self, email: str) -> bool:
+        """Usuń email (False gdy nie ma go na liście)"""
+        self._ensure_table(current_app.config['DATABASE_PATH'])
+        email = email.strip().lower()
+        return run_write(lambda db: db.execute(
+            "DELETE FROM whitelist_emails WHERE email = ?", (email,)
+        ).rowcount == 1)
+
+    def entries(self) -> List[Dict]:
+        """Lista z kontami i pracownikami przypisanymi do emaili - jedno zapytanie"""
+        self._ensure_table(current_app.config['DATABASE_PATH'])
+        ensure_employees_email_column()
+        rows = get_db().execute("""
+            SELECT w.email, u.name AS user_name, e.name AS employee_name, e.id AS employee_id,
+                   u.id IS NOT NULL AS has_account
+            FROM whitelist_emails w
+            LEFT JOIN users u ON u.email = w.email
+            LEFT JOIN employees e ON e.email = w.email
+            ORDER BY w.email
+        """).fetchall()
+        return [{
+            'email': row['email'],
+            'user_name': row['user_name'],
+            'employee_name': row['employee_name'],
+            'employee_id': row['employee_id'],
+            'has_account': bool(row['has_account'])
+        } for row in rows]
+
+# Jedna kopia listy na proces roboczy
+whitelist = EmailWhitelist()
@@ -0,0 +1,4 @@
+"""
+Benchmarki wydajności - mikrobenchmarki (pytest-benchmark), test obciążeniowy
+na lokalnym gunicorn i porównanie wyników z wartościami bazowymi
+"""
@@ -0,0 +1,141 @@
+"""
+Mikrobenchmarki najczęściej używanych endpointów (pytest-benchmark)
+Uruchamiane przez test client Flask na bazie z generate_data.py - mierzą
+czas widoku razem z zapytaniami SQL, bez sieci i serwera WSGI.
+
+    python -m pytest benchmarks --benchmark-json=bench.json
+    python -m benchmarks.compare bench.json
+"""
+
+import itertools
+import sqlite3
+import threading
+import pytest
+from app.cache import cache
+from benchmarks.dataset import BENCH_YEAR, BENCH_MONTH, BULK_EMPLOYEES, CONCURRENT_WRITERS, SHIFT_CYCLE, bulk_changes
+
+
+@pytest.fixture(scope='module')
+def employee_names(dataset):
+    conn = sqlite3.connect(dataset['db_path'])
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM employees ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def assert_ok(response):
+    assert response.status_code == 200, response.get_data(as_text=True)[:200]
+    return response
+
+
+def bench_index(benchmark, admin_client):
+    """Strona główna - widok miesiąca dla wszystkich pracowników"""
+    url = f"/?year={BENCH_YEAR}&month={BENCH_MONTH}"
+    response = assert_ok(benchmark(admin_client.get, url))
+    assert 'Wystąpił błąd' not in response.get_data(as_text=True)
+
+
+def bench_shifts_for_date_uncached(benchmark, admin_client):
+    """Zmiany dla dnia - zapytanie do bazy (cache czyszczony przed każdą rundą)"""
+    url = f"/api/shifts/{BENCH_YEAR}-{BENCH_MONTH:02d}-15"
+    benchmark.pedantic(admin_client.get, args=(url,), setup=cache.clear, rounds=200)
+    assert_ok(admin_client.get(url))
+
+
+def bench_shifts_for_date_cached(benchmark, admin_client):
+    """Zmiany dla dnia - odpowiedź z cache"""
+    url = f"/api/shifts/{BENCH_YEAR}-{BENCH_MONTH:02d}-15"
+    assert_ok(admin_client.get(url))
+    assert_ok(benchmark(admin_client.get, url))
+
+
+def bench_swaps_inbox_admin(benchmark, admin_client):
+    """Skrzynka zamian administratora - wszystkie prośby"""
+    response = assert_ok(benchmark(admin_client.get, "/api/swaps/inbox"))
+    assert response.get_json()['is_boss'] is True
+
+
+def bench_swaps_inbox_user(benchmark, user_client):
+    """Skrzynka zamian zwykłego użytkownika - tylko jego prośby"""
+    assert_ok(benchmark(user_client.get, "/api/swaps/inbox"))
+
+
+def bench_save_bulk(benchmark, admin_client, employee_names):
+    """Zapis zbiorczy - każda runda zmienia wartości wszystkich komórek"""
+    values = itertools.cycle(SHIFT_CYCLE)
+
+    def save():
+        return admin_client.post("/api/save", json={'changes': bulk_changes(employee_names, next(values))})
+
+    assert_ok(benchmark.pedantic(save, rounds=40))
+
+
+def bench_draft_publish(benchmark, admin_client, employee_names):
+    """Publikacja wersji roboczej (zapis wersji roboczej poza pomiarem)"""
+    values = itertools.cycle(SHIFT_CYCLE[:3])
+
+    def save_draft():
+        changes = bulk_changes(employee_names, next(values))
+        assert_ok(admin_client.post("/api/draft/save", json={'changes': changes}))
+
+    def publish():
+        return admin_client.post("/api/draft/publish")
+
+    assert_ok(benchmark.pedantic(publish, setup=save_draft, rounds=20))
+
+
+def bench_export_excel(benchmark, admin_client):
+    """Eksport miesiąca do pliku Excel"""
+    url = f"/api/export/excel?year={BENCH_YEAR}&month={BENCH_MONTH}"
+    response = assert_ok(benchmark.pedantic(admin_client.get, args=(url,), rounds=10))
+    assert response.data[:2] == b'PK'
+
+
+def bench_swap_approval_concurrent_writers(benchmark, bench_app, dataset, admin_client, employee_names):
+    """Zatwierdzenie zamiany przy równoległych zapisach grafiku (CONCURRENT_WRITERS wątków /api/save)"""
+    from benchmarks.conftest import _client
+
+    # Zamiana między pracownikami spoza zapisu zbiorczego - ta sama tabela, inne wiersze
+    from_name, to_name = employee_names[BULK_EMPLOYEES], employee_names[BULK_EMPLOYEES + 1]
+    days = itertools.count()
+    writers = [_client(bench_app, admin_id) for admin_id in dataset['admin_ids'][1:1 + CONCURRENT_WRITERS]]
+    stop = threading.Event()
+    errors = []
+
+    def write_loop(client, offset):
+        values = itertools.cycle(SHIFT_CYCLE[offset:] + SHIFT_CYCLE[:offset])
+        while not stop.is_set():
+            response = client.post("/api/save", json={'changes': bulk_changes(employee_names, next(values))})
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    def new_request():
+        day = next(days) % 28 + 1
+        conn = sqlite3.connect(dataset['db_path'])
+        try:
+            request_id = conn.execute("""
+                INSERT INTO swap_requests (requester_user_id, from_date, to_date, from_employee, to_employee,
+                                           recipient_status)
+                VALUES (1, ?, ?, ?, ?, 'APPROVED')
+            """, (f"{BENCH_YEAR}-{BENCH_MONTH:02d}-{day:02d}", f"{BENCH_YEAR}-{BENCH_MONTH:02d}-{day + 1:02d}",
+                  from_name, to_name)).lastrowid
+            conn.commit()
+        finally:
+            conn.close()
+        return (request_id,), {}
+
+    def approve(request_id):
+        return admin_client.post("/api/swaps/boss", json={'id': request_id, 'status': 'APPROVED', 'version': 0})
+
+    threads = [threading.Thread(target=write_loop, args=(client, i), daemon=True) for i, client in enumerate(writers)]
+    for thread in threads:
+        thread.start()
+    try:
+        response = benchmark.pedantic(approve, setup=new_request, rounds=60)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert_ok(response)
+    assert not errors
@@ -0,0 +1,124 @@
+"""
+Benchmark regression check
+Compares a pytest-benchmark JSON file (--benchmark-json) or a load test
+result (benchmarks.loadtest --output) with the stored baseline and fails
+when a metric got worse by more than the threshold.
+
+Usage:
+    python -m benchmarks.compare results/micro.json                  # check
+    python -m benchmarks.compare results/micro.json --threshold 0.4
+    python -m benchmarks.compare results/micro.json --save           # new baseline
+"""
+
+import os
+import sys
+import json
+import platform
+import datetime as dt
+from typing import Dict, List, Tuple
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+DEFAULT_THRESHOLD = 0.25
+
+# Compared metrics: True when a higher value is better
+METRICS = {
+    'median': False,
+    'p95': False,
+    'rps': True,
+}
+
+def load_results(path: str) -> Dict:
+    """Read a result file and normalize it to {kind, dataset, results}"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    if 'benchmarks' in data:
+        # pytest-benchmark output, times in seconds
+        return {
+            'kind': 'micro',
+            'dataset': data.get('dataset'),
+            'results': {bench['name']: {'median': bench['stats']['median']}
+                        for bench in data['benchmarks']},
+        }
+    if data.get('kind') in ('micro', 'load'):
+        return data
+    raise ValueError(f"{path}: unknown result format")
+
+def baseline_path(kind: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{kind}.json")
+
+def save_baseline(results: Dict, path: str) -> None:
+    baseline = dict(results)
+    baseline['machine'] = f"{platform.system()} {platform.machine()} Python {platform.python_version()}"
+    baseline['created'] = dt.date.today().isoformat()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def compare(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> Tuple[List[str], List[str]]:
+    """Compare normalized results, returns (report lines, regressions)"""
+    report, regressions = [], []
+    for name, metrics in sorted(current['results'].items()):
+        base_metrics = baseline['results'].get(name)
+        if base_metrics is None:
+            report.append(f"  {name}: no baseline")
+            continue
+
+        if metrics.get('errors'):
+            regressions.append(f"{name}: {metrics['errors']} failed requests")
+
+        for metric, higher_is_better in METRICS.items():
+            value, base = metrics.get(metric), base_metrics.get(metric)
+            if value is None or not base:
+                continue
+            change = (value - base) / base
+            worse = -change if higher_is_better else change
+            status = "REGRESSION" if worse > threshold else "ok"
+            report.append(f"  {name:<34} {metric:<7} {base:>12.6g} -> {value:<12.6g} {change:+7.1%}  {status}")
+            if worse > threshold:
+                regressions.append(f"{name}: {metric} {change:+.1%} (threshold {threshold:.0%})")
+    return report, regressions
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare benchmark results with the stored baseline")
+    parser.add_argument("results", help="pytest-benchmark JSON or load test output")
+    parser.add_argument("--baseline", help="baseline file (default: baselines/<kind>.json)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument("--save", action="store_true", help="store results as the new baseline")
+    args = parser.parse_args(argv)
+
+    current = load_results(args.results)
+    path = args.baseline or baseline_path(current['kind'])
+
+    if args.save:
+        save_baseline(current, path)
+        print(f"Baseline saved: {path}")
+        return 0
+
+    if not os.path.exists(path):
+        print(f"No baseline at {path} - run with --save first")
+        return 2
+    baseline = load_results(path)
+
+    for key in ('dataset', 'config'):
+        if current.get(key) != baseline.get(key):
+            print(f"{key.capitalize()} differs from the baseline - results are not comparable")
+            return 2
+
+    report, regressions = compare(current, baseline, args.threshold)
+    print(f"Baseline: {path} ({baseline.get('machine', 'unknown machine')}, {baseline.get('created', '?')})")
+    print('\n'.join(report))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Wspólne fixtures benchmarków - baza z generate_data.py i zalogowani klienci
+"""
+
+import pytest
+from generate_data import generate
+from app import create_app
+from app.cache import cache
+from benchmarks.dataset import BENCH_DATASET
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    """Zapisz parametry danych w wynikach, żeby compare.py mógł je sprawdzić"""
+    output_json['dataset'] = BENCH_DATASET
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    """Wygenerowana baza danych benchmarków"""
+    db_path = str(tmp_path_factory.mktemp('bench') / 'bench.db')
+    summary = generate(db_path, **BENCH_DATASET)
+    summary['db_path'] = db_path
+    return summary
+
+
+@pytest.fixture(scope='session')
+def bench_app(dataset):
+    """Aplikacja na bazie benchmarków (bez CSRF, limitów i nagłówków debug)"""
+    # Flask-Limiter czyta RATELIMIT_ENABLED w init_app, więc przez środowisko
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('RATELIMIT_ENABLED', 'false')
+        app = create_app()
+    app.config.update({
+        'TESTING': True,
+        'DATABASE_PATH': dataset['db_path'],
+        'WTF_CSRF_ENABLED': False,
+        'DB_QUERY_HEADERS': False,
+    })
+    return app
+
+
+def _client(app, user_id):
+    client = app.test_client()
+    with app.app_context():
+        from app.database import get_db
+        user = get_db().execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user['id']
+        sess['user_email'] = user['email']
+        sess['user_name'] = user['name']
+        sess['user_role'] = user['role']
+    return client
+
+
+@pytest.fixture
+def admin_client(bench_app, dataset):
+    """Klient zalogowany jako administrator"""
+    cache.clear()
+    return _client(bench_app, dataset['admin_ids'][0])
+
+
+@pytest.fixture
+def user_client(bench_app, dataset):
+    """Klient zalogowany jako zwykły użytkownik"""
+    cache.clear()
+    return _client(bench_app, dataset['admin_ids'][-1] + 1)
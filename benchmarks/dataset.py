@@ -0,0 +1,45 @@
+"""
+Parametry danych benchmarków (generate_data.py)
+Zmiana wartości wymaga zapisania nowych wyników bazowych (baselines/).
+"""
+
+# Dane mikrobenchmarków - preset "medium" z generate_data.py, przepisany tutaj,
+# żeby zmiana presetu nie zmieniała po cichu danych benchmarków
+BENCH_DATASET = {
+    'employees': 60,
+    'admins': 4,
+    'start': '2025-01',
+    'months': 12,
+    'swaps': 2000,
+    'unavailability': 300,
+    'changes': 20000,
+    'history': 3000,
+    'drafts': 1000,
+    'push_subscriptions': 40,
+    'seed': 1,
+}
+
+# Test obciążeniowy - więcej kont administratorów, bo każdy wątek klienta
+# ma własne konto (wersje robocze są per użytkownik)
+LOAD_DATASET = dict(BENCH_DATASET, admins=16)
+
+# Miesiąc w zakresie danych, używany przez widok miesiąca i eksport
+BENCH_YEAR = 2025
+BENCH_MONTH = 6
+
+# Zapis zbiorczy: dni miesiąca × pracownicy, wartości zmieniane co rundę
+BULK_DAYS = 30
+BULK_EMPLOYEES = 10
+SHIFT_CYCLE = ['D', 'N', 'P', '']
+
+# Zatwierdzanie zamian: liczba wątków zapisujących grafik w tle (konta administratorów 2..)
+CONCURRENT_WRITERS = 3
+
+
+def bulk_changes(names, value):
+    """Zmiany dla BULK_DAYS dni × BULK_EMPLOYEES pracowników (format z app.js)"""
+    return [
+        {'date': f"{BENCH_YEAR}-{BENCH_MONTH:02d}-{day:02d}", 'employee': name, 'shift_type': value}
+        for day in range(1, BULK_DAYS + 1)
+        for name in names[:BULK_EMPLOYEES]
+    ]
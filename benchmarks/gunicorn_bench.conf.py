@@ -0,0 +1,37 @@
+# Konfiguracja Gunicorn dla testu obciążeniowego (benchmarks/loadtest.py)
+# Jak gunicorn.conf.py, ale bez użytkownika systemowego, /opt i plików logów.
+# Adres, liczbę workerów, klasę workera i liczbę wątków podaje loadtest.py w linii poleceń.
+
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR",
+                      os.path.join(tempfile.gettempdir(), "grafiksp4600-bench-metrics"))
+
+worker_class = "gthread"
+preload_app = True
+timeout = 60
+keepalive = 2
+backlog = 2048
+
+accesslog = None
+loglevel = "warning"
+
+limit_request_line = 4094
+limit_request_fields = 100
+limit_request_field_size = 8190
+
+def on_starting(server):
+    """Wyczyść metryki z poprzedniego uruchomienia"""
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    """Usuń wkład zakończonego workera do gauge'ów typu live*"""
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
@@ -0,0 +1,314 @@
+"""
+Concurrent load generator for the hot endpoints
+Starts a local gunicorn on a generated database (generate_data.py), logs
+every client thread in as its own admin account and runs each scenario for
+a fixed time with N concurrent keep-alive clients (closed loop). Reports
+throughput and latency percentiles as JSON for benchmarks.compare.
+
+Usage:
+    python -m benchmarks.loadtest                          # all scenarios
+    python -m benchmarks.loadtest --scenarios index,save_bulk --concurrency 4 --duration 5
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --db app.db   # running server
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import socket
+import secrets
+import sqlite3
+import tempfile
+import threading
+import itertools
+import subprocess
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from benchmarks.dataset import LOAD_DATASET, BENCH_YEAR, BENCH_MONTH, SHIFT_CYCLE, bulk_changes
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUNICORN_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn_bench.conf.py")
+
+_CSRF_RE = re.compile(r"window\.csrfToken = '([^']+)'")
+
+class Client:
+    """Keep-alive HTTP session logged in as one user"""
+
+    def __init__(self, base_url: str, cookie: str, index: int, employees: List[str]):
+        self.base_url = base_url
+        self.index = index
+        self.employees = employees
+        self.http = requests.Session()
+        # Same domain/path as the cookie set by the server, so it gets replaced
+        self.http.cookies.set('session', cookie, domain=urlparse(base_url).hostname, path='/')
+        self.values = itertools.cycle(SHIFT_CYCLE)
+        self.days = itertools.cycle(range(1, 29))
+        self.csrf_token = ''
+
+    def login(self) -> None:
+        """Load the main page once - it stores a CSRF token in the session"""
+        response = self.get(f"/?year={BENCH_YEAR}&month={BENCH_MONTH}")
+        match = _CSRF_RE.search(response.text)
+        if response.status_code != 200 or not match:
+            raise RuntimeError(f"login failed (HTTP {response.status_code}) - check SECRET_KEY / user id")
+        self.csrf_token = match.group(1)
+
+    def get(self, path: str) -> requests.Response:
+        return self.http.get(self.base_url + path, allow_redirects=False)
+
+    def post(self, path: str, payload=None) -> requests.Response:
+        return self.http.post(self.base_url + path, json=payload, allow_redirects=False,
+                              headers={'X-CSRFToken': self.csrf_token})
+
+# Scenario: one iteration; returns the measured response. Work that is only
+# preparation (e.g. saving a draft before publishing) is passed to `untimed`.
+def scenario_index(client: Client, untimed: Callable) -> requests.Response:
+    return client.get(f"/?year={BENCH_YEAR}&month={BENCH_MONTH}")
+
+def scenario_shifts_for_date(client: Client, untimed: Callable) -> requests.Response:
+    day = next(client.days)
+    return client.get(f"/api/shifts/{BENCH_YEAR}-{BENCH_MONTH:02d}-{day:02d}")
+
+def scenario_swaps_inbox(client: Client, untimed: Callable) -> requests.Response:
+    return client.get("/api/swaps/inbox")
+
+def scenario_save_bulk(client: Client, untimed: Callable) -> requests.Response:
+    return client.post("/api/save", {'changes': bulk_changes(client.employees, next(client.values))})
+
+def scenario_draft_publish(client: Client, untimed: Callable) -> requests.Response:
+    changes = bulk_changes(client.employees, next(client.values) or 'D')
+    untimed(lambda: client.post("/api/draft/save", {'changes': changes}))
+    return client.post("/api/draft/publish")
+
+def scenario_export_excel(client: Client, untimed: Callable) -> requests.Response:
+    return client.get(f"/api/export/excel?year={BENCH_YEAR}&month={BENCH_MONTH}")
+
+SCENARIOS = {
+    'index': scenario_index,
+    'shifts_for_date': scenario_shifts_for_date,
+    'swaps_inbox': scenario_swaps_inbox,
+    'save_bulk': scenario_save_bulk,
+    'draft_publish': scenario_draft_publish,
+    'export_excel': scenario_export_excel,
+}
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    """Throughput and latency percentiles (seconds) of one scenario run"""
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'rps': round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+        'median': percentile(values, 0.50),
+        'p95': percentile(values, 0.95),
+        'p99': percentile(values, 0.99),
+        'max': values[-1] if values else 0.0,
+    }
+
+def run_scenario(clients: List[Client], scenario: Callable, duration: float) -> Dict:
+    """Run one scenario with every client in its own thread for `duration` seconds"""
+    latencies: List[float] = []
+    errors = [0]
+    measured_time = [0.0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(client: Client):
+        own_latencies, own_errors, own_untimed = [], 0, 0.0
+
+        def untimed(action):
+            nonlocal own_untimed
+            start = time.perf_counter()
+            action()
+            own_untimed += time.perf_counter() - start
+
+        thread_start = time.perf_counter()
+        while time.perf_counter() < deadline:
+            before_untimed = own_untimed
+            start = time.perf_counter()
+            try:
+                response = scenario(client, untimed)
+                ok = 200 <= response.status_code < 300
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start - (own_untimed - before_untimed)
+            if ok:
+                own_latencies.append(elapsed)
+            else:
+                own_errors += 1
+
+        with lock:
+            latencies.extend(own_latencies)
+            errors[0] += own_errors
+            measured_time[0] += time.perf_counter() - thread_start - own_untimed
+
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Throughput over measured time only (preparation requests excluded)
+    return summarize(latencies, errors[0], measured_time[0] / len(threads))
+
+def session_cookie(secret_key: str, user: sqlite3.Row) -> str:
+    """Signed Flask session cookie for a user (same as after a login)"""
+    from flask import Flask
+    from flask.sessions import SecureCookieSessionInterface
+
+    signer_app = Flask(__name__)
+    signer_app.secret_key = secret_key
+    serializer = SecureCookieSessionInterface().get_signing_serializer(signer_app)
+    return serializer.dumps({
+        'user_id': user['id'],
+        'user_email': user['email'],
+        'user_name': user['name'],
+        'user_role': user['role'],
+    })
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(db_path: str, secret_key: str, workers: int, log_path: str,
+                 worker_class: str = 'gthread', threads: int = 4) -> Tuple[subprocess.Popen, str]:
+    """Start gunicorn on a free port, returns (process, base URL) once it answers"""
+    port = free_port()
+    env = dict(os.environ, DATABASE_PATH=db_path, SECRET_KEY=secret_key, RATELIMIT_ENABLED='false',
+               FLASK_ENV='production')
+    log = open(log_path, 'w', encoding='utf-8')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', GUNICORN_CONFIG,
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+         '--worker-class', worker_class, '--threads', str(threads), 'wsgi:application'],
+        cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}, see {log_path}")
+        try:
+            requests.get(f"{base_url}/api/healthz", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not start within 30 s, see {log_path}")
+
+def load_accounts(db_path: str, count: int):
+    """Admin accounts for client threads and the employee names"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        admins = conn.execute("SELECT * FROM users WHERE role = 'ADMIN' ORDER BY id LIMIT ?", (count,)).fetchall()
+        employees = [row['name'] for row in conn.execute("SELECT name FROM employees ORDER BY id")]
+    finally:
+        conn.close()
+    if len(admins) < count:
+        raise RuntimeError(f"need {count} admin accounts, database has {len(admins)}")
+    return admins, employees
+
+def run(scenarios: List[str], concurrency: int, duration: float, workers: int,
+        url: Optional[str] = None, db_path: Optional[str] = None, secret_key: Optional[str] = None,
+        worker_class: str = 'gthread', threads: int = 4) -> Dict:
+    """Run the load test, returns results in the benchmarks.compare format"""
+    work_dir = tempfile.mkdtemp(prefix="grafiksp4600-load-")
+    process = None
+    dataset = None
+    clients = []
+    try:
+        if url is None:
+            from generate_data import generate
+
+            db_path = os.path.join(work_dir, "load.db")
+            generate(db_path, **LOAD_DATASET)
+            dataset = LOAD_DATASET
+            secret_key = secrets.token_urlsafe(32)
+            process, url = start_server(db_path, secret_key, workers, os.path.join(work_dir, "gunicorn.log"),
+                                        worker_class, threads)
+        elif not (db_path and secret_key):
+            raise RuntimeError("--url requires --db and --secret-key (to sign session cookies)")
+
+        admins, employees = load_accounts(db_path, concurrency)
+        clients = [Client(url, session_cookie(secret_key, admin), index, employees)
+                   for index, admin in enumerate(admins)]
+        for client in clients:
+            client.login()
+
+        results = {}
+        for name in scenarios:
+            # Short warm-up (imports, caches) excluded from the results
+            run_scenario(clients, SCENARIOS[name], min(1.0, duration))
+            results[name] = run_scenario(clients, SCENARIOS[name], duration)
+            print(f"{name:<16} {results[name]['rps']:>8.1f} req/s  median {results[name]['median'] * 1000:7.1f} ms"
+                  f"  p95 {results[name]['p95'] * 1000:7.1f} ms  errors {results[name]['errors']}")
+
+        return {
+            'kind': 'load',
+            'dataset': dataset,
+            'config': {'concurrency': concurrency, 'duration': duration, 'workers': workers,
+                       'worker_class': worker_class, 'threads': threads},
+            'results': results,
+        }
+    finally:
+        # gthread workers wait for open keep-alive connections before exiting
+        for client in clients:
+            client.http.close()
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test the hot endpoints on a local gunicorn")
+    parser.add_argument("--scenarios", default=','.join(SCENARIOS),
+                        help=f"comma separated, available: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--worker-class", default="gthread", choices=("sync", "gthread", "gevent"),
+                        help="gunicorn worker class (as in gunicorn.conf.py)")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker (gthread)")
+    parser.add_argument("--url", help="use a running server instead of starting gunicorn")
+    parser.add_argument("--db", help="database of the running server (with --url)")
+    parser.add_argument("--secret-key", help="SECRET_KEY of the running server (with --url)")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    if args.concurrency > LOAD_DATASET['admins'] and args.url is None:
+        parser.error(f"--concurrency is limited to {LOAD_DATASET['admins']} (one admin account per client)")
+
+    result = run(scenarios, args.concurrency, args.duration, args.workers,
+                 url=args.url, db_path=args.db, secret_key=args.secret_key,
+                 worker_class=args.worker_class, threads=args.threads)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
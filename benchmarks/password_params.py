@@ -0,0 +1,127 @@
+"""
+Password hashing parameter calibration
+Measures the registered password hashers (app/password_utils.py) on this
+machine and picks the highest cost that still verifies a password within
+the target latency. Run it on the deployment box and put the printed
+values into .env; existing hashes are rewritten on the next login.
+
+Usage:
+    python -m benchmarks.password_params                       # scrypt, 50 ms
+    python -m benchmarks.password_params --target-ms 100 --algorithm pbkdf2_sha256
+    python -m benchmarks.password_params --algorithm all --max-memory-mb 32 --json
+"""
+
+import sys
+import json
+import time
+import statistics
+from typing import Dict, List, Tuple
+
+from app.password_utils import HASHERS, generate_salt
+
+DEFAULT_TARGET_MS = 50.0
+DEFAULT_MAX_MEMORY_MB = 64
+DEFAULT_REPEAT = 5
+
+# Cost floors - below these a hash is too cheap to be worth storing
+MIN_PARAMS = {
+    'scrypt': {'n': 2 ** 14, 'r': 8, 'p': 1},
+    'pbkdf2_sha256': {'iterations': 100000},
+}
+
+def measure(algorithm: str, params: Dict[str, int], repeat: int = DEFAULT_REPEAT) -> float:
+    """Median time (seconds) of one hash with the given parameters"""
+    hasher = HASHERS[algorithm]
+    salt = generate_salt()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hasher.derive("benchmark-password-1", salt, params)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def scrypt_memory(params: Dict[str, int]) -> int:
+    """Approximate scrypt working memory in bytes (128 * r * (n + p))"""
+    return 128 * params['r'] * (params['n'] + params['p'])
+
+def calibrate_scrypt(target: float, max_memory: int, repeat: int) -> Tuple[Dict[str, int], float, List[str]]:
+    """Double n while a hash stays within the target time and memory limit"""
+    params = dict(MIN_PARAMS['scrypt'])
+    elapsed = measure('scrypt', params, repeat)
+    while True:
+        candidate = dict(params, n=params['n'] * 2)
+        if scrypt_memory(candidate) > max_memory:
+            break
+        candidate_elapsed = measure('scrypt', candidate, repeat)
+        if candidate_elapsed > target:
+            break
+        params, elapsed = candidate, candidate_elapsed
+    notes = []
+    if elapsed > target:
+        notes.append(f"minimum cost n={params['n']} already takes {elapsed * 1000:.1f} ms")
+    return params, elapsed, notes
+
+def calibrate_pbkdf2(target: float, repeat: int) -> Tuple[Dict[str, int], float, List[str]]:
+    """Scale iterations linearly from a short probe, rounded to 10 000"""
+    probe = {'iterations': 20000}
+    per_iteration = measure('pbkdf2_sha256', probe, repeat) / probe['iterations']
+    iterations = int(target / per_iteration) // 10000 * 10000
+    params = {'iterations': max(iterations, MIN_PARAMS['pbkdf2_sha256']['iterations'])}
+    elapsed = measure('pbkdf2_sha256', params, repeat)
+    notes = []
+    if elapsed > target:
+        notes.append(f"minimum cost {params['iterations']} iterations already takes {elapsed * 1000:.1f} ms")
+    return params, elapsed, notes
+
+def calibrate(algorithm: str, target_ms: float = DEFAULT_TARGET_MS,
+              max_memory_mb: int = DEFAULT_MAX_MEMORY_MB, repeat: int = DEFAULT_REPEAT) -> Dict:
+    """Parameters for one algorithm: {algorithm, params, env, ms, notes}"""
+    target = target_ms / 1000
+    if algorithm == 'scrypt':
+        params, elapsed, notes = calibrate_scrypt(target, max_memory_mb * 1024 * 1024, repeat)
+    elif algorithm == 'pbkdf2_sha256':
+        params, elapsed, notes = calibrate_pbkdf2(target, repeat)
+    else:
+        raise ValueError(f"no calibration for {algorithm}")
+    return {
+        'algorithm': algorithm,
+        'params': params,
+        'env': {
+            'PASSWORD_HASH_ALGORITHM': algorithm,
+            'PASSWORD_HASH_PARAMS': HASHERS[algorithm].encode_params(params),
+        },
+        'ms': round(elapsed * 1000, 2),
+        'notes': notes,
+    }
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pick password hashing parameters for a target latency")
+    parser.add_argument("--algorithm", default="scrypt", choices=sorted(HASHERS) + ["all"])
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS,
+                        help="maximum time of one hash/verify on this machine")
+    parser.add_argument("--max-memory-mb", type=int, default=DEFAULT_MAX_MEMORY_MB,
+                        help="scrypt memory limit per hash (times PASSWORD_HASH_WORKERS per process)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="measurements per candidate")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    algorithms = sorted(HASHERS) if args.algorithm == "all" else [args.algorithm]
+    results = [calibrate(name, args.target_ms, args.max_memory_mb, args.repeat) for name in algorithms]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    for result in results:
+        print(f"{result['algorithm']}: {result['ms']} ms per hash "
+              f"(~{1000 / result['ms']:.0f} logins/s per hashing thread)")
+        for note in result['notes']:
+            print(f"  warning: {note}")
+        for key, value in result['env'].items():
+            print(f"  {key}={value}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,13 @@
 # Konfiguracja Gunicorn dla aplikacji GRAFIKSP4600
 
 import os
+import shutil
 import multiprocessing
 
+# Metryki Prometheus z wielu workerów - każdy proces zapisuje swoje pliki,
+# /metrics agreguje je przy odczycie. Musi być ustawione przed importem aplikacji.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/dev/shm/grafiksp4600-metrics")
+
 # Ścieżka do aplikacji
 bind = "127.0.0.1:8000"
 backlog = 2048
@@ -52,6 +57,20 @@ limit_request_field_size = 8190
 def on_starting(server):
     """Hook wywoływany przy starcie serwera"""
     server.log.info("Gunicorn startuje...")
+    
+    # Wyczyść metryki z poprzedniego uruchomienia
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    """Hook wywoływany po zakończeniu workera"""
+    # Usuń wkład zakończonego workera do gauge'ów typu live*
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
 
 def on_reload(server):
     """Hook wywoływany przy przeładowaniu"""
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for benchmarks, scaling tests and profiling
+Creates the schema exactly as the application does (app.database) and fills
+every table with realistic, deterministic (seed-based) data: employees with
+matching user accounts, the shift schedule, swap and unavailability requests,
+schedule change history, archived requests, drafts, push subscriptions and
+the e-mail whitelist.
+
+Every table uses its own random stream derived from the seed, so changing
+one volume does not change the data of the other tables. Rows are streamed
+into SQLite, so large presets do not need much memory.
+
+Usage:
+    python generate_data.py bench.db                      # "medium" preset
+    python generate_data.py big.db --preset large         # 5 years x 200 employees, 100k audit rows
+    python generate_data.py big.db --preset large --employees 300 --seed 7
+"""
+
+import os
+import json
+import random
+import sqlite3
+import hashlib
+import datetime as dt
+import calendar
+from typing import Dict, Iterator, List, Tuple
+
+FIRST_NAMES = [
+    'Anna', 'Piotr', 'Katarzyna', 'Tomasz', 'Magdalena', 'Paweł', 'Agnieszka', 'Michał',
+    'Joanna', 'Krzysztof', 'Monika', 'Marcin', 'Aleksandra', 'Jakub', 'Ewa', 'Łukasz',
+    'Natalia', 'Mateusz', 'Zofia', 'Bartosz',
+]
+LAST_NAMES = [
+    'Nowak', 'Kowalski', 'Wiśniewski', 'Wójcik', 'Kowalczyk', 'Kamiński', 'Lewandowski',
+    'Zieliński', 'Szymański', 'Woźniak', 'Dąbrowski', 'Kozłowski', 'Jankowski', 'Mazur',
+    'Kwiatkowski', 'Krawczyk', 'Piotrowski', 'Grabowski', 'Nowakowski', 'Pawłowski',
+]
+
+# Shift values as stored by /api/save, with their relative frequency
+SHIFT_WEIGHTS = [
+    ('DNIOWKA', 30), ('NOCKA', 15), ('POPOLUDNIOWKA', 10), ('P 10-22', 3), ('D 9-21', 2), (None, 40),
+]
+# Fewer people work at weekends
+WEEKEND_SHIFT_WEIGHTS = [
+    ('DNIOWKA', 20), ('NOCKA', 10), ('POPOLUDNIOWKA', 5), (None, 65),
+]
+SWAP_STATUSES = [
+    (('PENDING', 'PENDING'), 30), (('ACCEPTED', 'PENDING'), 20),
+    (('ACCEPTED', 'APPROVED'), 35), (('ACCEPTED', 'REJECTED'), 5), (('REJECTED', 'PENDING'), 10),
+]
+UNAVAILABILITY_STATUSES = [('PENDING', 40), ('APPROVED', 45), ('REJECTED', 15)]
+UNAVAILABILITY_REASONS = ['Urlop', 'Szkolenie', 'Sprawy rodzinne', 'Wizyta lekarska', 'Studia', 'Niedyspozycja']
+SWAP_COMMENTS = ['', 'Wesele w rodzinie', 'Wizyta lekarska', 'Egzamin', 'Wyjazd', 'Zamiana (dane testowe)']
+HISTORY_STATUSES = [
+    (('ZATWIERDZONE', 'APPROVED'), 70), (('ODRZUCONE', 'REJECTED'), 15),
+    (('ODRZUCONE_PRZEZ_SZEFA', 'REJECTED'), 15),
+]
+PUSH_SERVICES = [
+    'https://fcm.googleapis.com/fcm/send/',
+    'https://updates.push.services.mozilla.com/wpush/v2/',
+    'https://web.push.apple.com/',
+]
+
+# Password of every generated account (hash computed once, see _password_hash)
+DEFAULT_PASSWORD = "benchmark"
+
+# Volumes: months of schedule x employees, rows of the other tables
+PRESETS = {
+    'small': {
+        'employees': 10, 'admins': 2, 'start': '2025-01', 'months': 2,
+        'swaps': 50, 'unavailability': 10, 'changes': 500, 'history': 100,
+        'drafts': 100, 'push_subscriptions': 5, 'seed': 1,
+    },
+    'medium': {
+        'employees': 60, 'admins': 4, 'start': '2025-01', 'months': 12,
+        'swaps': 2000, 'unavailability': 300, 'changes': 20000, 'history': 3000,
+        'drafts': 1000, 'push_subscriptions': 40, 'seed': 1,
+    },
+    'large': {
+        'employees': 200, 'admins': 8, 'start': '2021-01', 'months': 60,
+        'swaps': 10000, 'unavailability': 2000, 'changes': 100000, 'history': 20000,
+        'drafts': 6000, 'push_subscriptions': 150, 'seed': 1,
+    },
+}
+DEFAULT_PRESET = 'medium'
+DEFAULTS = PRESETS[DEFAULT_PRESET]
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _weighted(rng: random.Random, choices):
+    values = [value for value, _ in choices]
+    weights = [weight for _, weight in choices]
+    return rng.choices(values, weights)[0]
+
+def _table_rng(seed: int, table: str) -> random.Random:
+    """Independent random stream per table"""
+    return random.Random(f"{seed}:{table}")
+
+def _password_hash() -> str:
+    """Hash in the app's current format and cost (registry default) - accounts can log in"""
+    from app.password_utils import hash_password
+    return hash_password(DEFAULT_PASSWORD)
+
+def _timestamp(value: dt.datetime) -> str:
+    return value.strftime(TIMESTAMP_FORMAT)
+
+def employee_names(count: int, rng: random.Random) -> List[str]:
+    """Unique, realistic-looking employee names"""
+    names: List[str] = []
+    seen = set()
+    while len(names) < count:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        if name in seen:
+            name = f"{name} {len(names) + 1}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+def month_dates(start: str, months: int) -> List[dt.date]:
+    """All days of `months` months starting at YYYY-MM"""
+    dates = []
+    for year, month in month_keys(start, months):
+        for day in range(1, calendar.monthrange(year, month)[1] + 1):
+            dates.append(dt.date(year, month, day))
+    return dates
+
+def month_keys(start: str, months: int) -> List[Tuple[int, int]]:
+    year, month = (int(part) for part in start.split('-'))
+    keys = []
+    for _ in range(months):
+        keys.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return keys
+
+def create_schema(db_path: str) -> None:
+    """Create all tables exactly as the application does"""
+    from app import create_app
+    from app.database import init_db, ensure_request_history_table, ensure_whitelist_table
+
+    app = create_app()
+    app.config.update({'DATABASE_PATH': db_path, 'DB_INSTRUMENTATION': False})
+    with app.app_context():
+        init_db()
+        ensure_request_history_table()
+        ensure_whitelist_table()
+
+# ============================================================================
+# ROW GENERATORS (one per table)
+# ============================================================================
+
+class Context:
+    """Data shared by the row generators"""
+
+    def __init__(self, params: Dict, names: List[str], dates: List[dt.date]):
+        self.params = params
+        self.seed = params['seed']
+        self.names = names
+        self.dates = dates
+        self.admins = max(min(params['admins'], len(names)), 1)
+        self.emails = [f"user{index + 1}@example.com" for index in range(len(names))]
+        self.admin_emails = self.emails[:self.admins]
+        self.start_time = dt.datetime.combine(dates[0], dt.time(6, 0))
+        self.span_seconds = (len(dates) - 1) * 86400 + 16 * 3600
+
+    def spread_time(self, index: int, total: int) -> dt.datetime:
+        """index-th of `total` timestamps evenly spread over the whole period"""
+        return self.start_time + dt.timedelta(seconds=self.span_seconds * index // max(total, 1))
+
+    def date_near(self, rng: random.Random, moment: dt.datetime, min_days: int, max_days: int) -> dt.date:
+        """A date a few days after `moment`, clipped to the generated period"""
+        date = moment.date() + dt.timedelta(days=rng.randint(min_days, max_days))
+        return min(max(date, self.dates[0]), self.dates[-1])
+
+def user_rows(ctx: Context) -> Iterator[tuple]:
+    # One account per employee (same name - that is how the app matches them)
+    password_hash = _password_hash()
+    created_at = _timestamp(ctx.start_time)
+    for index, name in enumerate(ctx.names):
+        role = 'ADMIN' if index < ctx.admins else 'USER'
+        yield (ctx.emails[index], name, password_hash, 'EMAIL', role, created_at)
+
+def shift_rows(ctx: Context, employee_ids: Dict[str, int]) -> Iterator[tuple]:
+    rng = _table_rng(ctx.seed, 'shifts')
+    for date in ctx.dates:
+        iso = date.isoformat()
+        weights = WEEKEND_SHIFT_WEIGHTS if date.weekday() >= 5 else SHIFT_WEIGHTS
+        for name in ctx.names:
+            shift_type = _weighted(rng, weights)
+            if shift_type:
+                yield (iso, shift_type, employee_ids[name])
+
+def schedule_change_rows(ctx: Context) -> Iterator[tuple]:
+    # Audit log in time order; edits mostly concern the next few weeks
+    rng = _table_rng(ctx.seed, 'schedule_changes')
+    total = ctx.params['changes']
+    for index in range(total):
+        created_at = ctx.spread_time(index, total)
+        yield (
+            ctx.date_near(rng, created_at, -3, 30).isoformat(), rng.choice(ctx.names),
+            _weighted(rng, SHIFT_WEIGHTS) or '', _weighted(rng, SHIFT_WEIGHTS) or '',
+            rng.choice(ctx.admin_emails), _timestamp(created_at),
+        )
+
+def swap_rows(ctx: Context) -> Iterator[tuple]:
+    rng = _table_rng(ctx.seed, 'swap_requests')
+    total = ctx.params['swaps']
+    for index in range(total):
+        requester_index = rng.randrange(len(ctx.names))
+        recipient = rng.choice(ctx.names)
+        recipient_status, boss_status = _weighted(rng, SWAP_STATUSES)
+        created_at = ctx.spread_time(index, total)
+        yield (
+            requester_index + 1,
+            ctx.date_near(rng, created_at, 1, 21).isoformat(), ctx.date_near(rng, created_at, 1, 21).isoformat(),
+            ctx.names[requester_index], recipient, rng.choice(SWAP_COMMENTS),
+            recipient_status, boss_status, _timestamp(created_at),
+        )
+
+def unavailability_rows(ctx: Context, employee_ids: Dict[str, int]) -> Iterator[tuple]:
+    # At most one request per employee and month (enforced by the app)
+    rng = _table_rng(ctx.seed, 'unavailability_requests')
+    months = month_keys(ctx.params['start'], ctx.params['months'])
+    pairs = [(name, month) for month in months for name in ctx.names]
+    total = min(ctx.params['unavailability'], len(pairs))
+    chosen = sorted(rng.sample(range(len(pairs)), total))
+    for index, pair_index in enumerate(chosen):
+        name, (year, month) = pairs[pair_index]
+        days_in_month = calendar.monthrange(year, month)[1]
+        days = sorted(rng.sample(range(1, days_in_month + 1), rng.randint(1, 6)))
+        selected = ','.join(f"{year}-{month:02d}-{day:02d}" for day in days)
+        # Requests are submitted in the month before
+        created_at = dt.datetime(year, month, 1, 12, 0) - dt.timedelta(days=rng.randint(3, 25))
+        yield (
+            employee_ids[name], f"{year}-{month:02d}", rng.choice(UNAVAILABILITY_REASONS), selected,
+            _weighted(rng, UNAVAILABILITY_STATUSES), _timestamp(max(created_at, ctx.start_time)),
+        )
+
+def request_history_rows(ctx: Context) -> Iterator[tuple]:
+    rng = _table_rng(ctx.seed, 'request_history')
+    total = ctx.params['history']
+    for index in range(total):
+        created_at = ctx.spread_time(index, total)
+        archived_at = created_at + dt.timedelta(hours=rng.randint(2, 24 * 14))
+        final_status, admin_action = _weighted(rng, HISTORY_STATUSES)
+        archived_by = rng.randint(1, ctx.admins)
+        if rng.random() < 0.75:
+            yield (
+                index + 1, 'swap', rng.choice(ctx.names), rng.choice(ctx.names),
+                ctx.date_near(rng, created_at, 1, 21).isoformat(), ctx.date_near(rng, created_at, 1, 21).isoformat(),
+                None, None, rng.choice(SWAP_COMMENTS), final_status, admin_action, None,
+                _timestamp(created_at), _timestamp(archived_at), archived_by,
+            )
+        else:
+            month = ctx.date_near(rng, created_at, 5, 40)
+            yield (
+                index + 1, 'unavailability', rng.choice(ctx.names), None, None, None,
+                month.strftime('%Y-%m'), rng.choice(UNAVAILABILITY_REASONS), None,
+                final_status, admin_action, None, _timestamp(created_at), _timestamp(archived_at), archived_by,
+            )
+
+def draft_rows(ctx: Context, employee_ids: Dict[str, int]) -> Iterator[tuple]:
+    # Unpublished drafts of the admins, for the last generated days
+    rng = _table_rng(ctx.seed, 'draft_shifts')
+    total = ctx.params['drafts']
+    cells = [(date, name) for date in reversed(ctx.dates) for name in ctx.names]
+    created_at = _timestamp(ctx.start_time + dt.timedelta(seconds=ctx.span_seconds))
+    for index in range(min(total, len(cells) * ctx.admins)):
+        admin_id = index % ctx.admins + 1
+        date, name = cells[index // ctx.admins]
+        yield (date.isoformat(), _weighted(rng, SHIFT_WEIGHTS) or '', employee_ids[name], admin_id,
+               created_at, created_at)
+
+def push_subscription_rows(ctx: Context) -> Iterator[tuple]:
+    # Subscription JSON in the browser PushSubscription.toJSON() shape
+    rng = _table_rng(ctx.seed, 'push_subscriptions')
+    total = min(ctx.params['push_subscriptions'], len(ctx.names))
+    for user_id in sorted(rng.sample(range(1, len(ctx.names) + 1), total)):
+        token = hashlib.sha256(f"{ctx.seed}:{user_id}".encode()).hexdigest()
+        subscription = {
+            'endpoint': rng.choice(PUSH_SERVICES) + token,
+            'expirationTime': None,
+            'keys': {'p256dh': 'B' + token * 2, 'auth': token[:22]},
+        }
+        created_at = _timestamp(ctx.start_time)
+        yield (user_id, json.dumps(subscription), hashlib.sha256(subscription['endpoint'].encode()).hexdigest(),
+               created_at, created_at)
+
+def whitelist_rows(ctx: Context) -> Iterator[tuple]:
+    added_at = _timestamp(ctx.start_time)
+    for email in ctx.emails:
+        yield (email, 1, added_at)
+
+# ============================================================================
+# GENERATION
+# ============================================================================
+
+INSERTS = {
+    'users': """INSERT INTO users (email, name, password_hash, login_type, role, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+    'shifts': "INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, ?)",
+    'schedule_changes': """INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift,
+                                                        changed_by, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+    'swap_requests': """INSERT INTO swap_requests (requester_user_id, from_date, to_date, from_employee,
+                                                  to_employee, comment_requester, recipient_status,
+                                                  boss_status, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    'unavailability_requests': """INSERT INTO unavailability_requests (employee_id, month_year, reason,
+                                                                      selected_days, status, created_at)
+                                  VALUES (?, ?, ?, ?, ?, ?)""",
+    'request_history': """INSERT INTO request_history (original_id, type, from_employee, to_employee,
+                                                      from_date, to_date, month_year, reason,
+                                                      comment_requester, final_status, admin_action,
+                                                      admin_comment, created_at, archived_at, archived_by)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    'draft_shifts': """INSERT INTO draft_shifts (date, shift_type, employee_id, created_by, created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+    'push_subscriptions': """INSERT INTO push_subscriptions (user_id, subscription_data, endpoint_hash,
+                                                            created_at, last_seen)
+                             VALUES (?, ?, ?, ?, ?)""",
+    'whitelist_emails': "INSERT OR IGNORE INTO whitelist_emails (email, added_by, added_at) VALUES (?, ?, ?)",
+}
+
+def generate(db_path: str, preset: str = DEFAULT_PRESET, **overrides) -> Dict:
+    """Populate a new database, returns row counts per table
+
+    Volumes come from PRESETS[preset], any key can be overridden
+    (e.g. ``generate(path, employees=300, seed=7)``). The same parameters
+    always produce the same data, so results are comparable between runs
+    and machines.
+    """
+    unknown = set(overrides) - set(PRESETS[preset])
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    params = dict(PRESETS[preset], **overrides)
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    create_schema(db_path)
+
+    names = employee_names(params['employees'], _table_rng(params['seed'], 'employees'))
+    ctx = Context(params, names, month_dates(params['start'], params['months']))
+
+    conn = sqlite3.connect(db_path)
+    try:
+        # Bulk load: no fsync per transaction, the file is recreated on failure anyway
+        conn.execute("PRAGMA synchronous=OFF")
+
+        conn.executemany("INSERT INTO employees (name) VALUES (?)", [(name,) for name in names])
+        employee_ids = {name: emp_id for emp_id, name in conn.execute("SELECT id, name FROM employees")}
+
+        conn.executemany(INSERTS['users'], user_rows(ctx))
+        conn.executemany(INSERTS['whitelist_emails'], whitelist_rows(ctx))
+        # Emails imported from WHITELIST_EMAILS by ensure_whitelist_table() carry the current time
+        conn.execute("UPDATE whitelist_emails SET added_at = ?", (_timestamp(ctx.start_time),))
+        conn.executemany(INSERTS['shifts'], shift_rows(ctx, employee_ids))
+        conn.executemany(INSERTS['schedule_changes'], schedule_change_rows(ctx))
+        conn.executemany(INSERTS['swap_requests'], swap_rows(ctx))
+        conn.executemany(INSERTS['unavailability_requests'], unavailability_rows(ctx, employee_ids))
+        conn.executemany(INSERTS['request_history'], request_history_rows(ctx))
+        conn.executemany(INSERTS['draft_shifts'], draft_rows(ctx, employee_ids))
+        conn.executemany(INSERTS['push_subscriptions'], push_subscription_rows(ctx))
+        conn.commit()
+
+        summary = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                   for table in ['employees'] + list(INSERTS)}
+    finally:
+        conn.close()
+
+    summary.update({
+        'admin_ids': list(range(1, ctx.admins + 1)),
+        'first_date': ctx.dates[0].isoformat(),
+        'last_date': ctx.dates[-1].isoformat(),
+    })
+    return summary
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic Grafik SP4600 database")
+    parser.add_argument("db_path", help="output SQLite file (overwritten)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default=DEFAULT_PRESET,
+                        help=f"data volume (default: {DEFAULT_PRESET})")
+    parser.add_argument("--employees", type=int)
+    parser.add_argument("--admins", type=int)
+    parser.add_argument("--start", help="first month, YYYY-MM")
+    parser.add_argument("--months", type=int, help="months of schedule")
+    parser.add_argument("--swaps", type=int, help="swap_requests rows")
+    parser.add_argument("--unavailability", type=int, help="unavailability_requests rows")
+    parser.add_argument("--changes", type=int, help="schedule_changes rows")
+    parser.add_argument("--history", type=int, help="request_history rows")
+    parser.add_argument("--drafts", type=int, help="draft_shifts rows")
+    parser.add_argument("--push-subscriptions", type=int, help="push_subscriptions rows")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    overrides = {key: value for key, value in vars(args).items()
+                 if key not in ('db_path', 'preset') and value is not None}
+    started = time.time()
+    summary = generate(args.db_path, preset=args.preset, **overrides)
+    for key, value in summary.items():
+        print(f"{key:>24}: {value}")
+    print(f"Generated in {time.time() - started:.1f} s, {os.path.getsize(args.db_path) / 1e6:.1f} MB")
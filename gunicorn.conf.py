@@ -1,16 +1,38 @@
 # Konfiguracja Gunicorn dla aplikacji GRAFIKSP4600
 
 import os
+import shutil
 import multiprocessing
 
+# Metryki Prometheus z wielu workerów - każdy proces zapisuje swoje pliki,
+# /metrics agreguje je przy odczycie. Musi być ustawione przed importem aplikacji.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/dev/shm/grafiksp4600-metrics")
+# Wyczyść metryki z poprzedniego uruchomienia - tutaj, a nie w on_starting: przy preload_app
+# aplikacja (i jej pliki metryk) ładuje się przed hookami, a /dev/shm jest pusty po restarcie
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Liczniki limitów żądań wspólne dla workerów (SQLite w pamięci współdzielonej,
+# app/rate_limit.py) - bez tego każdy worker liczy osobno, a limit mnoży się przez liczbę workerów
+os.environ.setdefault("RATELIMIT_STORAGE_URI", "sqlite:////dev/shm/grafiksp4600-ratelimit.db")
+
+# gunicorn nasłuchuje lokalnie za nginx - adres klienta z X-Forwarded-For (jeden zaufany serwer proxy),
+# inaczej wszyscy anonimowi klienci dzielą limit adresu 127.0.0.1
+os.environ.setdefault("PROXY_FIX_HOPS", "1")
+
 # Ścieżka do aplikacji
 bind = "127.0.0.1:8000"
 backlog = 2048
 
-# Liczba workerów
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
-worker_connections = 1000
+# Model workerów (GUNICORN_WORKER_CLASS): gthread (domyślnie), gevent albo sync.
+# Wszystkie zapisy trafiają do jednego pliku SQLite, więc kolejne procesy dodają
+# głównie konflikty blokad - lepiej mniej procesów z wątkami. Zapisy w procesie
+# szereguje wątek zapisujący (DB_WRITE_QUEUE w app/database.py).
+# Pomiary: PERFORMANCE_OPTIMIZATIONS.md, sekcja "Worker Model".
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("GUNICORN_WORKERS", max(2, min(multiprocessing.cpu_count(), 4))))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))  # gthread
+worker_connections = 1000  # gevent - jednoczesne połączenia na workera
 max_requests = 1000
 max_requests_jitter = 50
 
@@ -33,7 +55,9 @@ group = "grafiksp4600"
 chdir = "/opt/grafiksp4600"
 
 # Preload aplikacji
-preload_app = True
+# gevent musi podmienić moduły (monkey patching) przed importem aplikacji,
+# więc z gevent aplikacja ładuje się w każdym workerze osobno
+preload_app = worker_class != "gevent"
 
 # Restart workerów
 max_requests = 1000
@@ -53,6 +77,15 @@ def on_starting(server):
     """Hook wywoływany przy starcie serwera"""
     server.log.info("Gunicorn startuje...")
 
+def child_exit(server, worker):
+    """Hook wywoływany po zakończeniu workera"""
+    # Usuń wkład zakończonego workera do gauge'ów typu live*
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
+
 def on_reload(server):
     """Hook wywoływany przy przeładowaniu"""
     server.log.info("Gunicorn przeładowuje...")
@@ -89,24 +122,22 @@ def on_exit(server):
     """Hook wywoływany przy wyjściu"""
     server.log.info("Gunicorn kończy pracę")
 
-# Konfiguracja dla różnych środowisk
+# Konfiguracja dla różnych środowisk - liczba workerów zawsze z GUNICORN_WORKERS
+# (wyżej); więcej procesów to więcej wątków zapisujących walczących o blokadę SQLite
 if os.getenv("FLASK_ENV") == "production":
-    # Produkcja - więcej workerów, mniej logowania
-    workers = multiprocessing.cpu_count() * 2 + 1
+    # Produkcja - mniej logowania
     loglevel = "warning"
     accesslog = None  # Wyłącz logi dostępu w produkcji
     max_requests = 2000
     max_requests_jitter = 100
     
 elif os.getenv("FLASK_ENV") == "testing":
-    # Testy - mniej workerów, więcej logowania
-    workers = 1
+    # Testy - więcej logowania
     loglevel = "debug"
     max_requests = 100
     
 else:
     # Development - domyślne ustawienia
-    workers = 2
     loglevel = "info"
     reload = True
     reload_extra_files = [
@@ -2,13 +2,27 @@
 """
 SQLite Exporter dla Prometheus
 Eksportuje metryki z bazy danych SQLite aplikacji GRAFIKSP4600
+
+Metryki zbierane przy scrapie są tanie (PRAGMA page_count/freelist_count,
+rozmiar pliku WAL, szacunki liczby rekordów z sqlite_stat1 / sqlite_sequence)
+i buforowane przez METRICS_CACHE_SECONDS. Pełne odczyty pliku bazy
+(PRAGMA quick_check / integrity_check) działają w wątku w tle, według
+wolnego harmonogramu - nie konkurują przy każdym scrapie z czytelnikami aplikacji.
+
+Zmienne środowiskowe:
+    DB_PATH                   - ścieżka do bazy (domyślnie /app/db/app.db)
+    EXPORTER_PORT             - port HTTP (domyślnie 9114)
+    METRICS_CACHE_SECONDS     - jak długo wyniki scrapu są aktualne (domyślnie 30)
+    QUICK_CHECK_INTERVAL      - co ile sekund PRAGMA quick_check (domyślnie 3600, 0 = wyłączone)
+    INTEGRITY_CHECK_INTERVAL  - co ile sekund PRAGMA integrity_check (domyślnie 86400, 0 = wyłączone)
 """
 
 import os
 import sqlite3
 import time
-from prometheus_client import start_http_server, Gauge, Counter, Histogram, Summary
-from flask import Flask, request, jsonify
+import threading
+from prometheus_client import Gauge, Counter, Histogram
+from flask import Flask, jsonify
 import logging
 
 # Konfiguracja logowania
@@ -19,156 +33,275 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Metryki Prometheus
-DB_SIZE = Gauge('sqlite_database_size_bytes', 'Rozmiar bazy danych w bajtach')
+DB_SIZE = Gauge('sqlite_database_size_bytes', 'Rozmiar bazy danych w bajtach (plik główny + WAL)')
 DB_TABLES = Gauge('sqlite_tables_total', 'Liczba tabel w bazie danych')
-DB_RECORDS = Gauge('sqlite_records_total', 'Liczba rekordów w tabeli', ['table'])
-DB_CONNECTIONS = Gauge('sqlite_connections_active', 'Liczba aktywnych połączeń')
-DB_QUERY_DURATION = Histogram('sqlite_query_duration_seconds', 'Czas wykonania zapytań', ['query_type'])
+DB_RECORDS = Gauge('sqlite_records_total',
+                   'Szacowana liczba rekordów w tabeli (sqlite_stat1, sqlite_sequence lub MAX(rowid))', ['table'])
+DB_CONNECTIONS = Gauge('sqlite_connections_active', 'Czy baza jest dostępna do odczytu (1/0)')
+DB_PAGES = Gauge('sqlite_page_count', 'Liczba stron bazy danych')
+DB_PAGE_SIZE = Gauge('sqlite_page_size_bytes', 'Rozmiar strony bazy danych')
+DB_FREELIST = Gauge('sqlite_freelist_pages', 'Liczba nieużywanych stron (do odzyskania przez VACUUM)')
+DB_WAL_SIZE = Gauge('sqlite_wal_size_bytes', 'Rozmiar pliku WAL')
+DB_QUERY_DURATION = Histogram('sqlite_query_duration_seconds', 'Czas wykonania zapytań', ['query_type'],
+                              buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300))
 DB_ERRORS = Counter('sqlite_errors_total', 'Liczba błędów bazy danych', ['error_type'])
+INTEGRITY_OK = Gauge('sqlite_integrity_ok', 'Wynik ostatniego sprawdzenia integralności (1 = ok)', ['check'])
+INTEGRITY_LAST_RUN = Gauge('sqlite_integrity_last_run_timestamp_seconds',
+                           'Czas zakończenia ostatniego sprawdzenia integralności', ['check'])
+
+# Rodzaje sprawdzeń integralności: nazwa -> PRAGMA
+INTEGRITY_CHECKS = {
+    'quick': 'quick_check',
+    'full': 'integrity_check',
+}
+
+# Maksymalna liczba komunikatów błędów zapamiętywanych z integrity_check
+MAX_CHECK_MESSAGES = 20
+
+# Opóźnienie pierwszego quick_check po starcie eksportera (sekundy)
+STARTUP_CHECK_DELAY = 60
 
 # Flask app
 app = Flask(__name__)
 
 class SQLiteExporter:
     """Eksporter metryk SQLite"""
-    
-    def __init__(self, db_path):
+
+    def __init__(self, db_path, cache_seconds=30, quick_check_interval=3600, integrity_check_interval=86400):
         self.db_path = db_path
         self.last_check = 0
-        self.check_interval = 30  # sekundy
-        
+        self.check_interval = cache_seconds  # sekundy
+        self.quick_check_interval = quick_check_interval
+        self.integrity_check_interval = integrity_check_interval
+        self.cached_info = {}
+        self.check_results = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def connect(self):
+        """Połączenie tylko do odczytu - nie tworzy pliku bazy i nie blokuje zapisu"""
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=1.0)
+        conn.execute("PRAGMA busy_timeout=1000")
+        return conn
+
     def get_db_size(self):
-        """Pobierz rozmiar bazy danych"""
+        """Pobierz rozmiar bazy danych (plik główny + WAL, tylko stat)"""
         try:
-            if os.path.exists(self.db_path):
-                size = os.path.getsize(self.db_path)
-                DB_SIZE.set(size)
-                return size
-            else:
-                DB_SIZE.set(0)
-                return 0
+            size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+            wal_path = f"{self.db_path}-wal"
+            wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+            DB_WAL_SIZE.set(wal_size)
+            DB_SIZE.set(size + wal_size)
+            return size + wal_size
         except Exception as e:
             logger.error(f"Błąd podczas pobierania rozmiaru bazy: {e}")
             DB_ERRORS.labels(error_type="size_check").inc()
             return 0
-    
+
+    @staticmethod
+    def get_page_stats(conn):
+        """Statystyki stron z nagłówka bazy - bez czytania tabel"""
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        DB_PAGES.set(page_count)
+        DB_PAGE_SIZE.set(page_size)
+        DB_FREELIST.set(freelist)
+        return {'page_count': page_count, 'page_size': page_size, 'freelist_count': freelist}
+
+    @staticmethod
+    def estimate_row_counts(conn):
+        """Szacunkowa liczba rekordów w tabelach bez skanowania
+
+        Kolejno: sqlite_stat1 (po ANALYZE), sqlite_sequence (tabele
+        AUTOINCREMENT) i MAX(rowid) - jedno wyszukiwanie w B-drzewie.
+        Dwa ostatnie nie uwzględniają usuniętych rekordów.
+        """
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+        existing = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name IN ('sqlite_stat1', 'sqlite_sequence')")}
+
+        estimates = {}
+        if 'sqlite_stat1' in existing:
+            for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+                try:
+                    rows = int(str(stat).split()[0])
+                except (ValueError, IndexError):
+                    continue
+                estimates[table] = max(estimates.get(table, 0), rows)
+        if 'sqlite_sequence' in existing:
+            for table, seq in conn.execute("SELECT name, seq FROM sqlite_sequence"):
+                estimates.setdefault(table, seq)
+
+        for table in tables:
+            if table not in estimates:
+                try:
+                    estimates[table] = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+                except sqlite3.Error:
+                    estimates[table] = 0  # np. tabela WITHOUT ROWID
+        return {table: estimates.get(table, 0) for table in tables}
+
     def get_table_info(self):
-        """Pobierz informacje o tabelach"""
+        """Pobierz informacje o tabelach (szacunki, bez COUNT(*))"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Pobierz listę tabel
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = cursor.fetchall()
-            DB_TABLES.set(len(tables))
-            
-            # Pobierz liczbę rekordów w każdej tabeli
-            for table in tables:
-                table_name = table[0]
-                try:
-                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                    count = cursor.fetchone()[0]
-                    DB_RECORDS.labels(table=table_name).set(count)
-                except Exception as e:
-                    logger.warning(f"Nie można policzyć rekordów w tabeli {table_name}: {e}")
-                    DB_RECORDS.labels(table=table_name).set(0)
-            
-            conn.close()
-            return len(tables)
-            
+            conn = self.connect()
+            try:
+                counts = self.estimate_row_counts(conn)
+            finally:
+                conn.close()
+
+            DB_TABLES.set(len(counts))
+            for table_name, count in counts.items():
+                DB_RECORDS.labels(table=table_name).set(count)
+            return counts
+
         except Exception as e:
             logger.error(f"Błąd podczas pobierania informacji o tabelach: {e}")
             DB_ERRORS.labels(error_type="table_info").inc()
-            return 0
-    
-    def get_connection_info(self):
-        """Pobierz informacje o połączeniach"""
+            return {}
+
+    def update_metrics(self, force=False):
+        """Zaktualizuj tanie metryki (co najwyżej raz na check_interval)"""
+        with self._lock:
+            current_time = time.time()
+
+            # Sprawdź czy minął interwał - między scrapami zwracane są wyniki z bufora
+            if not force and current_time - self.last_check < self.check_interval:
+                return self.cached_info
+
+            start_time = time.perf_counter()
+            info = {'size_bytes': self.get_db_size()}
+            try:
+                conn = self.connect()
+                try:
+                    info.update(self.get_page_stats(conn))
+                    info['tables'] = self.estimate_row_counts(conn)
+                finally:
+                    conn.close()
+                DB_CONNECTIONS.set(1)
+            except Exception as e:
+                logger.error(f"Błąd podczas zbierania metryk SQLite: {e}")
+                DB_ERRORS.labels(error_type="metrics").inc()
+                DB_CONNECTIONS.set(0)
+                info['tables'] = {}
+
+            DB_TABLES.set(len(info['tables']))
+            for table_name, count in info['tables'].items():
+                DB_RECORDS.labels(table=table_name).set(count)
+
+            DB_QUERY_DURATION.labels(query_type="metrics").observe(time.perf_counter() - start_time)
+            info['last_update'] = current_time
+            self.cached_info = info
+            self.last_check = current_time
+            return info
+
+    def run_integrity_check(self, kind):
+        """Uruchom PRAGMA quick_check / integrity_check (czyta cały plik bazy)"""
+        pragma = INTEGRITY_CHECKS[kind]
+        start_time = time.perf_counter()
         try:
-            # W SQLite nie ma prawdziwych połączeń, ale możemy symulować
-            # na podstawie aktywnych procesów
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Sprawdź czy baza jest dostępna
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            
-            # Symuluj liczbę połączeń (w rzeczywistości zawsze 1 dla SQLite)
-            DB_CONNECTIONS.set(1)
-            
-            conn.close()
-            return 1
-            
+            conn = self.connect()
+            try:
+                messages = [row[0] for row in conn.execute(f"PRAGMA {pragma}({MAX_CHECK_MESSAGES})")]
+            finally:
+                conn.close()
+            ok = messages == ['ok']
         except Exception as e:
-            logger.error(f"Błąd podczas sprawdzania połączeń: {e}")
-            DB_ERRORS.labels(error_type="connection_check").inc()
-            DB_CONNECTIONS.set(0)
-            return 0
-    
+            logger.error(f"Błąd podczas PRAGMA {pragma}: {e}")
+            DB_ERRORS.labels(error_type=f"{kind}_check").inc()
+            messages, ok = [str(e)], False
+
+        duration = time.perf_counter() - start_time
+        finished_at = time.time()
+        DB_QUERY_DURATION.labels(query_type=f"{kind}_check").observe(duration)
+        INTEGRITY_OK.labels(check=kind).set(1 if ok else 0)
+        INTEGRITY_LAST_RUN.labels(check=kind).set(finished_at)
+
+        result = {'ok': ok, 'messages': messages, 'duration': round(duration, 3), 'finished_at': finished_at}
+        self.check_results[kind] = result
+        if ok:
+            logger.info(f"PRAGMA {pragma}: ok ({duration:.1f}s)")
+        else:
+            logger.error(f"PRAGMA {pragma} wykrył problemy: {messages}")
+        return result
+
     def check_database_health(self):
-        """Sprawdź zdrowie bazy danych"""
+        """Sprawdź zdrowie bazy danych - tanio: dostępność i wynik ostatnich sprawdzeń"""
         try:
-            start_time = time.time()
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Sprawdź integralność bazy
-            cursor.execute("PRAGMA integrity_check")
-            integrity = cursor.fetchone()
-            
-            # Sprawdź wersję SQLite
-            cursor.execute("SELECT sqlite_version()")
-            version = cursor.fetchone()
-            
-            # Sprawdź ustawienia
-            cursor.execute("PRAGMA foreign_keys")
-            foreign_keys = cursor.fetchone()
-            
-            conn.close()
-            
-            duration = time.time() - start_time
-            DB_QUERY_DURATION.labels(query_type="health_check").observe(duration)
-            
-            logger.info(f"Sprawdzono zdrowie bazy danych w {duration:.3f}s")
-            return True
-            
+            if not os.path.exists(self.db_path):
+                return False
+            conn = self.connect()
+            try:
+                conn.execute("SELECT 1").fetchone()
+            finally:
+                conn.close()
+            return all(result['ok'] for result in self.check_results.values())
+
         except Exception as e:
             logger.error(f"Błąd podczas sprawdzania zdrowia bazy: {e}")
             DB_ERRORS.labels(error_type="health_check").inc()
             return False
-    
-    def update_metrics(self):
-        """Zaktualizuj wszystkie metryki"""
-        current_time = time.time()
-        
-        # Sprawdź czy minął interwał
-        if current_time - self.last_check < self.check_interval:
+
+    # ------------------------------------------------------------------
+    # Harmonogram sprawdzeń integralności (wątek w tle)
+    # ------------------------------------------------------------------
+
+    def _intervals(self):
+        return {kind: interval for kind, interval in (
+            ('quick', self.quick_check_interval), ('full', self.integrity_check_interval)) if interval > 0}
+
+    def start_background_checks(self, initial_delay=STARTUP_CHECK_DELAY):
+        """Uruchom wątek wykonujący quick_check / integrity_check według harmonogramu"""
+        intervals = self._intervals()
+        if not intervals or (self._thread and self._thread.is_alive()):
             return
-        
-        logger.info("Aktualizuję metryki SQLite...")
-        
-        # Pobierz metryki
-        self.get_db_size()
-        self.get_table_info()
-        self.get_connection_info()
-        self.check_database_health()
-        
-        self.last_check = current_time
-        logger.info("Metryki SQLite zaktualizowane")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._check_loop, args=(intervals, initial_delay),
+                                        name="sqlite-integrity-checks", daemon=True)
+        self._thread.start()
+        logger.info(f"Sprawdzenia integralności w tle: {intervals}")
+
+    def stop_background_checks(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _check_loop(self, intervals, initial_delay):
+        now = time.time()
+        # Pierwszy quick_check wkrótce po starcie, pełne sprawdzenie po pełnym interwale
+        next_due = {kind: now + (initial_delay if kind == 'quick' else interval)
+                    for kind, interval in intervals.items()}
+
+        while not self._stop.wait(max(min(next_due.values()) - time.time(), 0)):
+            now = time.time()
+            due = [kind for kind, at in next_due.items() if at <= now]
+            # integrity_check obejmuje quick_check - nie uruchamiaj obu naraz
+            if 'full' in due:
+                self.run_integrity_check('full')
+                due = ['full'] + (['quick'] if 'quick' in due else [])
+            elif 'quick' in due:
+                self.run_integrity_check('quick')
+            for kind in due:
+                next_due[kind] = time.time() + intervals[kind]
 
 # Inicjalizacja eksportera
 db_path = os.getenv('DB_PATH', '/app/db/app.db')
-exporter = SQLiteExporter(db_path)
+exporter = SQLiteExporter(
+    db_path,
+    cache_seconds=float(os.getenv('METRICS_CACHE_SECONDS', '30')),
+    quick_check_interval=float(os.getenv('QUICK_CHECK_INTERVAL', '3600')),
+    integrity_check_interval=float(os.getenv('INTEGRITY_CHECK_INTERVAL', '86400')),
+)
 
 @app.route('/')
 def index():
     """Strona główna"""
     return jsonify({
         'name': 'SQLite Exporter',
-        'version': '1.0.0',
-        'database': db_path,
+        'version': '1.1.0',
+        'database': exporter.db_path,
         'endpoints': {
             '/': 'Ta strona',
             '/metrics': 'Metryki Prometheus',
@@ -180,9 +313,9 @@ def index():
 @app.route('/metrics')
 def metrics():
     """Endpoint z metrykami Prometheus"""
-    # Zaktualizuj metryki
+    # Zaktualizuj metryki (jeśli bufor jest nieaktualny)
     exporter.update_metrics()
-    
+
     # Zwróć metryki w formacie Prometheus
     from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
     return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
@@ -192,15 +325,16 @@ def health():
     """Health check endpoint"""
     try:
         # Sprawdź czy baza istnieje
-        if not os.path.exists(db_path):
+        if not os.path.exists(exporter.db_path):
             return jsonify({'status': 'unhealthy', 'error': 'Database file not found'}), 503
-        
-        # Sprawdź zdrowie bazy
+
+        # Sprawdź zdrowie bazy (dostępność + wynik ostatnich sprawdzeń integralności)
         if exporter.check_database_health():
-            return jsonify({'status': 'healthy'}), 200
+            return jsonify({'status': 'healthy', 'checks': exporter.check_results}), 200
         else:
-            return jsonify({'status': 'unhealthy', 'error': 'Database health check failed'}), 503
-            
+            return jsonify({'status': 'unhealthy', 'error': 'Database health check failed',
+                            'checks': exporter.check_results}), 503
+
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         return jsonify({'status': 'unhealthy', 'error': str(e)}), 503
@@ -209,57 +343,42 @@ def health():
 def info():
     """Informacje o bazie danych"""
     try:
-        if not os.path.exists(db_path):
+        if not os.path.exists(exporter.db_path):
             return jsonify({'error': 'Database file not found'}), 404
-        
-        # Pobierz podstawowe informacje
-        size = exporter.get_db_size()
-        tables = exporter.get_table_info()
-        
-        # Pobierz szczegółowe informacje o tabelach
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        table_names = [row[0] for row in cursor.fetchall()]
-        
-        table_info = {}
-        for table in table_names:
-            try:
-                cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                count = cursor.fetchone()[0]
-                table_info[table] = count
-            except:
-                table_info[table] = 0
-        
-        conn.close()
-        
+
+        info = exporter.update_metrics()
+
         return jsonify({
-            'database_path': db_path,
-            'size_bytes': size,
-            'tables_count': tables,
-            'tables': table_info,
-            'last_update': time.time()
+            'database_path': exporter.db_path,
+            'size_bytes': info.get('size_bytes', 0),
+            'page_count': info.get('page_count'),
+            'freelist_count': info.get('freelist_count'),
+            'tables_count': len(info.get('tables', {})),
+            'tables': info.get('tables', {}),
+            'tables_are_estimates': True,
+            'integrity_checks': exporter.check_results,
+            'last_update': info.get('last_update')
         })
-        
+
     except Exception as e:
         logger.error(f"Error getting database info: {e}")
         return jsonify({'error': str(e)}), 500
 
 def main():
     """Główna funkcja"""
-    logger.info(f"Uruchamiam SQLite Exporter dla bazy: {db_path}")
-    
+    logger.info(f"Uruchamiam SQLite Exporter dla bazy: {exporter.db_path}")
+
     # Sprawdź czy baza istnieje
-    if not os.path.exists(db_path):
-        logger.warning(f"Plik bazy danych nie istnieje: {db_path}")
-    
-    # Uruchom serwer HTTP dla metryk Prometheus
-    start_http_server(9114)
-    logger.info("Serwer HTTP uruchomiony na porcie 9114")
-    
-    # Uruchom Flask app
-    app.run(host='0.0.0.0', port=9114, debug=False)
+    if not os.path.exists(exporter.db_path):
+        logger.warning(f"Plik bazy danych nie istnieje: {exporter.db_path}")
+
+    # Sprawdzenia integralności w tle
+    exporter.start_background_checks()
+
+    # Uruchom Flask app - /metrics obsługuje ten sam serwer
+    port = int(os.getenv('EXPORTER_PORT', '9114'))
+    logger.info(f"Serwer HTTP uruchomiony na porcie {port}")
+    app.run(host='0.0.0.0', port=port, debug=False)
 
 if __name__ == '__main__':
     main()
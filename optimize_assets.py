@@ -1,56 +1,299 @@
 #!/usr/bin/env python3
 """
 Asset optimization script for better performance
-Minifies CSS and JavaScript files, optimizes images
+Minifies CSS and JavaScript files (tokenizer-based, string/regex safe),
+writes .gz/.br variants and reports per-bundle sizes
+
+Usage:
+    python optimize_assets.py            # minify + compress static/
+    python optimize_assets.py --report   # size report only
+    python optimize_assets.py --precache # regenerate sw.js precache list only
 """
 
 import os
 import re
 import gzip
+import json
 import shutil
+import hashlib
 from pathlib import Path
 
-def minify_css(css_content):
-    """Minify CSS by removing unnecessary whitespace and comments"""
-    # Remove comments
-    css_content = re.sub(r'/\*.*?\*/', '', css_content, flags=re.DOTALL)
-    
-    # Remove unnecessary whitespace
-    css_content = re.sub(r'\s+', ' ', css_content)
-    css_content = re.sub(r';\s*}', '}', css_content)
-    css_content = re.sub(r'{\s*', '{', css_content)
-    css_content = re.sub(r';\s*', ';', css_content)
-    css_content = re.sub(r':\s*', ':', css_content)
-    css_content = re.sub(r',\s*', ',', css_content)
-    
-    # Remove trailing semicolons before closing braces
-    css_content = re.sub(r';(\s*})', r'\1', css_content)
-    
-    return css_content.strip()
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# ============================================================================
+# TOKENIZER-BASED MINIFICATION
+# ============================================================================
+
+# Keywords after which a slash starts a regex literal, not a division
+REGEX_PRECEDING_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+
+def _is_ident_char(ch):
+    """Check if character can be part of a JS identifier or number"""
+    return ch.isalnum() or ch in '_$' or ord(ch) > 127
+
+def _scan_string(src, i):
+    """Return index just past a quoted string starting at src[i]"""
+    quote = src[i]
+    i += 1
+    while i < len(src):
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+            continue
+        i += 1
+        if ch == quote:
+            break
+    return i
+
+def _scan_template(src, i):
+    """Return index just past a template literal starting at src[i]"""
+    i += 1
+    while i < len(src):
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+        elif ch == '`':
+            return i + 1
+        elif src.startswith('${', i):
+            i = _scan_braced_code(src, i + 2)
+        else:
+            i += 1
+    return i
+
+def _scan_braced_code(src, i):
+    """Return index just past the '}' closing an embedded ${...} expression"""
+    depth = 0
+    while i < len(src):
+        ch = src[i]
+        if ch in '\'"':
+            i = _scan_string(src, i)
+        elif ch == '`':
+            i = _scan_template(src, i)
+        elif ch == '{':
+            depth += 1
+            i += 1
+        elif ch == '}':
+            if depth == 0:
+                return i + 1
+            depth -= 1
+            i += 1
+        else:
+            i += 1
+    return i
+
+def _scan_regex(src, i):
+    """Return index just past a regex literal (including flags) starting at src[i]"""
+    i += 1
+    in_class = False
+    while i < len(src):
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+            continue
+        i += 1
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            break
+        elif ch == '\n':
+            break
+    while i < len(src) and _is_ident_char(src[i]):
+        i += 1
+    return i
+
+def _slash_starts_regex(out, last_word):
+    """Decide whether a '/' begins a regex based on the previous token"""
+    prev = out.rstrip()[-1:] if out else ''
+    if not prev:
+        return True
+    if _is_ident_char(prev):
+        return last_word in REGEX_PRECEDING_KEYWORDS
+    return prev not in ')]}'
+
+def _needs_space(prev, nxt):
+    """Whether a whitespace run between prev and nxt chars must be kept"""
+    if _is_ident_char(prev) and _is_ident_char(nxt):
+        return True
+    if prev == nxt and prev in '+-':
+        return True
+    if prev == '/' and nxt in '/*':
+        return True
+    if prev.isdigit() and nxt == '.':
+        return True
+    return False
+
+# Characters around which a line break can never be a statement terminator
+_NO_ASI_AFTER = set('{([,;:=?&|!<>*%^~')
+_NO_ASI_BEFORE = set('})],;.?:=&|*%<>')
 
 def minify_js(js_content):
-    """Basic JavaScript minification"""
-    # Remove single-line comments (but preserve URLs)
-    js_content = re.sub(r'//(?!.*http).*$', '', js_content, flags=re.MULTILINE)
-    
-    # Remove multi-line comments
-    js_content = re.sub(r'/\*.*?\*/', '', js_content, flags=re.DOTALL)
+    """Minify JavaScript with a small tokenizer
+
+    Strings, template literals and regex literals are copied verbatim;
+    comments are removed and whitespace collapsed. Line breaks are kept
+    wherever automatic semicolon insertion could depend on them.
+    """
+    out = []
+    tail = ''          # ostatnie wyemitowane znaki (do decyzji o spacjach)
+    last_word = ''
+    pending_space = False
+    pending_newline = False
+    i = 0
+    n = len(js_content)
+
+    def emit(text):
+        nonlocal tail, pending_space, pending_newline
+        if pending_space or pending_newline:
+            prev = tail[-1:] if tail else ''
+            nxt = text[0]
+            if prev:
+                if pending_newline and prev not in _NO_ASI_AFTER and nxt not in _NO_ASI_BEFORE:
+                    out.append('\n')
+                elif _needs_space(prev, nxt):
+                    out.append(' ')
+            pending_space = pending_newline = False
+        out.append(text)
+        tail = (tail + text)[-2:]
+
+    while i < n:
+        ch = js_content[i]
+
+        if ch in ' \t\r\n\f\v\ufeff':
+            if ch == '\n':
+                pending_newline = True
+            else:
+                pending_space = True
+            i += 1
+        elif js_content.startswith('//', i):
+            end = js_content.find('\n', i)
+            i = n if end == -1 else end
+        elif js_content.startswith('/*', i):
+            end = js_content.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            if '\n' in js_content[i:end]:
+                pending_newline = True
+            else:
+                pending_space = True
+            i = end
+        elif ch in '\'"':
+            end = _scan_string(js_content, i)
+            emit(js_content[i:end])
+            last_word = ''
+            i = end
+        elif ch == '`':
+            end = _scan_template(js_content, i)
+            emit(js_content[i:end])
+            last_word = ''
+            i = end
+        elif ch == '/' and _slash_starts_regex(''.join(out[-3:]), last_word):
+            end = _scan_regex(js_content, i)
+            emit(js_content[i:end])
+            last_word = ''
+            i = end
+        elif _is_ident_char(ch):
+            end = i
+            while end < n and _is_ident_char(js_content[end]):
+                end += 1
+            last_word = js_content[i:end]
+            emit(last_word)
+            i = end
+        else:
+            emit(ch)
+            last_word = ''
+            i += 1
+
+    return ''.join(out).strip()
+
+def minify_css(css_content):
+    """Minify CSS with a small tokenizer
+
+    Strings and url(...) values are copied verbatim, comments removed,
+    whitespace collapsed and dropped around punctuation where it carries
+    no meaning. Whitespace before ':' is kept (it matters in selectors
+    such as 'a :hover').
+    """
+    out = []
+    pending_space = False
+    i = 0
+    n = len(css_content)
+    strip_before = set('{};,>)')
+    strip_after = set('{};,>:(')
+
+    def emit(text):
+        nonlocal pending_space
+        if pending_space and out:
+            prev = out[-1][-1]
+            if prev not in strip_after and text[0] not in strip_before:
+                out.append(' ')
+        pending_space = False
+        # Usuń zbędny średnik przed '}'
+        if text == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(text)
+
+    while i < n:
+        ch = css_content[i]
+        if ch in ' \t\r\n\f':
+            pending_space = True
+            i += 1
+        elif css_content.startswith('/*', i):
+            end = css_content.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+        elif ch in '\'"':
+            end = _scan_string(css_content, i)
+            emit(css_content[i:end])
+            i = end
+        elif css_content[i:i + 4].lower() == 'url(':
+            end = css_content.find(')', i)
+            end = n if end == -1 else end + 1
+            emit(css_content[i:end])
+            i = end
+        else:
+            emit(ch)
+            i += 1
+
+    return ''.join(out).strip()
+
+# Source hashes of .gz/.br variants - app/compression.py serves a variant only
+# while the hash recorded here matches the current content of its source file
+PRECOMPRESSED_MANIFEST = 'precompressed.json'
+
+def record_precompressed(file_path, variant_path, static_dir=Path("static")):
+    """Record the content hash of the file a variant was compressed from"""
+    try:
+        key = Path(variant_path).resolve().relative_to(Path(static_dir).resolve()).as_posix()
+    except ValueError:
+        print(f"Not recording {variant_path}: outside {static_dir}")
+        return
     
-    # Remove unnecessary whitespace
-    js_content = re.sub(r'\s+', ' ', js_content)
-    js_content = re.sub(r';\s*}', '}', js_content)
-    js_content = re.sub(r'{\s*', '{', js_content)
-    js_content = re.sub(r';\s*', ';', js_content)
+    manifest_path = Path(static_dir) / PRECOMPRESSED_MANIFEST
+    manifest = {}
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    manifest[key] = file_fingerprint(file_path, length=64)
     
-    return js_content.strip()
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
 
-def compress_file(file_path):
+def compress_file(file_path, static_dir=Path("static")):
     """Create gzipped version of file"""
     gz_path = f"{file_path}.gz"
     
     with open(file_path, 'rb') as f_in:
         with gzip.open(gz_path, 'wb') as f_out:
             shutil.copyfileobj(f_in, f_out)
+    record_precompressed(file_path, gz_path, static_dir)
     
     # Get file sizes
     original_size = os.path.getsize(file_path)
@@ -61,6 +304,102 @@ def compress_file(file_path):
     
     return gz_path
 
+def compress_file_brotli(file_path, static_dir=Path("static")):
+    """Create Brotli-compressed version of file"""
+    if not BROTLI_AVAILABLE:
+        print(f"Skipping Brotli for {file_path}: brotli module not installed (pip install brotli)")
+        return None
+    
+    br_path = f"{file_path}.br"
+    
+    with open(file_path, 'rb') as f_in:
+        data = f_in.read()
+    
+    with open(br_path, 'wb') as f_out:
+        f_out.write(brotli.compress(data, quality=11))
+    record_precompressed(file_path, br_path, static_dir)
+    
+    # Get file sizes
+    original_size = os.path.getsize(file_path)
+    compressed_size = os.path.getsize(br_path)
+    compression_ratio = (1 - compressed_size / original_size) * 100
+    
+    print(f"Brotli {file_path}: {original_size} -> {compressed_size} bytes ({compression_ratio:.1f}% reduction)")
+    
+    return br_path
+
+# ============================================================================
+# SERVICE WORKER PRECACHE LIST
+# ============================================================================
+
+# Pages and static files precached on service worker install; files that do
+# not exist in static/ are skipped so cache.addAll never fails on a 404
+PRECACHE_PAGES = ['/offline']
+PRECACHE_ASSETS = ['style.css', 'schedule-store.js', 'app.js', 'manifest.json', 'favicon.ico']
+
+PRECACHE_VERSION_RE = re.compile(r"const PRECACHE_VERSION\s*=\s*'[^']*';")
+PRECACHE_URLS_RE = re.compile(r"const PRECACHE_URLS\s*=\s*\[[^\]]*\];")
+
+def file_fingerprint(path, length=10):
+    """Short content hash of a file - must match app/assets.py file_fingerprint"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:length]
+
+def manifest_icons(static_dir):
+    """Static file names of icons referenced by manifest.json"""
+    manifest_path = static_dir / "manifest.json"
+    if not manifest_path.exists():
+        return []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    prefix = "/static/"
+    return [icon['src'][len(prefix):] for icon in manifest.get('icons', [])
+            if icon.get('src', '').startswith(prefix)]
+
+def build_precache_list(static_dir=Path("static")):
+    """Versioned precache URLs for files that actually exist"""
+    urls = list(PRECACHE_PAGES)
+    seen = set()
+    for name in PRECACHE_ASSETS + manifest_icons(static_dir):
+        path = static_dir / name
+        if name in seen:
+            continue
+        seen.add(name)
+        if not path.is_file():
+            print(f"Precache: skipping missing file {path}")
+            continue
+        urls.append(f"/static/{name}?v={file_fingerprint(path)}")
+    return urls
+
+def update_precache_manifest(static_dir=Path("static")):
+    """Rewrite PRECACHE_VERSION/PRECACHE_URLS in sw.js and recompress it"""
+    sw_path = static_dir / "sw.js"
+    with open(sw_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    urls = build_precache_list(static_dir)
+    version = hashlib.sha256("\n".join(urls).encode('utf-8')).hexdigest()[:10]
+    urls_js = "const PRECACHE_URLS = [\n" + ",\n".join(f"  '{url}'" for url in urls) + "\n];"
+    
+    if not PRECACHE_URLS_RE.search(content) or not PRECACHE_VERSION_RE.search(content):
+        print(f"Precache block not found in {sw_path}")
+        return None
+    
+    content = PRECACHE_VERSION_RE.sub(f"const PRECACHE_VERSION = '{version}';", content, count=1)
+    content = PRECACHE_URLS_RE.sub(lambda _: urls_js, content, count=1)
+    
+    with open(sw_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    
+    compress_file(str(sw_path), static_dir)
+    compress_file_brotli(str(sw_path), static_dir)
+    
+    print(f"Precache list ({version}): {len(urls)} entries written to {sw_path}")
+    return urls
+
 def optimize_assets():
     """Optimize all static assets"""
     static_dir = Path("static")
@@ -94,8 +433,9 @@ def optimize_assets():
         with open(css_file, 'w', encoding='utf-8') as f:
             f.write(minified_css)
         
-        # Create compressed version
+        # Create compressed versions
         compress_file(str(css_file))
+        compress_file_brotli(str(css_file))
         
         print(f"Minified CSS: {css_file}")
     
@@ -118,13 +458,76 @@ def optimize_assets():
         with open(js_file, 'w', encoding='utf-8') as f:
             f.write(minified_js)
         
-        # Create compressed version
+        # Create compressed versions
         compress_file(str(js_file))
+        compress_file_brotli(str(js_file))
         
         print(f"Minified JS: {js_file}")
     
+    # Precache list hashes the final (minified) files
+    update_precache_manifest(static_dir)
+    
     print("\nAsset optimization complete!")
     print(f"Original files backed up to: {backup_dir}")
+    
+    report_bundle_sizes(static_dir)
+
+# ============================================================================
+# BUNDLE SIZE REPORT
+# ============================================================================
+
+# Bundles served to the browser - app.js is loaded on every page,
+# admin.js only lazily for administrators
+BUNDLES = [
+    ("app.js", "core (all users)"),
+    ("schedule-store.js", "offline store"),
+    ("admin.js", "admin (lazy)"),
+    ("sw.js", "service worker"),
+    ("style.css", "styles"),
+]
+
+def bundle_sizes(path):
+    """Return raw/minified/gzip/brotli sizes of a bundle (without writing files)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    minifier = minify_css if str(path).endswith('.css') else minify_js
+    minified = minifier(content).encode('utf-8')
+    
+    sizes = {
+        'raw': len(content.encode('utf-8')),
+        'minified': len(minified),
+        'gzip': len(gzip.compress(minified, compresslevel=9)),
+        'brotli': len(brotli.compress(minified, quality=11)) if BROTLI_AVAILABLE else None,
+    }
+    return sizes
+
+def report_bundle_sizes(static_dir=Path("static")):
+    """Print size report for every bundle"""
+    print(f"\n{'Bundle':<12} {'Role':<18} {'Raw':>10} {'Minified':>10} {'Gzip':>10} {'Brotli':>10}")
+    print("-" * 74)
+    
+    for name, role in BUNDLES:
+        path = static_dir / name
+        if not path.exists():
+            continue
+        sizes = bundle_sizes(path)
+        brotli_size = f"{sizes['brotli']:>10}" if sizes['brotli'] is not None else f"{'n/a':>10}"
+        print(f"{name:<12} {role:<18} {sizes['raw']:>10} {sizes['minified']:>10} {sizes['gzip']:>10} {brotli_size}")
 
 if __name__ == "__main__":
-    optimize_assets()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Minify and precompress static assets")
+    parser.add_argument("--report", action="store_true",
+                        help="only print bundle size report, do not modify files")
+    parser.add_argument("--precache", action="store_true",
+                        help="only regenerate service worker precache list")
+    args = parser.parse_args()
+    
+    if args.report:
+        report_bundle_sizes()
+    elif args.precache:
+        update_precache_manifest()
+    else:
+        optimize_assets()
@@ -398,6 +398,9 @@
   highlightToday();
   highlightCurrentUser();
   updateSummary();
+  
+  // Komórki zaktualizowane z grafiku offline (IndexedDB)
+  document.addEventListener('schedule:updated', updateSummary);
   setInterval(highlightToday, 60000); // Aktualizuj co minutę - OPTYMALIZOWANE
 
 
@@ -489,11 +492,7 @@ function setupMenuButtons() {
           // Bezpośrednie wywołanie funkcji
           if (menuButtonId === 'menu-btn-employees') {
             console.log('👥 Uruchamiam toggleEmps');
-            if (typeof toggleEmps === 'function') {
-              toggleEmps();
-            } else {
-              console.error('❌ toggleEmps nie jest funkcją!');
-            }
+            callAdminFunction('toggleEmps');
           } else if (menuButtonId === 'menu-btn-swaps-admin' || menuButtonId === 'menu-btn-swaps-user') {
             console.log('🔄 Uruchamiam toggleSwaps');
             if (typeof toggleSwaps === 'function') {
@@ -555,21 +554,12 @@ function setupMenuButtons() {
             }
           } else if (menuButtonId === 'menu-btn-export') {
             console.log('📊 Uruchamiam eksport do Excel');
-            console.log('📊 Sprawdzam czy funkcja exportToExcel istnieje...');
-            console.log('📊 typeof exportToExcel:', typeof exportToExcel);
-            if (typeof exportToExcel === 'function') {
-              console.log('✅ Funkcja exportToExcel istnieje, wywołuję...');
-              // Znajdź przycisk i przekaż go do funkcji
-              const button = document.querySelector('#menu-btn-export');
-              if (button) {
-                console.log('✅ Znaleziono przycisk, przekazuję go do funkcji');
-                exportToExcel({ target: button });
-              } else {
-                console.error('❌ Nie znaleziono przycisku eksportu');
-              }
+            // Znajdź przycisk i przekaż go do funkcji
+            const button = document.querySelector('#menu-btn-export');
+            if (button) {
+              callAdminFunction('exportToExcel', { target: button });
             } else {
-              console.error('❌ exportToExcel nie jest funkcją!');
-              console.error('❌ Dostępne funkcje:', Object.keys(window).filter(key => typeof window[key] === 'function'));
+              console.error('❌ Nie znaleziono przycisku eksportu');
             }
           } else if (menuButtonId === 'menu-btn-refresh') {
             console.log('🔄 Uruchamiam odświeżanie cache');
@@ -1262,7 +1252,7 @@ window.addEventListener('orientationchange', handleResponsiveDesign);
 // Rejestracja Service Worker dla PWA
 if ('serviceWorker' in navigator) {
   window.addEventListener('load', () => {
-    navigator.serviceWorker.register('/static/sw.js')
+    navigator.serviceWorker.register('/static/sw.js', { scope: '/' })
       .then(registration => {
         console.log('Service Worker zarejestrowany:', registration);
         // Inicjalizuj Web Push po rejestracji Service Worker TYLKO jeśli użytkownik jest zalogowany
@@ -1507,17 +1497,11 @@ async function initializePushSubscription() {
       const result = await saveResponse.json();
       console.log('✅ Subskrypcja zapisana pomyślnie:', result);
       
-      // Uruchom background sync
-      if ('sync' in window.ServiceWorkerRegistration.prototype) {
-        console.log('🔄 Rejestruję background sync...');
-        registration.sync.register('check-notifications');
-      }
-      
-      // Sprawdź nowe prośby co 30 sekund
-      console.log('⏰ Uruchamiam sprawdzanie nowych prośb co 30 sekund...');
-      startNotificationChecking();
+      // Serwer sam wysyła push po zmianach - odpytywanie niepotrzebne
+      stopNotificationChecking();
       
       console.log('🎉 Web Push Notifications zainicjalizowane pomyślnie!');
+      return true;
     } else {
       const error = await saveResponse.json();
       console.error('❌ Błąd zapisywania subskrypcji:', error);
@@ -1526,6 +1510,7 @@ async function initializePushSubscription() {
   } catch (error) {
     console.error('❌ Błąd inicjalizacji subskrypcji push:', error);
   }
+  return false;
 }
 
 
@@ -2279,7 +2264,7 @@ document.addEventListener('DOMContentLoaded', function() {
   
   // Event listener dla przycisku publikacji draft
   const btnPublishDraft = document.getElementById('publish-draft-shifts');
-  if (btnPublishDraft) btnPublishDraft.addEventListener('click', publishDraftChanges);
+  if (btnPublishDraft) btnPublishDraft.addEventListener('click', () => callAdminFunction('publishDraftChanges'));
   
   document.addEventListener('click', (e) => {
     if (!editor || !editor.classList.contains('show')) return;
@@ -2331,17 +2316,17 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Przycisk edycji
         row.querySelector('.btn-edit').addEventListener('click', () => {
-          startInlineEdit(row, emp);
+          callAdminFunction('startInlineEdit', row, emp);
         });
         
         // Przycisk zapisz
         row.querySelector('.btn-save').addEventListener('click', () => {
-          saveInlineEdit(row, emp);
+          callAdminFunction('saveInlineEdit', row, emp);
         });
         
         // Przycisk anuluj
         row.querySelector('.btn-cancel').addEventListener('click', () => {
-          cancelInlineEdit(row, emp);
+          callAdminFunction('cancelInlineEdit', row, emp);
         });
         
         // Przycisk usuwania
@@ -2361,7 +2346,7 @@ document.addEventListener('DOMContentLoaded', function() {
                   // Zaktualizuj cache
                   window.employeesCache = window.employeesCache.filter(e => e.id !== emp.id);
                   window.employeesCacheTime = Date.now();
-                  loadEmployees();
+                  callAdminFunction('loadEmployees');
                 }
               })
               .catch(error => {
@@ -2434,7 +2419,7 @@ document.addEventListener('DOMContentLoaded', function() {
       empName.value = ''; 
       empCode.value = ''; 
       empEmail.value = ''; 
-      loadEmployees(); 
+      callAdminFunction('loadEmployees');
       showNotification('Pracownik został dodany!', 'success');
     })
     .catch((err) => { 
@@ -2509,7 +2494,7 @@ document.addEventListener('DOMContentLoaded', function() {
   if (empName) empName.addEventListener('keydown', (e) => { if (e.key == 'Enter') addEmp(); });
   if (empCode) empCode.addEventListener('keydown', (e) => { if (e.key == 'Enter') addEmp(); });
   if (empEmail) empEmail.addEventListener('keydown', (e) => { if (e.key == 'Enter') addEmp(); });
-  if (btnEmps) btnEmps.addEventListener('click', toggleEmps);
+  if (btnEmps) btnEmps.addEventListener('click', () => callAdminFunction('toggleEmps'));
   
   // Event listener dla przycisku dodawania
   const empAddBtn = document.getElementById('emp-add-btn');
@@ -2769,7 +2754,7 @@ document.addEventListener('DOMContentLoaded', function() {
           // Sprawdź typ zgłoszenia i wyświetl odpowiednio
           if (item.type === 'unavailability') {
             // Zgłoszenie niedyspozycji
-            const days = JSON.parse(item.selected_days || '[]');
+            const days = Array.isArray(item.selected_days) ? item.selected_days : JSON.parse(item.selected_days || '[]');
             const daysText = days.length > 0 ? days.join(', ') : 'Brak dni';
             title.innerHTML = `📅 <strong>Niedyspozycja:</strong> ${escapeHtml(item.employee_name)} - ${escapeHtml(item.month_year)}<br>
                               <small>Dni: ${daysText}</small>`;
@@ -2836,11 +2821,11 @@ document.addEventListener('DOMContentLoaded', function() {
               const acc = document.createElement('button'); 
               acc.className = 'btn'; 
               acc.textContent = 'Akceptuj'; 
-              acc.onclick = () => respondSwap(item.id, 'ACCEPTED');
+              acc.onclick = () => respondSwap(item.id, 'ACCEPTED', item.version);
               const dec = document.createElement('button'); 
               dec.className = 'btn'; 
               dec.textContent = 'Odrzuć'; 
-              dec.onclick = () => respondSwap(item.id, 'DECLINED');
+              dec.onclick = () => respondSwap(item.id, 'DECLINED', item.version);
               actions.appendChild(acc); 
               actions.appendChild(dec);
             }
@@ -2849,11 +2834,11 @@ document.addEventListener('DOMContentLoaded', function() {
               const ap = document.createElement('button'); 
               ap.className = 'btn'; 
               ap.textContent = 'Zatwierdź'; 
-              ap.onclick = () => bossSwap(item.id, 'APPROVED');
+              ap.onclick = () => bossSwap(item.id, 'APPROVED', item.version);
               const rj = document.createElement('button'); 
               rj.className = 'btn'; 
               rj.textContent = 'Odrzuć'; 
-              rj.onclick = () => bossSwap(item.id, 'REJECTED');
+              rj.onclick = () => bossSwap(item.id, 'REJECTED', item.version);
               actions.appendChild(ap); 
               actions.appendChild(rj);
             }
@@ -2876,16 +2861,17 @@ document.addEventListener('DOMContentLoaded', function() {
       });
   }
   
-  function respondSwap(id, status) { 
+  function respondSwap(id, status, version) { 
     fetch('/api/swaps/respond', { 
       method: 'POST', 
       headers: {'Content-Type': 'application/json'}, 
-      body: JSON.stringify({ id, status }),
+      body: JSON.stringify({ id, status, version }),
       credentials: 'include'
     })
     .then(response => response.json())
     .then(data => {
       if (data.error) {
+        loadSwaps();  // np. 409 - prośba zmieniona w międzyczasie
         alert('Błąd: ' + data.error);
       } else {
         loadSwaps();
@@ -2898,11 +2884,11 @@ document.addEventListener('DOMContentLoaded', function() {
     });
   }
   
-  function bossSwap(id, status) { 
+  function bossSwap(id, status, version) { 
     fetch('/api/swaps/boss', { 
       method: 'POST', 
       headers: {'Content-Type': 'application/json'}, 
-      body: JSON.stringify({ id, status }),
+      body: JSON.stringify({ id, status, version }),
       credentials: 'include'
     })
     .then(async r => { 
@@ -2915,6 +2901,8 @@ document.addEventListener('DOMContentLoaded', function() {
       
       if (!r.ok) { 
         const errorMsg = data.error || `HTTP ${r.status}: ${r.statusText}` || 'Nieznany błąd';
+        // 409 - prośba zmieniona przez kogoś innego, pokaż aktualny stan
+        if (r.status === 409) loadSwaps();
         alert('Błąd: ' + errorMsg); 
         throw new Error(errorMsg); 
       } 
@@ -3771,31 +3759,6 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // ===== GLOBALNE FUNKCJE DLA HAMBURGER MENU =====
 
-// Globalne funkcje dla hamburger menu - muszą być dostępne poza DOMContentLoaded
-function toggleEmps() {
-  const empEditor = document.getElementById('emp-editor');
-  if (!empEditor) return;
-  const show = !empEditor.classList.contains('show');
-  
-  if (show) {
-    // Pokaż modal najpierw
-    empEditor.classList.add('show');
-    
-    // Użyj requestAnimationFrame dla lepszej wydajności
-    requestAnimationFrame(() => {
-      // Użyj cache jeśli jest świeży
-      const now = Date.now();
-      if (window.employeesCache && (now - window.employeesCacheTime) < 30000) {
-        renderEmployees(window.employeesCache);
-      } else {
-        loadEmployees();
-      }
-    });
-  } else {
-    empEditor.classList.remove('show');
-  }
-}
-
 // Funkcja do otwierania/zamykania modala skrzynki
 function toggleSwap() {
   const swapEditor = document.getElementById('swap-editor');
@@ -3833,271 +3796,6 @@ window.swapCache = null;
 window.swapCacheTime = 0;
 const CACHE_DURATION = 30000; // 30 sekund
 
-// Globalne funkcje pomocnicze
-function loadEmployees() {
-  fetch('/api/employees', { credentials: 'include' })
-    .then(response => response.json())
-    .then(data => { 
-      if (data.error) {
-        throw new Error(data.error);
-      }
-      // Zaktualizuj cache
-      window.employeesCache = data.employees || [];
-      window.employeesCacheTime = Date.now();
-      renderEmployees(window.employeesCache); 
-    })
-    .catch(error => {
-      console.error('Błąd podczas ładowania pracowników:', error);
-      alert('Błąd podczas ładowania listy pracowników');
-    });
-}
-
-function renderEmployees(items) {
-  const empList = document.getElementById('emp-list');
-  if (!empList) return;
-  
-  // Użyj requestAnimationFrame dla lepszej wydajności
-  requestAnimationFrame(() => {
-    // Użyj DocumentFragment dla lepszej wydajności
-    const fragment = document.createDocumentFragment();
-    
-    for (const emp of items) {
-      const row = document.createElement('div');
-      row.className = 'emp-row';
-      row.innerHTML = `
-        <div>
-          <div class="emp-name-code-line">
-            <div class="emp-name-edit">
-              <input type="text" class="emp-name-input" value="${emp.name}" data-id="${emp.id}" data-field="name" style="display: none;">
-              <span class="emp-name-display">${emp.name}</span>
-            </div>
-            <div class="emp-code-edit">
-              <input type="text" class="emp-code-input" value="${emp.code || ''}" data-id="${emp.id}" data-field="code" style="display: none;">
-              <span class="emp-code-display">(${emp.code || '-'})</span>
-            </div>
-          </div>
-          <div class="emp-email-edit">
-            <input type="email" class="emp-email-input" value="${emp.email || ''}" data-id="${emp.id}" data-field="email" style="display: none;">
-            <small class="emp-email-display" style="${emp.email ? '' : 'display: none;'}">${emp.email || ''}</small>
-          </div>
-        </div>
-        <div class="emp-actions">
-          <button data-id="${emp.id}" class="btn btn-edit">
-            Edytuj
-          </button>
-          <button data-id="${emp.id}" class="btn btn-save" style="display: none;">
-            Zapisz
-          </button>
-          <button data-id="${emp.id}" class="btn btn-cancel" style="display: none;">
-            Anuluj
-          </button>
-          <button data-id="${emp.id}" class="btn">
-            Usuń
-          </button>
-        </div>
-      `;
-      
-      // Przycisk edycji
-      row.querySelector('.btn-edit').addEventListener('click', () => {
-        startInlineEdit(row, emp);
-      });
-      
-      // Przycisk zapisz
-      row.querySelector('.btn-save').addEventListener('click', () => {
-        saveInlineEdit(row, emp);
-      });
-      
-      // Przycisk anuluj
-      row.querySelector('.btn-cancel').addEventListener('click', () => {
-        cancelInlineEdit(row, emp);
-      });
-      
-      // Przycisk usuwania
-      const deleteBtn = Array.from(row.querySelectorAll('.btn')).find(btn => btn.textContent.trim() === 'Usuń');
-      console.log('🔍 Znaleziony przycisk usuwania (funkcja 2):', deleteBtn);
-      if (deleteBtn) deleteBtn.addEventListener('click', () => {
-        const originalText = deleteBtn.textContent;
-        deleteBtn.textContent = 'Usuwanie...';
-        deleteBtn.disabled = true;
-        
-        fetch(`/api/employees/${emp.id}`, { 
-          method: 'DELETE',
-          headers: { 'X-CSRFToken': window.csrfToken },
-          credentials: 'include'
-        })
-          .then(response => response.json())
-          .then(data => {
-            if (data.error) {
-              console.error('Błąd podczas usuwania:', data.error);
-            } else {
-              // Zaktualizuj cache
-              window.employeesCache = window.employeesCache.filter(e => e.id !== emp.id);
-              window.employeesCacheTime = Date.now();
-              loadEmployees();
-            }
-          })
-          .catch(error => {
-            console.error('Błąd podczas usuwania pracownika:', error);
-          })
-          .finally(() => {
-            // Przywróć przycisk
-            deleteBtn.textContent = originalText;
-            deleteBtn.disabled = false;
-          });
-      });
-      
-      fragment.appendChild(row);
-    }
-    
-    // Wyczyść i dodaj wszystkie elementy jednocześnie
-    empList.innerHTML = '';
-    empList.appendChild(fragment);
-    
-    // Zaktualizuj statystyki
-    updateEmployeeStats(items);
-  });
-}
-
-function updateEmployeeStats(employees) {
-  const totalCount = document.getElementById('emp-total-count');
-  const withEmailCount = document.getElementById('emp-with-email-count');
-  const withCodeCount = document.getElementById('emp-with-code-count');
-  
-  if (totalCount) totalCount.textContent = employees.length;
-  if (withEmailCount) withEmailCount.textContent = employees.filter(emp => emp.email).length;
-  if (withCodeCount) withCodeCount.textContent = employees.filter(emp => emp.code).length;
-}
-
-
-// Funkcje edycji inline
-function startInlineEdit(row, emp) {
-  // Ukryj przycisk edycji, pokaż zapisz/anuluj
-  row.querySelector('.btn-edit').style.display = 'none';
-  row.querySelector('.btn-save').style.display = 'inline-block';
-  row.querySelector('.btn-cancel').style.display = 'inline-block';
-  
-  // Ukryj wyświetlane wartości, pokaż inputy
-  row.querySelector('.emp-name-display').style.display = 'none';
-  row.querySelector('.emp-code-display').style.display = 'none';
-  row.querySelector('.emp-email-display').style.display = 'none';
-  
-  row.querySelector('.emp-name-input').style.display = 'inline-block';
-  row.querySelector('.emp-code-input').style.display = 'inline-block';
-  row.querySelector('.emp-email-input').style.display = 'inline-block';
-  
-  // Skup się na pierwszym polu
-  row.querySelector('.emp-name-input').focus();
-}
-
-function saveInlineEdit(row, emp) {
-  const nameInput = row.querySelector('.emp-name-input');
-  const codeInput = row.querySelector('.emp-code-input');
-  const emailInput = row.querySelector('.emp-email-input');
-  
-  const newName = nameInput.value.trim();
-  const newCode = codeInput.value.trim();
-  const newEmail = emailInput.value.trim();
-  
-  if (!newName) {
-    alert('Imię jest wymagane');
-    nameInput.focus();
-    return;
-  }
-  
-  // Walidacja emaila
-  if (newEmail && !/^[^\s@]+@[^\s@]+\.[^\s@]+$/.test(newEmail)) {
-    alert('Podaj prawidłowy adres email');
-    emailInput.focus();
-    return;
-  }
-  
-  // Pokaż loading
-  const saveBtn = row.querySelector('.btn-save');
-  const originalText = saveBtn.textContent;
-  saveBtn.textContent = 'Zapisywanie...';
-  saveBtn.disabled = true;
-  
-  
-  fetch(`/api/employees/${emp.id}`, {
-    method: 'PUT',
-    headers: { 
-      'Content-Type': 'application/json',
-      'X-CSRFToken': window.csrfToken
-    },
-    body: JSON.stringify({ name: newName, code: newCode, email: newEmail }),
-    credentials: 'include'
-  })
-  .then(async r => {
-    const data = await r.json().catch(() => ({}));
-    if (!r.ok) {
-      throw new Error(data.error || 'Błąd podczas edycji');
-    }
-    return data;
-  })
-  .then(() => {
-    // Zaktualizuj wyświetlane wartości
-    row.querySelector('.emp-name-display').textContent = newName;
-    row.querySelector('.emp-code-display').textContent = `(${newCode || '-'})`;
-    
-    const emailDisplay = row.querySelector('.emp-email-display');
-    if (newEmail) {
-      emailDisplay.textContent = newEmail;
-      emailDisplay.style.display = 'block';
-    } else {
-      emailDisplay.style.display = 'none';
-    }
-    
-    // Zaktualizuj obiekt emp
-    emp.name = newName;
-    emp.code = newCode;
-    emp.email = newEmail;
-    
-    // Zaktualizuj cache
-    if (window.employeesCache) {
-      const empIndex = window.employeesCache.findIndex(e => e.id === emp.id);
-      if (empIndex !== -1) {
-        window.employeesCache[empIndex] = { ...emp, name: newName, code: newCode, email: newEmail };
-      }
-    }
-    
-    // Wyjdź z trybu edycji
-    cancelInlineEdit(row, emp);
-  })
-  .catch(error => {
-    console.error('Błąd podczas edycji pracownika:', error);
-    alert('Wystąpił błąd podczas edycji pracownika');
-  })
-  .finally(() => {
-    saveBtn.textContent = originalText;
-    saveBtn.disabled = false;
-  });
-}
-
-function cancelInlineEdit(row, emp) {
-  // Przywróć oryginalne wartości
-  const nameInput = row.querySelector('.emp-name-input');
-  const codeInput = row.querySelector('.emp-code-input');
-  const emailInput = row.querySelector('.emp-email-input');
-  
-  nameInput.value = emp.name;
-  codeInput.value = emp.code || '';
-  emailInput.value = emp.email || '';
-  
-  // Ukryj inputy, pokaż wyświetlane wartości
-  nameInput.style.display = 'none';
-  codeInput.style.display = 'none';
-  emailInput.style.display = 'none';
-  
-  row.querySelector('.emp-name-display').style.display = 'inline';
-  row.querySelector('.emp-code-display').style.display = 'inline';
-  row.querySelector('.emp-email-display').style.display = emp.email ? 'block' : 'none';
-  
-  // Ukryj zapisz/anuluj, pokaż edytuj
-  row.querySelector('.btn-edit').style.display = 'inline-block';
-  row.querySelector('.btn-save').style.display = 'none';
-  row.querySelector('.btn-cancel').style.display = 'none';
-}
-
 // Funkcje dla skrzynki
 function loadSwap() {
   // Sprawdź czy mamy świeże dane w cache
@@ -4363,122 +4061,6 @@ function cancelSwapEdit(row, request) {
   row.querySelector('.btn-cancel').style.display = 'none';
 }
 
-function showEditEmployeeDialog(emp) {
-  // Utwórz dialog edycji
-  const dialog = document.createElement('div');
-  dialog.className = 'emp-editor show';
-  dialog.innerHTML = `
-    <div class="emp-container">
-      <button type="button" class="emp-close" aria-label="Zamknij">✕</button>
-      <div class="emp-head">Edytuj pracownika</div>
-      <div class="emp-edit-form">
-        <div class="emp-add">
-          <input id="edit-emp-name" placeholder="imię" value="${emp.name}" />
-          <input id="edit-emp-code" placeholder="id" value="${emp.code || ''}" />
-          <input id="edit-emp-email" placeholder="email" type="email" value="${emp.email || ''}" />
-        </div>
-        <div class="emp-edit-actions">
-          <button id="edit-emp-save" class="btn">Zapisz</button>
-          <button id="edit-emp-cancel" class="btn">Anuluj</button>
-        </div>
-      </div>
-    </div>
-  `;
-  
-  // Dodaj do body
-  document.body.appendChild(dialog);
-  
-  // Event listeners
-  const closeBtn = dialog.querySelector('.emp-close');
-  const cancelBtn = dialog.querySelector('#edit-emp-cancel');
-  const saveBtn = dialog.querySelector('#edit-emp-save');
-  const nameInput = dialog.querySelector('#edit-emp-name');
-  const codeInput = dialog.querySelector('#edit-emp-code');
-  const emailInput = dialog.querySelector('#edit-emp-email');
-  
-  function closeDialog() {
-    dialog.remove();
-  }
-  
-  if (closeBtn) closeBtn.addEventListener('click', closeDialog);
-  if (cancelBtn) cancelBtn.addEventListener('click', closeDialog);
-  dialog.addEventListener('click', (e) => {
-    if (e.target === dialog) closeDialog();
-  });
-  
-  // Zapisz zmiany
-  if (saveBtn) saveBtn.addEventListener('click', () => {
-    const newName = nameInput.value.trim();
-    const newCode = codeInput.value.trim();
-    const newEmail = emailInput.value.trim();
-    
-    // Walidacja
-    if (!newName) {
-      showNotification('Imię jest wymagane', 'error');
-      nameInput.focus();
-      return;
-    }
-    
-    if (newEmail && !isValidEmail(newEmail)) {
-      showNotification('Podaj prawidłowy adres email', 'error');
-      emailInput.focus();
-      return;
-    }
-    
-    // Pokaż loading state
-    const originalText = saveBtn.textContent;
-    saveBtn.textContent = 'Zapisywanie...';
-    saveBtn.disabled = true;
-    
-    fetch(`/api/employees/${emp.id}`, {
-      method: 'PUT',
-      headers: { 
-        'Content-Type': 'application/json',
-        'X-CSRFToken': window.csrfToken
-      },
-      body: JSON.stringify({ name: newName, code: newCode, email: newEmail }),
-      credentials: 'include'
-    })
-    .then(async r => {
-      const data = await r.json().catch(() => ({}));
-      if (!r.ok) {
-        throw new Error(data.error || 'Błąd podczas edycji');
-      }
-      return data;
-    })
-    .then(() => {
-      closeDialog();
-      loadEmployees(); // Odśwież listę
-      showNotification('Pracownik został zaktualizowany!', 'success');
-    })
-    .catch((err) => {
-      showNotification('Błąd: ' + err.message, 'error');
-    })
-    .finally(() => {
-      // Przywróć przycisk
-      saveBtn.textContent = originalText;
-      saveBtn.disabled = false;
-    });
-  });
-  
-  // Enter w polach
-  if (nameInput) {
-    nameInput.addEventListener('keydown', (e) => {
-      if (e.key === 'Enter' && saveBtn) saveBtn.click();
-    });
-  }
-  if (codeInput) {
-    codeInput.addEventListener('keydown', (e) => {
-      if (e.key === 'Enter' && saveBtn) saveBtn.click();
-    });
-  }
-  if (emailInput) {
-    emailInput.addEventListener('keydown', (e) => {
-      if (e.key === 'Enter' && saveBtn) saveBtn.click();
-    });
-  }
-}
-
 // ===== SYSTEM POWIADOMIEŃ PWA =====
 
 // Globalna zmienna dla interwału powiadomień
@@ -4521,7 +4103,7 @@ async function initializeNotifications() {
   
   // Zarejestruj service worker
   try {
-    const registration = await navigator.serviceWorker.register('/static/sw.js');
+    const registration = await navigator.serviceWorker.register('/static/sw.js', { scope: '/' });
     console.log('Service Worker zarejestrowany:', registration);
     
     // Sprawdź czy powiadomienia są dozwolone
@@ -4531,19 +4113,20 @@ async function initializeNotifications() {
     }
     
     // Jeśli powiadomienia są dozwolone, utwórz subskrypcję push
+    let pushActive = false;
     if (Notification.permission === 'granted') {
       console.log('🔔 Powiadomienia są dozwolone, inicjalizuję subskrypcję push...');
-      await initializePushSubscription();
+      pushActive = await initializePushSubscription();
     }
     
-    // Uruchom background sync
-    if ('sync' in window.ServiceWorkerRegistration.prototype) {
-      registration.sync.register('check-notifications');
+    // Bez push (brak zgody lub wsparcia) - zapasowe odpytywanie co 30 sekund
+    if (!pushActive) {
+      if ('sync' in window.ServiceWorkerRegistration.prototype) {
+        registration.sync.register('check-notifications');
+      }
+      startNotificationChecking();
     }
     
-    // Sprawdź nowe prośby co 30 sekund
-    startNotificationChecking();
-    
   } catch (error) {
     console.error('Błąd rejestracji Service Worker:', error);
   }
@@ -4926,133 +4509,6 @@ function showHistoryModal(historyItems) {
   });
 }
 
-// Funkcja eksportu do Excel (tylko dla adminów)
-function exportToExcel(event) {
-  console.log('🚀 Rozpoczynam eksport do Excel...');
-  console.log('Event:', event);
-  
-  // Pokaż loading
-  const button = event ? event.target : document.querySelector('#menu-btn-export');
-  console.log('Znaleziony przycisk:', button);
-  console.log('Wszystkie przyciski z ID menu-btn-export:', document.querySelectorAll('#menu-btn-export'));
-  console.log('Wszystkie przyciski menu:', document.querySelectorAll('[id^="menu-btn-"]'));
-  console.log('HTML hamburger menu:', document.querySelector('.hamburger-menu-items')?.innerHTML);
-  
-  if (!button) {
-    console.error('❌ Nie znaleziono przycisku eksportu');
-    console.error('❌ Sprawdzam czy hamburger menu jest otwarte...');
-    const hamburgerMenu = document.querySelector('.hamburger-menu');
-    console.log('❌ Hamburger menu element:', hamburgerMenu);
-    console.log('❌ Hamburger menu visible:', hamburgerMenu?.style.display);
-    return;
-  }
-  
-  const originalText = button.textContent;
-  button.innerHTML = '⏳ EKSPORTUJĘ...';
-  button.disabled = true;
-  
-  // Pobierz aktualny miesiąc i rok z URL lub użyj bieżący miesiąc
-  const urlParams = new URLSearchParams(window.location.search);
-  const year = urlParams.get('year') ? parseInt(urlParams.get('year')) : new Date().getFullYear();
-  const month = urlParams.get('month') ? parseInt(urlParams.get('month')) : new Date().getMonth() + 1;
-  
-  console.log(`📅 Eksportuję dla roku: ${year}, miesiąca: ${month}`);
-  console.log(`🌐 URL: /api/export/excel?year=${year}&month=${month}`);
-  
-  // Wywołaj API eksportu z parametrami miesiąca
-  fetch(`/api/export/excel?year=${year}&month=${month}`, {
-    method: 'GET',
-    credentials: 'include',  // Wysyłaj cookies sesji
-    headers: {
-      'Accept': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    }
-  })
-    .then(response => {
-      console.log('Response status:', response.status);
-      console.log('Response headers:', [...response.headers.entries()]);
-      
-      if (!response.ok) {
-        return response.text().then(text => {
-          console.error('Error response body:', text);
-          throw new Error(`HTTP error! status: ${response.status}, body: ${text}`);
-        });
-      }
-      
-      // Sprawdź czy to jest plik Excel
-      const contentType = response.headers.get('Content-Type');
-      console.log('Content-Type:', contentType);
-      
-      if (!contentType || !contentType.includes('spreadsheetml')) {
-        return response.text().then(text => {
-          console.error('Unexpected content type:', contentType);
-          console.error('Response body:', text);
-          throw new Error(`Oczekiwano pliku Excel, otrzymano: ${contentType}`);
-        });
-      }
-      
-      // Pobierz nazwę pliku z nagłówka Content-Disposition
-      const contentDisposition = response.headers.get('Content-Disposition');
-      let filename = `grafik_sp4600_${year}_${month}.xlsx`;
-      if (contentDisposition) {
-        const filenameMatch = contentDisposition.match(/filename[^;=\n]*=((['"]).*?\2|[^;\n]*)/);
-        if (filenameMatch && filenameMatch[1]) {
-          filename = filenameMatch[1].replace(/['"]/g, '');
-        }
-      }
-      
-      console.log('Nazwa pliku:', filename);
-      
-      return response.blob().then(blob => {
-        console.log('Rozmiar blob:', blob.size, 'bytes');
-        return { blob, filename };
-      });
-    })
-    .then(({ blob, filename }) => {
-      if (blob.size === 0) {
-        throw new Error('Pobrany plik jest pusty');
-      }
-      
-      // Utwórz link do pobrania
-      const url = window.URL.createObjectURL(blob);
-      const a = document.createElement('a');
-      a.style.display = 'none';
-      a.href = url;
-      a.download = filename;
-      document.body.appendChild(a);
-      a.click();
-      
-      // Wyczyść
-      setTimeout(() => {
-        window.URL.revokeObjectURL(url);
-        document.body.removeChild(a);
-      }, 100);
-      
-      console.log('Eksport do Excel zakończony pomyślnie, plik:', filename);
-      alert(`Plik ${filename} został pobrany pomyślnie!`);
-    })
-    .catch(error => {
-      console.error('❌ Błąd podczas eksportu do Excel:', error);
-      console.error('❌ Szczegóły błędu:', error.message);
-      console.error('❌ Stack trace:', error.stack);
-      alert(`❌ Wystąpił błąd podczas eksportu do Excel: ${error.message}\n\nSprawdź konsolę przeglądarki (F12) dla szczegółów.`);
-    })
-    .finally(() => {
-      // Przywróć przycisk z oryginalnym HTML
-      button.innerHTML = `
-        <span>
-          <div class="spotify-function-icon">
-            <svg viewBox="0 0 24 24" fill="currentColor">
-              <path d="M14,2H6A2,2 0 0,0 4,4V20A2,2 0 0,0 6,22H18A2,2 0 0,0 20,20V8L14,2M18,20H6V4H13V9H18V20Z"/>
-              <path d="M8,12H16V14H8V12M8,16H13V18H8V16Z"/>
-            </svg>
-          </div>
-          <div class="spotify-function-text">EKSPORT</div>
-        </span>
-      `;
-      button.disabled = false;
-    });
-}
-
 // Funkcja do podświetlania zalogowanego użytkownika
 function highlightCurrentUser() {
   const table = document.getElementById('grafik');
@@ -5319,7 +4775,7 @@ function toggleEdit() {
       console.log('🔧 [EDIT] Włączam tryb edycji - globalEditMode:', globalEditMode);
       
       // Zaktualizuj interfejs trybu roboczego
-      updateDraftUI();
+      callAdminFunction('updateDraftUI');
     }
     
     if (!globalEditMode) { 
@@ -5345,820 +4801,45 @@ function toggleEdit() {
 let isDraftMode = false;
 let draftChanges = new Map();
 
-// Prosta funkcja włączania/wyłączania trybu roboczego
-async function toggleDraftMode() {
-  console.log('🔄 [DRAFT] Toggle draft mode - current state:', isDraftMode);
-  
-  // Sprawdź czy użytkownik jest adminem
-  const isAdmin = document.body.classList.contains('admin-user');
-  if (!isAdmin) {
-    console.log('🔧 [DRAFT] Użytkownik nie jest adminem - tryb roboczy niedostępny');
-    showNotification('Tryb roboczy dostępny tylko dla administratorów', 'warning');
-    return;
-  }
-  
-  if (isDraftMode) {
-    console.log('🔄 [DRAFT] Wyłączam tryb roboczy...');
-    await exitDraftMode();
-  } else {
-    console.log('🔄 [DRAFT] Włączam tryb roboczy...');
-    await enterDraftMode();
-  }
-}
-
-// Włącz tryb roboczy
-async function enterDraftMode() {
-  console.log('🔄 [DRAFT] Włączam tryb roboczy...');
-  isDraftMode = true;
-  updateDraftUI();
-  
-  try {
-    // NAJPIERW: Załaduj oficjalny grafik i ustaw data-official-value
-    console.log('🔄 [DRAFT] Ładuję oficjalny grafik jako punkt odniesienia...');
-    await loadOfficialScheduleForDraft();
-    
-    // TERAZ: Załaduj zapisane wersje robocze
-    await loadDraftData();
-    
-    // Upewnij się że UI jest poprawnie zaktualizowany po wszystkich operacjach
-    updateDraftUI();
-    console.log('🔧 [DRAFT] UI zaktualizowane - isDraftMode:', isDraftMode);
-  } catch (error) {
-    console.error('Błąd podczas włączania trybu roboczego:', error);
-    showNotification('Błąd podczas włączania trybu roboczego', 'error');
-    
-    // Wyłącz tryb roboczy w przypadku błędu
-    isDraftMode = false;
-    updateDraftUI();
-  }
-}
-
-// Wyłącz tryb roboczy
-async function exitDraftMode() {
-  console.log('🔄 [DRAFT] Wyłączam tryb roboczy...');
-  
-  try {
-    // Usuń zapisane zmiany draft z serwera (bez potwierdzenia)
-    await discardDraftChanges(false);
-    
-    // Przywróć oficjalny grafik
-    await restoreOfficialSchedule();
-    
-    console.log('🔄 [DRAFT] Tryb roboczy wyłączony pomyślnie');
-  } catch (error) {
-    console.error('Błąd podczas wyłączania trybu roboczego:', error);
-    showNotification('Błąd podczas wyłączania trybu roboczego', 'error');
-  } finally {
-    // Zawsze ustaw tryb na normalny i wyczyść zmiany (nawet w przypadku błędu)
-    isDraftMode = false;
-    draftChanges.clear();
-    
-    // Zaktualizuj UI na końcu
-    updateDraftUI();
-  }
-}
-
-// Załaduj oficjalny grafik dla trybu draft (ustawia data-official-value)
-async function loadOfficialScheduleForDraft() {
-  console.log('🔄 [DRAFT] Ładuję oficjalny grafik jako punkt odniesienia...');
-  
-  // Pobierz parametry roku i miesiąca z tabeli
-  const grafikTable = document.getElementById('grafik');
-  const year = grafikTable.getAttribute('data-year');
-  const month = grafikTable.getAttribute('data-month');
-  
-  if (!year || !month) {
-    console.error('Brak parametrów roku/miesiąca w tabeli');
-    return Promise.resolve();
-  }
-  
-  // Załaduj oficjalny grafik z serwera dla całego miesiąca
-  return fetch(`/?year=${year}&month=${month}`, { credentials: 'include' })
-    .then(response => response.text())
-    .then(html => {
-      // Parsuj HTML aby wyciągnąć dane shifts_by_date
-      const parser = new DOMParser();
-      const doc = parser.parseFromString(html, 'text/html');
-      const scriptTags = doc.querySelectorAll('script');
-      
-      let shiftsData = {};
-      let dataFound = false;
-      
-      for (const script of scriptTags) {
-        const content = script.textContent;
-        if (content.includes('shiftsData = ')) {
-          try {
-            // Wyciągnij dane z JavaScript
-            const match = content.match(/const shiftsData = (.*?);/s);
-            if (match) {
-              shiftsData = JSON.parse(match[1]);
-              dataFound = true;
-              break;
-            }
-          } catch (e) {
-            console.error('Błąd parsowania shiftsData:', e);
-          }
-        }
-      }
-      
-      if (!dataFound) {
-        console.error('Nie znaleziono danych shiftsData w HTML');
-        throw new Error('Nie znaleziono danych shiftsData w HTML');
-      }
-      
-      // Ustaw data-official-value na oficjalne wartości (bez zmiany wyświetlania)
-      Object.keys(shiftsData).forEach(date => {
-        if (date === '_timestamp') return; // Pomiń klucz timestamp
-        
-        Object.keys(shiftsData[date]).forEach(employeeName => {
-          const shiftType = shiftsData[date][employeeName];
-          
-          // Znajdź odpowiednią komórkę w tabeli
-          const cell = document.querySelector(`[data-date="${date}"][data-employee="${employeeName}"]`);
-          if (cell) {
-            // Ustaw tylko data-official-value (nie zmieniaj wyświetlania)
-            cell.dataset.officialValue = shiftType;
-            console.log(`🔄 [DRAFT] Ustawiono data-official-value: ${date} - ${employeeName} = ${shiftType}`);
-          }
-        });
-      });
-      
-      console.log('🔄 [DRAFT] Oficjalne wartości ustawione jako punkt odniesienia');
-    })
-    .catch(error => {
-      console.error('Błąd ładowania oficjalnego grafiku:', error);
-    });
-}
+// ============================================================================
+// LENIWE ŁADOWANIE MODUŁU ADMINISTRACYJNEGO (static/admin.js)
+// ============================================================================
 
-// Przywróć oficjalny grafik
-function restoreOfficialSchedule() {
-  console.log('🔄 [DRAFT] Przywracam oficjalny grafik...');
-  
-  // Wyczyść wszystkie sloty (NIE czyść data-official-value - to jest potrzebne do porównywania)
-  document.querySelectorAll('.slot[data-date][data-employee]').forEach(slot => {
-    slot.setAttribute('data-value', '');
-    slot.textContent = '';
-    slot.classList.remove('draft-slot');
-  });
-  
-  // Pobierz parametry roku i miesiąca z tabeli
-  const grafikTable = document.getElementById('grafik');
-  const year = grafikTable.getAttribute('data-year');
-  const month = grafikTable.getAttribute('data-month');
-  
-  if (!year || !month) {
-    console.error('Brak parametrów roku/miesiąca w tabeli');
-    return Promise.resolve();
-  }
-  
-  // Załaduj oficjalny grafik z serwera dla całego miesiąca
-  return fetch(`/?year=${year}&month=${month}`, { credentials: 'include' })
-    .then(response => response.text())
-    .then(html => {
-      // Parsuj HTML aby wyciągnąć dane shifts_by_date
-      const parser = new DOMParser();
-      const doc = parser.parseFromString(html, 'text/html');
-      const scriptTags = doc.querySelectorAll('script');
-      
-      let shiftsData = {};
-      let dataFound = false;
-      
-      for (const script of scriptTags) {
-        const content = script.textContent;
-        if (content.includes('shiftsData = ')) {
-          try {
-            // Wyciągnij dane z JavaScript
-            const match = content.match(/const shiftsData = (.*?);/s);
-            if (match) {
-              shiftsData = JSON.parse(match[1]);
-              dataFound = true;
-              break;
-            }
-          } catch (e) {
-            console.error('Błąd parsowania shiftsData:', e);
-          }
-        }
-      }
-      
-      if (!dataFound) {
-        console.error('Nie znaleziono danych shiftsData w HTML');
-        showNotification('Błąd ładowania oficjalnego grafiku', 'error');
-        throw new Error('Nie znaleziono danych shiftsData w HTML');
-      }
-      
-      // Zastosuj oficjalny grafik
-      Object.keys(shiftsData).forEach(date => {
-        if (date === '_timestamp') return; // Pomiń klucz timestamp
-        
-        Object.keys(shiftsData[date]).forEach(employeeName => {
-          const shiftType = shiftsData[date][employeeName];
-          
-          // Znajdź odpowiednią komórkę w tabeli
-          const cell = document.querySelector(`[data-date="${date}"][data-employee="${employeeName}"]`);
-          if (cell) {
-            // Zaktualizuj komórkę typem zmiany
-            const displayValue = shiftType === 'DNIOWKA' ? 'D' : shiftType === 'NOCKA' ? 'N' : shiftType;
-            cell.textContent = displayValue;
-            cell.dataset.value = shiftType;
-            cell.dataset.officialValue = shiftType; // Ustaw pełną nazwę jako oficjalną wartość
-            
-            // Dodaj odpowiednią klasę dla stylowania
-            cell.classList.remove('dniowka', 'nocka', 'custom-shift', 'poludniowka');
-            if (shiftType === 'DNIOWKA') {
-              cell.classList.add('dniowka');
-            } else if (shiftType === 'NOCKA') {
-              cell.classList.add('nocka');
-            } else if (shiftType && shiftType.startsWith('P ')) {
-              cell.classList.add('poludniowka');
-            } else if (shiftType && shiftType.length > 0) {
-              cell.classList.add('custom-shift');
-            }
-          }
-        });
-      });
-      
-      console.log('🔄 [DRAFT] Oficjalny grafik przywrócony dla całego miesiąca');
-    })
-    .catch(error => {
-      console.error('Błąd ładowania oficjalnego grafiku:', error);
-      throw error; // Rzuć błąd dalej dla obsługi w exitDraftMode
+// Pracownicy, eksport i tryb roboczy są w osobnym pliku - zwykli
+// użytkownicy nigdy go nie pobierają
+let adminModulePromise = null;
+
+function loadAdminModule() {
+  if (!adminModulePromise) {
+    adminModulePromise = new Promise((resolve, reject) => {
+      const script = document.createElement('script');
+      // Wersjonowany URL z preloadu w szablonie (ten sam wpis w cache)
+      const preload = document.getElementById('admin-module-url');
+      script.src = preload ? preload.getAttribute('href') : '/static/admin.js';
+      script.async = true;
+      script.onload = () => resolve();
+      script.onerror = () => {
+        adminModulePromise = null; // Pozwól ponowić próbę
+        reject(new Error('Nie udało się załadować modułu administracyjnego'));
+      };
+      document.head.appendChild(script);
     });
-}
-
-// Aktualizuj interfejs trybu roboczego
-function updateDraftUI() {
-  const toggleBtn = document.getElementById('toggle-draft-mode');
-  const exitDraftBtn = document.getElementById('exit-draft-mode');
-  const saveDraftBtn = document.getElementById('save-draft-version');
-  const normalSaveBtn = document.getElementById('save-shifts');
-  const cancelBtn = document.getElementById('cancel-shifts');
-  const publishBtn = document.getElementById('publish-draft-shifts');
-  
-  // Znajdź komórki układu 2x2
-  const rightTopCell = document.querySelector('.cell.right-top');
-  const leftBottomCell = document.querySelector('.cell.left-bottom');
-  const rightBottomCell = document.querySelector('.cell.right-bottom');
-  
-  console.log('🔍 [DRAFT] Komórki UI:', {
-    rightTopCell: !!rightTopCell,
-    leftBottomCell: !!leftBottomCell,
-    rightBottomCell: !!rightBottomCell,
-    toggleBtn: !!toggleBtn,
-    exitDraftBtn: !!exitDraftBtn,
-    normalSaveBtn: !!normalSaveBtn,
-    cancelBtn: !!cancelBtn
-  });
-  
-  if (isDraftMode) {
-    // TRYB ROBOCZY - zmień przyciski w układzie 2x2
-    
-    // Prawy górny: Wyłącz tryb roboczy
-    if (rightTopCell) {
-      console.log('🧹 [DRAFT] Czyśzczę rightTopCell przed włączeniem trybu roboczego');
-      
-      // Wyczyść CAŁKOWICIE komórkę
-      rightTopCell.innerHTML = '';
-      console.log('🧹 [DRAFT] Wyczyściłem rightTopCell całkowicie');
-      
-      // Dodaj przycisk "Wyłącz tryb roboczy"
-      if (exitDraftBtn) {
-        // Usuń przycisk z kontenera hidden
-        exitDraftBtn.remove();
-        
-        // Styl przycisku dla widoczności
-        exitDraftBtn.style.display = 'block';
-        exitDraftBtn.style.visibility = 'visible';
-        exitDraftBtn.style.position = 'relative';
-        exitDraftBtn.classList.remove('hidden');
-        
-        // Dodaj do komórki
-        rightTopCell.appendChild(exitDraftBtn);
-        console.log('🔧 [DRAFT] Przeniosłem exit-draft-btn do rightTopCell');
-      }
-    }
-    
-    // Lewy dolny: Zapisz wersję roboczą
-    if (leftBottomCell) {
-      console.log('🧹 [DRAFT] Czyśzczę leftBottomCell przed włączeniem trybu roboczego');
-      
-      // Wyczyść CAŁKOWICIE komórkę
-      leftBottomCell.innerHTML = '';
-      console.log('🧹 [DRAFT] Wyczyściłem leftBottomCell całkowicie');
-      
-      // Dodaj przycisk "Zapisz wersję roboczą"
-      if (saveDraftBtn) {
-        // Usuń przycisk z kontenera hidden
-        saveDraftBtn.remove();
-        
-        // Styl przycisku dla widoczności
-        saveDraftBtn.style.display = 'block';
-        saveDraftBtn.style.visibility = 'visible';
-        saveDraftBtn.style.position = 'relative';
-        saveDraftBtn.classList.remove('hidden');
-        
-        // Dodaj do komórki
-        leftBottomCell.appendChild(saveDraftBtn);
-        console.log('🔧 [DRAFT] Przeniosłem save-draft-btn do leftBottomCell');
-      }
-    }
-    
-    // Prawy dolny: Prześlij zmiany
-    if (rightBottomCell) {
-      console.log('🧹 [DRAFT] Czyśzczę rightBottomCell przed włączeniem trybu roboczego');
-      
-      // Wyczyść CAŁKOWICIE komórkę
-      rightBottomCell.innerHTML = '';
-      console.log('🧹 [DRAFT] Wyczyściłem rightBottomCell całkowicie');
-      
-      // Dodaj przycisk "Prześlij zmiany"
-      if (publishBtn) {
-        // Usuń przycisk z kontenera hidden
-        publishBtn.remove();
-        
-        // Styl przycisku dla widoczności
-        publishBtn.style.display = 'block';
-        publishBtn.style.visibility = 'visible';
-        publishBtn.style.position = 'relative';
-        publishBtn.classList.remove('hidden');
-        
-        // Dodaj do komórki
-        rightBottomCell.appendChild(publishBtn);
-        console.log('🔧 [DRAFT] Przeniosłem publish-draft-btn do rightBottomCell');
-      }
-    }
-    
-  } else {
-    // TRYB NORMALNY - przywróć oryginalne przyciski
-    console.log('🔄 [DRAFT] Przywracam oryginalne przyciski...');
-    
-    // Prawy górny: Włącz tryb roboczy
-    if (rightTopCell) {
-      console.log('🧹 [DRAFT] Przywracam normalne przyciski dla rightTopCell');
-      
-      // Usuń przycisk draft z komórki
-      const exitDraftBtn = rightTopCell.querySelector('#exit-draft-mode');
-      if (exitDraftBtn) {
-        exitDraftBtn.remove();
-        // Znajdź kontener ukryty i dodaj z powrotem
-        const draftControls = document.querySelector('.draft-mode-controls');
-        if (draftControls) {
-          draftControls.appendChild(exitDraftBtn);
-          exitDraftBtn.style.display = '';
-          console.log('🔙 [DRAFT] Przywróciłem exit-draft-btn do kontenera ukrytego');
-        }
-      }
-      
-      // Wyczyść komórkę i przywróć oryginalny przycisk
-      rightTopCell.innerHTML = `
-        <button id="toggle-draft-mode" class="btn btn-secondary">
-          <svg viewBox="0 0 24 24" fill="currentColor" width="18" height="18">
-            <path d="M22.7 19l-9.1-9.1c.9-2.3.4-5-1.5-6.9-2-2-5-2.4-7.4-1.3L9 6 6 9 1.6 4.7C.4 7.1.9 10.1 2.9 12.1c1.9 1.9 4.6 2.4 6.9 1.5l9.1 9.1c.4.4 1 .4 1.4 0l2.3-2.3c.5-.4.5-1.1.1-1.4z"/>
-          </svg>
-          tryb<br>roboczy
-        </button>
-      `;
-      console.log('🔧 [DRAFT] Przywróciłem toggleBtn');
-    }
-    
-    // Lewy dolny: Zapisz
-    if (leftBottomCell) {
-      console.log('🧹 [DRAFT] Przywracam normalne przyciski dla leftBottomCell');
-      
-      // Usuń przycisk draft z komórki
-      const saveDraftBtn = leftBottomCell.querySelector('#save-draft-version');
-      if (saveDraftBtn) {
-        saveDraftBtn.remove();
-        // Znajdź kontener ukryty i dodaj z powrotem
-        const draftControls = document.querySelector('.draft-mode-controls');
-        if (draftControls) {
-          draftControls.appendChild(saveDraftBtn);
-          saveDraftBtn.style.display = '';
-          console.log('🔙 [DRAFT] Przywróciłem save-draft-btn do kontenera ukrytego');
-        }
-      }
-      
-      // Wyczyść komórkę i przywróć oryginalny przycisk
-      leftBottomCell.innerHTML = `
-        <button id="save-shifts" class="btn">
-          <svg viewBox="0 0 24 24" fill="currentColor" width="18" height="18">
-            <path d="M17 3H5c-1.11 0-2 .9-2 2v14c0 1.1.89 2 2 2h14c1.1 0 2-.9 2-2V7l-4-4zm-5 16c-1.66 0-3-1.34-3-3s1.34-3 3-3 3 1.34 3 3-1.34 3-3 3zm3-10H5V5h10v4z"/>
-          </svg>
-          Zapisz
-        </button>
-      `;
-      console.log('🔧 [DRAFT] Przywróciłem saveBtn');
-      
-      // Ponownie przypisz event listener do nowego przycisku
-      const newSaveBtn = document.getElementById('save-shifts');
-      if (newSaveBtn && typeof save === 'function') {
-        newSaveBtn.addEventListener('click', save);
-        console.log('🔧 [DRAFT] Przypisałem event listener do nowego saveBtn');
-      }
-    }
-    
-    // Prawy dolny: Anuluj
-    if (rightBottomCell) {
-      console.log('🧹 [DRAFT] Przywracam normalne przyciski dla rightBottomCell');
-      
-      // Usuń przycisk draft z komórki
-      const publishBtn = rightBottomCell.querySelector('#publish-draft-shifts');
-      if (publishBtn) {
-        publishBtn.remove();
-        // Znajdź kontener ukryty i dodaj z powrotem
-        const draftControls = document.querySelector('.draft-mode-controls');
-        if (draftControls) {
-          draftControls.appendChild(publishBtn);
-          publishBtn.style.display = '';
-          console.log('🔙 [DRAFT] Przywróciłem publish-draft-btn do kontenera ukrytego');
-        }
-      }
-      
-      // Wyczyść komórkę i przywróć oryginalny przycisk
-      rightBottomCell.innerHTML = `
-        <button id="cancel-shifts" class="btn">
-          <svg viewBox="0 0 24 24" fill="currentColor" width="18" height="18">
-            <path d="M19 6.41L17.59 5 12 10.59 6.41 5 5 6.41 10.59 12 5 17.59 6.41 19 12 13.41 17.59 19 19 17.59 13.41 12z"/>
-          </svg>
-          Anuluj
-        </button>
-      `;
-      console.log('🔧 [DRAFT] Przywróciłem cancelBtn');
-      
-      // Ponownie przypisz event listener do nowego przycisku
-      const newCancelBtn = document.getElementById('cancel-shifts');
-      if (newCancelBtn && typeof cancel === 'function') {
-        newCancelBtn.addEventListener('click', cancel);
-        console.log('🔧 [DRAFT] Przypisałem event listener do nowego cancelBtn');
-      }
-    }
   }
-  
-  console.log('🔧 [DRAFT] UI zaktualizowane - isDraftMode:', isDraftMode);
-  
-  // Sprawdź czy istnieją zapisane wersje robocze
-  checkDraftStatus();
-}
-
-// Zapisz wersję roboczą
-function saveDraftVersion() {
-  console.log('💾 [DRAFT] Zapisuję wersję roboczą...');
-  
-  // Zbierz wszystkie zmiany z interfejsu
-  const changes = collectDraftChanges();
-  console.log('💾 [DRAFT] Zebrano', changes.length, 'zmian do zapisania');
-  console.log('💾 [DRAFT] Szczegóły zmian:', changes);
-  
-  if (changes.length === 0) {
-    showNotification('Brak zmian do zapisania', 'info');
-    return;
-  }
-  
-  // Wyłącz przyciski podczas zapisywania
-  const saveBtn = document.getElementById('save-draft-version');
-  if (saveBtn) {
-    saveBtn.disabled = true;
-    saveBtn.textContent = 'Zapisywanie...';
-  }
-  
-  // Wyślij dane do API
-  fetch('/api/draft/save', {
-    method: 'POST',
-    headers: { 
-      'Content-Type': 'application/json',
-      'X-CSRFToken': window.csrfToken
-    },
-    credentials: 'include',
-    body: JSON.stringify({ changes })
-  })
-  .then(response => response.json())
-  .then(data => {
-    if (data.error) {
-      showNotification('Błąd zapisywania: ' + data.error, 'error');
-      return;
-    }
-    
-    showNotification(`Wersja robocza zapisana! (${changes.length} zmian)`, 'success');
-    console.log('💾 [DRAFT] Wersja robocza zapisana pomyślnie');
-    // Odśwież status draft
-    checkDraftStatus();
-  })
-  .catch(error => {
-    console.error('Błąd zapisywania wersji roboczej:', error);
-    showNotification('Błąd zapisywania wersji roboczej', 'error');
-  })
-  .finally(() => {
-    // Przywróć przyciski
-    if (saveBtn) {
-      saveBtn.disabled = false;
-      saveBtn.textContent = 'Zapisz wersję roboczą';
-    }
-  });
+  return adminModulePromise;
 }
 
-// Sprawdź status wersji roboczej
-function checkDraftStatus() {
-  fetch('/api/draft/status', { credentials: 'include' })
-    .then(response => response.json())
-    .then(data => {
-      if (data.error) {
-        console.error('Błąd sprawdzania statusu draft:', data.error);
-        return;
-      }
-      
-      // Status draft jest teraz tylko w trybie edycji
-      console.log('📊 [DRAFT] Status draft:', data);
-      
-      // Pokaż/ukryj przycisk publikacji w zależności od tego czy istnieją drafty
-      const publishBtn = document.getElementById('publish-draft-shifts');
-      if (publishBtn) {
-        if (data.has_draft && isDraftMode) {
-          publishBtn.classList.remove('hidden');
-          publishBtn.disabled = false;
-        } else {
-          publishBtn.classList.add('hidden');
-        }
+// Wywołaj funkcję z modułu administracyjnego (ładując go w razie potrzeby)
+function callAdminFunction(name, ...args) {
+  return loadAdminModule()
+    .then(() => {
+      if (typeof window[name] !== 'function') {
+        throw new Error(`${name} nie jest funkcją!`);
       }
+      return window[name](...args);
     })
-    .catch(error => {
-      console.error('Błąd sprawdzania statusu draft:', error);
-    });
+    .catch(error => console.error('❌ [ADMIN]', error));
 }
 
-// Opublikuj zmiany z draft
-function publishDraftChanges() {
-  console.log('🚀 [DRAFT] Publikuję zmiany z draft...');
-  
-  // Przycisk publikacji jest teraz w trybie edycji
-  
-  fetch('/api/draft/publish', {
-    method: 'POST',
-    headers: { 
-      'Content-Type': 'application/json',
-      'X-CSRFToken': window.csrfToken
-    },
-    credentials: 'include'
-  })
-  .then(response => response.json())
-  .then(data => {
-    if (data.error) {
-      showNotification('Błąd publikacji: ' + data.error, 'error');
-    } else {
-      showNotification('Zmiany zostały opublikowane pomyślnie', 'success');
-      // Odśwież status draft
-      checkDraftStatus();
-      // Odśwież stronę aby pokazać nowe zmiany
-      setTimeout(() => {
-        window.location.reload();
-      }, 1000);
-    }
-  })
-  .catch(error => {
-    console.error('Błąd publikacji draft:', error);
-    showNotification('Błąd publikacji zmian', 'error');
-  })
-  .finally(() => {
-    // Przycisk publikacji jest teraz w trybie edycji
-  });
-}
-
-// Odrzuć wersję roboczą
-function discardDraftChanges(showConfirmation = true) {
-  console.log('🗑️ [DRAFT] Odrzucam wersję roboczą...');
-  
-  if (showConfirmation && !confirm('Czy na pewno chcesz odrzucić wszystkie zmiany w wersji roboczej?')) {
-    return Promise.resolve();
-  }
-  
-  // Przycisk odrzucania jest teraz w trybie edycji
-  
-  return fetch('/api/draft/discard', {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    credentials: 'include'
-  })
-  .then(response => {
-    if (!response.ok) {
-      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-    }
-    return response.json();
-  })
-  .then(data => {
-    if (data.error) {
-      if (showConfirmation) {
-        showNotification('Błąd odrzucania: ' + data.error, 'error');
-      }
-      console.error('Błąd odrzucania draft:', data.error);
-    } else {
-      if (showConfirmation) {
-        showNotification('Wersja robocza została odrzucona', 'success');
-        // Odśwież status draft
-        checkDraftStatus();
-      }
-      console.log('🗑️ [DRAFT] Wersja robocza została odrzucona');
-    }
-  })
-  .catch(error => {
-    console.error('Błąd odrzucania draft:', error);
-    if (showConfirmation) {
-      showNotification('Błąd odrzucania wersji roboczej: ' + error.message, 'error');
-    }
-  });
-}
-
-// Załaduj zapisane wersje robocze
-async function loadDraftData() {
-  console.log('📥 [DRAFT] Ładowanie zapisanych wersji roboczych...');
-  
-  try {
-    const response = await fetch('/api/draft/load', { credentials: 'include' });
-    const data = await response.json();
-    
-    if (data.error) {
-      console.error('Błąd ładowania draft:', data.error);
-      showNotification('Błąd ładowania wersji roboczej: ' + data.error, 'error');
-      return;
-    }
-    
-    if (data.changes && data.changes.length > 0) {
-      console.log('📥 [DRAFT] Znaleziono', data.changes.length, 'zapisanych zmian');
-      applyDraftChanges(data.changes);
-      showNotification(`Załadowano ${data.changes.length} zapisanych zmian`, 'info');
-    } else {
-      console.log('📥 [DRAFT] Brak zapisanych wersji roboczych');
-    }
-  } catch (error) {
-    console.error('Błąd ładowania draft:', error);
-    showNotification('Błąd ładowania wersji roboczej: ' + error.message, 'error');
-    throw error; // Rzuć błąd dalej dla obsługi w enterDraftMode
-  }
-}
-
-// Zastosuj zmiany draft do interfejsu
-function applyDraftChanges(changes) {
-  console.log('🎨 [DRAFT] Zastosowuję zapisane zmiany...');
-  
-  // NAJPIERW: Wyczyść wszystkie sloty (usuń oficjalny grafik)
-  document.querySelectorAll('.slot[data-date][data-employee]').forEach(slot => {
-    slot.setAttribute('data-value', '');
-    // NIE czyść data-official-value - to jest potrzebne do porównywania zmian
-    slot.textContent = '';
-    slot.classList.remove('draft-slot');
-  });
-  
-  // Mapowanie pełnych nazw na skróty
-  const shiftTypeMapping = {
-    'DNIOWKA': 'D',
-    'NOCKA': 'N',
-    'POPOLUDNIOWKA': 'P',
-    'P ': 'P',  // Obsługa międzyzmiany z spacją
-    'P': 'P'    // Obsługa międzyzmiany bez spacji
-  };
-  
-  // TERAZ: Zastosuj tylko zmiany z wersji roboczej
-  changes.forEach(change => {
-    const slot = document.querySelector(`[data-date="${change.date}"][data-employee="${change.employee}"]`);
-    if (slot) {
-      // Mapuj pełną nazwę na skrót
-      const displayValue = shiftTypeMapping[change.shift_type] || change.shift_type;
-      
-      slot.setAttribute('data-value', displayValue || '');
-      slot.textContent = displayValue || '';
-      
-      // Dodaj klasę draft-slot tylko jeśli jest wartość
-      if (displayValue && displayValue.trim()) {
-        slot.classList.add('draft-slot');
-      } else {
-        slot.classList.remove('draft-slot');
-      }
-      
-      // NIE aktualizuj data-official-value - to powinno pozostać jako oryginalna wartość
-      
-      console.log('🎨 [DRAFT] Zastosowano:', change.date, change.employee, change.shift_type, '->', displayValue || 'PUSTE');
-    }
-  });
-  
-  console.log('🎨 [DRAFT] Wersja robocza zastąpiła oficjalny grafik');
-}
-
-// Zbierz zmiany z interfejsu (TYLKO wersja robocza)
-function collectDraftChanges() {
-  console.log('🔍 [DRAFT] Zbieram zmiany z interfejsu...');
-  const changes = [];
-  const slots = document.querySelectorAll('.slot[data-date][data-employee]');
-  console.log(`🔍 [DRAFT] Znaleziono ${slots.length} slotów do sprawdzenia`);
-  
-  // Mapowanie skrótów na pełne nazwy
-  const reverseShiftTypeMapping = {
-    'D': 'DNIOWKA',
-    'N': 'NOCKA',
-    'P': 'POPOLUDNIOWKA'
-  };
-  
-  slots.forEach((slot, index) => {
-    const date = slot.getAttribute('data-date');
-    const employee = slot.getAttribute('data-employee');
-    const currentValue = slot.getAttribute('data-value') || '';
-    const officialValue = slot.getAttribute('data-official-value') || '';
-    
-    // Loguj pierwsze 5 slotów dla debugowania
-    if (index < 5) {
-      console.log(`🔍 [DRAFT] Slot ${index}: ${date} - ${employee} - current:"${currentValue}" official:"${officialValue}"`);
-    }
-    
-    if (date && employee) {
-      // Sprawdź czy jest różnica między oficjalną a aktualną wartością
-      if (currentValue !== officialValue) {
-        // Mapuj skrót na pełną nazwę przed zapisaniem
-        const fullShiftType = reverseShiftTypeMapping[currentValue] || currentValue;
-        
-        // Zapisuj zmianę (może być pusta jeśli usuwamy zmianę)
-        changes.push({ 
-          date, 
-          employee, 
-          shift_type: fullShiftType || '' // Upewnij się że puste wartości są zapisywane jako pusty string
-        });
-        
-        console.log(`💾 [DRAFT] Zmiana wykryta: ${date} - ${employee} - "${officialValue}" -> "${currentValue}" (${fullShiftType || 'PUSTE'})`);
-      }
-    }
-  });
-  
-  console.log('💾 [DRAFT] Zebrano', changes.length, 'zmian z wersji roboczej');
-  
-  // Dodatkowe debugowanie - policz sloty z różnymi wartościami
-  let differentSlots = 0;
-  let emptySlots = 0;
-  let officialSlots = 0;
-  
-  slots.forEach(slot => {
-    const currentValue = slot.getAttribute('data-value') || '';
-    const officialValue = slot.getAttribute('data-official-value') || '';
-    
-    if (currentValue !== officialValue) {
-      differentSlots++;
-    }
-    if (currentValue === '') {
-      emptySlots++;
-    }
-    if (officialValue !== '') {
-      officialSlots++;
-    }
-  });
-  
-  console.log(`🔍 [DRAFT] Statystyki: ${differentSlots} różnych slotów, ${emptySlots} pustych slotów, ${officialSlots} slotów z oficjalnymi wartościami`);
-  
-  return changes;
-}
-
-// Inicjalizacja prostego systemu draft
-function initializeDraftSystem() {
-  console.log('🔧 [DRAFT] Inicjalizacja prostego systemu draft...');
-  
-  // Sprawdź czy użytkownik jest adminem
-  const isAdmin = document.body.classList.contains('admin-user');
-  if (!isAdmin) {
-    console.log('🔧 [DRAFT] Użytkownik nie jest adminem - tryb roboczy niedostępny');
-    return;
-  }
-  
-  // Dodaj event listener dla przycisku zapisu w trybie edycji
-  const saveBtn = document.getElementById('save-draft-version');
-  if (saveBtn) {
-    saveBtn.addEventListener('click', saveDraftVersion);
-    console.log('🔧 [DRAFT] Event listener dla zapisu wersji roboczej dodany');
-  }
-  
-  // Przyciski panelu kontrolnego zostały usunięte - funkcjonalność tylko w trybie edycji
-  
-  // Sprawdź status draft przy inicjalizacji
-  checkDraftStatus();
-  
-  console.log('🔧 [DRAFT] Prosty system draft zainicjalizowany');
-}
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
-
-// Stare funkcje usunięte - zastąpione przez DraftManager
 
 // Sprawdź zmiany statusów po załadowaniu strony
 document.addEventListener('DOMContentLoaded', function() {
@@ -6170,22 +4851,24 @@ document.addEventListener('DOMContentLoaded', function() {
   // Inicjalizuj nawigację zmian
   initializeShiftNavigation();
   
-  // Inicjalizuj system draft
-  console.log('🚀 [APP] Inicjalizuję system draft...');
-  initializeDraftSystem();
+  // Inicjalizuj system draft (tylko admin - ładuje moduł administracyjny)
+  if (document.body.classList.contains('admin-user')) {
+    console.log('🚀 [APP] Inicjalizuję system draft...');
+    callAdminFunction('initializeDraftSystem');
+  }
   
   // Uniwersalny event listener dla przycisków draft mode
   document.addEventListener('click', function(e) {
     console.log('🔄 [DRAFT] Kliknięto element:', e.target.id, e.target);
     if (e.target && e.target.id === 'toggle-draft-mode') {
       console.log('🔄 [DRAFT] Kliknięto przycisk toggle-draft-mode');
-      toggleDraftMode();
+      callAdminFunction('toggleDraftMode');
     } else if (e.target && e.target.id === 'exit-draft-mode') {
       console.log('🔄 [DRAFT] Kliknięto przycisk exit-draft-mode');
-      exitDraftMode();
+      callAdminFunction('exitDraftMode');
     } else if (e.target && e.target.closest && e.target.closest('#exit-draft-mode')) {
       console.log('🔄 [DRAFT] Kliknięto element wewnątrz exit-draft-mode');
-      exitDraftMode();
+      callAdminFunction('exitDraftMode');
     }
   });
   
@@ -6318,3 +5001,111 @@ document.addEventListener('DOMContentLoaded', function() {
   }
 });
 
+
+// ============================================================================
+// GRAFIK OFFLINE - IndexedDB + synchronizacja delty (static/schedule-store.js)
+// ============================================================================
+
+// Wartość wyświetlana w komórce (jak w szablonie index.html)
+function displayShiftValue(shiftType) {
+  if (shiftType === 'DNIOWKA') return 'D';
+  if (shiftType === 'NOCKA') return 'N';
+  return shiftType || '';
+}
+
+// Wyrenderuj miesiąc z IndexedDB - tylko komórki bez niezapisanych zmian
+function renderScheduleMonth(table, snapshot) {
+  let updated = 0;
+  table.querySelectorAll(`.slot[data-date^="${snapshot.key}-"]`).forEach(cell => {
+    const dayShifts = snapshot.shifts[cell.dataset.date] || {};
+    const value = displayShiftValue(dayShifts[cell.dataset.employee]);
+    const current = cell.dataset.value || '';
+    
+    // Komórka edytowana lokalnie - nie nadpisuj
+    if (current !== (cell.dataset.officialValue || '') || current === value) {
+      return;
+    }
+    
+    cell.textContent = value;
+    cell.dataset.value = value;
+    cell.dataset.officialValue = value;
+    cell.classList.remove('dniowka', 'nocka', 'custom-shift', 'poludniowka');
+    if (value === 'D') {
+      cell.classList.add('dniowka');
+    } else if (value === 'N') {
+      cell.classList.add('nocka');
+    } else if (value.startsWith('P ')) {
+      cell.classList.add('poludniowka');
+    } else if (value) {
+      cell.classList.add('custom-shift');
+    }
+    updated++;
+  });
+  return updated;
+}
+
+// Pokaż dane z IndexedDB, jeśli są nowsze niż wyświetlone (np. strona z cache SW)
+async function refreshScheduleFromStore() {
+  const table = document.getElementById('grafik');
+  if (!table || isDraftMode) return;
+  
+  const year = parseInt(table.dataset.year, 10);
+  const month = parseInt(table.dataset.month, 10);
+  const displayedCursor = parseInt(table.dataset.scheduleCursor || '0', 10);
+  
+  const snapshot = await ScheduleStore.getMonth(year, month);
+  if (!snapshot || snapshot.cursor <= displayedCursor) return;
+  
+  const updated = renderScheduleMonth(table, snapshot);
+  table.dataset.scheduleCursor = snapshot.cursor;
+  if (updated > 0) {
+    console.log(`📅 [OFFLINE] Zaktualizowano ${updated} komórek grafiku (kursor ${snapshot.cursor})`);
+    document.dispatchEvent(new CustomEvent('schedule:updated'));
+  }
+}
+
+// Poproś Service Worker o synchronizację po odzyskaniu połączenia
+function requestScheduleBackgroundSync() {
+  if (!('serviceWorker' in navigator)) return;
+  navigator.serviceWorker.ready
+    .then(registration => registration.sync && registration.sync.register(ScheduleStore.SYNC_TAG))
+    .catch(error => console.warn('⚠️ [OFFLINE] Background Sync niedostępny:', error));
+}
+
+async function syncOfflineSchedule() {
+  if (!navigator.onLine) {
+    requestScheduleBackgroundSync();
+    return;
+  }
+  try {
+    await ScheduleStore.sync();
+    await refreshScheduleFromStore();
+  } catch (error) {
+    console.warn('⚠️ [OFFLINE] Synchronizacja grafiku nieudana, ponowię w tle:', error);
+    requestScheduleBackgroundSync();
+  }
+}
+
+async function initOfflineSchedule() {
+  if (!document.getElementById('grafik') || !window.ScheduleStore || !('indexedDB' in window)) return;
+  
+  // Najpierw natychmiast z IndexedDB, potem synchronizacja z serwerem
+  try {
+    await refreshScheduleFromStore();
+  } catch (error) {
+    console.warn('⚠️ [OFFLINE] Błąd odczytu grafiku z IndexedDB:', error);
+  }
+  
+  window.addEventListener('online', syncOfflineSchedule);
+  if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.addEventListener('message', event => {
+      if (event.data && event.data.type === 'SCHEDULE_UPDATED') {
+        refreshScheduleFromStore().catch(error => console.warn('⚠️ [OFFLINE]', error));
+      }
+    });
+  }
+  
+  await syncOfflineSchedule();
+}
+
+document.addEventListener('DOMContentLoaded', initOfflineSchedule);
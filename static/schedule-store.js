@@ -0,0 +1,184 @@
+// Magazyn grafiku offline (IndexedDB) - Grafik SP4600
+// Przechowuje bieżący i następny miesiąc razem z kursorem (id ostatniej zmiany
+// w schedule_changes). Synchronizacja pobiera tylko komórki zmienione po kursorze.
+// Używany przez stronę (app.js) i Service Worker (importScripts) - bez dostępu do DOM.
+
+(function (global) {
+  'use strict';
+
+  const DB_NAME = 'grafiksp4600';
+  const DB_VERSION = 1;
+  const MONTHS_STORE = 'months';
+
+  // Po tym czasie miesiąc jest pobierany ponownie w całości (np. nowi pracownicy)
+  const MONTH_MAX_AGE_MS = 24 * 60 * 60 * 1000;
+
+  let dbPromise = null;
+
+  function openDb() {
+    if (!dbPromise) {
+      dbPromise = new Promise((resolve, reject) => {
+        const request = indexedDB.open(DB_NAME, DB_VERSION);
+        request.onupgradeneeded = () => {
+          const db = request.result;
+          if (!db.objectStoreNames.contains(MONTHS_STORE)) {
+            db.createObjectStore(MONTHS_STORE, { keyPath: 'key' });
+          }
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => {
+          dbPromise = null;
+          reject(request.error);
+        };
+      });
+    }
+    return dbPromise;
+  }
+
+  // Wykonaj operację w transakcji i poczekaj na jej zakończenie
+  async function withStore(mode, callback) {
+    const db = await openDb();
+    return new Promise((resolve, reject) => {
+      const tx = db.transaction(MONTHS_STORE, mode);
+      const result = callback(tx.objectStore(MONTHS_STORE));
+      tx.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+      tx.onerror = () => reject(tx.error);
+      tx.onabort = () => reject(tx.error);
+    });
+  }
+
+  function monthKey(year, month) {
+    return `${year}-${String(month).padStart(2, '0')}`;
+  }
+
+  // Bieżący i następny miesiąc - tylko te są trzymane offline
+  function trackedMonths(now = new Date()) {
+    const year = now.getFullYear();
+    const month = now.getMonth() + 1;
+    const next = month === 12 ? { year: year + 1, month: 1 } : { year, month: month + 1 };
+    return [{ year, month }, next];
+  }
+
+  function getMonth(year, month) {
+    return withStore('readonly', store => store.get(monthKey(year, month)));
+  }
+
+  function getAllMonths() {
+    return withStore('readonly', store => store.getAll());
+  }
+
+  function putMonths(months) {
+    return withStore('readwrite', store => {
+      months.forEach(month => store.put(month));
+    });
+  }
+
+  function deleteMonths(keys) {
+    return withStore('readwrite', store => {
+      keys.forEach(key => store.delete(key));
+    });
+  }
+
+  async function fetchJson(url) {
+    const response = await fetch(url, { credentials: 'include' });
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status} dla ${url}`);
+    }
+    return response.json();
+  }
+
+  async function fetchMonth(year, month) {
+    const data = await fetchJson(`/api/schedule/month?year=${year}&month=${month}`);
+    return {
+      key: monthKey(year, month),
+      year: data.year,
+      month: data.month,
+      cursor: data.cursor,
+      shifts: data.shifts || {},
+      fetchedAt: Date.now()
+    };
+  }
+
+  function lastDayOfMonth(year, month) {
+    return new Date(year, month, 0).getDate();
+  }
+
+  // Zastosuj zmienione komórki do miesięcy w pamięci, zwraca komórki faktycznie zmienione
+  function applyChanges(months, changes) {
+    const byKey = new Map(months.map(month => [month.key, month]));
+    const applied = [];
+    changes.forEach(change => {
+      const month = byKey.get(change.date.slice(0, 7));
+      if (!month) {
+        return;
+      }
+      const day = month.shifts[change.date] || (month.shifts[change.date] = {});
+      const previous = day[change.employee] || '';
+      if (change.shift_type) {
+        day[change.employee] = change.shift_type;
+      } else {
+        delete day[change.employee];
+      }
+      if (previous !== change.shift_type) {
+        applied.push(change);
+      }
+    });
+    return applied;
+  }
+
+  // Synchronizacja: uzupełnij brakujące/przestarzałe miesiące, potem pobierz deltę.
+  // Zwraca { cursor, changes } - komórki zmienione od ostatniej synchronizacji.
+  async function sync() {
+    const tracked = trackedMonths();
+    const trackedKeys = tracked.map(({ year, month }) => monthKey(year, month));
+    const stored = await getAllMonths();
+
+    // Usuń miesiące, które nie są już śledzone
+    const obsolete = stored.filter(month => !trackedKeys.includes(month.key)).map(month => month.key);
+    if (obsolete.length) {
+      await deleteMonths(obsolete);
+    }
+
+    const storedByKey = new Map(stored.map(month => [month.key, month]));
+    let months = await Promise.all(tracked.map(({ year, month }) => {
+      const existing = storedByKey.get(monthKey(year, month));
+      if (existing && Date.now() - existing.fetchedAt < MONTH_MAX_AGE_MS) {
+        return existing;
+      }
+      return fetchMonth(year, month);
+    }));
+
+    const since = Math.min(...months.map(month => month.cursor));
+    const first = tracked[0];
+    const last = tracked[tracked.length - 1];
+    const params = new URLSearchParams({
+      since: String(since),
+      from: `${monthKey(first.year, first.month)}-01`,
+      to: `${monthKey(last.year, last.month)}-${lastDayOfMonth(last.year, last.month)}`
+    });
+    const delta = await fetchJson(`/api/schedule/delta?${params}`);
+
+    let changes;
+    if (delta.reset) {
+      // Baza została odtworzona lub zmian jest zbyt wiele - pobierz miesiące od nowa
+      months = await Promise.all(tracked.map(({ year, month }) => fetchMonth(year, month)));
+      changes = null;
+    } else {
+      changes = applyChanges(months, delta.changes);
+      months.forEach(month => {
+        month.cursor = Math.max(month.cursor, delta.cursor);
+      });
+    }
+
+    await putMonths(months);
+    return { cursor: Math.max(...months.map(month => month.cursor)), changes };
+  }
+
+  global.ScheduleStore = {
+    SYNC_TAG: 'schedule-sync',
+    monthKey,
+    trackedMonths,
+    getMonth,
+    sync
+  };
+})(self);
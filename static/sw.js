@@ -1 +1,521 @@
-const CACHE_NAME = 'grafiksp4600-v1.1.0';const urlsToCache = [ '/', '/signin', '/static/style.css', '/static/app.js', '/static/PKN.WA.D.png', '/static/icon-48.png', '/static/icon-72.png', '/static/icon-96.png', '/static/icon-144.png', '/static/icon-192.png', '/static/icon-512.png', '/static/favicon.ico', '/static/manifest.json' ];const VAPID_PUBLIC_KEY = 'BIvhQxAeGQGHEfdZRg8c1DyFQ2i35xL-ZBlfVz8GO4u8UxSVbWeCVACXpBi7_L7nDQJl3nxMoIYSPNJDn8xOsBQ';const urlB64ToUint8Array = (base64String) => {const padding = '='.repeat((4 - (base64String.length % 4)) % 4);const base64 = (base64String + padding).replace(/\-/g, '+').replace(/_/g, '/');const rawData = atob(base64);const outputArray = new Uint8Array(rawData.length);for (let i = 0;i < rawData.length;++i) {outputArray[i] = rawData.charCodeAt(i)} return outputArray};self.addEventListener('install', event => {console.log('Service Worker: Instalacja rozpoczęta');event.waitUntil( caches.open(CACHE_NAME) .then(cache => {console.log('Service Worker: Cache otwarty');return cache.addAll(urlsToCache)}) .then(() => {console.log('Service Worker: Wszystkie pliki zostały zacachowane');return self.skipWaiting()}) )});self.addEventListener('activate', event => {console.log('Service Worker: Aktywacja rozpoczęta');event.waitUntil( caches.keys().then(cacheNames => {return Promise.all( cacheNames.map(cacheName => {if (cacheName !== CACHE_NAME) {console.log('Service Worker: Usuwam stary cache:', cacheName);return caches.delete(cacheName)} }) )}).then(() => {return self.clients.claim()}).then(() => {return self.registration.pushManager.getSubscription().then(subscription => {if (!subscription) {console.log('Service Worker: Brak subskrypcji push, rejestruję...');return self.registration.pushManager.subscribe({userVisibleOnly: true, applicationServerKey: urlB64ToUint8Array(VAPID_PUBLIC_KEY) }).then(subscription => {console.log('Service Worker: Subskrypcja push utworzona:', subscription);return saveSubscriptionToServer(subscription)}).catch(error => {console.error('Service Worker: Błąd tworzenia subskrypcji push:', error);return null})} else {console.log('Service Worker: Subskrypcja push już istnieje:', subscription);return subscription} }).catch(error => {console.error('Service Worker: Błąd pobierania subskrypcji push:', error);return null})}) )});const saveSubscriptionToServer = async (subscription) => {try {const response = await fetch('/api/push/subscribe', {method: 'POST', headers: {'Content-Type': 'application/json', }, body: JSON.stringify(subscription), });if (response.ok) {const result = await response.json();console.log('Service Worker: Subskrypcja zapisana na serwerze:', result);return result} else {console.error('Service Worker: Błąd zapisywania subskrypcji:', response.status)} } catch (error) {console.error('Service Worker: Błąd podczas zapisywania subskrypcji:', error)} };self.addEventListener('fetch', event => {event.respondWith( caches.match(event.request) .then(response => {if (response) {return response} return fetch(event.request) .then(response => {if (!response || response.status !== 200 || response.type !== 'basic') {return response} const responseToCache = response.clone();caches.open(CACHE_NAME) .then(cache => {cache.put(event.request, responseToCache)});return response}) .catch(() => {if (event.request.mode === 'navigate') {return caches.match('/offline')} })}) )});self.addEventListener('message', event => {if (event.data && event.data.type === 'SKIP_WAITING') {self.skipWaiting()} else if (event.data && event.data.type === 'GET_SUBSCRIPTION') {self.registration.pushManager.getSubscription().then(subscription => {event.ports[0].postMessage({subscription: subscription })})} else if (event.data && event.data.type === 'SUBSCRIBE_PUSH') {self.registration.pushManager.subscribe({userVisibleOnly: true, applicationServerKey: urlB64ToUint8Array(VAPID_PUBLIC_KEY) }).then(subscription => {saveSubscriptionToServer(subscription);event.ports[0].postMessage({success: true, subscription: subscription })}).catch(error => {console.error('Service Worker: Błąd subskrypcji push:', error);event.ports[0].postMessage({success: false, error: error.message })})} });self.addEventListener('push', event => {console.log('Service Worker: Otrzymano push event:', event);let notificationData = {title: 'Grafik SP4600', body: 'Masz nową prośbę w skrzynce', icon: '/static/PKN.WA.D-192.png', badge: '/static/PKN.WA.D-192.png', data: {url: '/', timestamp: Date.now() } };if (event.data) {try {const pushData = event.data.json();notificationData = {...notificationData, ...pushData }} catch (error) {console.error('Service Worker: Błąd parsowania danych push:', error)} } const options = {body: notificationData.body, icon: notificationData.icon, badge: notificationData.badge, vibrate: [200, 100, 200], data: notificationData.data, actions: [ {action: 'open', title: 'Otwórz aplikację', icon: '/static/PKN.WA.D-192.png' }, {action: 'close', title: 'Zamknij', icon: '/static/PKN.WA.D-192.png' } ], requireInteraction: true, tag: 'grafik-notification' };event.waitUntil( self.registration.showNotification(notificationData.title, options) )});self.addEventListener('notificationclick', event => {console.log('Service Worker: Kliknięto w powiadomienie:', event);event.notification.close();if (event.action === 'open') {event.waitUntil( clients.openWindow('/') )} else if (event.action === 'close') {return} else {event.waitUntil( clients.matchAll().then(clientList => {if (clientList.length > 0) {return clientList[0].focus()} return clients.openWindow('/')}) )} });self.addEventListener('sync', event => {if (event.tag === 'check-notifications') {event.waitUntil(checkForNewRequests())} });async function checkForNewRequests() {try {const response = await fetch('/api/swaps/inbox', { credentials: 'include' });const data = await response.json();if (data.items && data.items.length > 0) {const previousStatuses = await getPreviousStatuses();const currentStatuses = {};let hasChanges = false;let notificationMessage = '';data.items.forEach(item => {currentStatuses[item.id] = item.final_status;if (previousStatuses[item.id] && previousStatuses[item.id] !== item.final_status) {hasChanges = true;const statusText = getStatusText(item.final_status);if (!notificationMessage) {notificationMessage = `Status prośby się zmienił: ${statusText}`} else {notificationMessage += `, ${statusText}`} } if (!previousStatuses[item.id] && (item.final_status === 'OCZEKUJACE' || item.final_status === 'WSTEPNIE_ZATWIERDZONE')) {hasChanges = true;if (!notificationMessage) {notificationMessage = `Masz nową prośbę w skrzynce`} else {notificationMessage += `, nowa prośba`} } });await savePreviousStatuses(currentStatuses);if (hasChanges && notificationMessage) {self.registration.showNotification('Grafik SP4600', {body: notificationMessage, icon: '/static/PKN.WA.D-192.png', badge: '/static/PKN.WA.D-192.png', tag: 'grafik-notification', data: {url: '/' } })} } } catch (error) {console.error('Service Worker: Błąd sprawdzania nowych próśb:', error)} } async function getPreviousStatuses() {try {const cache = await caches.open('grafiksp4600-statuses');const response = await cache.match('/statuses');if (response) {return await response.json()} } catch (error) {console.error('Service Worker: Błąd pobierania poprzednich statusów:', error)} return {}} async function savePreviousStatuses(statuses) {try {const cache = await caches.open('grafiksp4600-statuses');await cache.put('/statuses', new Response(JSON.stringify(statuses)))} catch (error) {console.error('Service Worker: Błąd zapisywania statusów:', error)} } function getStatusText(finalStatus) {switch (finalStatus) {case 'OCZEKUJACE': return 'Oczekujące';case 'WSTEPNIE_ZATWIERDZONE': return 'Wstępnie zatwierdzone';case 'ZATWIERDZONE': return 'Zatwierdzone';case 'ODRZUCONE': return 'Odrzucone';case 'ODRZUCONE_PRZEZ_SZEFA': return 'Odrzucone przez szefa';default: return finalStatus} }
\ No newline at end of file
+// Service Worker dla Grafik SP4600 - PWA z Web Push Notifications
+// Service Worker to skrypt który działa w tle przeglądarki i umożliwia:
+// - Cachowanie plików (szybsze ładowanie)
+// - Działanie offline
+// - Web Push Notifications (powiadomienia push z serwera)
+//
+// Strategie cache:
+// - cache-first: pliki statyczne z hashem zawartości (?v=...) i obrazki
+// - network-first z timeoutem: strony HTML i dane grafiku (/api/shifts, /api/schedule)
+// - stale-while-revalidate: dane miesiąca (/api/schedule/month), manifest i pliki statyczne bez hasha
+// - pozostałe /api/* i żądania inne niż GET nie są cachowane
+
+// Wspólny magazyn grafiku offline (IndexedDB) - ten sam kod co na stronie
+importScripts('/static/schedule-store.js');
+
+// Lista precache generowana przez optimize_assets.py (tylko istniejące pliki) -
+// nie edytuj ręcznie, uruchom: python optimize_assets.py --precache
+const PRECACHE_VERSION = 'aae7409ed4';
+const PRECACHE_URLS = [
+  '/offline',
+  '/static/style.css?v=c58b5bde06',
+  '/static/schedule-store.js?v=ee78399280',
+  '/static/app.js?v=f9d3811f31',
+  '/static/manifest.json?v=3f4aa3045d',
+  '/static/favicon.ico?v=b0f2404bf0',
+  '/static/PKN.WA.D.png?v=b0f2404bf0'
+];
+
+// Nazwy cache z wersją - stare są usuwane przy aktywacji
+const CACHE_PREFIX = 'grafiksp4600-';
+const PRECACHE_NAME = `${CACHE_PREFIX}precache-${PRECACHE_VERSION}`;
+const RUNTIME_CACHES = {
+  assets: { name: `${CACHE_PREFIX}assets-v2`, maxEntries: 60 },
+  pages: { name: `${CACHE_PREFIX}pages-v2`, maxEntries: 10 },
+  data: { name: `${CACHE_PREFIX}data-v2`, maxEntries: 100 }
+};
+// Cache statusów próśb (background sync) - nie jest usuwany przy aktywacji
+const STATUSES_CACHE = `${CACHE_PREFIX}statuses`;
+
+// Po tylu ms network-first poddaje się i zwraca wersję z cache
+const NETWORK_TIMEOUT_MS = 4000;
+
+// VAPID Public Key - musi być zgodny z kluczem na serwerze
+const VAPID_PUBLIC_KEY = 'BIvhQxAeGQGHEfdZRg8c1DyFQ2i35xL-ZBlfVz8GO4u8UxSVbWeCVACXpBi7_L7nDQJl3nxMoIYSPNJDn8xOsBQ';
+
+// Funkcja do konwersji VAPID public key z base64 na Uint8Array
+const urlB64ToUint8Array = (base64String) => {
+  const padding = '='.repeat((4 - (base64String.length % 4)) % 4);
+  const base64 = (base64String + padding).replace(/\-/g, '+').replace(/_/g, '/');
+  const rawData = atob(base64);
+  const outputArray = new Uint8Array(rawData.length);
+  for (let i = 0; i < rawData.length; ++i) {
+    outputArray[i] = rawData.charCodeAt(i);
+  }
+  return outputArray;
+};
+
+// Instalacja Service Worker - uruchamia się gdy przeglądarka instaluje SW
+self.addEventListener('install', event => {
+  console.log('Service Worker: Instalacja rozpoczęta');
+  event.waitUntil(
+    caches.open(PRECACHE_NAME)
+      .then(cache => {
+        console.log('Service Worker: Cache otwarty');
+        // Pojedynczy brakujący plik nie może przerwać instalacji
+        return Promise.all(PRECACHE_URLS.map(url =>
+          cache.add(new Request(url, { cache: 'reload' })).catch(error => {
+            console.warn('Service Worker: Nie udało się zacachować', url, error);
+          })
+        ));
+      })
+      .then(() => {
+        console.log('Service Worker: Wszystkie pliki zostały zacachowane');
+        return self.skipWaiting(); // Wymuś natychmiastową aktywację
+      })
+  );
+});
+
+// Aktywacja Service Worker - uruchamia się gdy SW staje się aktywny
+self.addEventListener('activate', event => {
+  console.log('Service Worker: Aktywacja rozpoczęta');
+  const currentCaches = new Set([
+    PRECACHE_NAME,
+    STATUSES_CACHE,
+    ...Object.values(RUNTIME_CACHES).map(config => config.name)
+  ]);
+  event.waitUntil(
+    caches.keys().then(cacheNames => {
+      return Promise.all(
+        cacheNames.map(cacheName => {
+          if (!currentCaches.has(cacheName)) {
+            console.log('Service Worker: Usuwam stary cache:', cacheName);
+            return caches.delete(cacheName);
+          }
+        })
+      );
+    }).then(() => {
+      // Wymuś natychmiastowe przejęcie kontroli nad wszystkimi klientami
+      return self.clients.claim();
+    }).then(() => {
+      // Zarejestruj się do Web Push po aktywacji
+      return self.registration.pushManager.getSubscription().then(subscription => {
+        if (!subscription) {
+          console.log('Service Worker: Brak subskrypcji push, rejestruję...');
+          return self.registration.pushManager.subscribe({
+            userVisibleOnly: true,
+            applicationServerKey: urlB64ToUint8Array(VAPID_PUBLIC_KEY)
+          }).then(subscription => {
+            console.log('Service Worker: Subskrypcja push utworzona:', subscription);
+            return saveSubscriptionToServer(subscription);
+          }).catch(error => {
+            console.error('Service Worker: Błąd tworzenia subskrypcji push:', error);
+            return null;
+          });
+        } else {
+          console.log('Service Worker: Subskrypcja push już istnieje:', subscription);
+          return subscription;
+        }
+      }).catch(error => {
+        console.error('Service Worker: Błąd pobierania subskrypcji push:', error);
+        return null;
+      });
+    })
+  );
+});
+
+// Funkcja do zapisania subskrypcji na serwerze
+const saveSubscriptionToServer = async (subscription) => {
+  try {
+    const response = await fetch('/api/push/subscribe', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(subscription),
+    });
+    
+    if (response.ok) {
+      const result = await response.json();
+      console.log('Service Worker: Subskrypcja zapisana na serwerze:', result);
+      return result;
+    } else {
+      console.error('Service Worker: Błąd zapisywania subskrypcji:', response.status);
+    }
+  } catch (error) {
+    console.error('Service Worker: Błąd podczas zapisywania subskrypcji:', error);
+  }
+};
+
+// ============================================================================
+// STRATEGIE CACHE
+// ============================================================================
+
+// Usuń najstarsze wpisy gdy cache przekroczy limit (keys() zwraca w kolejności dodania)
+async function trimCache(cacheName, maxEntries) {
+  const cache = await caches.open(cacheName);
+  const keys = await cache.keys();
+  for (let i = 0; i < keys.length - maxEntries; i++) {
+    await cache.delete(keys[i]);
+  }
+}
+
+// Cachuj tylko pełne, poprawne odpowiedzi z własnego originu
+function isCacheable(response) {
+  return response && response.status === 200 && response.type === 'basic';
+}
+
+async function putInCache(config, request, response) {
+  const cache = await caches.open(config.name);
+  await cache.put(request, response);
+  await trimCache(config.name, config.maxEntries);
+}
+
+// Cache-first - dla plików, których zawartość nie zmienia się pod danym URL
+async function cacheFirst(event, config) {
+  const cached = await caches.match(event.request);
+  if (cached) {
+    return cached;
+  }
+  const response = await fetch(event.request);
+  if (isCacheable(response)) {
+    event.waitUntil(putInCache(config, event.request, response.clone()));
+  }
+  return response;
+}
+
+// Network-first z timeoutem - świeże dane gdy sieć działa, cache gdy jest wolna lub jej brak
+async function networkFirst(event, config, fallbackUrl) {
+  const networkPromise = fetch(event.request).then(response => {
+    if (isCacheable(response)) {
+      event.waitUntil(putInCache(config, event.request, response.clone()));
+    }
+    return response;
+  });
+
+  let timeoutId;
+  const timeoutPromise = new Promise(resolve => {
+    timeoutId = setTimeout(resolve, NETWORK_TIMEOUT_MS);
+  });
+
+  try {
+    const response = await Promise.race([networkPromise, timeoutPromise]);
+    if (response) {
+      return response;
+    }
+    // Timeout - spróbuj cache, a jeśli go nie ma, czekaj dalej na sieć
+    const cached = await caches.match(event.request);
+    return cached || await networkPromise;
+  } catch (error) {
+    const cached = await caches.match(event.request);
+    if (cached) {
+      return cached;
+    }
+    if (fallbackUrl) {
+      const fallback = await caches.match(fallbackUrl);
+      if (fallback) {
+        return fallback;
+      }
+    }
+    throw error;
+  } finally {
+    clearTimeout(timeoutId);
+  }
+}
+
+// Stale-while-revalidate - natychmiast z cache, odświeżenie w tle
+async function staleWhileRevalidate(event, config) {
+  const cached = await caches.match(event.request);
+  const networkPromise = fetch(event.request).then(response => {
+    if (isCacheable(response)) {
+      return putInCache(config, event.request, response.clone()).then(() => response);
+    }
+    return response;
+  });
+
+  if (cached) {
+    event.waitUntil(networkPromise.catch(() => null));
+    return cached;
+  }
+  return networkPromise;
+}
+
+// Dobór strategii dla żądania - null oznacza zwykłe żądanie sieciowe bez cache
+function selectStrategy(event) {
+  const request = event.request;
+  if (request.method !== 'GET') {
+    return null;
+  }
+
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) {
+    return null;
+  }
+
+  // Strony HTML
+  if (request.mode === 'navigate') {
+    // Ekran logowania i OAuth zawsze z sieci
+    if (['/signin', '/login', '/authorize', '/logout'].some(path => url.pathname.startsWith(path))) {
+      return null;
+    }
+    return () => networkFirst(event, RUNTIME_CACHES.pages, '/offline');
+  }
+
+  if (url.pathname.startsWith('/static/')) {
+    // Sam Service Worker zawsze przez HTTP (przeglądarka sprawdza aktualizacje)
+    if (url.pathname === '/static/sw.js') {
+      return null;
+    }
+    // Plik z hashem zawartości w URL nigdy się nie zmienia
+    if (url.searchParams.has('v') || request.destination === 'image' || request.destination === 'font') {
+      return () => cacheFirst(event, RUNTIME_CACHES.assets);
+    }
+    return () => staleWhileRevalidate(event, RUNTIME_CACHES.assets);
+  }
+
+  // Dane miesiąca - natychmiast z cache, kursor w odpowiedzi pozwala dociągnąć deltę
+  if (url.pathname === '/api/schedule/month') {
+    return () => staleWhileRevalidate(event, RUNTIME_CACHES.data);
+  }
+
+  // Dane grafiku - świeże gdy to możliwe, ostatnie znane offline
+  if (url.pathname.startsWith('/api/shifts/') || url.pathname === '/api/schedule/changes') {
+    return () => networkFirst(event, RUNTIME_CACHES.data);
+  }
+
+  // Pozostałe API (prośby, skrzynka, administracja) nie są cachowane
+  return null;
+}
+
+// Interceptowanie żądań
+self.addEventListener('fetch', event => {
+  const strategy = selectStrategy(event);
+  if (strategy) {
+    event.respondWith(strategy());
+  }
+});
+
+// Obsługa wiadomości z głównego wątku
+self.addEventListener('message', event => {
+  if (event.data && event.data.type === 'SKIP_WAITING') {
+    self.skipWaiting();
+  } else if (event.data && event.data.type === 'GET_SUBSCRIPTION') {
+    // Zwróć aktualną subskrypcję do głównego wątku
+    self.registration.pushManager.getSubscription().then(subscription => {
+      event.ports[0].postMessage({ subscription: subscription });
+    });
+  } else if (event.data && event.data.type === 'SUBSCRIBE_PUSH') {
+    // Zarejestruj się do push notifications
+    self.registration.pushManager.subscribe({
+      userVisibleOnly: true,
+      applicationServerKey: urlB64ToUint8Array(VAPID_PUBLIC_KEY)
+    }).then(subscription => {
+      saveSubscriptionToServer(subscription);
+      event.ports[0].postMessage({ success: true, subscription: subscription });
+    }).catch(error => {
+      console.error('Service Worker: Błąd subskrypcji push:', error);
+      event.ports[0].postMessage({ success: false, error: error.message });
+    });
+  }
+});
+
+// Obsługa powiadomień push z serwera
+self.addEventListener('push', event => {
+  console.log('Service Worker: Otrzymano push event:', event);
+  
+  let notificationData = {
+    title: 'Grafik SP4600',
+    body: 'Masz nową prośbę w skrzynce',
+    icon: '/static/PKN.WA.D.png',
+    badge: '/static/PKN.WA.D.png',
+    data: {
+      url: '/',
+      timestamp: Date.now()
+    }
+  };
+  
+  // Jeśli push event zawiera dane, użyj ich
+  if (event.data) {
+    try {
+      const pushData = event.data.json();
+      notificationData = {
+        ...notificationData,
+        ...pushData
+      };
+    } catch (error) {
+      console.error('Service Worker: Błąd parsowania danych push:', error);
+      // Użyj domyślnych danych
+    }
+  }
+  
+  const options = {
+    body: notificationData.body,
+    icon: notificationData.icon,
+    badge: notificationData.badge,
+    vibrate: [200, 100, 200],
+    data: notificationData.data,
+    actions: [
+      {
+        action: 'open',
+        title: 'Otwórz aplikację',
+        icon: '/static/PKN.WA.D.png'
+      },
+      {
+        action: 'close',
+        title: 'Zamknij',
+        icon: '/static/PKN.WA.D.png'
+      }
+    ],
+    requireInteraction: true,
+    tag: 'grafik-notification'
+  };
+
+  // Zmiana grafiku - od razu pobierz deltę, zamiast czekać na odpytywanie
+  const kinds = (notificationData.data && notificationData.data.kinds) || [];
+  const tasks = [self.registration.showNotification(notificationData.title, options)];
+  if (kinds.includes('schedule')) {
+    tasks.push(syncScheduleInBackground().catch(error => {
+      console.warn('Service Worker: Synchronizacja grafiku po push nieudana:', error);
+    }));
+  }
+  event.waitUntil(Promise.all(tasks));
+});
+
+// Obsługa kliknięć w powiadomienia
+self.addEventListener('notificationclick', event => {
+  console.log('Service Worker: Kliknięto w powiadomienie:', event);
+  
+  event.notification.close();
+  
+  if (event.action === 'open') {
+    event.waitUntil(
+      clients.openWindow('/')
+    );
+  } else if (event.action === 'close') {
+    // Tylko zamknij powiadomienie
+    return;
+  } else {
+    // Domyślne zachowanie - otwórz aplikację
+    event.waitUntil(
+      clients.matchAll().then(clientList => {
+        if (clientList.length > 0) {
+          return clientList[0].focus();
+        }
+        return clients.openWindow('/');
+      })
+    );
+  }
+});
+
+// Background sync - sprawdzanie nowych próśb i synchronizacja grafiku offline
+self.addEventListener('sync', event => {
+  if (event.tag === 'check-notifications') {
+    event.waitUntil(checkForNewRequests());
+  } else if (event.tag === ScheduleStore.SYNC_TAG) {
+    event.waitUntil(syncScheduleInBackground());
+  }
+});
+
+// Pobierz deltę grafiku do IndexedDB i powiadom otwarte karty.
+// Błąd odrzuca promise - przeglądarka ponowi synchronizację później.
+async function syncScheduleInBackground() {
+  const result = await ScheduleStore.sync();
+  const clientList = await self.clients.matchAll({ type: 'window' });
+  clientList.forEach(client => {
+    client.postMessage({ type: 'SCHEDULE_UPDATED', cursor: result.cursor });
+  });
+}
+
+// Funkcja sprawdzania nowych próśb i zmian statusu
+async function checkForNewRequests() {
+  try {
+    const response = await fetch('/api/swaps/inbox');
+    const data = await response.json();
+    
+    if (data.items && data.items.length > 0) {
+      // Pobierz poprzednie statusy z IndexedDB lub localStorage
+      const previousStatuses = await getPreviousStatuses();
+      const currentStatuses = {};
+      let hasChanges = false;
+      let notificationMessage = '';
+      
+      // Sprawdź każdą prośbę
+      data.items.forEach(item => {
+        currentStatuses[item.id] = item.final_status;
+        
+        // Sprawdź czy status się zmienił
+        if (previousStatuses[item.id] && previousStatuses[item.id] !== item.final_status) {
+          hasChanges = true;
+          const statusText = getStatusText(item.final_status);
+          
+          if (!notificationMessage) {
+            notificationMessage = `Status prośby się zmienił: ${statusText}`;
+          } else {
+            notificationMessage += `, ${statusText}`;
+          }
+        }
+        
+        // Sprawdź nowe prośby
+        if (!previousStatuses[item.id] && (item.final_status === 'OCZEKUJACE' || item.final_status === 'WSTEPNIE_ZATWIERDZONE')) {
+          hasChanges = true;
+          if (!notificationMessage) {
+            notificationMessage = `Masz nową prośbę w skrzynce`;
+          } else {
+            notificationMessage += `, nowa prośba`;
+          }
+        }
+      });
+      
+      // Zapisz aktualne statusy
+      await savePreviousStatuses(currentStatuses);
+      
+      // Wyślij powiadomienie jeśli są zmiany
+      if (hasChanges && notificationMessage) {
+        self.registration.showNotification('Grafik SP4600', {
+          body: notificationMessage,
+          icon: '/static/PKN.WA.D.png',
+          badge: '/static/PKN.WA.D.png',
+          tag: 'grafik-notification',
+          data: { url: '/' }
+        });
+      }
+    }
+  } catch (error) {
+    console.error('Service Worker: Błąd sprawdzania nowych próśb:', error);
+  }
+}
+
+// Funkcje pomocnicze do przechowywania statusów w Service Worker
+async function getPreviousStatuses() {
+  try {
+    const cache = await caches.open(STATUSES_CACHE);
+    const response = await cache.match('/statuses');
+    if (response) {
+      return await response.json();
+    }
+  } catch (error) {
+    console.error('Service Worker: Błąd pobierania poprzednich statusów:', error);
+  }
+  return {};
+}
+
+async function savePreviousStatuses(statuses) {
+  try {
+    const cache = await caches.open(STATUSES_CACHE);
+    await cache.put('/statuses', new Response(JSON.stringify(statuses)));
+  } catch (error) {
+    console.error('Service Worker: Błąd zapisywania statusów:', error);
+  }
+}
+
+// Funkcja pomocnicza do mapowania statusów
+function getStatusText(finalStatus) {
+  switch (finalStatus) {
+    case 'OCZEKUJACE': return 'Oczekujące';
+    case 'WSTEPNIE_ZATWIERDZONE': return 'Wstępnie zatwierdzone';
+    case 'ZATWIERDZONE': return 'Zatwierdzone';
+    case 'ODRZUCONE': return 'Odrzucone';
+    case 'ODRZUCONE_PRZEZ_SZEFA': return 'Odrzucone przez szefa';
+    default: return finalStatus;
+  }
+}
\ No newline at end of file
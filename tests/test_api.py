@@ -2,7 +2,9 @@
 Testy jednostkowe dla API aplikacji
 """
 
+import json
 import pytest
+import sqlite3
 import tempfile
 import os
 from app import app
@@ -30,9 +32,6 @@ def client():
     os.unlink(db_path)
 
 
-# CLI commands are not available in the new modular structure
-
-
 def test_health_check(client):
     """Test endpointu health check"""
     response = client.get('/api/healthz')
@@ -93,9 +92,6 @@ def test_invalid_json(client):
 # Rate limiting is not implemented in the current version
 
 
-# CLI commands are not available in the new modular structure
-
-
 def test_safe_get_json():
     """Test bezpiecznego pobierania JSON"""
     from app.routes.api import safe_get_json
@@ -113,3 +109,277 @@ def test_safe_get_json():
 
 if __name__ == '__main__':
     pytest.main([__file__])
+
+
+@pytest.fixture
+def user_client(client, monkeypatch):
+    """Zalogowany użytkownik powiązany z pracownikiem (email), z prośbą o zamianę do niego"""
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    from app.database import ensure_employees_email_column
+    ensure_employees_email_column()
+    db = get_db()
+    db.execute("INSERT INTO users (id, email, name) VALUES (1, 'jan@example.com', 'Jan Kowalski')")
+    db.execute("INSERT INTO users (id, email, name) VALUES (2, 'anna@example.com', 'Anna Nowak')")
+    db.execute("INSERT INTO employees (name, email) VALUES (?, ?)", ('Jan Kowalski', 'jan@example.com'))
+    db.execute("""
+        INSERT INTO swap_requests (requester_user_id, from_date, to_date, from_employee, to_employee)
+        VALUES (2, '2025-01-10', '2025-01-11', 'Anna Nowak', 'Jan Kowalski')
+    """)
+    db.commit()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_email='jan@example.com', user_name='Jan Kowalski', user_role='USER')
+    return client
+
+
+def query(sql):
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_unavailability_create(user_client):
+    """Test zgłoszenia niedyspozycji - komentarz zapisany jako reason"""
+    response = user_client.post('/api/unavailability', json={
+        'month_year': '2025-02', 'selected_days': ['2025-02-03', '2025-02-04'], 'comment': 'Urlop'})
+    assert response.status_code == 200
+    assert query("SELECT month_year, reason, selected_days FROM unavailability_requests") == \
+        [('2025-02', 'Urlop', '2025-02-03,2025-02-04')]
+
+
+def test_swaps_respond(user_client):
+    """Test odpowiedzi adresata na prośbę o zamianę"""
+    response = user_client.post('/api/swaps/respond', json={'id': 1, 'status': 'APPROVED'})
+    assert response.status_code == 200
+    assert query("SELECT recipient_status FROM swap_requests") == [('APPROVED',)]
+
+
+def test_swaps_respond_stale_version_is_conflict(user_client):
+    """Test kontroli wersji - odpowiedź na nieaktualną wersję prośby nic nie zmienia"""
+    response = user_client.post('/api/swaps/respond', json={'id': 1, 'status': 'APPROVED', 'version': 0})
+    assert response.status_code == 200
+    assert query("SELECT recipient_status, version FROM swap_requests") == [('APPROVED', 1)]
+
+    response = user_client.post('/api/swaps/respond', json={'id': 1, 'status': 'REJECTED', 'version': 0})
+    assert response.status_code == 409
+    assert query("SELECT recipient_status, version FROM swap_requests") == [('APPROVED', 1)]
+
+
+def test_swaps_respond_after_boss_decision_is_conflict(user_client):
+    """Test odpowiedzi po decyzji kierownika - status adresata zostaje bez zmian"""
+    db = get_db()
+    db.execute("UPDATE swap_requests SET boss_status = 'REJECTED' WHERE id = 1")
+    db.commit()
+    response = user_client.post('/api/swaps/respond', json={'id': 1, 'status': 'APPROVED'})
+    assert response.status_code == 409
+    assert query("SELECT recipient_status, version FROM swap_requests") == [('PENDING', 0)]
+
+
+def test_init_db_command_adds_swap_version_column(tmp_path, monkeypatch):
+    """Test migracji - flask init-db dodaje kolumnę version do istniejącej tabeli próśb"""
+    db_path = tmp_path / 'old.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute("""CREATE TABLE swap_requests (id INTEGER PRIMARY KEY, requester_email TEXT,
+                    from_date TEXT, from_employee TEXT, to_date TEXT, to_employee TEXT,
+                    recipient_status TEXT DEFAULT 'PENDING', boss_status TEXT DEFAULT 'PENDING')""")
+    conn.execute("INSERT INTO swap_requests (id, from_employee) VALUES (1, 'Anna Nowak')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setitem(app.config, 'DATABASE_PATH', str(db_path))
+
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT id, version FROM swap_requests").fetchall() == [(1, 0)]
+    conn.close()
+
+
+def test_push_subscribe_keeps_one_row_per_endpoint(user_client):
+    """Test subskrypcji push - osobny wiersz na urządzenie, ponowna subskrypcja aktualizuje wiersz"""
+    for endpoint, key in (('https://fcm.googleapis.com/fcm/send/1', 'key'), ('https://fcm.googleapis.com/fcm/send/2', 'key'),
+                          ('https://fcm.googleapis.com/fcm/send/1', 'nowy')):
+        response = user_client.post('/api/push/subscribe', json={
+            'endpoint': endpoint, 'keys': {'p256dh': key, 'auth': 'auth'}})
+        assert response.status_code == 200
+
+    rows = query("SELECT user_id, subscription_data FROM push_subscriptions ORDER BY id")
+    assert [json.loads(data)['endpoint'] for _, data in rows] == ['https://fcm.googleapis.com/fcm/send/1', 'https://fcm.googleapis.com/fcm/send/2']
+    assert json.loads(rows[0][1])['keys']['p256dh'] == 'nowy'
+
+
+@pytest.fixture
+def admin_client(user_client):
+    """Zalogowany administrator (ten sam użytkownik co user_client, rola ADMIN)"""
+    db = get_db()
+    db.execute("UPDATE users SET role = 'ADMIN' WHERE id = 1")
+    db.commit()
+    with user_client.session_transaction() as sess:
+        sess['user_role'] = 'ADMIN'
+    return user_client
+
+
+def add_unavailability(selected_days, status='PENDING'):
+    db = get_db()
+    db.execute("""
+        INSERT INTO unavailability_requests (employee_id, month_year, reason, selected_days, status)
+        VALUES (1, '2025-02', 'Urlop', ?, ?)
+    """, (selected_days, status))
+    db.commit()
+
+
+def test_unavailability_approve_blocks_selected_days(admin_client):
+    """Test zatwierdzenia niedyspozycji - tylko wybrane dni, historia zmian, archiwizacja"""
+    db = get_db()
+    db.executemany("INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, 1)",
+                   [('2025-02-03', 'DNIOWKA'), ('2025-02-05', 'NOCKA'), ('2025-02-06', '-')])
+    db.commit()
+    add_unavailability('2025-02-03,2025-02-04,2025-02-06,2025-03-01')
+
+    response = admin_client.post('/api/unavailability/respond', json={'id': 1, 'status': 'APPROVED'})
+    assert response.status_code == 200
+    assert response.get_json()['changed_days'] == 2
+    assert query("SELECT date, shift_type FROM shifts ORDER BY date") == [
+        ('2025-02-03', '-'), ('2025-02-04', '-'), ('2025-02-05', 'NOCKA'), ('2025-02-06', '-')]
+    assert query("SELECT date, old_shift, new_shift FROM schedule_changes ORDER BY date") == [
+        ('2025-02-03', 'DNIOWKA', '-'), ('2025-02-04', '', '-')]
+    assert query("SELECT original_id, final_status FROM request_history") == [(1, 'ZATWIERDZONE')]
+    assert query("SELECT COUNT(*) FROM unavailability_requests") == [(0,)]
+
+
+def test_unavailability_without_selected_days_blocks_month(admin_client):
+    """Test starego zgłoszenia bez wybranych dni - cały miesiąc"""
+    add_unavailability(None)
+    response = admin_client.post('/api/unavailability/respond', json={'id': 1, 'status': 'APPROVED'})
+    assert response.status_code == 200
+    assert query("SELECT COUNT(*), MIN(date), MAX(date) FROM shifts WHERE shift_type = '-'") == \
+        [(28, '2025-02-01', '2025-02-28')]
+
+
+def test_unavailability_decided_twice_is_conflict(admin_client):
+    """Test podwójnej decyzji - zgłoszenie już rozpatrzone nie zmienia grafiku"""
+    add_unavailability('2025-02-03', status='REJECTED')
+    response = admin_client.post('/api/unavailability/respond', json={'id': 1, 'status': 'APPROVED'})
+    assert response.status_code == 409
+    assert query("SELECT COUNT(*) FROM shifts") == [(0,)]
+
+
+def test_unavailability_inbox_lists_own_requests(user_client):
+    """Test skrzynki - pracownik widzi tylko swoje zgłoszenia, dni jako lista"""
+    db = get_db()
+    db.execute("INSERT INTO employees (id, name) VALUES (2, 'Anna Nowak')")
+    db.execute("""INSERT INTO unavailability_requests (employee_id, month_year, reason, selected_days)
+                  VALUES (2, '2025-02', 'Urlop', '2025-02-10')""")
+    db.commit()
+    add_unavailability('2025-02-03,2025-02-04')
+
+    data = user_client.get('/api/unavailability/inbox').get_json()
+    assert data['is_boss'] is False
+    assert [(item['employee_name'], item['selected_days'], item['comment']) for item in data['items']] == [
+        ('Jan Kowalski', ['2025-02-03', '2025-02-04'], 'Urlop')]
+
+
+def test_unavailability_inbox_admin_sees_all(admin_client):
+    """Test skrzynki admina - wszystkie zgłoszenia"""
+    add_unavailability('2025-02-03')
+    add_unavailability('2025-02-04')
+    data = admin_client.get('/api/unavailability/inbox').get_json()
+    assert data['is_boss'] is True
+    assert len(data['items']) == 2
+
+
+def test_schedule_changes_recent(user_client):
+    """Test ostatnich zmian w grafiku - format oczekiwany przez app.js"""
+    db = get_db()
+    db.execute("""INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
+                  VALUES ('2025-02-03', 'Jan Kowalski', 'D', 'N', 'admin@example.com')""")
+    db.execute("""INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by, created_at)
+                  VALUES ('2025-01-03', 'Jan Kowalski', 'D', 'N', 'admin@example.com', '2020-01-01 00:00:00')""")
+    db.commit()
+
+    response = user_client.get('/api/schedule/changes')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['current_user_name'] == 'Jan Kowalski'
+    assert [(c['date'], c['new_shift']) for c in data['changes']] == [('2025-02-03', 'N')]
+    assert data['changes'][0]['changed_at']
+
+
+def test_deprecated_admin_alias_redirects(admin_client):
+    """Test starego adresu bez /api - 308 z nagłówkiem Deprecation, decyzja przez nowy endpoint"""
+    add_unavailability(None)
+    response = admin_client.post('/unavailability/respond', json={'id': 1, 'status': 'APPROVED'})
+    assert response.status_code == 308
+    assert response.headers['Location'].endswith('/api/unavailability/respond')
+    assert response.headers['Deprecation'] == 'true'
+    assert 'rel="successor-version"' in response.headers['Link']
+
+    response = admin_client.post('/unavailability/respond', json={'id': 1, 'status': 'APPROVED'},
+                                 follow_redirects=True)
+    assert response.status_code == 200
+    assert query("SELECT COUNT(*) FROM shifts WHERE shift_type = '-'") == [(28,)]
+
+
+@pytest.fixture
+def swap_shifts(admin_client):
+    """Prośba 1 (Anna 2025-01-10 ↔ Jan 2025-01-11) zaakceptowana przez adresata; Jan nie ma wpisu 11-go"""
+    db = get_db()
+    db.execute("INSERT INTO employees (id, name) VALUES (2, 'Anna Nowak')")
+    db.executemany("INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, ?)",
+                   [('2025-01-10', 'DNIOWKA', 2), ('2025-01-11', 'NOCKA', 2), ('2025-01-10', 'NOCKA', 1)])
+    db.execute("UPDATE swap_requests SET recipient_status = 'APPROVED', version = 1 WHERE id = 1")
+    db.commit()
+    return admin_client
+
+
+def test_swap_boss_approve_swaps_shift_rows(swap_shifts):
+    """Test zatwierdzenia zamiany - wpisy zamienione, historia, archiwizacja prośby"""
+    response = swap_shifts.post('/api/swaps/boss', json={'id': 1, 'status': 'APPROVED', 'version': 1})
+    assert response.status_code == 200
+    # Wpis Anny z 10-go przechodzi na Jana 11-go; Jan nie miał wpisu 11-go, więc Anna 10-go nie ma nic
+    assert query("SELECT date, shift_type, employee_id FROM shifts ORDER BY date, employee_id") == [
+        ('2025-01-10', 'NOCKA', 1), ('2025-01-11', 'DNIOWKA', 1), ('2025-01-11', 'NOCKA', 2)]
+    assert query("SELECT date, employee_name, old_shift, new_shift FROM schedule_changes ORDER BY date") == [
+        ('2025-01-10', 'Anna Nowak', 'DNIOWKA', ''), ('2025-01-11', 'Jan Kowalski', '', 'DNIOWKA')]
+    assert query("SELECT original_id, final_status, archived_by FROM request_history") == [(1, 'ZATWIERDZONE', 1)]
+    assert query("SELECT COUNT(*) FROM swap_requests") == [(0,)]
+
+
+def test_swap_boss_stale_version_is_conflict(swap_shifts):
+    """Test kontroli wersji - decyzja na nieaktualnej wersji prośby nie zmienia grafiku"""
+    response = swap_shifts.post('/api/swaps/boss', json={'id': 1, 'status': 'APPROVED', 'version': 0})
+    assert response.status_code == 409
+    assert query("SELECT boss_status, version FROM swap_requests") == [('PENDING', 1)]
+    assert query("SELECT COUNT(*) FROM schedule_changes") == [(0,)]
+
+
+def test_swap_boss_concurrent_approvals_swap_once(swap_shifts):
+    """Test równoległych decyzji - zamiana wykonana dokładnie raz"""
+    import threading
+    codes = []
+
+    def approve():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(user_id=1, user_email='jan@example.com', user_name='Jan Kowalski', user_role='ADMIN')
+        codes.append(client.post('/api/swaps/boss', json={'id': 1, 'status': 'APPROVED'}).status_code)
+
+    threads = [threading.Thread(target=approve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert codes.count(200) == 1
+    assert set(codes) <= {200, 404, 409}
+    assert query("SELECT COUNT(*) FROM schedule_changes") == [(2,)]
+    assert query("SELECT date, employee_id FROM shifts WHERE shift_type = 'DNIOWKA'") == [('2025-01-11', 1)]
+
+
+def test_swap_boss_without_write_queue(swap_shifts, monkeypatch):
+    """Test zamiany na połączeniu żądania (DB_WRITE_QUEUE=false) - ta sama transakcja"""
+    monkeypatch.delitem(app.extensions, 'write_queue', raising=False)
+    response = swap_shifts.post('/api/swaps/boss', json={'id': 1, 'status': 'APPROVED'})
+    assert response.status_code == 200
+    assert query("SELECT date, shift_type FROM shifts WHERE employee_id = 1 ORDER BY date") == [
+        ('2025-01-10', 'NOCKA'), ('2025-01-11', 'DNIOWKA')]
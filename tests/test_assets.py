@@ -0,0 +1,45 @@
+"""
+Testy wersjonowania plików statycznych i nagłówków cache
+"""
+
+import pytest
+from app import app
+
+
+@pytest.fixture
+def client():
+    """Klient testowy Flask"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_asset_url_contains_content_hash():
+    """Test generowania URL z hashem zawartości"""
+    assets = app.extensions['asset_fingerprints']
+    url = assets.asset_url('style.css')
+    assert url.startswith('/static/style.css?v=')
+    assert url.endswith(assets.fingerprint('style.css'))
+    assert assets.asset_url('nie-istnieje.js') == '/static/nie-istnieje.js'
+
+
+def test_fingerprinted_asset_is_immutable(client):
+    """Test długiego cache dla pliku z aktualnym hashem"""
+    url = app.extensions['asset_fingerprints'].asset_url('style.css')
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+
+
+def test_unversioned_asset_not_cached(client):
+    """Test braku cache dla pliku bez hasha lub z nieaktualnym hashem"""
+    for url in ('/static/style.css', '/static/style.css?v=stary'):
+        response = client.get(url)
+        assert 'no-store' in response.headers['Cache-Control']
+
+
+def test_service_worker_allowed_root_scope(client):
+    """Test nagłówka pozwalającego SW z /static/ kontrolować całą aplikację"""
+    response = client.get('/static/sw.js')
+    assert response.headers['Service-Worker-Allowed'] == '/'
+    assert 'no-store' in response.headers['Cache-Control']
@@ -0,0 +1,94 @@
+"""
+Testy narzędzi benchmarków - porównanie z wartościami bazowymi, test obciążeniowy
+"""
+
+import json
+import sqlite3
+from benchmarks.compare import compare, load_results, main as compare_main
+from benchmarks.loadtest import percentile, summarize, session_cookie
+from benchmarks.password_params import calibrate
+from generate_data import generate
+
+
+def test_compare_detects_regressions():
+    """Test progu regresji - czasy w górę, przepustowość w dół, błędy"""
+    baseline = {'results': {
+        'index': {'median': 0.100, 'p95': 0.200, 'rps': 50.0},
+        'save': {'median': 0.050},
+    }}
+    current = {'results': {
+        'index': {'median': 0.110, 'p95': 0.300, 'rps': 30.0, 'errors': 2},
+        'save': {'median': 0.040},
+        'new': {'median': 1.0},
+    }}
+    report, regressions = compare(current, baseline, threshold=0.25)
+    assert any('no baseline' in line for line in report)
+    assert len(regressions) == 3
+    assert any('p95' in line for line in regressions)
+    assert any('rps' in line for line in regressions)
+    assert any('failed requests' in line for line in regressions)
+
+
+def test_compare_cli_with_pytest_benchmark_output(tmp_path):
+    """Test CLI - format pytest-benchmark, zapis wartości bazowej i kod wyjścia"""
+    result_path = tmp_path / 'micro.json'
+    baseline_path = tmp_path / 'baseline.json'
+    data = {'dataset': {'seed': 1}, 'benchmarks': [{'name': 'bench_index', 'stats': {'median': 0.1}}]}
+    result_path.write_text(json.dumps(data))
+
+    assert load_results(str(result_path))['results'] == {'bench_index': {'median': 0.1}}
+    assert compare_main([str(result_path), '--baseline', str(baseline_path), '--save']) == 0
+    assert compare_main([str(result_path), '--baseline', str(baseline_path)]) == 0
+
+    data['benchmarks'][0]['stats']['median'] = 0.2
+    result_path.write_text(json.dumps(data))
+    assert compare_main([str(result_path), '--baseline', str(baseline_path)]) == 1
+
+    data['dataset'] = {'seed': 2}
+    result_path.write_text(json.dumps(data))
+    assert compare_main([str(result_path), '--baseline', str(baseline_path)]) == 2
+
+
+def test_load_summary_percentiles():
+    """Test percentyli i przepustowości testu obciążeniowego"""
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 0.5) == 0.5
+    assert percentile(values, 0.95) == 0.95
+    assert percentile([], 0.5) == 0.0
+
+    summary = summarize(list(reversed(values)), errors=1, elapsed=2.0)
+    assert summary['requests'] == 100
+    assert summary['rps'] == 50.0
+    assert summary['max'] == 1.0
+
+
+def test_load_session_cookie_is_accepted(tmp_path):
+    """Test ciasteczka sesji generatora obciążenia - aplikacja uznaje użytkownika"""
+    from app import create_app
+
+    db_path = str(tmp_path / 'load.db')
+    generate(db_path, preset='small', employees=3, admins=1)
+    app = create_app()
+    app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    user = conn.execute("SELECT * FROM users WHERE id = 1").fetchone()
+    conn.close()
+
+    client = app.test_client()
+    client.set_cookie('session', session_cookie(app.config['SECRET_KEY'], user))
+    response = client.get('/api/draft/status')
+    assert response.status_code == 200
+    assert response.is_json  # bez sesji administratora byłaby strona logowania
+
+
+def test_password_params_calibration():
+    """Test doboru parametrów haseł - wartości do .env, limit pamięci scrypt"""
+    result = calibrate('scrypt', target_ms=1000, max_memory_mb=16, repeat=1)
+    assert result['params'] == {'n': 16384, 'r': 8, 'p': 1}  # 32768 przekracza 16 MB
+    assert result['env'] == {'PASSWORD_HASH_ALGORITHM': 'scrypt', 'PASSWORD_HASH_PARAMS': 'n=16384,r=8,p=1'}
+
+    result = calibrate('pbkdf2_sha256', target_ms=0.01, repeat=1)
+    assert result['params'] == {'iterations': 100000}
+    assert result['notes']  # minimalny koszt ponad czas docelowy
@@ -0,0 +1,149 @@
+"""
+Testy kompresji odpowiedzi i plików statycznych
+"""
+
+import gzip
+import pytest
+from app import app
+from app.compression import negotiate_encoding, parse_accept_encoding
+
+
+@pytest.fixture
+def client():
+    """Klient testowy Flask"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_parse_accept_encoding():
+    """Test parsowania nagłówka Accept-Encoding z wartościami q"""
+    parsed = parse_accept_encoding('gzip;q=0.5, br, identity;q=0')
+    assert parsed == {'gzip': 0.5, 'br': 1.0, 'identity': 0.0}
+    assert parse_accept_encoding(None) == {}
+
+
+def test_negotiate_encoding_prefers_brotli():
+    """Test wyboru najlepszego dostępnego kodowania"""
+    assert negotiate_encoding('gzip, br', ['br', 'gzip']) == 'br'
+    assert negotiate_encoding('gzip', ['br', 'gzip']) == 'gzip'
+    assert negotiate_encoding('br;q=0, gzip', ['br', 'gzip']) == 'gzip'
+    assert negotiate_encoding('*', ['gzip']) == 'gzip'
+    assert negotiate_encoding('identity', ['br', 'gzip']) is None
+
+
+def test_static_gzip_variant_served(client):
+    """Test serwowania prekompresowanego pliku z poprawnymi nagłówkami"""
+    response = client.get('/static/sw.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.mimetype in ('application/javascript', 'text/javascript')
+    assert int(response.headers['Content-Length']) == len(response.data)
+
+    plain = client.get('/static/sw.js', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_static_without_variant_not_encoded(client):
+    """Test pliku bez wariantu skompresowanego"""
+    response = client.get('/static/manifest.json', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_static_variant_with_stale_source_hash_ignored(tmp_path):
+    """Test wykrywania nieaktualnego .gz - edycja bez zmiany rozmiaru pliku"""
+    from flask import Flask
+    from optimize_assets import compress_file
+    from app.compression import PrecompressedStatic
+
+    asset = tmp_path / 'app.js'
+    asset.write_text('var a = 1;')
+    compress_file(str(asset), tmp_path)
+    test_app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+    assert PrecompressedStatic(test_app).encodings_for('app.js') == ['gzip']
+
+    asset.write_text('var b = 2;')
+    assert PrecompressedStatic(test_app).encodings_for('app.js') == []
+    response = test_app.test_client().get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == b'var b = 2;'
+    response.close()
+
+
+@pytest.fixture
+def compress_app():
+    """Mała aplikacja z middleware kompresji odpowiedzi"""
+    from flask import Flask, Response, jsonify
+    from app.compression import ResponseCompressor, no_compress
+
+    test_app = Flask(__name__)
+    test_app.config['COMPRESS_RESPONSES'] = True
+    test_app.config['COMPRESS_BROTLI'] = False
+    ResponseCompressor(test_app)
+
+    @test_app.get('/big')
+    def big():
+        return jsonify(items=['x' * 50] * 100)
+
+    @test_app.get('/small')
+    def small():
+        return jsonify(status='ok')
+
+    @test_app.get('/stream')
+    def stream():
+        return Response((f"line {i}\n" for i in range(100)), mimetype='text/plain')
+
+    @test_app.get('/download')
+    @no_compress
+    def download():
+        return jsonify(items=['x' * 50] * 100)
+
+    return test_app
+
+
+def test_dynamic_json_compressed(compress_app):
+    """Test kompresji dużej odpowiedzi JSON"""
+    client = compress_app.test_client()
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data).startswith(b'{')
+
+
+def test_dynamic_small_response_not_compressed(compress_app):
+    """Test progu rozmiaru"""
+    client = compress_app.test_client()
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_dynamic_streamed_response_compressed(compress_app):
+    """Test kompresji odpowiedzi strumieniowej"""
+    client = compress_app.test_client()
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data).decode().count('line') == 100
+
+
+def test_dynamic_compression_off_by_default():
+    """Test domyślnej konfiguracji - odpowiedzi dynamiczne kompresuje nginx, nie aplikacja"""
+    from flask import Flask, jsonify
+    from app.compression import ResponseCompressor
+
+    test_app = Flask(__name__)
+    ResponseCompressor(test_app)
+    test_app.add_url_rule('/big', 'big', lambda: jsonify(items=['x' * 50] * 100))
+
+    response = test_app.test_client().get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_dynamic_compression_opt_out(compress_app):
+    """Test wyłączenia kompresji dla konkretnej trasy"""
+    client = compress_app.test_client()
+    response = client.get('/download', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
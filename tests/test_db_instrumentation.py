@@ -0,0 +1,139 @@
+"""
+Testy instrumentacji zapytań SQL
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import pytest
+from prometheus_client import REGISTRY
+from app import create_app
+from app.db_instrumentation import InstrumentedConnection, normalize_sql, statement_label, request_query_stats
+
+
+def test_normalize_sql_groups_equal_statements():
+    """Test normalizacji - literały i białe znaki nie tworzą osobnych kluczy"""
+    assert normalize_sql("SELECT *\n   FROM shifts WHERE date = '2025-01-01' AND id = 5") == \
+        "SELECT * FROM shifts WHERE date = ? AND id = ?"
+    assert normalize_sql("DELETE FROM shifts WHERE id IN (?, ?, ?);") == \
+        normalize_sql("DELETE FROM shifts WHERE id IN (?)") == \
+        "DELETE FROM shifts WHERE id IN (?...)"
+
+
+def test_statement_label():
+    """Test etykiety metryki (operacja, tabela)"""
+    assert statement_label("SELECT s.date FROM shifts s JOIN employees e ON e.id = s.employee_id") == \
+        ('SELECT', 'shifts')
+    assert statement_label("INSERT INTO schedule_changes (date) VALUES (?)") == ('INSERT', 'schedule_changes')
+    assert statement_label("PRAGMA journal_mode=WAL") == ('PRAGMA', '-')
+
+
+def test_slow_query_logged_with_plan(caplog):
+    """Test logowania wolnego zapytania razem z EXPLAIN QUERY PLAN"""
+    connection = sqlite3.connect(':memory:')
+    connection.execute("CREATE TABLE shifts (id INTEGER PRIMARY KEY, date TEXT)")
+    db = InstrumentedConnection(connection, slow_query_threshold=0)
+
+    with caplog.at_level(logging.WARNING, logger='app.db_instrumentation'):
+        rows = db.execute("SELECT id FROM shifts WHERE date = ?", ('2025-01-01',)).fetchall()
+
+    assert rows == []
+    message = caplog.records[-1].getMessage()
+    assert 'Slow query' in message
+    assert 'SELECT id FROM shifts WHERE date = ?' in message
+    assert 'plan: SCAN shifts' in message
+
+
+def test_wrapper_is_transparent():
+    """Test przezroczystości wrappera (row_factory, lastrowid, commit)"""
+    db = InstrumentedConnection(sqlite3.connect(':memory:'))
+    db.row_factory = sqlite3.Row
+    db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    cursor = db.execute("INSERT INTO t (name) VALUES (?)", ('a',))
+    db.commit()
+    assert cursor.lastrowid == 1
+    assert db.execute("SELECT name FROM t").fetchone()['name'] == 'a'
+
+
+@pytest.fixture
+def debug_client(monkeypatch):
+    """Aplikacja z nagłówkami X-DB-Query-* i tymczasową bazą"""
+    monkeypatch.setenv('DB_QUERY_HEADERS', 'true')
+    test_app = create_app()
+    db_fd, db_path = tempfile.mkstemp()
+    test_app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+
+    from app.database import init_db
+    with test_app.app_context():
+        init_db()
+
+    with test_app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        yield client
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_query_count_header(debug_client):
+    """Test nagłówka z liczbą zapytań wykonanych przez żądanie"""
+    response = debug_client.get('/api/schedule/month?year=2025&month=1')
+    assert response.status_code == 200
+    assert response.headers['X-DB-Query-Count'] == '2'
+    assert response.headers['X-DB-Query-Time'].endswith('ms')
+
+
+@pytest.fixture
+def locked_db(tmp_path):
+    """Plik bazy w trybie WAL i drugie połączenie trzymające blokadę zapisu"""
+    path = str(tmp_path / 'locks.db')
+    holder = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    holder.execute("PRAGMA journal_mode=WAL")
+    holder.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    holder.execute("BEGIN IMMEDIATE")
+    yield path, holder
+    holder.close()
+
+
+def waiting_connection(path, lock_timeout):
+    connection = sqlite3.connect(path, timeout=0)
+    return InstrumentedConnection(connection, slow_query_threshold=10, lock_timeout=lock_timeout)
+
+
+def test_busy_statement_retried_and_lock_wait_counted(locked_db):
+    """Test ponowień po SQLITE_BUSY - czas czekania trafia do statystyk żądania"""
+    path, holder = locked_db
+    db = waiting_connection(path, lock_timeout=5)
+    test_app = create_app()
+    with test_app.test_request_context():
+        threading.Timer(0.2, holder.execute, args=("COMMIT",)).start()
+        db.execute("INSERT INTO t (name) VALUES (?)", ('a',))
+        db.commit()
+        stats = request_query_stats()
+
+    assert stats.count == 1
+    assert stats.busy_retries > 0
+    assert 0.15 < stats.lock_wait < 5
+    assert stats.total_time < stats.lock_wait  # czas zapytania bez czekania na blokadę
+    assert REGISTRY.get_sample_value('grafik_db_busy_retries_total', {'operation': 'INSERT', 'table': 't'}) > 0
+
+
+def test_lock_timeout_reraises(locked_db):
+    """Test limitu czekania - po lock_timeout błąd 'database is locked' jak wcześniej"""
+    path, _ = locked_db
+    before = REGISTRY.get_sample_value('grafik_db_lock_timeouts_total', {'operation': 'INSERT', 'table': 't'}) or 0
+
+    db = waiting_connection(path, lock_timeout=0.1)
+    with pytest.raises(sqlite3.OperationalError, match='locked'):
+        db.execute("INSERT INTO t (name) VALUES (?)", ('a',))
+
+    assert REGISTRY.get_sample_value('grafik_db_lock_timeouts_total', {'operation': 'INSERT', 'table': 't'}) == before + 1
+
+
+def test_lock_wait_header(debug_client):
+    """Test nagłówka z czasem czekania na blokady"""
+    response = debug_client.get('/api/schedule/month?year=2025&month=1')
+    assert response.headers['X-DB-Lock-Wait'] == '0.0ms'
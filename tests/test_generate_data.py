@@ -0,0 +1,102 @@
+"""
+Testy generatora danych syntetycznych (generate_data.py)
+"""
+
+import sqlite3
+import pytest
+from generate_data import generate, PRESETS
+
+TABLES = ['employees', 'users', 'shifts', 'schedule_changes', 'swap_requests', 'unavailability_requests',
+          'request_history', 'draft_shifts', 'push_subscriptions', 'whitelist_emails']
+
+
+def dump(path, tables=TABLES):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall() for table in tables}
+    finally:
+        conn.close()
+
+
+def test_generate_fills_every_table(tmp_path):
+    """Test presetu small - każda tabela ma dane, liczby zgodne z parametrami"""
+    summary = generate(str(tmp_path / 'small.db'), preset='small')
+    params = PRESETS['small']
+
+    for table in TABLES:
+        assert summary[table] > 0, table
+    assert summary['employees'] == summary['users'] == params['employees']
+    assert summary['swap_requests'] == params['swaps']
+    assert summary['schedule_changes'] == params['changes']
+    assert summary['request_history'] == params['history']
+    assert summary['admin_ids'] == [1, 2]
+    assert summary['first_date'] == '2025-01-01'
+    assert summary['last_date'] == '2025-02-28'
+
+
+def test_generate_is_deterministic(tmp_path):
+    """Test powtarzalności - ten sam seed daje identyczne dane"""
+    generate(str(tmp_path / 'a.db'), preset='small')
+    generate(str(tmp_path / 'b.db'), preset='small')
+    generate(str(tmp_path / 'c.db'), preset='small', seed=2)
+
+    tables = [table for table in TABLES if table != 'users']  # hash hasła ma losową sól
+    assert dump(tmp_path / 'a.db', tables) == dump(tmp_path / 'b.db', tables)
+    assert dump(tmp_path / 'a.db', ['shifts']) != dump(tmp_path / 'c.db', ['shifts'])
+
+
+def test_generate_volumes_are_independent(tmp_path):
+    """Test niezależnych strumieni - zmiana liczby zamian nie zmienia grafiku"""
+    generate(str(tmp_path / 'a.db'), preset='small')
+    generate(str(tmp_path / 'b.db'), preset='small', swaps=5)
+
+    assert dump(tmp_path / 'a.db', ['shifts', 'schedule_changes']) == \
+        dump(tmp_path / 'b.db', ['shifts', 'schedule_changes'])
+
+
+def test_generated_data_is_consistent(tmp_path):
+    """Test spójności - klucze obce, jedna niedyspozycja na pracownika i miesiąc, daty w zakresie"""
+    path = str(tmp_path / 'data.db')
+    summary = generate(path, preset='small', unavailability=1000)
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        assert conn.execute("""
+            SELECT COUNT(*) FROM (SELECT employee_id, month_year FROM unavailability_requests
+                                  GROUP BY employee_id, month_year HAVING COUNT(*) > 1)
+        """).fetchone()[0] == 0
+        # 10 pracowników × 2 miesiące - więcej zgłoszeń się nie zmieści
+        assert summary['unavailability_requests'] == 20
+        first, last = conn.execute("SELECT MIN(date), MAX(date) FROM shifts").fetchone()
+        assert (first, last) == (summary['first_date'], summary['last_date'])
+        assert conn.execute("""
+            SELECT COUNT(*) FROM swap_requests
+            WHERE from_date NOT BETWEEN ? AND ? OR to_date NOT BETWEEN ? AND ?
+        """, (first, last, first, last)).fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_generate_rejects_unknown_parameters(tmp_path):
+    """Test walidacji parametrów"""
+    with pytest.raises(ValueError):
+        generate(str(tmp_path / 'x.db'), preset='small', employes=5)
+
+
+def test_generated_accounts_can_log_in(tmp_path):
+    """Test haseł kont - hash w formacie aplikacji, weryfikowalny hasłem DEFAULT_PASSWORD"""
+    from app.password_utils import DEFAULT_ALGORITHM, parse_hash, verify_password
+    from generate_data import DEFAULT_PASSWORD
+
+    path = str(tmp_path / 'small.db')
+    generate(path, preset='small')
+    conn = sqlite3.connect(path)
+    try:
+        hashes = {row[0] for row in conn.execute("SELECT password_hash FROM users")}
+    finally:
+        conn.close()
+
+    assert len(hashes) == 1  # jeden hash dla wszystkich kont
+    stored = hashes.pop()
+    assert parse_hash(stored)[0] == DEFAULT_ALGORITHM
+    assert verify_password(DEFAULT_PASSWORD, stored)
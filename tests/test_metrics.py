@@ -0,0 +1,103 @@
+"""
+Testy metryk żądań Prometheus (/metrics)
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+from app import app
+
+
+@pytest.fixture
+def client():
+    """Klient testowy Flask"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_metrics_record_request_latency_and_status(client):
+    """Test rejestrowania czasu i statusu żądania per endpoint"""
+    client.get('/api/healthz')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+
+    body = response.get_data(as_text=True)
+    assert 'grafik_http_requests_total{endpoint="api.healthz",method="GET",status="200"}' in body
+    assert 'grafik_http_request_duration_seconds_bucket{endpoint="api.healthz",le="0.005",method="GET"}' in body
+    assert 'grafik_http_requests_in_progress{endpoint="api.healthz",method="GET"} 0.0' in body
+
+
+def test_metrics_unmatched_route_label(client):
+    """Test wspólnej etykiety dla nieistniejących tras (ograniczona kardynalność)"""
+    client.get('/nie-ma-takiej-strony-123')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'endpoint="none",method="GET",status="404"' in body
+    assert 'nie-ma-takiej-strony' not in body
+
+
+def test_metrics_access_control(client):
+    """Test ochrony /metrics - tylko lokalnie lub z tokenem"""
+    assert client.get('/metrics', headers={'X-Forwarded-For': '1.2.3.4'}).status_code == 403
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 403
+
+    app.config['METRICS_TOKEN'] = 'sekret'
+    try:
+        assert client.get('/metrics').status_code == 403
+        response = client.get('/metrics', headers={'Authorization': 'Bearer sekret'},
+                              environ_base={'REMOTE_ADDR': '10.0.0.5'})
+        assert response.status_code == 200
+    finally:
+        app.config['METRICS_TOKEN'] = ''
+
+
+WORKER_SCRIPT = """
+from app import app
+client = app.test_client()
+for _ in range(3):
+    client.get('/api/healthz')
+"""
+
+
+def test_metrics_aggregated_across_processes(tmp_path):
+    """Test agregacji metryk z kilku procesów (tryb multiprocess jak pod gunicorn)"""
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', WORKER_SCRIPT], env=env, check=True,
+                       cwd=os.path.dirname(os.path.dirname(__file__)))
+
+    from prometheus_client import CollectorRegistry, generate_latest, multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+    body = generate_latest(registry).decode()
+    assert 'grafik_http_requests_total{endpoint="api.healthz",method="GET",status="200"} 6.0' in body
+
+
+def test_app_import_creates_missing_multiprocess_dir(tmp_path):
+    """Test startu z nieistniejącym katalogiem metryk (pusty /dev/shm po restarcie)"""
+    metrics_dir = tmp_path / 'shm' / 'metrics'
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(metrics_dir))
+    subprocess.run([sys.executable, '-c', 'import app'], env=env, check=True,
+                   cwd=os.path.dirname(os.path.dirname(__file__)))
+    assert metrics_dir.is_dir()
+
+
+SCRAPE_SCRIPT = """
+from app import app
+app.config['TESTING'] = True
+client = app.test_client()
+print([client.get('/metrics').status_code for _ in range(5)])
+print([client.get('/offline').status_code for _ in range(5)])
+"""
+
+
+def test_metrics_not_rate_limited():
+    """Test wyłączenia /metrics z domyślnych limitów żądań (scrape co kilkanaście sekund)"""
+    # Domyślne limity czyta pierwsze init_app wspólnego limitera - osobny proces
+    env = dict(os.environ, RATELIMIT_DEFAULT='3 per day')
+    result = subprocess.run([sys.executable, '-c', SCRAPE_SCRIPT], env=env, check=True,
+                            capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(__file__)))
+    assert result.stdout.splitlines() == ['[200, 200, 200, 200, 200]', '[200, 200, 200, 429, 429]']
@@ -0,0 +1,124 @@
+"""
+Testy powiadomień o zmianach (app/notifications.py) - wysyłka na atrapę usługi push
+"""
+
+import json
+import time
+import sqlite3
+import pytest
+from app import app
+from app.database import init_db
+from app.notifications import NotificationDispatcher, coalesce
+from tests.test_push import Browser, push_service, sender  # noqa: F401 - fikstury
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    """Dispatcher z długim oknem - testy wysyłają przez flush()"""
+    notifications = NotificationDispatcher(window=60)
+    notifications.app = app
+    monkeypatch.setitem(app.extensions, 'notifications', notifications)
+    return notifications
+
+
+@pytest.fixture
+def team(tmp_path, monkeypatch, push_service, sender, dispatcher):
+    """Admin + trzech pracowników z kontami (dopasowanie po imieniu i nazwisku), każdy z subskrypcją"""
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    db_path = str(tmp_path / 'notifications.db')
+    app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+    with app.app_context():
+        init_db()
+    browsers = {user_id: Browser() for user_id in (2, 3, 4)}
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, name, role) VALUES (1, 'admin@example.com', 'Admin', 'ADMIN')")
+    for user_id, name in ((2, 'Jan Kowalski'), (3, 'Anna Nowak'), (4, 'Ewa Zielińska')):
+        conn.execute("INSERT INTO users (id, email, name) VALUES (?, ?, ?)", (user_id, f"u{user_id}@example.com", name))
+        conn.execute("INSERT INTO employees (id, name) VALUES (?, ?)", (user_id, name))
+        conn.execute("INSERT INTO push_subscriptions (user_id, subscription_data) VALUES (?, ?)",
+                     (user_id, json.dumps(browsers[user_id].subscription(f"{push_service.url}/201/user{user_id}"))))
+    conn.commit()
+    conn.close()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_email='admin@example.com', user_role='ADMIN', user_name='Admin')
+    client.browsers = browsers
+    return client
+
+
+def received(push_service, browsers):
+    """Odszyfrowane powiadomienia per ścieżka subskrypcji"""
+    result = {}
+    for path, _, body in push_service.received:
+        user_id = int(path.rsplit('user', 1)[1])
+        result.setdefault(path, []).append(json.loads(browsers[user_id].decrypt(body)))
+    return result
+
+
+def test_bulk_publish_sends_one_push_per_employee(team, push_service, dispatcher):
+    """Test publikacji - setki zmian w grafiku, jedno powiadomienie na pracownika"""
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn.executemany("INSERT INTO draft_shifts (date, shift_type, employee_id, created_by) VALUES (?, ?, ?, 1)",
+                     [(f"2026-11-{day:02d}", 'DNIOWKA', emp_id) for day in range(1, 31) for emp_id in (2, 3)])
+    conn.commit()
+    conn.close()
+
+    assert team.post('/api/draft/publish').status_code == 200
+    assert push_service.received == []  # jeszcze w oknie łączenia
+
+    with app.app_context():
+        assert dispatcher.flush() == {'sent': 2, 'failed': 0, 'removed': 0}
+    messages = received(push_service, team.browsers)
+    assert sorted(messages) == ['/201/user2', '/201/user3']
+    assert messages['/201/user2'][0]['body'] == 'Opublikowano nowy grafik'
+    assert messages['/201/user2'][0]['data']['kinds'] == ['schedule']
+
+
+def test_save_changes_are_coalesced(team, push_service, dispatcher):
+    """Test zapisu - kilka zapisów w oknie, jedno zbiorcze powiadomienie"""
+    for day in ('2026-11-02', '2026-11-03'):
+        response = team.post('/api/save', json={'changes': [
+            {'date': day, 'employee': 'Jan Kowalski', 'shift_type': 'D'},
+            {'date': day, 'employee': 'Anna Nowak', 'shift_type': 'N'},
+        ]})
+        assert response.status_code == 200
+    team.post('/api/save', json={'changes': [{'date': '2026-11-02', 'employee': 'Jan Kowalski', 'shift_type': 'D'}]})
+
+    dispatcher.flush()
+    messages = received(push_service, team.browsers)
+    assert [m['body'] for m in messages['/201/user2']] == ['Zmiany w Twoim grafiku (2)']
+    assert len(messages['/201/user3']) == 1
+
+
+def test_swap_decision_notifies_requester_and_employees(team, push_service, dispatcher):
+    """Test decyzji kierownika - prośbodawca i obaj pracownicy dostają wynik"""
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn.execute("""INSERT INTO swap_requests (id, requester_user_id, from_date, to_date, from_employee, to_employee,
+                    recipient_status) VALUES (7, 2, '2026-11-02', '2026-11-05', 'Jan Kowalski', 'Anna Nowak', 'APPROVED')""")
+    conn.commit()
+    conn.close()
+
+    assert team.post('/api/swaps/boss', json={'id': 7, 'status': 'REJECTED'}).status_code == 200
+    dispatcher.flush()
+    messages = received(push_service, team.browsers)
+    assert sorted(messages) == ['/201/user2', '/201/user3']
+    assert messages['/201/user2'][0]['body'] == 'Zamiana 2026-11-02 ↔ 2026-11-05 odrzucona przez kierownika'
+
+
+def test_window_elapses_in_background(team, push_service, dispatcher):
+    """Test wątku wysyłki - powiadomienie wychodzi samo po upływie okna"""
+    dispatcher.window = 0.05
+    with app.app_context():
+        from app.notifications import notify_employees
+        notify_employees(['Ewa Zielińska'], 'unavailability', 'Niedyspozycja 2026-12 zatwierdzona')
+    deadline = time.time() + 5
+    while not push_service.received and time.time() < deadline:
+        time.sleep(0.02)
+    assert [path for path, _, _ in push_service.received] == ['/201/user4']
+
+
+def test_coalesce_mixed_events():
+    """Test łączenia - jeden rodzaj to podsumowanie, różne rodzaje to pierwsza treść + liczba"""
+    assert coalesce([('swap', 'A', '/'), ('swap', 'A', '/')]) == ('A', '/', ('swap',))
+    assert coalesce([('schedule', 'A', '/'), ('schedule', 'B', '/')])[0] == 'Zmiany w Twoim grafiku (2)'
+    assert coalesce([('schedule', 'A', '/'), ('swap', 'B', '/x')]) == ('A (+1)', '/', ('schedule', 'swap'))
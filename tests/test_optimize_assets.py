@@ -0,0 +1,84 @@
+"""
+Testy minifikacji JS/CSS w optimize_assets.py
+"""
+
+import subprocess
+import shutil
+import pytest
+from optimize_assets import minify_js, minify_css
+
+
+def test_minify_js_keeps_strings_and_urls():
+    """Test że // wewnątrz stringów nie jest traktowane jako komentarz"""
+    source = "const url = 'https://example.com/api'; // komentarz\nconst s = \"a /* b */ c\";"
+    result = minify_js(source)
+    assert "'https://example.com/api'" in result
+    assert '"a /* b */ c"' in result
+    assert 'komentarz' not in result
+
+
+def test_minify_js_keeps_regex_literals():
+    """Test zachowania literałów regex zawierających / i cudzysłowy"""
+    source = "const re = /\\/api\\/\"x\"/g;\nconst half = total / 2 / count;"
+    result = minify_js(source)
+    assert '/\\/api\\/"x"/g' in result
+    assert 'total/2/count' in result
+
+
+def test_minify_js_keeps_template_literals():
+    """Test zachowania białych znaków w template literals"""
+    source = "const html = `<div  class=\"a\">\n  ${ name }  </div>`;"
+    result = minify_js(source)
+    assert '`<div  class="a">\n  ${ name }  </div>`' in result
+
+
+def test_minify_js_keeps_newline_needed_by_asi():
+    """Test zachowania nowej linii tam gdzie zależy od niej ASI"""
+    source = "let a = b\n++c\nreturn\nx"
+    result = minify_js(source)
+    assert 'b\n++c' in result
+    assert 'return\nx' in result
+
+
+def test_minify_css_keeps_descendant_pseudo_selector():
+    """Test że spacja przed :hover w selektorze potomka nie znika"""
+    result = minify_css(".menu a :hover { color: red ; }\n/* komentarz */")
+    assert result == '.menu a :hover{color:red}'
+
+
+def test_minify_css_keeps_strings():
+    """Test zachowania stringów i url()"""
+    result = minify_css('.a { content: "x ; y"; background: url( "img/a b.png" ); }')
+    assert '"x ; y"' in result
+    assert 'url( "img/a b.png" )' in result
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="node niedostępny")
+@pytest.mark.parametrize('name', ['app.js', 'admin.js', 'sw.js'])
+def test_minified_bundles_are_valid_js(tmp_path, name):
+    """Test że zminifikowane pliki statyczne są poprawnym JS"""
+    with open(f'static/{name}', encoding='utf-8') as f:
+        minified = minify_js(f.read())
+    out = tmp_path / name
+    out.write_text(minified, encoding='utf-8')
+    result = subprocess.run(['node', '--check', str(out)], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_precache_list_contains_only_existing_files():
+    """Test że lista precache w sw.js wskazuje tylko na istniejące pliki z aktualnym hashem"""
+    import os
+    import re
+    from optimize_assets import build_precache_list, file_fingerprint
+
+    with open('static/sw.js', encoding='utf-8') as f:
+        sw_source = f.read()
+    urls = re.findall(r"'(/[^']*)'", re.search(r"PRECACHE_URLS\s*=\s*\[([^\]]*)\]", sw_source).group(1))
+
+    assert urls == build_precache_list()
+    assert '/' not in urls
+    for url in urls:
+        if url.startswith('/static/'):
+            path, _, version = url[len('/static/'):].partition('?v=')
+            assert os.path.isfile(os.path.join('static', path))
+            assert version == file_fingerprint(os.path.join('static', path))
@@ -0,0 +1,99 @@
+"""
+Testy hashowania haseł (app/password_utils.py)
+"""
+
+import hashlib
+import tempfile
+import os
+import sqlite3
+import threading
+import pytest
+from app import app
+from app.database import init_db
+from app.password_utils import (hash_password, verify_password, needs_rehash, check_password,
+                                parse_params, PasswordHasher, PasswordHasherBusy)
+
+
+def legacy_hash(password, salt='abcd'):
+    """Hash w starym formacie "hash:sól" (100 000 iteracji)"""
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000).hex() + ':' + salt
+
+
+def test_versioned_format_round_trip():
+    """Test formatu algorytm$parametry$sól$hash - koszt zapisany przy hashu"""
+    stored = hash_password('Haslo123', algorithm='pbkdf2_sha256', params={'iterations': 1000})
+    algorithm, iterations, salt, _ = stored.split('$')
+    assert (algorithm, iterations, len(salt)) == ('pbkdf2_sha256', '1000', 64)
+    assert verify_password('Haslo123', stored)
+    assert not verify_password('Haslo124', stored)
+    assert not needs_rehash(stored, 'pbkdf2_sha256', {'iterations': 1000})
+    assert needs_rehash(stored, 'pbkdf2_sha256', {'iterations': 2000})
+
+
+def test_scrypt_is_default_and_parameters_change_forces_rehash():
+    """Test scrypt - parametry n/r/p w hashu, zmiana algorytmu lub parametrów = przepisanie"""
+    stored = hash_password('Haslo123', params={'n': 1024})
+    assert stored.startswith('scrypt$n=1024,r=8,p=1$')
+    assert verify_password('Haslo123', stored)
+    assert not verify_password('Haslo124', stored)
+    assert not needs_rehash(stored, 'scrypt', parse_params('scrypt', 'n=1024'))
+    assert needs_rehash(stored, 'scrypt', parse_params('scrypt', 'n=2048'))
+    assert needs_rehash(stored, 'pbkdf2_sha256')
+    assert parse_params('pbkdf2_sha256', '200000') == {'iterations': 200000}
+
+
+def test_legacy_hash_is_verified_and_upgraded():
+    """Test starego formatu - weryfikacja i nowy hash przy poprawnym haśle"""
+    stored = legacy_hash('Haslo123')
+    assert verify_password('Haslo123', stored)
+    assert needs_rehash(stored, 'pbkdf2_sha256')
+
+    assert check_password('zle', stored) == (False, None)
+    is_valid, new_hash = check_password('Haslo123', stored, 'scrypt', {'n': 1024})
+    assert is_valid and new_hash.startswith('scrypt$n=1024,')
+    assert verify_password('Haslo123', new_hash)
+    assert not verify_password('Haslo123', 'bcrypt$12$x$y')
+
+
+def test_full_pool_rejects_instead_of_queueing():
+    """Test limitu puli - ponad workers + max_waiting zadań jest odrzucane od razu"""
+    hasher = PasswordHasher(workers=1, max_waiting=0, timeout=5, params={'n': 1024, 'r': 8, 'p': 1})
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hasher._run, args=('verify', lambda: started.set() or release.wait(5)))
+    holder.start()
+    assert started.wait(5)
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash('Haslo123')
+    release.set()
+    holder.join(5)
+
+    assert hasher.check('Haslo123', hasher.hash('Haslo123')) == (True, None)
+
+
+def test_login_upgrades_legacy_hash(monkeypatch):
+    """Test logowania - przestarzały hash przepisany na nowy format"""
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    db_fd, db_path = tempfile.mkstemp()
+    app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+    try:
+        with app.app_context():
+            init_db()
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO users (email, name, password_hash, login_type) VALUES (?, ?, ?, 'EMAIL')",
+                     ('jan@example.com', 'Jan Kowalski', legacy_hash('Haslo123')))
+        conn.commit()
+        conn.close()
+
+        client = app.test_client()
+        response = client.post('/login-email', data={'email': 'jan@example.com', 'password': 'Haslo123'})
+        assert response.status_code == 302
+
+        conn = sqlite3.connect(db_path)
+        stored = conn.execute("SELECT password_hash FROM users").fetchone()[0]
+        conn.close()
+        assert stored.startswith('scrypt$n=16384,r=8,p=1$')
+        assert verify_password('Haslo123', stored)
+    finally:
+        os.close(db_fd)
+        os.unlink(db_path)
@@ -0,0 +1,100 @@
+"""
+Testy liczników wydajności (histogramy w oknie czasowym)
+"""
+
+import random
+import threading
+from app.performance import LogHistogram, PerformanceCounter
+
+
+class FakeClock:
+    """Sterowany zegar do testów okna czasowego"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_histogram_percentiles_within_bucket_error():
+    """Test dokładności percentyli histogramu logarytmicznego"""
+    rng = random.Random(42)
+    samples = [rng.uniform(0.001, 2.0) for _ in range(10000)]
+    histogram = LogHistogram()
+    for value in samples:
+        histogram.record(value)
+
+    samples.sort()
+    for q in (50, 95, 99):
+        exact = samples[int(len(samples) * q / 100) - 1]
+        assert abs(histogram.percentile(q) - exact) / exact < 0.1
+    assert histogram.min == samples[0]
+    assert histogram.max == samples[-1]
+
+
+def test_histogram_memory_is_fixed():
+    """Test stałego rozmiaru histogramu niezależnie od liczby próbek"""
+    histogram = LogHistogram()
+    for i in range(100000):
+        histogram.record(i * 1e-5)
+    assert len(histogram.buckets) == LogHistogram.BUCKET_COUNT
+    assert histogram.count == 100000
+
+
+def test_counter_keeps_api_and_adds_percentiles():
+    """Test zgodności API increment/add_time/get_stats"""
+    counter = PerformanceCounter()
+    counter.increment('requests')
+    counter.increment('requests')
+    for value in (0.1, 0.2, 0.3):
+        counter.add_time('db', value)
+
+    stats = counter.get_stats()
+    assert stats['requests_count'] == 2
+    assert stats['db_samples'] == 3
+    assert abs(stats['db_avg_time'] - 0.2) < 1e-9
+    assert stats['db_min_time'] == 0.1
+    assert stats['db_max_time'] == 0.3
+    assert abs(stats['db_total_time'] - 0.6) < 1e-9
+    assert 0.1 <= stats['db_p50_time'] <= 0.3
+    assert stats['db_p99_time'] == 0.3
+
+
+def test_counter_sliding_window_expires_samples():
+    """Test wygasania próbek starszych niż okno czasowe"""
+    clock = FakeClock()
+    counter = PerformanceCounter(window_seconds=60, slots=6, clock=clock)
+    counter.add_time('slow', 5.0)
+
+    clock.now = 30
+    counter.add_time('slow', 1.0)
+    assert counter.get_stats()['slow_samples'] == 2
+
+    clock.now = 65
+    stats = counter.get_stats()
+    assert stats['slow_samples'] == 1
+    assert stats['slow_max_time'] == 1.0
+
+    clock.now = 200
+    assert 'slow_samples' not in counter.get_stats()
+
+
+def test_counter_thread_safe():
+    """Test równoległych zapisów z wielu wątków"""
+    counter = PerformanceCounter()
+
+    def worker():
+        for _ in range(1000):
+            counter.increment('hits')
+            counter.add_time('op', 0.01)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = counter.get_stats()
+    assert stats['hits_count'] == 8000
+    assert stats['op_samples'] == 8000
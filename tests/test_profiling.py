@@ -0,0 +1,109 @@
+"""
+Testy profilera (cProfile per żądanie i próbkowanie stosów)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import pytest
+from app import app
+from app.database import get_db, init_db
+from app.profiling import StackSampler, collapse_stack
+
+
+def busy_function(stop):
+    """Funkcja obciążająca CPU dla testu próbkowania"""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_collapse_stack_root_to_leaf():
+    """Test formatu collapsed stack (korzeń -> liść)"""
+    def inner():
+        return collapse_stack(sys._getframe())
+
+    stack = inner()
+    assert stack.split(';')[-1].startswith('inner (test_profiling.py:')
+    assert 'test_collapse_stack_root_to_leaf' in stack
+
+
+def test_stack_sampler_collects_busy_thread(tmp_path):
+    """Test próbkowania stosu wybranego wątku"""
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_function, args=(stop,))
+    worker.start()
+    try:
+        output = tmp_path / 'out.folded'
+        sampler = StackSampler('test', time.time() + 0.3, 0.005, str(output),
+                               thread_filter=lambda: {worker.ident})
+        sampler.start()
+        sampler.join()
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = output.read_text().splitlines()
+    assert lines
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert any('busy_function' in line for line in lines)
+    assert not any('stack-sampler' in line or 'StackSampler' in line for line in lines)
+
+
+@pytest.fixture
+def admin_client():
+    """Klient zalogowany jako administrator"""
+    db_fd, db_path = tempfile.mkstemp()
+    app.config.update({'TESTING': True, 'DATABASE_PATH': db_path, 'WTF_CSRF_ENABLED': False})
+
+    with app.app_context():
+        init_db()
+        db = get_db()
+        db.execute("INSERT INTO users (email, name, role) VALUES ('admin@test.pl', 'Admin', 'ADMIN')")
+        db.execute("INSERT INTO users (email, name, role) VALUES ('user@test.pl', 'User', 'USER')")
+        db.commit()
+
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        yield client
+
+    app.config['WTF_CSRF_ENABLED'] = True
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_request_profile_captured_for_admin(admin_client):
+    """Test zapisu profilu cProfile dla żądania z flagą _profile"""
+    response = admin_client.get('/api/healthz?_profile=1')
+    name = response.headers['X-Profile-File']
+    assert name.endswith('api.healthz.pstats')
+
+    report = admin_client.get(f'/admin/profiler/profiles/{name}?format=text')
+    assert report.status_code == 200
+    assert 'function calls' in report.get_data(as_text=True)
+
+    assert admin_client.get('/admin/profiler/profiles/..%2Fapp.db').status_code == 404
+
+
+def test_request_profile_ignored_for_regular_user(admin_client):
+    """Test że zwykły użytkownik nie może włączyć profilowania"""
+    with admin_client.session_transaction() as sess:
+        sess['user_id'] = 2
+    response = admin_client.get('/api/healthz', headers={'X-Profile': '1'})
+    assert 'X-Profile-File' not in response.headers
+
+
+def test_sampling_run_via_endpoint(admin_client):
+    """Test uruchomienia próbkowania i pobrania wyniku"""
+    response = admin_client.post('/admin/profiler/sampling', json={'seconds': 1, 'interval': 0.01})
+    assert response.status_code == 200
+    run_id = response.get_json()['run_id']
+
+    assert admin_client.get('/admin/profiler').get_json()['sampling'] is True
+
+    app.extensions['profiler']._sampler.join(timeout=5)
+    result = admin_client.get(f'/admin/profiler/sampling/{run_id}')
+    assert result.status_code == 200
+    assert result.mimetype == 'text/plain'
@@ -0,0 +1,321 @@
+"""
+Testy wysyłki Web Push (app/push.py) na lokalnej atrapie usługi push
+"""
+
+import os
+import ssl
+import json
+import sqlite3
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives import hashes
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from app import app
+from app.database import init_db
+from app.push import PushSender, b64url_decode, b64url_encode, encrypt_payload, endpoint_error
+
+
+class Browser:
+    """Klucze subskrypcji po stronie przeglądarki - do odszyfrowania wiadomości"""
+
+    def __init__(self):
+        self.key = ec.generate_private_key(ec.SECP256R1())
+        self.auth = os.urandom(16)
+        self.public = self.key.public_key().public_bytes(
+            serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+
+    def subscription(self, endpoint):
+        return {'endpoint': endpoint, 'keys': {'p256dh': b64url_encode(self.public), 'auth': b64url_encode(self.auth)}}
+
+    def decrypt(self, body):
+        salt, id_len = body[:16], body[20]
+        as_public, ciphertext = body[21:21 + id_len], body[21 + id_len:]
+        shared = self.key.exchange(ec.ECDH(), ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), as_public))
+        ikm = HKDF(hashes.SHA256(), 32, self.auth, b"WebPush: info\x00" + self.public + as_public).derive(shared)
+        cek = HKDF(hashes.SHA256(), 16, salt, b"Content-Encoding: aes128gcm\x00").derive(ikm)
+        nonce = HKDF(hashes.SHA256(), 12, salt, b"Content-Encoding: nonce\x00").derive(ikm)
+        plaintext = AESGCM(cek).decrypt(nonce, ciphertext, None)
+        assert plaintext.endswith(b"\x02")
+        return plaintext[:-1]
+
+
+def self_signed_certificate(directory):
+    """Certyfikat i klucz dla https://localhost (plik PEM), zaufany przez REQUESTS_CA_BUNDLE"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (x509.CertificateBuilder()
+                   .subject_name(name).issuer_name(name).public_key(key.public_key())
+                   .serial_number(x509.random_serial_number())
+                   .not_valid_before(now - datetime.timedelta(days=1))
+                   .not_valid_after(now + datetime.timedelta(days=1))
+                   .add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost')]), critical=False)
+                   .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+                   .sign(key, hashes.SHA256()))
+    cert_path, key_path = directory / 'push.crt', directory / 'push.key'
+    cert_path.write_bytes(certificate.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    return str(cert_path), str(key_path)
+
+
+@pytest.fixture
+def push_service(tmp_path, monkeypatch):
+    """Atrapa usługi push (https://localhost) - status odpowiedzi wg ścieżki, np. /410 albo /503-201 (kolejne próby)"""
+    received = []
+    attempts = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            statuses = self.path.strip('/').split('/')[0].split('-')
+            with lock:
+                attempt = attempts.get(self.path, 0)
+                attempts[self.path] = attempt + 1
+                received.append((self.path, dict(self.headers), body))
+            self.send_response(int(statuses[min(attempt, len(statuses) - 1)]))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    cert_path, key_path = self_signed_certificate(tmp_path)
+    monkeypatch.setenv('REQUESTS_CA_BUNDLE', cert_path)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"https://localhost:{server.server_port}"
+    server.received = received
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sender(monkeypatch):
+    """Nadawca z kluczem VAPID podpiętym do aplikacji testowej"""
+    vapid = ec.generate_private_key(ec.SECP256R1())
+    raw = b64url_encode(vapid.private_numbers().private_value.to_bytes(32, 'big'))
+    push_sender = PushSender(workers=4, timeout=2, max_retries=2, backoff=0.01, batch_size=2,
+                             allowed_hosts=('localhost',))
+    push_sender.configure_vapid(raw, 'admin@example.com')
+    monkeypatch.setitem(app.extensions, 'push_sender', push_sender)
+    return push_sender
+
+
+@pytest.fixture
+def admin_client(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    db_path = str(tmp_path / 'push.db')
+    app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+    with app.app_context():
+        init_db()
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, name, role) VALUES (1, 'admin@example.com', 'Admin', 'ADMIN')")
+    conn.execute("INSERT INTO users (id, email, name) VALUES (2, 'jan@example.com', 'Jan')")
+    conn.commit()
+    conn.close()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_email='admin@example.com', user_role='ADMIN')
+    return client
+
+
+def add_subscriptions(*rows):
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn.executemany("INSERT INTO push_subscriptions (user_id, subscription_data) VALUES (?, ?)",
+                     [(user_id, data if isinstance(data, str) else json.dumps(data)) for user_id, data in rows])
+    conn.commit()
+    conn.close()
+
+
+def subscription_ids():
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    rows = conn.execute("SELECT id FROM push_subscriptions ORDER BY id").fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+def test_encrypted_payload_decrypts_in_browser():
+    """Test szyfrowania aes128gcm (RFC 8291) - przeglądarka odczytuje treść"""
+    browser = Browser()
+    keys = browser.subscription('x')['keys']
+    body = encrypt_payload(b'{"title": "Grafik"}', keys['p256dh'], keys['auth'])
+    assert int.from_bytes(body[16:20], 'big') == 4096
+    assert browser.decrypt(body) == b'{"title": "Grafik"}'
+    with pytest.raises(ValueError):
+        encrypt_payload(b'x' * 4000, keys['p256dh'], keys['auth'])
+
+
+def test_send_to_all_prunes_gone_and_retries(admin_client, push_service, sender):
+    """Test wysyłki do wszystkich - 410/404 usuwane, 503 ponawiane, partie po 2"""
+    browser = Browser()
+    add_subscriptions(
+        (1, browser.subscription(f"{push_service.url}/201/a")),
+        (2, browser.subscription(f"{push_service.url}/410/b")),
+        (2, browser.subscription(f"{push_service.url}/503-201/c")),
+        (2, browser.subscription(f"{push_service.url}/404/d")),
+        (2, browser.subscription(f"{push_service.url}/500/e")),
+    )
+    response = admin_client.post('/push/send-to-all', json={'title': 'Grafik', 'body': 'Nowy grafik'})
+    assert response.status_code == 200
+    assert {k: response.get_json()[k] for k in ('sent', 'failed', 'removed')} == {'sent': 2, 'failed': 1, 'removed': 2}
+    assert subscription_ids() == [1, 3, 5]
+
+    paths = [path for path, _, _ in push_service.received]
+    assert paths.count('/503-201/c') == 2
+    assert paths.count('/500/e') == 3  # pierwsza próba + 2 ponowienia
+
+    _, headers, body = next(r for r in push_service.received if r[0] == '/201/a')
+    assert headers['Content-Encoding'] == 'aes128gcm'
+    assert headers['Authorization'].startswith('vapid t=')
+    assert headers['Authorization'].endswith(f"k={sender.vapid_public_key}")
+    token = headers['Authorization'].split('t=')[1].split(',')[0]
+    claims = json.loads(b64url_decode(token.split('.')[1]))
+    assert claims['aud'] == push_service.url and claims['sub'] == 'mailto:admin@example.com'
+    payload = json.loads(browser.decrypt(body))
+    assert payload['title'] == 'Grafik' and payload['data']['url'] == '/'
+
+
+def test_send_to_user_reaches_only_own_subscriptions(admin_client, push_service, sender):
+    """Test wysyłki do użytkownika - wszystkie jego urządzenia, nikt inny"""
+    add_subscriptions(
+        (2, Browser().subscription(f"{push_service.url}/201/phone")),
+        (2, Browser().subscription(f"{push_service.url}/201/laptop")),
+        (1, Browser().subscription(f"{push_service.url}/201/admin")),
+    )
+    response = admin_client.post('/push/send', json={'title': 'Zamiana', 'body': 'Nowa prośba', 'user_id': 2})
+    assert response.status_code == 200
+    assert response.get_json()['sent'] == 2
+    assert sorted(path for path, _, _ in push_service.received) == ['/201/laptop', '/201/phone']
+
+
+def test_endpoint_must_be_known_push_service():
+    """Test adresu subskrypcji - tylko https do usług push przeglądarek"""
+    assert endpoint_error('https://fcm.googleapis.com/fcm/send/abc') is None
+    assert endpoint_error('https://web.push.apple.com/QG9') is None
+    assert endpoint_error('https://wns2-db5p.notify.windows.com/w/?token=x') is None
+    for endpoint in ('http://fcm.googleapis.com/fcm/send/abc', 'https://127.0.0.1:8000/x',
+                     'https://10.0.0.5/x', 'https://169.254.169.254/latest', 'https://localhost/x',
+                     'https://fcm.googleapis.com.evil.example/x', 'https://user:pw@fcm.googleapis.com/x',
+                     'file:///etc/passwd', None):
+        assert endpoint_error(endpoint), endpoint
+    assert endpoint_error('https://push.internal.example/x', ('push.internal.example',)) is None
+
+
+def test_subscribe_rejects_internal_endpoint(admin_client):
+    """Test zapisu subskrypcji - adres spoza usług push odrzucony, nic nie zapisane"""
+    for endpoint in ('http://127.0.0.1:8000/api/admin', 'https://192.168.1.1/'):
+        response = admin_client.post('/api/push/subscribe', json=Browser().subscription(endpoint))
+        assert response.status_code == 400
+    assert subscription_ids() == []
+
+
+def test_send_refuses_stored_internal_endpoint(admin_client, push_service, sender):
+    """Test wysyłki - wiersz z niedozwolonym adresem (sprzed walidacji) nie wychodzi z serwera"""
+    result = sender.send(1, Browser().subscription(push_service.url.replace('localhost', '127.0.0.1') + '/201/x'),
+                         b'{}')
+    assert not result.ok and result.attempts == 0
+    assert 'not a known push service' in result.error
+    result = sender.send(2, Browser().subscription(push_service.url.replace('https', 'http') + '/201/y'), b'{}')
+    assert 'https' in result.error
+    assert push_service.received == []
+
+
+def test_cleanup_removes_broken_and_stale(admin_client, sender):
+    """Test czyszczenia - uszkodzone subskrypcje i urządzenia niewidziane od max_age_days"""
+    add_subscriptions(
+        (1, Browser().subscription('https://fcm.googleapis.com/fcm/send/1')),
+        (1, 'nie-json'),
+        (2, {'endpoint': 'https://fcm.googleapis.com/fcm/send/2'}),
+        (2, Browser().subscription('https://fcm.googleapis.com/fcm/send/3')),
+        (2, Browser().subscription('http://169.254.169.254/latest')),
+    )
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn.execute("UPDATE push_subscriptions SET last_seen = datetime('now', '-90 days') WHERE id = 4")
+    conn.commit()
+    conn.close()
+
+    response = admin_client.post('/push/cleanup')
+    assert response.status_code == 200
+    assert response.get_json()['removed'] == 3
+    assert subscription_ids() == [1, 4]
+
+    assert admin_client.post('/push/cleanup', json={'max_age_days': 0}).status_code == 400
+    assert admin_client.post('/push/cleanup', json={'max_age_days': 30}).get_json()['removed'] == 1
+    assert subscription_ids() == [1]
+
+
+def test_subscriptions_are_per_device(admin_client):
+    """Test wielu urządzeń - wiersz na endpoint, ponowna rejestracja odświeża last_seen"""
+    phone, laptop = Browser(), Browser()
+    for subscription in (phone.subscription('https://fcm.googleapis.com/fcm/send/phone'),
+                         laptop.subscription('https://fcm.googleapis.com/fcm/send/laptop')):
+        assert admin_client.post('/api/push/subscribe', json=subscription).status_code == 200
+
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn.execute("UPDATE push_subscriptions SET last_seen = '2020-01-01 00:00:00'")
+    conn.commit()
+
+    # Telefon rejestruje się ponownie, potem ten sam telefon loguje się na inne konto
+    admin_client.post('/api/push/subscribe', json=phone.subscription('https://fcm.googleapis.com/fcm/send/phone'))
+    rows = conn.execute("SELECT id, user_id, last_seen > '2020-01-02' FROM push_subscriptions ORDER BY id").fetchall()
+    assert rows == [(1, 1, 1), (2, 1, 0)]
+
+    with admin_client.session_transaction() as sess:
+        sess.update(user_id=2, user_email='jan@example.com', user_role='USER')
+    admin_client.post('/api/push/subscribe', json=phone.subscription('https://fcm.googleapis.com/fcm/send/phone'))
+    rows = conn.execute("SELECT id, user_id FROM push_subscriptions ORDER BY id").fetchall()
+    conn.close()
+    assert rows == [(1, 2), (2, 1)]
+
+    with app.app_context():
+        from app.database import get_push_subscriptions
+        assert [row['id'] for row in get_push_subscriptions([1, 2])] == [1, 2]
+        assert [row['id'] for row in get_push_subscriptions([2])] == [1]
+        assert get_push_subscriptions([]) == []
+
+
+def test_old_table_is_migrated(tmp_path):
+    """Test migracji - stara tabela (jeden wiersz na użytkownika) dostaje klucz endpointu"""
+    db_path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("""CREATE TABLE push_subscriptions (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                    subscription_data TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+    conn.executemany("INSERT INTO push_subscriptions (user_id, subscription_data) VALUES (?, ?)", [
+        (1, json.dumps({'endpoint': 'https://fcm.googleapis.com/fcm/send/a'})),
+        (2, json.dumps({'endpoint': 'https://fcm.googleapis.com/fcm/send/a'})),
+        (3, 'nie-json'),
+    ])
+    conn.commit()
+    conn.close()
+
+    app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+    with app.app_context():
+        init_db()
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT id, user_id, endpoint_hash IS NOT NULL, last_seen IS NOT NULL "
+                        "FROM push_subscriptions ORDER BY id").fetchall()
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(push_subscriptions)")}
+    conn.close()
+    assert rows == [(2, 2, 1, 1), (3, 3, 0, 1)]
+    assert 'idx_push_subscriptions_endpoint' in indexes
+
+
+def test_send_without_vapid_key_is_unavailable(admin_client, monkeypatch):
+    """Test braku konfiguracji - 503 zamiast cichego 'wysłano'"""
+    monkeypatch.setitem(app.extensions, 'push_sender', PushSender())
+    response = admin_client.post('/push/send', json={'title': 'a', 'body': 'b'})
+    assert response.status_code == 503
@@ -0,0 +1,102 @@
+"""
+Testy limitów żądań (app/rate_limit.py)
+"""
+
+import pytest
+from flask import session
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from app import app
+from app.database import init_db
+from app.rate_limit import SQLiteStorage, limiter, rate_limit_key
+
+
+@pytest.fixture
+def storage_uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'ratelimit.db'}"
+
+
+def test_sqlite_storage_is_shared_between_processes(storage_uri):
+    """Test wspólnych liczników - dwa magazyny (dwa workery) na jednym pliku"""
+    first, second = storage_from_string(storage_uri), storage_from_string(storage_uri)
+    assert isinstance(first, SQLiteStorage)
+    limit = parse("3 per minute")
+
+    assert FixedWindowRateLimiter(first).hit(limit, "ip:1.2.3.4")
+    assert FixedWindowRateLimiter(second).hit(limit, "ip:1.2.3.4")
+    assert FixedWindowRateLimiter(first).hit(limit, "ip:1.2.3.4")
+    assert not FixedWindowRateLimiter(second).hit(limit, "ip:1.2.3.4")
+    assert FixedWindowRateLimiter(second).hit(limit, "ip:5.6.7.8")
+    assert first.get(limit.key_for("ip:1.2.3.4")) == 4
+
+
+def test_expired_window_starts_from_zero(storage_uri):
+    """Test okna stałego - po upływie okna licznik od nowa"""
+    storage = storage_from_string(storage_uri)
+    assert storage.incr("k/2/1/MINUTE", 60) == 1
+    storage._connection().execute("UPDATE rate_limits SET expires = 0")
+    assert storage.incr("k/2/1/MINUTE", 60) == 1
+    assert storage.get_expiry("k/2/1/MINUTE") > 0
+
+
+def test_over_limit_key_is_rejected_in_process(storage_uri):
+    """Test szybkiego sprawdzenia - klucz ponad limitem odrzucany bez zapisu w bazie"""
+    storage = storage_from_string(storage_uri)
+    key = parse("2 per minute").key_for("user:1")
+    assert [storage.incr(key, 60) for _ in range(3)] == [1, 2, 3]
+
+    storage._connection().execute("DELETE FROM rate_limits")
+    assert storage.incr(key, 60) == 4  # z pamięci procesu, baza nietknięta
+    assert storage._connection().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0] == 0
+
+    storage.clear(key)
+    assert storage.incr(key, 60) == 1
+
+
+def test_key_is_per_user_when_logged_in():
+    """Test klucza - zalogowany użytkownik ma własny limit niezależnie od adresu"""
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.7'}):
+        assert rate_limit_key() == 'ip:10.0.0.7'
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.7'}):
+        session['user_id'] = 42
+        assert rate_limit_key() == 'user:42'
+
+
+def test_login_limit_uses_single_limiter(tmp_path, monkeypatch):
+    """Test limitu logowania - jeden limiter aplikacji, 11. próba w minucie odrzucona"""
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    app.config.update({'TESTING': True, 'DATABASE_PATH': str(tmp_path / 'login.db')})
+    with app.app_context():
+        init_db()
+    limiter.reset()
+    client = app.test_client()
+    statuses = [client.post('/login-email', data={'email': 'x@example.com', 'password': 'zle'}).status_code
+                for _ in range(11)]
+    limiter.reset()
+    assert statuses[:10] == [200] * 10
+    assert statuses[10] == 429
+
+
+def test_login_limit_is_per_forwarded_client(tmp_path, monkeypatch):
+    """Test za proxy (PROXY_FIX_HOPS=1) - limit liczony per adres z X-Forwarded-For, nie per 127.0.0.1"""
+    from app import create_app
+    monkeypatch.setenv('PROXY_FIX_HOPS', '1')
+    proxied = create_app()
+    proxied.config.update({'TESTING': True, 'WTF_CSRF_ENABLED': False,
+                           'DATABASE_PATH': str(tmp_path / 'proxy.db')})
+    with proxied.app_context():
+        init_db()
+    limiter.reset()
+    client = proxied.test_client()
+
+    def login(client_ip):
+        return client.post('/login-email', data={'email': 'x@example.com', 'password': 'zle'},
+                           headers={'X-Forwarded-For': client_ip},
+                           environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code
+
+    statuses = [login('203.0.113.5') for _ in range(11)]
+    other = login('198.51.100.7')
+    limiter.reset()
+    assert statuses[10] == 429
+    assert other == 200
@@ -0,0 +1,82 @@
+"""
+Testy endpointów danych grafiku dla trybu offline (miesiąc + delta)
+"""
+
+import os
+import tempfile
+import pytest
+from app import app
+from app.database import get_db, init_db
+
+
+@pytest.fixture
+def client():
+    """Zalogowany klient z tymczasową bazą danych"""
+    db_fd, db_path = tempfile.mkstemp()
+    app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+
+    with app.test_client() as client:
+        with app.app_context():
+            init_db()
+            db = get_db()
+            db.execute("INSERT INTO employees (name) VALUES ('Jan'), ('Ola')")
+            db.commit()
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        yield client
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def set_shift(date, employee, shift_type):
+    """Zapisz zmianę i wpis w historii jak /api/save"""
+    db = get_db()
+    emp_id = db.execute("SELECT id FROM employees WHERE name = ?", (employee,)).fetchone()['id']
+    db.execute("DELETE FROM shifts WHERE date = ? AND employee_id = ?", (date, emp_id))
+    if shift_type:
+        db.execute("INSERT INTO shifts (date, shift_type, employee_id) VALUES (?, ?, ?)",
+                   (date, shift_type, emp_id))
+    db.execute("""
+        INSERT INTO schedule_changes (date, employee_name, old_shift, new_shift, changed_by)
+        VALUES (?, ?, '', ?, 'test')
+    """, (date, employee, shift_type))
+    db.commit()
+
+
+def test_schedule_month_returns_cursor_and_shifts(client):
+    """Test pełnych danych miesiąca z kursorem"""
+    with app.app_context():
+        set_shift('2025-03-10', 'Jan', 'DNIOWKA')
+
+    response = client.get('/api/schedule/month?year=2025&month=3')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['cursor'] == 1
+    assert data['shifts'] == {'2025-03-10': {'Jan': 'DNIOWKA'}}
+
+    assert client.get('/api/schedule/month?year=2025&month=13').status_code == 400
+
+
+def test_schedule_delta_returns_current_cell_values(client):
+    """Test delty - tylko komórki zmienione po kursorze, z aktualną wartością"""
+    with app.app_context():
+        set_shift('2025-03-10', 'Jan', 'DNIOWKA')
+        set_shift('2025-03-11', 'Ola', 'NOCKA')
+        set_shift('2025-03-11', 'Ola', '')
+        set_shift('2025-04-01', 'Jan', 'NOCKA')
+
+    data = client.get('/api/schedule/delta?since=1&from=2025-03-01&to=2025-03-31').get_json()
+    assert data['cursor'] == 4
+    assert data['reset'] is False
+    assert data['changes'] == [{'date': '2025-03-11', 'employee': 'Ola', 'shift_type': ''}]
+
+    data = client.get('/api/schedule/delta?since=4').get_json()
+    assert data['changes'] == []
+
+
+def test_schedule_delta_reset_for_unknown_cursor(client):
+    """Test wymuszenia pełnego pobrania gdy kursor klienta jest z przyszłości"""
+    data = client.get('/api/schedule/delta?since=100').get_json()
+    assert data['reset'] is True
+    assert client.get('/api/schedule/delta?since=abc').status_code == 400
@@ -0,0 +1,103 @@
+"""
+Testy eksportera SQLite (monitoring/sqlite_exporter.py)
+"""
+
+import sqlite3
+import pytest
+from prometheus_client import REGISTRY
+from monitoring import sqlite_exporter
+from monitoring.sqlite_exporter import SQLiteExporter
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'app.db')
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("CREATE TABLE logs (id INTEGER PRIMARY KEY AUTOINCREMENT, msg TEXT)")
+    conn.execute("CREATE INDEX idx_employees_name ON employees(name)")
+    conn.executemany("INSERT INTO employees (name) VALUES (?)", [(f"P{i}",) for i in range(50)])
+    conn.executemany("INSERT INTO logs (msg) VALUES (?)", [(f"m{i}",) for i in range(30)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def exporter(db_path, monkeypatch):
+    exporter = SQLiteExporter(db_path, cache_seconds=30, quick_check_interval=0, integrity_check_interval=0)
+    monkeypatch.setattr(sqlite_exporter, 'exporter', exporter)
+    return exporter
+
+
+def test_row_estimates_without_count(exporter, db_path):
+    """Test szacunków - sqlite_sequence / MAX(rowid), po ANALYZE sqlite_stat1"""
+    info = exporter.update_metrics()
+    assert info['tables'] == {'employees': 50, 'logs': 30}
+    assert info['page_count'] > 0
+    assert REGISTRY.get_sample_value('sqlite_records_total', {'table': 'employees'}) == 50
+    assert REGISTRY.get_sample_value('sqlite_tables_total') == 2
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM employees WHERE id > 40")
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+    info = exporter.update_metrics(force=True)
+    assert info['tables']['employees'] == 40  # ze statystyk, nie z MAX(rowid)
+    assert 'sqlite_stat1' not in info['tables']
+
+
+def test_metrics_are_cached_between_scrapes(exporter, db_path):
+    """Test bufora - w oknie cache_seconds baza nie jest odpytywana ponownie"""
+    first = exporter.update_metrics()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO logs (msg) VALUES ('nowy')")
+    conn.commit()
+    conn.close()
+
+    assert exporter.update_metrics() is first
+    assert exporter.update_metrics(force=True)['tables']['logs'] == 31
+
+
+def test_integrity_checks_record_results(exporter):
+    """Test quick_check / integrity_check - wynik w metrykach i w /health"""
+    assert exporter.run_integrity_check('quick')['ok'] is True
+    assert exporter.run_integrity_check('full')['ok'] is True
+    assert REGISTRY.get_sample_value('sqlite_integrity_ok', {'check': 'full'}) == 1
+
+    client = sqlite_exporter.app.test_client()
+    response = client.get('/health')
+    assert response.status_code == 200
+    assert set(response.get_json()['checks']) == {'quick', 'full'}
+
+    exporter.check_results['full'] = dict(exporter.check_results['full'], ok=False)
+    assert client.get('/health').status_code == 503
+
+
+def test_health_does_not_run_integrity_check(exporter, monkeypatch):
+    """Test /health - tylko tanie sprawdzenie dostępności"""
+    monkeypatch.setattr(exporter, 'run_integrity_check', lambda kind: pytest.fail("integrity check w /health"))
+
+    response = sqlite_exporter.app.test_client().get('/health')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'healthy'
+
+
+def test_background_checks_run_on_schedule(db_path):
+    """Test harmonogramu - quick_check w tle po opóźnieniu startowym"""
+    exporter = SQLiteExporter(db_path, quick_check_interval=3600, integrity_check_interval=0)
+    exporter.start_background_checks(initial_delay=0)
+    try:
+        for _ in range(100):
+            if 'quick' in exporter.check_results:
+                break
+            exporter._stop.wait(0.05)
+    finally:
+        exporter.stop_background_checks()
+
+    assert exporter.check_results['quick']['ok'] is True
+    assert 'full' not in exporter.check_results
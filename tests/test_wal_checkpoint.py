@@ -0,0 +1,72 @@
+"""
+Testy checkpointów WAL (app/database.py)
+"""
+
+import sqlite3
+import pytest
+from prometheus_client import REGISTRY
+from app.database import CheckpointScheduler, wal_checkpoint, wal_size
+
+
+@pytest.fixture
+def wal_db(tmp_path):
+    """Baza w trybie WAL z niepustym plikiem WAL"""
+    path = str(tmp_path / 'wal.db')
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, payload TEXT)")
+    conn.executemany("INSERT INTO t (payload) VALUES (?)", [('x' * 500,) for _ in range(200)])
+    conn.commit()
+    yield path, conn
+    conn.close()
+
+
+def test_wal_checkpoint_result_and_metrics(wal_db):
+    """Test PRAGMA wal_checkpoint - wynik i licznik stron"""
+    path, conn = wal_db
+    before = REGISTRY.get_sample_value('grafik_db_checkpoints_total', {'mode': 'PASSIVE', 'result': 'ok'}) or 0
+
+    result = wal_checkpoint(conn, 'passive')
+    assert result['mode'] == 'PASSIVE'
+    assert result['busy'] == 0
+    assert result['checkpointed'] == result['log'] > 0
+    assert REGISTRY.get_sample_value('grafik_db_checkpoints_total', {'mode': 'PASSIVE', 'result': 'ok'}) == before + 1
+
+    with pytest.raises(ValueError):
+        wal_checkpoint(conn, 'DROP')
+
+
+def test_scheduler_passive_then_truncate_when_quiet(wal_db, request):
+    """Test harmonogramu - PASSIVE przy zapisach, TRUNCATE po okresie ciszy"""
+    path, conn = wal_db
+    scheduler = CheckpointScheduler(path, interval=60, quiet_seconds=3600)
+    request.addfinalizer(scheduler.stop)
+    assert scheduler.tick()['mode'] == 'PASSIVE'
+    assert wal_size(path) > 0  # PASSIVE nie skraca pliku WAL
+
+    scheduler.quiet_seconds = 0
+    assert scheduler.tick()['mode'] == 'TRUNCATE'
+    assert wal_size(path) == 0
+    assert REGISTRY.get_sample_value('grafik_db_wal_size_bytes') == 0
+    assert scheduler.tick() is None  # bez nowych zapisów nie ma czego robić
+
+    conn.execute("INSERT INTO t (payload) VALUES ('nowy')")
+    conn.commit()
+    assert scheduler.tick()['mode'] == 'TRUNCATE'
+
+
+def test_only_one_scheduler_checkpoints(wal_db):
+    """Test blokady - przy kilku procesach/schedulerach checkpointy robi jeden"""
+    path, _ = wal_db
+    leader = CheckpointScheduler(path)
+    follower = CheckpointScheduler(path)
+
+    try:
+        assert leader.tick() is not None
+        assert follower.tick() is None
+    finally:
+        leader.stop()
+        follower.stop()
+    assert follower.tick() is not None  # blokada zwolniona przez lidera
+    follower.stop()
@@ -0,0 +1,110 @@
+"""
+Testy whitelisty emaili (app/whitelist.py)
+"""
+
+import os
+import sqlite3
+import pytest
+from app import app
+from app.database import init_db
+from app.whitelist import whitelist
+
+
+@pytest.fixture
+def admin_client(tmp_path, monkeypatch):
+    """Administrator zalogowany na bazie z whitelistą przeniesioną z WHITELIST_EMAILS"""
+    monkeypatch.setenv('WHITELIST_EMAILS', 'Jan@Example.com, anna@example.com')
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    db_path = str(tmp_path / 'whitelist.db')
+    app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+    with app.app_context():
+        init_db()
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, name, role) VALUES (1, 'admin@example.com', 'Admin', 'ADMIN')")
+    conn.execute("INSERT INTO users (id, email, name) VALUES (2, 'jan@example.com', 'Jan Kowalski')")
+    conn.execute("ALTER TABLE employees ADD COLUMN email TEXT")
+    conn.execute("INSERT INTO employees (name, email) VALUES ('Jan Kowalski', 'jan@example.com')")
+    conn.commit()
+    conn.close()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_email='admin@example.com', user_role='ADMIN')
+    return client
+
+
+def test_whitelist_get_joins_accounts(admin_client):
+    """Test listy - emaile z WHITELIST_EMAILS w tabeli, konta i pracownicy z JOIN"""
+    response = admin_client.get('/api/whitelist')
+    assert response.status_code == 200
+    assert response.get_json()['emails'] == [
+        {'email': 'anna@example.com', 'user_name': None, 'employee_name': None,
+         'employee_id': None, 'has_account': False},
+        {'email': 'jan@example.com', 'user_name': 'Jan Kowalski', 'employee_name': 'Jan Kowalski',
+         'employee_id': 1, 'has_account': True},
+    ]
+
+
+def test_whitelist_changes_are_persistent(admin_client):
+    """Test dodawania/usuwania - zapis w bazie, nie w os.environ"""
+    assert admin_client.post('/api/whitelist', json={'email': 'Nowy@Example.com'}).status_code == 200
+    assert admin_client.post('/api/whitelist', json={'email': 'nowy@example.com'}).status_code == 400
+    assert admin_client.delete('/api/whitelist', json={'email': 'anna@example.com'}).status_code == 200
+    assert admin_client.delete('/api/whitelist', json={'email': 'anna@example.com'}).status_code == 404
+
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    rows = conn.execute("SELECT email, added_by FROM whitelist_emails ORDER BY email").fetchall()
+    conn.close()
+    assert rows == [('jan@example.com', None), ('nowy@example.com', 1)]
+    assert 'nowy@example.com' not in os.environ['WHITELIST_EMAILS']
+
+
+def test_whitelist_cache_refreshes_on_version_change(admin_client):
+    """Test kopii w procesie - ten sam frozenset do zmiany wersji (np. w innym procesie)"""
+    with app.app_context():
+        emails = whitelist.emails()
+        assert emails == frozenset({'jan@example.com', 'anna@example.com'})
+        assert whitelist.emails() is emails
+        assert whitelist.is_allowed(' JAN@example.com')
+        assert not whitelist.is_allowed('obcy@example.com')
+
+    # Zmiana z innego połączenia - wyzwalacz zwiększa wersję
+    conn = sqlite3.connect(app.config['DATABASE_PATH'])
+    conn.execute("INSERT INTO whitelist_emails (email) VALUES ('obcy@example.com')")
+    conn.commit()
+    conn.close()
+
+    with app.app_context():
+        assert whitelist.is_allowed('obcy@example.com')
+
+
+def test_whitelist_env_merged_into_existing_table(tmp_path, monkeypatch):
+    """Test migracji - WHITELIST_EMAILS dopisane raz do istniejącej tabeli, usunięte nie wracają"""
+    db_path = str(tmp_path / 'existing.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE whitelist_emails (id INTEGER PRIMARY KEY AUTOINCREMENT, email VARCHAR(255) UNIQUE NOT NULL,"
+                 " added_by INTEGER, added_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("INSERT INTO whitelist_emails (email) VALUES ('z-api@example.com')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setenv('WHITELIST_EMAILS', 'jan@example.com,z-api@example.com')
+    app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+
+    from app.database import ensure_whitelist_table, get_db
+    with app.app_context():
+        ensure_whitelist_table()
+        assert whitelist.emails() == frozenset({'jan@example.com', 'z-api@example.com'})
+        get_db().execute("DELETE FROM whitelist_emails WHERE email = 'jan@example.com'")
+        get_db().commit()
+        ensure_whitelist_table()
+        assert whitelist.emails() == frozenset({'z-api@example.com'})
+
+
+def test_whitelist_empty_env_means_no_restriction(tmp_path, monkeypatch):
+    """Test nowej bazy bez WHITELIST_EMAILS - pusta lista, każdy email dozwolony"""
+    monkeypatch.delenv('WHITELIST_EMAILS', raising=False)
+    app.config.update({'TESTING': True, 'DATABASE_PATH': str(tmp_path / 'fresh.db')})
+    with app.app_context():
+        init_db()
+        assert whitelist.emails() == frozenset()
+        assert whitelist.is_allowed('ktokolwiek@example.com')
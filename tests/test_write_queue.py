@@ -0,0 +1,134 @@
+"""
+Testy kolejki zapisu (WriteQueue w app/database.py)
+"""
+
+import sqlite3
+import threading
+import pytest
+from app import create_app
+from app.database import WriteQueue, run_write
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def make_queue(request):
+    """Fabryka kolejek zapisu - wątki zapisujące zatrzymywane po teście"""
+    def make(*args, **kwargs):
+        write_queue = WriteQueue(*args, **kwargs)
+        request.addfinalizer(write_queue.stop)
+        return write_queue
+    return make
+
+
+def insert(db, name):
+    return db.execute("INSERT INTO t (name) VALUES (?)", (name,)).lastrowid
+
+
+def names(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT name FROM t"))
+    finally:
+        conn.close()
+
+
+def test_writes_from_many_threads_are_serialized(db_path, make_queue):
+    """Test szeregowania - zapisy z wielu wątków, bez błędów blokad"""
+    write_queue = make_queue(db_path)
+    errors = []
+
+    def worker(index):
+        try:
+            for j in range(20):
+                write_queue.run(insert, f"{index}-{j}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(names(db_path)) == 160
+
+
+def test_waiting_jobs_share_one_commit(db_path, make_queue):
+    """Test group commit - zadania czekające w kolejce trafiają do jednej transakcji,
+    błąd jednego zadania nie wycofuje pozostałych"""
+    write_queue = make_queue(db_path)
+    batches = []
+    execute = write_queue._execute
+    write_queue._execute = lambda conn, batch: (batches.append(len(batch)), execute(conn, batch))
+
+    started, release = threading.Event(), threading.Event()
+    blocker = write_queue.submit(lambda db: started.set() or release.wait(5))
+    assert started.wait(5)  # wątek zapisujący zajęty - kolejne zadania czekają w kolejce
+    futures = [write_queue.submit(insert, name) for name in ('a', 'b', 'a', 'c')]
+    release.set()
+
+    assert blocker.result(5) is True
+    assert [f.exception(5) is None for f in futures] == [True, True, False, True]
+    assert isinstance(futures[2].exception(), sqlite3.IntegrityError)
+    assert names(db_path) == ['a', 'b', 'c']
+    assert batches == [1, 4]
+
+
+def test_run_write_without_queue_commits_on_request_connection(db_path, monkeypatch):
+    """Test trybu bez kolejki (DB_WRITE_QUEUE=false) - commit/rollback na połączeniu żądania"""
+    monkeypatch.setenv('DB_WRITE_QUEUE', 'false')
+    test_app = create_app()
+    test_app.config.update({'TESTING': True, 'DATABASE_PATH': db_path})
+    assert 'write_queue' not in test_app.extensions
+
+    with test_app.app_context():
+        assert run_write(insert, 'x') == 1
+        with pytest.raises(sqlite3.IntegrityError):
+            run_write(lambda db: (insert(db, 'y'), insert(db, 'x')))
+
+    assert names(db_path) == ['x']
+
+
+def test_window_coalesces_concurrent_writes(db_path, make_queue):
+    """Test okna grupowania - przy równoległych zapisach wątek chwilę czeka na kolejne"""
+    write_queue = make_queue(db_path, window=0.2, max_delay=1.0)
+    batches = []
+    execute = write_queue._execute
+    write_queue._execute = lambda conn, batch: (execute(conn, batch), batches.append(len(batch)))
+    write_queue._coalescing = True  # poprzednia transakcja objęła kilka zadań
+
+    first = write_queue.submit(insert, 'a')
+    threading.Event().wait(0.02)
+    second = write_queue.submit(insert, 'b')
+
+    assert (first.result(5), second.result(5)) == (1, 2)
+    assert batches == [2]
+
+
+def test_max_delay_moves_late_jobs_to_next_commit(db_path, make_queue):
+    """Test limitu opóźnienia - długie zadanie nie wstrzymuje commitu kolejnych"""
+    write_queue = make_queue(db_path, max_delay=0.05)
+    batches = []
+    execute = write_queue._execute
+    write_queue._execute = lambda conn, batch: (execute(conn, batch), batches.append(len(batch)))
+
+    started, release = threading.Event(), threading.Event()
+    blocker = write_queue.submit(lambda db: started.set() or release.wait(5))
+    assert started.wait(5)
+    slow = write_queue.submit(lambda db: threading.Event().wait(0.1) or insert(db, 'slow'))
+    quick = [write_queue.submit(insert, name) for name in ('a', 'b')]
+    release.set()
+
+    assert [f.result(5) for f in [slow] + quick] == [1, 2, 3]
+    assert blocker.result(5) is True
+    assert batches == [1, 1, 2]  # po wolnym zadaniu limit minął - szybkie w osobnej transakcji